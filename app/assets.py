@@ -0,0 +1,143 @@
+"""
+静的アセットのフィンガープリントと事前圧縮
+
+ビルド時に static/ 配下の CSS/JS を内容ハッシュ付きのファイル名で static/dist/ に書き出し、
+.br / .gz の圧縮済みファイルとマニフェスト（論理名 -> ハッシュ付きパス）を生成する。
+配信時はマニフェストで URL を解決し、ハッシュ付きファイルは immutable としてキャッシュさせる。
+
+ビルド方法（app ディレクトリで。Dockerfile でも実行する）:
+    python -m assets
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from middleware import brotli, select_encoding
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path("static")
+DIST_DIRNAME = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# フィンガープリント対象の拡張子
+ASSET_SUFFIXES = (".css", ".js")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+# =============================================================================
+# ビルド
+# =============================================================================
+
+def _fingerprinted_name(path: Path, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    return f"{path.stem}.{digest}{path.suffix}"
+
+
+def build_assets(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    """
+    static_dir 配下のアセットをハッシュ付きファイル名で dist/ に書き出す
+
+    Returns:
+        論理名（例: js/problem.js）-> ハッシュ付きパス（例: dist/js/problem.3f2a9c1b7d4e.js）
+    """
+    dist_dir = static_dir / DIST_DIRNAME
+    if dist_dir.exists():
+        shutil.rmtree(dist_dir)
+
+    manifest: Dict[str, str] = {}
+    for path in sorted(static_dir.rglob("*")):
+        if not path.is_file() or path.suffix not in ASSET_SUFFIXES:
+            continue
+        logical = path.relative_to(static_dir).as_posix()
+        content = path.read_bytes()
+        target = dist_dir / path.parent.relative_to(static_dir) / _fingerprinted_name(path, content)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        target.with_name(target.name + ".gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            target.with_name(target.name + ".br").write_bytes(brotli.compress(content, quality=11))
+        manifest[logical] = target.relative_to(static_dir).as_posix()
+
+    (dist_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    return manifest
+
+
+# =============================================================================
+# URL 解決
+# =============================================================================
+
+class AssetManifest:
+    """論理名からハッシュ付き URL を解決する（ビルド前は元のパスを返す）"""
+
+    def __init__(self, static_dir: Path = STATIC_DIR, url_prefix: str = "/static"):
+        self.url_prefix = url_prefix
+        self.mapping: Dict[str, str] = {}
+        manifest_path = static_dir / DIST_DIRNAME / MANIFEST_NAME
+        if manifest_path.exists():
+            self.mapping = json.loads(manifest_path.read_text(encoding="utf-8"))
+        else:
+            logger.info("アセットマニフェストがないため、ハッシュなしの URL で配信します")
+        self.fingerprinted = set(self.mapping.values())
+
+    def url(self, name: str) -> str:
+        return f"{self.url_prefix}/{self.mapping.get(name, name)}"
+
+
+# =============================================================================
+# 配信
+# =============================================================================
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    事前圧縮済みファイルを優先して返す StaticFiles
+
+    ハッシュ付きファイルは Accept-Encoding に応じて .br / .gz を返し、
+    Cache-Control: immutable を付与する。それ以外は StaticFiles と同じ。
+    """
+
+    def __init__(self, *args, manifest: Optional[AssetManifest] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        relative = Path(path).as_posix()
+        if self.manifest is None or relative not in self.manifest.fingerprinted:
+            return await super().get_response(path, scope)
+
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if stat_result is None:
+            return await super().get_response(path, scope)
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if encoding is not None:
+            compressed_path = f"{full_path}.{'br' if encoding == 'br' else 'gz'}"
+            if os.path.isfile(compressed_path):
+                headers["Content-Encoding"] = encoding
+                return FileResponse(
+                    compressed_path,
+                    headers=headers,
+                    media_type=mimetypes.guess_type(full_path)[0],
+                )
+        return FileResponse(full_path, headers=headers, stat_result=stat_result)
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    for logical, fingerprinted in built.items():
+        print(f"{logical} -> {fingerprinted}")
@@ -0,0 +1,73 @@
+"""
+ベンチマーク: レスポンス圧縮の転送量
+
+代表的なエンドポイントの応答（問題詳細・インタビュー履歴・採点結果）について、
+非圧縮 / gzip / brotli のバイト数を比較する。本文には実際の論述サンプル
+(tests/fixtures/sample_answers.json) を使う。
+
+実行方法（app ディレクトリで）:
+    python -m benchmarks.bench_compression
+"""
+
+import json
+from pathlib import Path
+
+from middleware import brotli, compress_body
+
+SAMPLES = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "sample_answers.json"
+
+
+def load_answers() -> dict:
+    return json.loads(SAMPLES.read_text(encoding="utf-8"))["high_score_answer"]["answers"]
+
+
+def make_payloads(answers: dict) -> dict:
+    """エンドポイントごとの代表的な応答本文"""
+    text = "\n".join(answers.values())
+    problem_detail = {
+        "exam_type": "IS",
+        "problem_id": "YEAR#2024SPRING#ESSAY#Q1",
+        "title": "システムリスク対応方針の立案について",
+        "year_term": "2024春",
+        "problem_content": text[:2500],
+        "problem_question": {"設問ア": text[:200], "設問イ": text[200:400], "設問ウ": text[400:600]},
+        "time_limit_minutes": 120,
+        "word_count_limits": {"設問ア": {"min": 600, "max": 800}},
+    }
+    interview_session = {
+        "session_id": "s-1",
+        "history": [
+            {"role": "assistant" if i % 2 else "user", "content": text[i * 300:(i + 1) * 300]}
+            for i in range(20)
+        ],
+    }
+    scoring = {
+        "submission_id": "sub-1",
+        "scores": {k: {"score": 70, "feedback": v[:400]} for k, v in answers.items()},
+        "total_score": 70,
+        "rank": "B",
+        "overall_feedback": text[:800],
+        "answers": answers,
+    }
+    return {
+        "GET /api/exams/detail": problem_detail,
+        "GET /api/interview/session": interview_session,
+        "GET /api/scoring/{id}": scoring,
+    }
+
+
+def main():
+    payloads = make_payloads(load_answers())
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    print(f"{'endpoint':<28}{'raw':>9}" + "".join(f"{e:>16}" for e in encodings))
+    for name, payload in payloads.items():
+        raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        row = f"{name:<28}{len(raw):>9,}"
+        for encoding in encodings:
+            size = len(compress_body(encoding, raw))
+            row += f"{size:>9,} ({size / len(raw):4.0%})"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+マイクロベンチマーク: 論文の機械的チェック（ルールベース）
+
+tests/conftest.py の高評価・低評価サンプル回答を使い、1 論文あたりの解析時間と
+一括処理（analyze_many）のスループットを表示する。入力中のリアルタイム表示（数 ms 以内）と
+大量の再採点前処理の目安にする。
+
+実行方法（app ディレクトリで）:
+    python -m benchmarks.bench_essay_analysis
+    python -m benchmarks.bench_essay_analysis --runs 5000 --batch 1000
+"""
+
+import argparse
+import statistics
+import time
+
+from services.essay_analysis import analyze_answers, analyze_many
+from tests import conftest
+
+
+def sample_essays() -> dict:
+    """conftest のフィクスチャ関数を直接呼んでサンプル回答を得る"""
+    return {
+        "high_score": conftest.sample_answers_high_score.__wrapped__(),
+        "low_score": conftest.sample_answers_low_score.__wrapped__(),
+    }
+
+
+def bench_single(answers: dict, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        analyze_answers(answers)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    essays = sample_essays()
+    print(f"{'sample':<12}{'chars':>8}{'p50 (us)':>12}{'p95 (us)':>12}  checks")
+    for name, answers in essays.items():
+        samples = bench_single(answers, args.runs)
+        chars = sum(len(a) for a in answers.values())
+        checks = analyze_answers(answers).checks
+        passed = ",".join(k for k, v in checks.items() if v) or "-"
+        print(
+            f"{name:<12}{chars:>8}{statistics.median(samples) * 1e6:>12.1f}"
+            f"{sorted(samples)[int(len(samples) * 0.95) - 1] * 1e6:>12.1f}  {passed}"
+        )
+
+    batch = [answers for _ in range(args.batch) for answers in essays.values()]
+    start = time.perf_counter()
+    analyze_many(batch)
+    elapsed = time.perf_counter() - start
+    print(f"\nanalyze_many: {len(batch)} 論文 {elapsed * 1000:.1f}ms ({len(batch) / elapsed:,.0f} 論文/秒)")
+
+
+if __name__ == "__main__":
+    main()
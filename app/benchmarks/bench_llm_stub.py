@@ -0,0 +1,124 @@
+"""
+ベンチマーク: LLM スタブによるエンドツーエンドの採点
+
+POST /api/scoring?wait=true（採点完了まで待つ）を ASGI 経由で並行に発行し、ルーター・採点・ガバナー・JSON 補修を通した
+応答時間（p50 / p95）・スループット・ステータス別件数・トークン数を表示する。
+Bedrock はローカルスタブ（services/llm.py の StubLLMProvider）で、トークン課金は発生しない。
+DynamoDB は回答を返すだけのスタブ。
+
+実行方法（app ディレクトリで）:
+    python -m benchmarks.bench_llm_stub
+    python -m benchmarks.bench_llm_stub --requests 100 --concurrency 20 --error-rate 0.1
+    python -m benchmarks.bench_llm_stub --replay data/llm-recordings.jsonl --mode per_question
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from unittest.mock import MagicMock
+
+import httpx
+
+from main import app
+from routers import scoring
+from services.aws import get_aws_clients
+from services.bedrock_governor import bedrock_governor
+from services.llm import StubLLMProvider
+from services.metrics import metrics
+from services.scoring import SCORING_MODE_SINGLE, get_scoring_queue
+from services.scoring_cache import get_scoring_cache
+
+PARAGRAPH = "私はA社の情報システム部門でITストラテジストとして中期IT戦略の策定を担当した。なぜならば、"
+
+
+def make_stub_aws(args) -> MagicMock:
+    """回答ごとに文面を少し変え、スタブの点数が回答によって変わるようにする"""
+
+    def get_item(Key, **kwargs):
+        n = int(Key["submission_id"].rsplit("-", 1)[-1])
+        answers = {q: f"{PARAGRAPH * (18 + i * 4)}（{n}）" for i, q in enumerate(("設問ア", "設問イ", "設問ウ"))}
+        return {"Item": {"submission_id": Key["submission_id"], "answers": answers}}
+
+    aws = MagicMock()
+    aws.submission_table.get_item.side_effect = get_item
+    aws.bedrock = StubLLMProvider(
+        replay_path=args.replay,
+        latency_seconds=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    return aws
+
+
+async def run(args) -> dict:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    samples = []
+    statuses: Counter = Counter()
+
+    async def score(client: httpx.AsyncClient, n: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/api/scoring?wait=true", json={"submission_id": f"bench-{n}"})
+            samples.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(score(client, n) for n in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    samples.sort()
+    return {
+        "elapsed": elapsed,
+        "p50": statistics.median(samples),
+        "p95": samples[max(0, int(len(samples) * 0.95) - 1)],
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mode", default=SCORING_MODE_SINGLE)
+    parser.add_argument("--latency", type=float, default=0.3, help="初回トークンまでの秒数")
+    parser.add_argument("--tokens-per-second", type=float, default=400)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replay", default=None, help="RecordingProvider が記録した JSON Lines")
+    args = parser.parse_args()
+
+    scoring.settings.scoring_mode = args.mode
+    scoring.limiter.enabled = False
+    bedrock_governor.retry_base_seconds = 0.05
+    aws = make_stub_aws(args)
+    app.dependency_overrides[get_aws_clients] = lambda: aws
+    app.dependency_overrides[get_scoring_cache] = lambda: None
+    app.dependency_overrides[get_scoring_queue] = lambda: None
+    metrics.reset()
+
+    r = asyncio.run(run(args))
+
+    counters = metrics.snapshot()["counters"]
+    print(
+        f"LLM スタブ: 初回 {args.latency:.2f}s, {args.tokens_per_second:.0f} tok/s, エラー率 {args.error_rate:.0%}, "
+        f"mode={args.mode}, {args.requests} 件 / 並行 {args.concurrency}"
+    )
+    print(f"  p50 {r['p50']:.2f}s  p95 {r['p95']:.2f}s  スループット {args.requests / r['elapsed'] * 60:.0f} 件/分")
+    print(f"  ステータス {r['statuses']}")
+    print(
+        f"  入力トークン {counters.get(f'scoring.{args.mode}.input_tokens', 0):.0f}"
+        f"  出力トークン {counters.get(f'scoring.{args.mode}.output_tokens', 0):.0f}"
+        f"  スロットリング {counters.get('bedrock.throttled', 0):.0f}"
+        f"  ガバナー上限 {bedrock_governor.limit:.1f}"
+    )
+    extract = {k.rsplit(".", 1)[-1]: v for k, v in counters.items() if k.startswith(f"json_extract.scoring.{args.mode}.")}
+    print(f"  JSON 取り出し {extract}")
+
+
+if __name__ == "__main__":
+    main()
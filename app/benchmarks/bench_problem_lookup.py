@@ -0,0 +1,69 @@
+"""
+マイクロベンチマーク: 問題詳細の検索
+
+S3 問題配列に対する線形走査と、読み込み時に構築する question_id 索引の検索時間を比較する。
+
+実行方法（app ディレクトリで）:
+    python -m benchmarks.bench_problem_lookup
+    python -m benchmarks.bench_problem_lookup --problems 5000 --lookups 20000
+"""
+
+import argparse
+import random
+import time
+
+from services.problems import build_problem_index
+
+
+def make_problems(count: int) -> list:
+    """合成問題データを生成（実データと同程度の本文長）"""
+    return [
+        {
+            "question_id": f"IS#YEAR#{2000 + i // 6}{'SPRING' if i % 2 else 'FALL'}#ESSAY#Q{i}",
+            "problemContent": "情報システム戦略の策定について述べよ。" * 40,
+            "problemQuestion": {"設問ア": "...", "設問イ": "...", "設問ウ": "..."},
+        }
+        for i in range(count)
+    ]
+
+
+def linear_lookup(problems: list, question_id: str):
+    """従来実装: 配列を先頭から走査"""
+    for problem in problems:
+        if problem.get("question_id") == question_id:
+            return problem
+    return None
+
+
+def bench(label: str, func, keys: list) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    elapsed = time.perf_counter() - start
+    per_lookup_us = elapsed / len(keys) * 1_000_000
+    print(f"{label:<14} total={elapsed * 1000:9.2f}ms  per_lookup={per_lookup_us:8.3f}us")
+    return per_lookup_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--problems", type=int, default=3000, help="合成問題数")
+    parser.add_argument("--lookups", type=int, default=10000, help="検索回数")
+    args = parser.parse_args()
+
+    problems = make_problems(args.problems)
+    rng = random.Random(42)
+    keys = [rng.choice(problems)["question_id"] for _ in range(args.lookups)]
+
+    start = time.perf_counter()
+    index = build_problem_index(problems)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"problems={args.problems} lookups={args.lookups} index_build={build_ms:.2f}ms (読み込み時に1回のみ)")
+    linear = bench("linear scan", lambda key: linear_lookup(problems, key), keys)
+    indexed = bench("index lookup", index.get, keys)
+    print(f"speedup: x{linear / indexed:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
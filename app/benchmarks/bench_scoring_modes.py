@@ -0,0 +1,120 @@
+"""
+ベンチマーク: 採点モードの比較（single / per_question）
+
+全設問を 1 プロンプトで採点する single と、設問ごとのプロンプトを並行実行する
+per_question について、1 回答あたりの所要時間（p50 / p95）と入出力トークン数を表示する。
+
+Bedrock はスタブで、応答時間を「初回トークンまで --ttft-ms + 出力トークン数 × --ms-per-token」で模擬する。
+トークン数は文字数 / --chars-per-token で概算する（日本語は 1 トークンあたり 1〜2 文字程度）。
+
+実行方法（app ディレクトリで）:
+    python -m benchmarks.bench_scoring_modes
+    python -m benchmarks.bench_scoring_modes --ms-per-token 15 --runs 10
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import time
+from unittest.mock import MagicMock
+
+from services.metrics import metrics
+from services.scoring import (
+    SCORING_CRITERIA,
+    SCORING_MODE_PER_QUESTION,
+    SCORING_MODE_SINGLE,
+    score_submission_answers,
+)
+
+QUESTIONS = ("設問ア", "設問イ", "設問ウ")
+COMMENT = "具体的な数値と企業名が示されており、施策との因果関係も明確に説明されている。"
+
+
+def make_answers() -> dict:
+    paragraph = "私はA社の情報システム部門でITストラテジストとして中期IT戦略の策定を担当した。なぜならば、"
+    return {q: paragraph * (18 + i * 4) for i, q in enumerate(QUESTIONS)}
+
+
+def criteria_output() -> list:
+    return [{"criterion": name, "weight": weight, "points": 82, "comment": COMMENT} for name, weight in SCORING_CRITERIA]
+
+
+def single_output() -> str:
+    return json.dumps({
+        "question_breakdown": {
+            q: {"level": "A", "question_score": 82, "criteria_scores": criteria_output()} for q in QUESTIONS
+        },
+        "aggregate_score": 82,
+        "final_rank": "A",
+        "feedback": COMMENT * 3,
+    }, ensure_ascii=False, indent=2)
+
+
+def question_output() -> str:
+    return json.dumps({"criteria_scores": criteria_output()}, ensure_ascii=False, indent=2)
+
+
+def make_stub_aws(args) -> MagicMock:
+    answers = make_answers()
+
+    def invoke_model(**kwargs):
+        prompt = json.loads(kwargs["body"])["messages"][0]["content"]
+        per_question = re.search(r"「(設問.)」への回答だけを評価", prompt) is not None
+        text = question_output() if per_question else single_output()
+        input_tokens = int(len(prompt) / args.chars_per_token)
+        output_tokens = int(len(text) / args.chars_per_token)
+        time.sleep((args.ttft_ms + output_tokens * args.ms_per_token) / 1000)
+        body = json.dumps({
+            "content": [{"text": text}],
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+        })
+        return {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+
+    aws = MagicMock()
+    aws.submission_table.get_item.return_value = {"Item": {"submission_id": "bench", "answers": answers}}
+    aws.bedrock.invoke_model.side_effect = invoke_model
+    return aws
+
+
+async def run_mode(aws, mode: str, runs: int) -> dict:
+    metrics.reset()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await score_submission_answers(aws, "bench", mode=mode)
+        samples.append(time.perf_counter() - started)
+    return {
+        "p50": statistics.median(samples),
+        "p95": sorted(samples)[max(0, int(len(samples) * 0.95) - 1)],
+        "input_tokens": metrics.counter(f"scoring.{mode}.input_tokens") / runs,
+        "output_tokens": metrics.counter(f"scoring.{mode}.output_tokens") / runs,
+        "aggregate_score": result["aggregate_score"],
+        "final_rank": result["final_rank"],
+    }
+
+
+async def main_async(args) -> None:
+    aws = make_stub_aws(args)
+    print(f"Bedrock スタブ: TTFT {args.ttft_ms:.0f}ms, {args.ms_per_token:.0f}ms/token, runs={args.runs}")
+    print(f"{'mode':<14}{'p50 (s)':>10}{'p95 (s)':>10}{'input tok':>12}{'output tok':>12}{'score':>8}{'rank':>6}")
+    for mode in (SCORING_MODE_SINGLE, SCORING_MODE_PER_QUESTION):
+        r = await run_mode(aws, mode, args.runs)
+        print(
+            f"{mode:<14}{r['p50']:>10.2f}{r['p95']:>10.2f}{r['input_tokens']:>12.0f}"
+            f"{r['output_tokens']:>12.0f}{r['aggregate_score']:>8}{r['final_rank']:>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=600)
+    parser.add_argument("--ms-per-token", type=float, default=4)
+    parser.add_argument("--chars-per-token", type=float, default=1.5)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+ベンチマーク: セキュリティヘッダーミドルウェア
+
+従来の BaseHTTPMiddleware 実装（リクエストごとに CSP 文字列を構築）と、
+純粋な ASGI 実装（エンコード済みヘッダーを http.response.start に差し込むだけ）を比較する。
+ネットワークを介さず ASGI アプリを直接呼び出すため、ミドルウェア自体のオーバーヘッドが表れる。
+
+- requests/sec: 小さな JSON 応答を逐次処理した場合のスループット
+- TTFB: ストリーミング応答（SSE 相当）の最初のチャンクが送信されるまでの時間
+
+実行方法（app ディレクトリで）:
+    python -m benchmarks.bench_security_headers
+    python -m benchmarks.bench_security_headers --requests 20000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middleware import CONTENT_SECURITY_POLICY, SecurityHeadersMiddleware
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """従来実装（比較用）"""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        response.headers["Content-Security-Policy"] = CONTENT_SECURITY_POLICY
+        return response
+
+
+def make_app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            yield "data: first\n\n"
+            for _ in range(20):
+                await asyncio.sleep(0)
+                yield "data: chunk\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_middleware(middleware)
+    return app
+
+
+def make_scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "server": ("bench", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+
+
+async def call(app, path: str, on_first_body=None) -> None:
+    async def receive():
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    first = True
+
+    async def send(message):
+        nonlocal first
+        if message["type"] == "http.response.body" and first and on_first_body:
+            first = False
+            on_first_body()
+
+    await app(make_scope(path), receive, send)
+
+
+async def requests_per_second(app, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        await call(app, "/health")
+    return count / (time.perf_counter() - start)
+
+
+async def ttfb_us(app, count: int) -> float:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await call(app, "/stream", lambda: samples.append(time.perf_counter() - start))
+    return statistics.median(samples) * 1_000_000
+
+
+async def run(args):
+    for label, middleware in (
+        ("BaseHTTPMiddleware", LegacySecurityHeadersMiddleware),
+        ("pure ASGI", SecurityHeadersMiddleware),
+    ):
+        app = make_app(middleware)
+        await requests_per_second(app, 200)  # ウォームアップ
+        rps = await requests_per_second(app, args.requests)
+        ttfb = await ttfb_us(app, args.streams)
+        print(f"{label:<20} requests/sec={rps:9,.0f}  stream TTFB(median)={ttfb:8.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="スループット計測のリクエスト数")
+    parser.add_argument("--streams", type=int, default=500, help="TTFB 計測のストリーム数")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+ベンチマーク: 論文設計ウィザードの初期表示
+
+従来のフロー（問題詳細・モジュール・設計図を並列取得し、その後インタビューセッションを取得）と、
+集約エンドポイント /api/wizard/bootstrap の 1 往復を比較し、p50 / p95 を表示する。
+
+AWS 呼び出しはスタブ（DynamoDB 呼び出しごとに --dynamodb-ms のスレッド待ち）、
+ブラウザと ALB 間の往復はリクエストごとに --rtt-ms の待ちで模擬する。
+
+実行方法（app ディレクトリで）:
+    python -m benchmarks.bench_wizard_bootstrap
+    python -m benchmarks.bench_wizard_bootstrap --rtt-ms 80 --dynamodb-ms 10 --runs 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from unittest.mock import MagicMock
+
+import httpx
+
+from main import app
+from services.aws import get_aws_clients
+from services.catalog import ExamCatalog, get_exam_catalog, load_exam_items
+from services.problems import ProblemDocumentCache, fetch_s3_object, get_problem_cache
+
+PROBLEM_ID = "YEAR#2024SPRING#ESSAY#Q1"
+
+
+def make_stub_aws(dynamodb_ms: float) -> MagicMock:
+    rng = random.Random(1)
+
+    def slow(result):
+        def call(**kwargs):
+            # DynamoDB のレイテンシのばらつきを模擬（平均 dynamodb_ms）
+            time.sleep(rng.expovariate(1 / dynamodb_ms) / 1000)
+            return result
+        return call
+
+    aws = MagicMock()
+    item = {"PK": "EXAM#IS", "SK": PROBLEM_ID, "title": "問題", "year_term": "2024春",
+            "s3_uri": "s3://bucket/IS/is_essay.json"}
+    body = json.dumps([{"question_id": f"IS#{PROBLEM_ID}", "problemContent": "本文" * 1000}],
+                      ensure_ascii=False).encode()
+    aws.exam_table.query.side_effect = slow({"Items": [item]})
+    aws.s3.get_object.side_effect = lambda **kwargs: {"Body": MagicMock(read=lambda: body), "ETag": '"e"'}
+    aws.modules_table.query.side_effect = slow({"Items": []})
+    aws.designs_table.get_item.side_effect = slow({})
+    aws.interview_table.get_item.side_effect = slow({"Item": {
+        "user_id": "demo-user", "exam_id": PROBLEM_ID, "history": [], "status": "active",
+    }})
+    return aws
+
+
+class RttTransport(httpx.AsyncBaseTransport):
+    """リクエストごとにネットワーク往復時間を加える ASGI トランスポート"""
+
+    def __init__(self, rtt_ms: float):
+        self.inner = httpx.ASGITransport(app=app)
+        self.rtt = rtt_ms / 1000
+
+    async def handle_async_request(self, request):
+        await asyncio.sleep(self.rtt)
+        return await self.inner.handle_async_request(request)
+
+
+async def legacy_flow(client: httpx.AsyncClient) -> None:
+    params = {"exam_type": "IS", "problem_id": PROBLEM_ID}
+    await asyncio.gather(
+        client.get("/api/exams/detail", params=params),
+        client.get("/api/modules"),
+        client.get(f"/api/designs/{PROBLEM_ID}"),
+    )
+    # モーダル表示時にインタビューセッションを取得
+    await client.get(f"/api/interview/sessions/{PROBLEM_ID}")
+
+
+async def bootstrap_flow(client: httpx.AsyncClient) -> None:
+    await client.get("/api/wizard/bootstrap", params={"exam_type": "IS", "problem_id": PROBLEM_ID})
+
+
+async def measure(flow, client, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await flow(client)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples: list, p: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(p) - 1]
+
+
+async def run(args):
+    aws = make_stub_aws(args.dynamodb_ms)
+    app.dependency_overrides[get_aws_clients] = lambda: aws
+    catalog = ExamCatalog(lambda t: load_exam_items(aws, t), ttl_seconds=3600, stale_seconds=0)
+    problem_cache = ProblemDocumentCache(
+        lambda b, k, e: fetch_s3_object(aws, b, k, e), max_bytes=1 << 24, ttl_seconds=3600, negative_ttl_seconds=30
+    )
+    app.dependency_overrides[get_exam_catalog] = lambda: catalog
+    app.dependency_overrides[get_problem_cache] = lambda: problem_cache
+
+    async with httpx.AsyncClient(transport=RttTransport(args.rtt_ms), base_url="http://bench") as client:
+        await bootstrap_flow(client)  # キャッシュを温める
+        print(f"rtt={args.rtt_ms}ms dynamodb(avg)={args.dynamodb_ms}ms runs={args.runs}")
+        for label, flow in (("legacy (4 requests)", legacy_flow), ("bootstrap (1 request)", bootstrap_flow)):
+            samples = await measure(flow, client, args.runs)
+            print(f"{label:<24} p50={percentile(samples, 50):7.1f}ms  p95={percentile(samples, 95):7.1f}ms")
+    app.dependency_overrides.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rtt-ms", type=float, default=50, help="ブラウザ - ALB 間の往復時間")
+    parser.add_argument("--dynamodb-ms", type=float, default=8, help="DynamoDB 呼び出しの平均レイテンシ")
+    parser.add_argument("--runs", type=int, default=100)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
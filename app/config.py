@@ -5,6 +5,7 @@ Scribo アプリケーション設定
 
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -19,10 +20,119 @@ class Settings(BaseSettings):
     dynamodb_modules_table: str = "ModulesTable"
     dynamodb_designs_table: str = "DesignsTable"
     dynamodb_interview_session_table: str = "InterviewSessionsTable"
+    dynamodb_scoring_jobs_table: str = "ScoringJobsTable"
+    dynamodb_scoring_cache_table: str = "ScoringCacheTable"
+    dynamodb_bedrock_governor_table: str = "BedrockGovernorTable"
     
     # Bedrock モデル設定
     bedrock_model_id: str = "anthropic.claude-3-5-sonnet-20240620-v1:0"
-    
+    # 固定のシステム指示に cache_control を付ける（プロンプトキャッシュ対応モデルでのみ有効にする）
+    bedrock_prompt_caching: bool = False
+
+    # LLM プロバイダー: bedrock（本番）または stub（ローカルの決定的なスタブ。課金なしの負荷試験・計測用）
+    llm_provider: str = "bedrock"
+    # Bedrock の応答を記録する JSON Lines（llm_stub_replay_path に指定してスタブで再生できる）
+    llm_record_path: Optional[str] = None
+    llm_stub_replay_path: Optional[str] = None
+    llm_stub_latency_seconds: float = 0.5
+    llm_stub_tokens_per_second: float = 50.0
+    llm_stub_error_rate: float = 0.0
+    llm_stub_error_code: str = "ThrottlingException"
+    llm_stub_seed: int = 0
+
+    # AWS 呼び出しの同時実行上限（サービス別スレッド数）
+    aws_dynamodb_concurrency: int = 32
+    aws_s3_concurrency: int = 16
+    aws_bedrock_concurrency: int = 8
+
+    # AWS クライアント接続設定（同時実行上限以上のプールサイズを確保する）
+    aws_max_pool_connections: int = 50
+    aws_tcp_keepalive: bool = True
+    aws_retry_mode: str = "adaptive"
+    aws_max_attempts: int = 5
+
+    # サービス別タイムアウト（秒）
+    dynamodb_connect_timeout: float = 2.0
+    dynamodb_read_timeout: float = 5.0
+    s3_connect_timeout: float = 2.0
+    s3_read_timeout: float = 10.0
+    bedrock_connect_timeout: float = 5.0
+    bedrock_read_timeout: float = 120.0
+
+    # Bedrock ガバナー（AIMD で同時実行数を調整し、スロットリングは再試行、失敗が続けばサーキットを開く）
+    # 状態の保存先は memory（単一プロセス）または dynamodb（全タスクで上限とサーキットを共有し、上限をタスク数で分け合う）
+    # 再試行はガバナーが行うため、Bedrock クライアント自体の再試行回数は bedrock_client_max_attempts に抑える
+    bedrock_governor_store: str = "memory"
+    bedrock_concurrency_initial: int = 4
+    bedrock_concurrency_min: int = 1
+    bedrock_concurrency_max: int = 8
+    bedrock_latency_target_seconds: float = 30.0
+    bedrock_max_attempts: int = 4
+    bedrock_retry_base_seconds: float = 0.5
+    bedrock_retry_max_seconds: float = 8.0
+    bedrock_circuit_failure_threshold: int = 5
+    bedrock_circuit_open_seconds: float = 30.0
+    bedrock_governor_sync_seconds: float = 5.0
+    # タスクの生存記録の有効期間（この間に同期のないタスクは上限を分け合うタスクから外れる）
+    bedrock_governor_member_ttl_seconds: float = 20.0
+    bedrock_client_max_attempts: int = 1
+
+    # 試験カタログキャッシュ（秒）
+    # TTL 経過後、stale 期間内は古い一覧を返しつつバックグラウンドで再取得する
+    exam_catalog_ttl_seconds: float = 3600
+    exam_catalog_stale_seconds: float = 86400
+
+    # S3 問題ドキュメントキャッシュ
+    # 上限はデコード後のオブジェクトの推定メモリ量の合計（Fargate タスクメモリ 1024MiB を前提）
+    problem_cache_max_bytes: int = 64 * 1024 * 1024
+    problem_cache_ttl_seconds: float = 3600
+    problem_cache_negative_ttl_seconds: float = 30
+
+    # 試験データ API のブラウザキャッシュ有効期間（秒）。期限後は ETag で再検証する
+    exam_http_max_age_seconds: int = 300
+
+    # レスポンス圧縮（brotli 未導入時は gzip のみ）
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+
+    # 問題ページの SSR（問題詳細を初期 HTML に埋め込む。タイムアウト時はクライアント取得）
+    ssr_problem_detail: bool = True
+    ssr_problem_timeout_seconds: float = 2.0
+
+    # 同梱の試験コーパススナップショット（python -m services.snapshot で生成。なければ未使用）
+    corpus_snapshot_path: str = "data/corpus.snapshot"
+    # true ならスナップショットを読み込めないとき起動に失敗する（本番で同梱漏れに気付けるように）
+    corpus_snapshot_required: bool = False
+
+    # 起動時ウォームアップ（有効時は完了まで /ready が 503 を返す）
+    warmup_enabled: bool = False
+    warmup_exam_types: List[str] = ["IS", "PM", "SA", "ST"]
+    warmup_timeout_seconds: float = 60
+
+    # 採点モード: single（全設問を 1 プロンプト）または per_question（設問ごとに並行採点）
+    scoring_mode: str = "single"
+    # 採点結果の JSON が補修しても読めない・項目が欠けているときに生成し直す回数
+    scoring_output_retries: int = 1
+
+    # 採点結果キャッシュ（同一回答の再提出は Bedrock を呼ばずに結果を再利用する）
+    # 保存先は memory / dynamodb / none（無効）
+    scoring_cache_store: str = "memory"
+    scoring_cache_ttl_seconds: int = 7 * 24 * 3600
+    scoring_cache_max_entries: int = 1000
+
+    # 採点ジョブキュー（ワーカー数が Bedrock 採点の同時実行上限になる）
+    # ジョブストアは memory（単一プロセス）または dynamodb（複数タスク構成）
+    scoring_job_store: str = "memory"
+    scoring_worker_concurrency: int = 4
+    scoring_queue_max_size: int = 100
+    scoring_job_ttl_seconds: int = 86400
+    # ジョブの採点をストリーミングで生成し、設問ごとの評価を完成次第 SSE で通知する
+    scoring_streaming: bool = True
+
+    # 管理エンドポイント用トークン（未設定時は管理エンドポイント無効）
+    admin_token: str = ""
+
     # アプリケーション設定
     app_name: str = "Scribo"
     app_description: str = "IPA午後Ⅱ論述式試験 学習支援アプリケーション"
@@ -5,54 +5,140 @@ FastAPI + htmx + Jinja2 構成
 メインエントリーポイント
 """
 
-from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+from assets import PrecompressedStaticFiles
 from config import get_settings
-from routers import exams, answers, scoring, modules, designs, interview
+from middleware import CompressionMiddleware, SecurityHeadersMiddleware
+from routers import exams, answers, scoring, modules, designs, interview, admin, wizard
+from routers.admin import require_admin
+from services.aws import AWSClients, get_aws_clients
+from services.bedrock_governor import bedrock_governor, create_governor_state
+from services.catalog import ExamCatalog, get_exam_catalog, load_exam_items
+from services.metrics import metrics
+from services.problems import ProblemDocumentCache, fetch_s3_object, get_problem_cache, load_problem_detail
+from services.scoring import ScoringQueue, create_job_store, score_submission_answers
+from services.scoring_cache import create_scoring_cache
+from services.snapshot import CorpusSnapshot, snapshot_catalog_loader, snapshot_object_fetcher
+from services.warmup import WarmupState, run_warmup
+from templating import asset_manifest, templates
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 # レート制限設定
 limiter = Limiter(key_func=get_remote_address)
 
 
 # =============================================================================
-# セキュリティヘッダーミドルウェア
+# ライフサイクル
 # =============================================================================
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """XSS、クリックジャッキング等を防ぐセキュリティヘッダーを追加"""
-    
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        # XSS対策
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        # リファラー情報漏洩防止
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        # CSP（CDNからのスクリプト読み込みを許可）
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net https://cdn.tailwindcss.com https://unpkg.com; "
-            "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com; "
-            "font-src 'self' https://fonts.gstatic.com; "
-            "img-src 'self' data:; "
-            "connect-src 'self' https://cdn.jsdelivr.net;"
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時に共有リソースを生成し、終了時に解放する"""
+    # AWS クライアントはワーカープロセスごとに一度だけ生成（fork 後に生成する必要がある）
+    app.state.aws = AWSClients(settings)
+    metrics.register_gauge("aws_pools", app.state.aws.pool_stats)
+
+    # 試験カタログ・問題ドキュメントの取得経路（同梱スナップショットがあれば優先）
+    aws = app.state.aws
+    catalog_loader = lambda exam_type: load_exam_items(aws, exam_type)
+    object_fetcher = lambda bucket, key, etag: fetch_s3_object(aws, bucket, key, etag)
+    app.state.snapshot = CorpusSnapshot.open_if_exists(settings.corpus_snapshot_path)
+    if app.state.snapshot is None and settings.corpus_snapshot_required:
+        app.state.aws.close()
+        raise RuntimeError(
+            f"コーパススナップショットがありません: {settings.corpus_snapshot_path}"
+            "（python -m services.snapshot で生成してイメージに同梱してください）"
         )
-        return response
+    if app.state.snapshot is not None:
+        catalog_loader = snapshot_catalog_loader(app.state.snapshot, catalog_loader)
+        object_fetcher = snapshot_object_fetcher(app.state.snapshot, object_fetcher)
+
+    # 試験カタログキャッシュ
+    app.state.exam_catalog = ExamCatalog(
+        loader=catalog_loader,
+        ttl_seconds=settings.exam_catalog_ttl_seconds,
+        stale_seconds=settings.exam_catalog_stale_seconds,
+    )
+
+    # S3 問題ドキュメントキャッシュ
+    app.state.problem_cache = ProblemDocumentCache(
+        fetcher=object_fetcher,
+        max_bytes=settings.problem_cache_max_bytes,
+        ttl_seconds=settings.problem_cache_ttl_seconds,
+        negative_ttl_seconds=settings.problem_cache_negative_ttl_seconds,
+    )
+    metrics.register_gauge("problem_cache", app.state.problem_cache.stats)
+
+    # Bedrock ガバナー（本番は DynamoDB で全タスクの上限・サーキットを共有する）
+    bedrock_governor.configure(create_governor_state(settings, aws))
+    metrics.register_gauge("bedrock_governor", bedrock_governor.stats)
+
+    # 採点結果キャッシュ
+    app.state.scoring_cache = scoring_cache = create_scoring_cache(settings, aws)
+    if scoring_cache is not None:
+        metrics.register_gauge("scoring_cache", scoring_cache.stats)
+
+    # 採点ジョブキュー（Bedrock 採点はワーカーで実行し、API は 202 を即時に返す）
+    app.state.scoring_queue = ScoringQueue(
+        store=create_job_store(settings, aws),
+        runner=lambda job, on_question, on_reset: score_submission_answers(
+            aws,
+            job.submission_id,
+            on_question=on_question if settings.scoring_streaming else None,
+            cache=scoring_cache,
+            bypass_cache=job.bypass_cache,
+            on_reset=on_reset,
+        ),
+        concurrency=settings.scoring_worker_concurrency,
+        max_queued=settings.scoring_queue_max_size,
+        job_ttl_seconds=settings.scoring_job_ttl_seconds,
+    )
+    app.state.scoring_queue.start()
+    metrics.register_gauge("scoring_queue", app.state.scoring_queue.stats)
+
+    # ウォームアップはバックグラウンドで実行し、その間も /health には応答する
+    app.state.warmup = WarmupState(ready=not settings.warmup_enabled)
+    warmup_task = None
+    if settings.warmup_enabled:
+        warmup_task = asyncio.create_task(run_warmup(
+            app.state.exam_catalog,
+            app.state.problem_cache,
+            settings.warmup_exam_types,
+            app.state.warmup,
+            settings.warmup_timeout_seconds,
+        ))
+    try:
+        yield
+    finally:
+        if warmup_task is not None and not warmup_task.done():
+            warmup_task.cancel()
+        await app.state.scoring_queue.stop()
+        metrics.unregister_gauge("scoring_queue")
+        metrics.unregister_gauge("scoring_cache")
+        metrics.unregister_gauge("bedrock_governor")
+        metrics.unregister_gauge("problem_cache")
+        metrics.unregister_gauge("aws_pools")
+        if app.state.snapshot is not None:
+            app.state.snapshot.close()
+        app.state.aws.close()
+
 
 # FastAPIアプリケーション初期化
 app = FastAPI(
     title=settings.app_name,
     description=settings.app_description,
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # レート制限ハンドラー登録
@@ -62,11 +148,20 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 # セキュリティヘッダーミドルウェア追加
 app.add_middleware(SecurityHeadersMiddleware)
 
-# 静的ファイル（CSS, JS）
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# レスポンス圧縮（最外層に置き、SSE は素通しする）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
 
-# Jinja2テンプレート
-templates = Jinja2Templates(directory="templates")
+# 静的ファイル（CSS, JS）。ハッシュ付きアセットは事前圧縮版を immutable で返す
+app.mount(
+    "/static",
+    PrecompressedStaticFiles(directory="static", manifest=asset_manifest),
+    name="static",
+)
 
 # ルーター登録
 app.include_router(exams.router, prefix="/api/exams", tags=["exams"])
@@ -75,6 +170,8 @@ app.include_router(scoring.router, prefix="/api/scoring", tags=["scoring"])
 app.include_router(modules.router, prefix="/api/modules", tags=["modules"])
 app.include_router(designs.router, prefix="/api/designs", tags=["designs"])
 app.include_router(interview.router, prefix="/api/interview", tags=["interview"])
+app.include_router(wizard.router, prefix="/api/wizard", tags=["wizard"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 
 # =============================================================================
@@ -91,11 +188,37 @@ async def index(request: Request):
 
 
 @app.get("/exam/{exam_type}/{problem_id:path}", response_class=HTMLResponse)
-async def problem_page(request: Request, exam_type: str, problem_id: str):
-    """問題閲覧・回答ページ"""
+async def problem_page(
+    request: Request,
+    exam_type: str,
+    problem_id: str,
+    aws: AWSClients = Depends(get_aws_clients),
+    catalog: ExamCatalog = Depends(get_exam_catalog),
+    problem_cache: ProblemDocumentCache = Depends(get_problem_cache),
+):
+    """
+    問題閲覧・回答ページ
+
+    SSR 有効時は問題詳細（文字数制限を含む）を初期 HTML に埋め込み、
+    クライアントは埋め込みがない場合のみ /api/exams/detail を取得する。
+    """
     # URLエンコードされたproblem_idをデコード
     from urllib.parse import unquote
     decoded_problem_id = unquote(problem_id)
+
+    problem = None
+    if settings.ssr_problem_detail:
+        try:
+            # API と同じキャッシュ層から取得し、遅い場合はクライアント取得に任せる
+            detail = await asyncio.wait_for(
+                load_problem_detail(aws, catalog, problem_cache, exam_type, decoded_problem_id),
+                settings.ssr_problem_timeout_seconds,
+            )
+            problem = detail.data if detail is not None else None
+            metrics.incr("ssr.problem.embedded" if problem is not None else "ssr.problem.not_found")
+        except Exception as e:
+            metrics.incr("ssr.problem.fallback")
+            logger.warning(f"問題詳細の埋め込みに失敗しました ({exam_type}/{decoded_problem_id}): {e!r}")
     
     return templates.TemplateResponse(
         "pages/problem.html",
@@ -104,6 +227,7 @@ async def problem_page(request: Request, exam_type: str, problem_id: str):
             "title": "問題",
             "exam_type": exam_type,
             "problem_id": decoded_problem_id,
+            "problem": problem,
         }
     )
 
@@ -162,6 +286,20 @@ async def health_check():
     return {"status": "healthy", "app": settings.app_name}
 
 
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """レディネスチェック（ALB用）。ウォームアップ完了まで 503 を返す"""
+    warmup: WarmupState = request.app.state.warmup
+    body = {"status": "ready" if warmup.ready else "warming", "warmup": warmup.to_dict()}
+    return JSONResponse(body, status_code=200 if warmup.ready else 503)
+
+
+@app.get("/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics():
+    """アプリケーションメトリクス（接続プール再利用数・キャッシュヒット率等）。X-Admin-Token ヘッダーが必要"""
+    return metrics.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,291 @@
+"""
+ASGI ミドルウェア
+
+BaseHTTPMiddleware を介さない純粋な ASGI ミドルウェアとして実装し、
+ストリーミング応答をバッファリングしない。
+"""
+
+import gzip
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 未導入環境では gzip のみ
+    brotli = None
+
+
+# =============================================================================
+# セキュリティヘッダー
+# =============================================================================
+
+# CSP（CDNからのスクリプト読み込みを許可）
+CONTENT_SECURITY_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.jsdelivr.net https://cdn.tailwindcss.com https://unpkg.com; "
+    "style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net https://fonts.googleapis.com; "
+    "font-src 'self' https://fonts.gstatic.com; "
+    "img-src 'self' data:; "
+    "connect-src 'self' https://cdn.jsdelivr.net;"
+)
+
+SECURITY_HEADERS = (
+    # XSS対策
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+    ("X-XSS-Protection", "1; mode=block"),
+    # リファラー情報漏洩防止
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+    ("Content-Security-Policy", CONTENT_SECURITY_POLICY),
+)
+
+
+class SecurityHeadersMiddleware:
+    """
+    XSS、クリックジャッキング等を防ぐセキュリティヘッダーを追加
+
+    ヘッダーはエンコード済みのリストとして起動時に一度だけ構築し、
+    http.response.start にのみ差し込む（本文チャンクには一切関与しない）。
+    """
+
+    def __init__(self, app: ASGIApp, headers: Iterable[Tuple[str, str]] = SECURITY_HEADERS):
+        self.app = app
+        self.raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        self.header_names = frozenset(name for name, _ in self.raw_headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # アプリが同名ヘッダーを設定していても上書きする
+                headers = [h for h in message.get("headers", ()) if h[0].lower() not in self.header_names]
+                headers.extend(self.raw_headers)
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# =============================================================================
+# レスポンス圧縮
+# =============================================================================
+
+# 圧縮対象の Content-Type（画像・フォント等の圧縮済み形式は対象外）
+COMPRESSIBLE_TYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+# 逐次配信が前提のため圧縮しない Content-Type
+STREAMING_TYPES = ("text/event-stream",)
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """Accept-Encoding を {エンコーディング: q値} に分解"""
+    encodings = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[token] = q
+    return encodings
+
+
+def select_encoding(header: str) -> Optional[str]:
+    """利用可能なエンコーディングのうち、クライアントが受け入れるものを選ぶ（br 優先）"""
+    accepted = parse_accept_encoding(header)
+    candidates: List[str] = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best: Optional[Tuple[float, str]] = None
+    for encoding in candidates:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0 and (best is None or q > best[0]):
+            best = (q, encoding)
+    return best[1] if best else None
+
+
+class _Compressor:
+    """チャンク単位で flush できる圧縮器（gzip / brotli 共通インターフェース）"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        """data を圧縮し、flush 時はここまでの出力をすべて返す"""
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.flush() if flush else b"")
+        out = self._zlib.compress(data)
+        return out + (self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress_body(encoding: str, body: bytes, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    """一括圧縮"""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encoding に応じて brotli / gzip で応答を圧縮する
+
+    - minimum_size 未満の単一チャンク応答は圧縮しない
+    - text/event-stream は素通しする（SSE をバッファリングしない）
+    - 複数チャンクのストリーミング応答はチャンクごとに flush しながら圧縮する
+    - 圧縮時は ETag を弱い ETag に変換する（表現が変わるため）
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = select_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send, request_headers.get("if-none-match", ""))
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """1 リクエスト分の送信メッセージを書き換える"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send, if_none_match: str):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.if_none_match = if_none_match
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # ヘッダー確定は本文の最初のチャンクを見てから行う
+            self.start_message = message
+            if message["status"] == 304:
+                # 圧縮済み表現（弱い ETag）に対する再検証であれば、同じ弱い ETag を返す
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and f"W/{etag}" in self.if_none_match:
+                    self._weaken_etag(headers)
+            self.passthrough = not self._compressible(Headers(raw=message["headers"]), message["status"])
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if not more_body:
+                # 単一チャンク: サイズ閾値を満たす場合のみ一括圧縮
+                if len(body) < self.middleware.minimum_size:
+                    await self._send(start)
+                    await self._send(message)
+                    return
+                compressed = compress_body(
+                    self.encoding, body, self.middleware.gzip_level, self.middleware.brotli_quality
+                )
+                self._record(len(body), len(compressed))
+                headers = self._rewrite_headers(start)
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(start)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+            # ストリーミング: Content-Length を外し、チャンクごとに flush する
+            self.compressor = _Compressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            headers = self._rewrite_headers(start)
+            del headers["Content-Length"]
+            await self._send(start)
+
+        if more_body:
+            chunk = self.compressor.compress(body, flush=True)
+        else:
+            chunk = self.compressor.finish(body)
+            self._record(self.bytes_in + len(body), self.bytes_out + len(chunk))
+        self.bytes_in += len(body)
+        self.bytes_out += len(chunk)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _compressible(self, headers: Headers, status: int) -> bool:
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type in STREAMING_TYPES:
+            return False
+        return content_type in COMPRESSIBLE_TYPES
+
+    def _rewrite_headers(self, start: Message) -> MutableHeaders:
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        self._weaken_etag(headers)
+        return headers
+
+    @staticmethod
+    def _weaken_etag(headers: MutableHeaders) -> None:
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    def _record(self, bytes_in: int, bytes_out: int) -> None:
+        metrics.incr(f"compression.{self.encoding}.responses")
+        metrics.incr(f"compression.{self.encoding}.bytes_in", bytes_in)
+        metrics.incr(f"compression.{self.encoding}.bytes_out", bytes_out)
@@ -20,6 +20,13 @@ class DesignProposal(BaseModel):
     module_map: Dict[str, List[str]] = Field(default={}, description="Proposed module mapping")
     reasoning: Optional[str] = Field(default=None, description="AI reasoning for the proposal")
 
+class DesignProposalOutput(DesignProposal):
+    """Design proposal as generated by the model; incomplete output is rejected instead of saved"""
+    theme: str = Field(min_length=1, description="Proposed theme")
+    breakdown: Dict[str, Any] = Field(min_length=1, description="Proposed breakdown")
+    structure: List[Dict[str, Any]] = Field(min_length=1, description="Proposed structure")
+    module_map: Dict[str, List[str]] = Field(description="Proposed module mapping")
+
 class InterviewSession(BaseModel):
     user_id: str
     exam_id: str
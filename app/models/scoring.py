@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field, ValidationInfo, model_validator
+from typing import List, Literal, Optional, Dict
+
+Rank = Literal["A", "B", "C", "D"]
+
+
+class CriteriaScore(BaseModel):
+    """評価観点別スコア"""
+    criterion: str
+    weight: float
+    points: int
+    comment: Optional[str] = None
+
+
+class QuestionBreakdown(BaseModel):
+    """設問別評価"""
+    level: str
+    question_score: int
+    word_count: int
+    criteria_scores: List[CriteriaScore]
+
+
+# =============================================================================
+# 採点モデルの出力
+# 欠けた項目・型の合わない値は補修後の検証で弾き、生成し直す（既定値で埋めて保存しない）
+# =============================================================================
+
+class QuestionBreakdownOutput(BaseModel):
+    """採点モデル（一括採点）が出力する設問別評価（文字数はアプリ側で数える）"""
+    level: Rank
+    question_score: int = Field(ge=0, le=100)
+    criteria_scores: List[CriteriaScore] = Field(min_length=1)
+
+
+class ScoringOutput(BaseModel):
+    """
+    採点モデル（一括採点）の出力
+
+    検証時の context に {"questions": [...]} を渡すと、その設問の評価がすべてあることも確かめる。
+    """
+    question_breakdown: Dict[str, QuestionBreakdownOutput] = Field(min_length=1, description="設問ごとの評価")
+    aggregate_score: float = Field(ge=0, le=100, description="総合スコア")
+    final_rank: Rank = Field(description="最終ランク")
+    feedback: Optional[str] = Field(default=None, description="全体的なフィードバック")
+
+    @model_validator(mode="after")
+    def _has_expected_questions(self, info: ValidationInfo) -> "ScoringOutput":
+        expected = (info.context or {}).get("questions") or ()
+        missing = [question for question in expected if question not in self.question_breakdown]
+        if missing:
+            raise ValueError(f"設問の評価がありません: {'、'.join(missing)}")
+        return self
+
+
+class CriteriaPoints(BaseModel):
+    """採点モデル（設問別採点）が出力する観点別の点数（重みはアプリ側で付ける）"""
+    criterion: str
+    points: float
+    comment: Optional[str] = None
+
+
+class QuestionScoringOutput(BaseModel):
+    """採点モデル（設問別採点）の出力"""
+    criteria_scores: List[CriteriaPoints] = Field(min_length=1, description="観点ごとの点数")
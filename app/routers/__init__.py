@@ -7,5 +7,10 @@ from routers.answers import router as answers_router
 from routers.scoring import router as scoring_router
 from routers.modules import router as modules_router
 from routers.designs import router as designs_router
+from routers.admin import router as admin_router
+from routers.wizard import router as wizard_router
 
-__all__ = ["exams_router", "answers_router", "scoring_router", "modules_router", "designs_router"]
+__all__ = [
+    "exams_router", "answers_router", "scoring_router", "modules_router", "designs_router",
+    "admin_router", "wizard_router",
+]
@@ -0,0 +1,47 @@
+"""
+管理 API ルーター
+キャッシュ無効化などの運用操作を提供（X-Admin-Token ヘッダーで保護）
+"""
+
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from config import get_settings
+from services.catalog import ExamCatalog, get_exam_catalog
+from services.snapshot import CorpusSnapshot, get_corpus_snapshot
+
+router = APIRouter()
+settings = get_settings()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """管理トークンを検証（ADMIN_TOKEN 未設定時は常に拒否）"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="管理エンドポイントは無効です")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="管理トークンが不正です")
+
+
+@router.post("/cache/exams/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_exam_catalog(
+    exam_type: Optional[str] = Query(default=None, description="試験区分（省略時は全区分）"),
+    catalog: ExamCatalog = Depends(get_exam_catalog),
+    snapshot: Optional[CorpusSnapshot] = Depends(get_corpus_snapshot),
+):
+    """
+    試験カタログキャッシュを無効化
+    
+    コーパススナップショットから返していた区分はスナップショットから外し、次回以降は DynamoDB から
+    読み込む（このタスクが終わるまで。新しいタスクは同梱のスナップショットから返す）。
+    
+    Args:
+        exam_type: 対象の試験区分（省略時は全区分）
+    
+    Returns:
+        無効化した試験区分と、スナップショットから外した試験区分
+    """
+    released = snapshot.release_catalogs(exam_type) if snapshot is not None else []
+    invalidated = catalog.invalidate(exam_type)
+    return {"invalidated": invalidated, "snapshot_released": released}
@@ -3,22 +3,30 @@
 DynamoDB (SubmissionTable) に回答を保存
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, field_validator, Field
 from typing import Dict, Optional, Literal
 from datetime import datetime
 import uuid
 import re
-import boto3
 
 from config import get_settings
+from services.aws import AWSClients, get_aws_clients, run_dynamodb
+from services.essay_analysis import analyze_answers
 
 router = APIRouter()
 settings = get_settings()
 
-# DynamoDB クライアント
-dynamodb = boto3.resource("dynamodb", region_name=settings.aws_region)
-submission_table = dynamodb.Table(settings.dynamodb_submission_table)
+
+def _validate_answers(v: Dict[str, str]) -> Dict[str, str]:
+    """設問キーと文字数上限の検証（送信・チェック共通）"""
+    allowed_keys = {'設問ア', '設問イ', '設問ウ'}
+    for key, value in v.items():
+        if key not in allowed_keys:
+            raise ValueError(f'無効な設問キー: {key}')
+        if len(value) > 5000:
+            raise ValueError(f'{key}の文字数が上限(5000文字)を超えています')
+    return v
 
 
 class AnswerSubmission(BaseModel):
@@ -40,13 +48,18 @@ class AnswerSubmission(BaseModel):
     @classmethod
     def validate_answers(cls, v: Dict[str, str]) -> Dict[str, str]:
         """回答の検証（キーと文字数制限）"""
-        allowed_keys = {'設問ア', '設問イ', '設問ウ'}
-        for key, value in v.items():
-            if key not in allowed_keys:
-                raise ValueError(f'無効な設問キー: {key}')
-            if len(value) > 5000:
-                raise ValueError(f'{key}の文字数が上限(5000文字)を超えています')
-        return v
+        return _validate_answers(v)
+
+
+class AnswerAnalysisRequest(BaseModel):
+    """回答の機械的チェックリクエスト（入力途中の回答）"""
+    answers: Dict[str, str]
+
+    @field_validator('answers')
+    @classmethod
+    def validate_answers(cls, v: Dict[str, str]) -> Dict[str, str]:
+        """回答の検証（キーと文字数制限）"""
+        return _validate_answers(v)
 
 
 class AnswerResponse(BaseModel):
@@ -57,7 +70,7 @@ class AnswerResponse(BaseModel):
 
 
 @router.post("", response_model=AnswerResponse)
-async def submit_answer(submission: AnswerSubmission):
+async def submit_answer(submission: AnswerSubmission, aws: AWSClients = Depends(get_aws_clients)):
     """
     回答を保存
     
@@ -84,7 +97,7 @@ async def submit_answer(submission: AnswerSubmission):
         if submission.metadata:
             item["metadata"] = submission.metadata
         
-        submission_table.put_item(Item=item)
+        await run_dynamodb(aws.submission_table.put_item, Item=item)
         
         return AnswerResponse(
             submission_id=submission_id,
@@ -96,8 +109,25 @@ async def submit_answer(submission: AnswerSubmission):
         raise HTTPException(status_code=500, detail=f"回答の保存に失敗しました: {str(e)}")
 
 
+@router.post("/analyze")
+async def analyze_answer(request: AnswerAnalysisRequest):
+    """
+    回答をルールベースで即時チェック（Bedrock は呼ばない）
+
+    章立て・定量データ・「なぜならば」の数・文字数・企業名/システム名を数え、
+    ランクA条件ごとの充足状況を返す。入力中のフィードバック用。
+
+    Args:
+        request: 設問ごとの回答
+
+    Returns:
+        設問ごとの集計（questions）と条件ごとの判定（checks）
+    """
+    return analyze_answers(request.answers).to_dict()
+
+
 @router.get("/{submission_id}")
-async def get_answer(submission_id: str):
+async def get_answer(submission_id: str, aws: AWSClients = Depends(get_aws_clients)):
     """
     保存済み回答を取得
     
@@ -108,7 +138,8 @@ async def get_answer(submission_id: str):
         回答データ
     """
     try:
-        response = submission_table.get_item(
+        response = await run_dynamodb(
+            aws.submission_table.get_item,
             Key={
                 "submission_id": submission_id
             }
@@ -3,22 +3,18 @@
 DynamoDB (DesignsTable) に設計図を保存・取得
 """
 
-from fastapi import APIRouter, HTTPException, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, Path, Body
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
-import boto3
 from boto3.dynamodb.conditions import Key
 from datetime import datetime
 
 from config import get_settings
+from services.aws import AWSClients, get_aws_clients, run_dynamodb
 
 router = APIRouter()
 settings = get_settings()
 
-# DynamoDB クライアント
-dynamodb = boto3.resource("dynamodb", region_name=settings.aws_region)
-designs_table = dynamodb.Table(settings.dynamodb_designs_table)
-
 # 仮のユーザーID
 DEMO_USER_ID = "demo-user"
 
@@ -54,10 +50,11 @@ class DesignResponse(DesignBase):
 # =============================================================================
 
 @router.get("/", response_model=List[DesignResponse])
-async def list_designs():
+async def list_designs(aws: AWSClients = Depends(get_aws_clients)):
     """ユーザーの設計図一覧を取得"""
     try:
-        response = designs_table.query(
+        response = await run_dynamodb(
+            aws.designs_table.query,
             KeyConditionExpression=Key('user_id').eq(DEMO_USER_ID)
         )
         return response.get('Items', [])
@@ -67,10 +64,14 @@ async def list_designs():
 
 
 @router.get("/{exam_id}", response_model=DesignResponse)
-async def get_design(exam_id: str = Path(..., description="問題ID")):
+async def get_design(
+    exam_id: str = Path(..., description="問題ID"),
+    aws: AWSClients = Depends(get_aws_clients),
+):
     """設計図を取得"""
     try:
-        response = designs_table.get_item(
+        response = await run_dynamodb(
+            aws.designs_table.get_item,
             Key={
                 'user_id': DEMO_USER_ID,
                 'exam_id': exam_id
@@ -98,14 +99,15 @@ async def get_design(exam_id: str = Path(..., description="問題ID")):
 
 
 @router.post("", response_model=DesignResponse)
-async def save_design(design: DesignCreate):
+async def save_design(design: DesignCreate, aws: AWSClients = Depends(get_aws_clients)):
     """設計図を保存（作成・更新）"""
     try:
         now = datetime.now().isoformat()
         
         # 既存データの確認（作成日時維持のため）
         try:
-            existing_response = designs_table.get_item(
+            existing_response = await run_dynamodb(
+                aws.designs_table.get_item,
                 Key={'user_id': DEMO_USER_ID, 'exam_id': design.exam_id}
             )
             existing_item = existing_response.get('Item')
@@ -124,7 +126,7 @@ async def save_design(design: DesignCreate):
             "updated_at": now
         }
         
-        designs_table.put_item(Item=item)
+        await run_dynamodb(aws.designs_table.put_item, Item=item)
         return item
     except Exception as e:
         print(f"Error saving design: {e}")
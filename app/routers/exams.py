@@ -4,29 +4,29 @@
 S3から問題本文を取得
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import HTMLResponse
+from html import escape
 from typing import Optional
-import boto3
-from boto3.dynamodb.conditions import Key
-import json
 
 from config import get_settings
+from services.aws import AWSClients, get_aws_clients
+from services.catalog import ExamCatalog, get_exam_catalog
+from services.http_cache import make_etag, not_modified, set_cache_headers
+from services.problems import ProblemDocumentCache, get_problem_cache, load_problem_detail
+from templating import exam_list_cache, templates
 
 router = APIRouter()
 settings = get_settings()
 
-# AWS クライアント
-dynamodb = boto3.resource("dynamodb", region_name=settings.aws_region)
-exam_table = dynamodb.Table(settings.dynamodb_exam_table)
-s3_client = boto3.client("s3", region_name=settings.aws_region)
-
-# S3問題データのキャッシュ（アプリ起動中のみ）
-_s3_problem_cache: dict = {}
-
 
 @router.get("")
-async def get_exams(exam_type: str = Query(default="IS", description="試験区分 (IS/PM/SA)")):
+async def get_exams(
+    request: Request,
+    response: Response,
+    exam_type: str = Query(default="IS", description="試験区分 (IS/PM/SA)"),
+    catalog: ExamCatalog = Depends(get_exam_catalog),
+):
     """
     試験一覧を取得
     
@@ -37,27 +37,16 @@ async def get_exams(exam_type: str = Query(default="IS", description="試験区
         試験一覧
     """
     try:
-        response = exam_table.query(
-            KeyConditionExpression=Key("PK").eq(f"EXAM#{exam_type}")
-        )
-        
-        items = response.get("Items", [])
-        
-        # レスポンス形式を整形
-        exams = []
-        for item in items:
-            exams.append({
-                "problem_id": item.get("SK"),
-                "title": item.get("title", ""),
-                "year_term": item.get("year_term", ""),
-                "exam_type": exam_type,
-                "question_id": item.get("question_id", ""),
-            })
-        
-        # 年度降順でソート
-        exams.sort(key=lambda x: x.get("year_term", ""), reverse=True)
+        # 試験カタログキャッシュから取得（年度降順で整形済み）
+        entry = await catalog.get(exam_type)
+
+        etag = make_etag("exams", exam_type, entry.version)
+        cached = not_modified(request, etag, "exams")
+        if cached is not None:
+            return cached
+        set_cache_headers(response, etag)
         
-        return {"exams": exams, "exam_type": exam_type}
+        return {"exams": entry.exams, "exam_type": exam_type}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"試験一覧の取得に失敗しました: {str(e)}")
@@ -65,11 +54,19 @@ async def get_exams(exam_type: str = Query(default="IS", description="試験区
 
 @router.get("/detail")
 async def get_problem_detail(
+    request: Request,
+    response: Response,
     exam_type: str = Query(..., description="試験区分"),
-    problem_id: str = Query(..., description="問題ID")
+    problem_id: str = Query(..., description="問題ID"),
+    aws: AWSClients = Depends(get_aws_clients),
+    catalog: ExamCatalog = Depends(get_exam_catalog),
+    problem_cache: ProblemDocumentCache = Depends(get_problem_cache),
 ):
     """
     問題詳細を取得
+
+    ETag はカタログ版と S3 ドキュメントの ETag から算出し、
+    If-None-Match が一致すれば本文を返さずに 304 を返す。
     
     Args:
         exam_type: 試験区分
@@ -79,76 +76,18 @@ async def get_problem_detail(
         問題詳細データ
     """
     try:
-        # DynamoDBからメタデータを取得
-        response = exam_table.get_item(
-            Key={
-                "PK": f"EXAM#{exam_type}",
-                "SK": problem_id
-            }
-        )
-        
-        item = response.get("Item")
-        if not item:
+        detail = await load_problem_detail(aws, catalog, problem_cache, exam_type, problem_id)
+        if detail is None:
             raise HTTPException(status_code=404, detail="問題が見つかりません")
+
+        # 取得失敗中の一時的な空本文はブラウザにキャッシュさせない（etag なし）
+        if detail.etag is not None:
+            cached = not_modified(request, detail.etag, "detail")
+            if cached is not None:
+                return cached
+            set_cache_headers(response, detail.etag)
         
-        # S3 URIから問題本文を取得
-        s3_uri = item.get("s3_uri", "")
-        problem_content = ""
-        problem_question = {}
-        word_count_limits = {}
-        
-        if s3_uri:
-            # S3 URIをパース (例: s3://scribo-essay-evaluator/ST/is_essay.json)
-            s3_parts = s3_uri.replace("s3://", "").split("/", 1)
-            if len(s3_parts) == 2:
-                bucket_name = s3_parts[0]
-                object_key = s3_parts[1]
-                
-                # キャッシュを確認
-                cache_key = f"{bucket_name}/{object_key}"
-                if cache_key not in _s3_problem_cache:
-                    try:
-                        s3_response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
-                        s3_data = json.loads(s3_response["Body"].read().decode("utf-8"))
-                        _s3_problem_cache[cache_key] = s3_data
-                    except Exception as e:
-                        print(f"S3からのデータ取得エラー: {e}")
-                        _s3_problem_cache[cache_key] = []
-                
-                s3_problems = _s3_problem_cache.get(cache_key, [])
-                
-                # DynamoDBのSKをS3のquestion_idに変換
-                # SK: YEAR#2025SPRING#ESSAY#Q1 → S3 question_id: IS#YEAR#2025SPRING#ESSAY#Q1
-                s3_question_id = f"{exam_type}#{problem_id}"
-                
-                # 該当する問題を検索
-                for problem in s3_problems:
-                    if problem.get("question_id") == s3_question_id:
-                        problem_content = problem.get("problemContent", "")
-                        problem_question = problem.get("problemQuestion", {})
-                        break
-        
-        # 文字数制限のデフォルト値
-        if not word_count_limits:
-            word_count_limits = {
-                "設問ア": {"min": 600, "max": 800},
-                "設問イ": {"min": 700, "max": 1000},
-                "設問ウ": {"min": 600, "max": 800}
-            }
-        
-        # 問題データを整形
-        problem_data = {
-            "exam_type": exam_type,
-            "problem_id": problem_id,
-            "title": item.get("title", ""),
-            "year_term": item.get("year_term", ""),
-            "problem_content": problem_content,
-            "problem_question": problem_question,
-            "time_limit_minutes": item.get("time_limit_minutes", 120),
-            "word_count_limits": word_count_limits,
-        }
-        
-        return problem_data
+        return detail.data
         
     except HTTPException:
         raise
@@ -158,84 +97,36 @@ async def get_problem_detail(
 
 @router.get("/partial/list", response_class=HTMLResponse)
 async def get_exams_partial(
+    request: Request,
     exam_type: str = Query(default="IS"),
-    mode: str = Query(default="normal", description="表示モード (normal/select_design)")
+    mode: str = Query(default="normal", description="表示モード (normal/select_design)"),
+    catalog: ExamCatalog = Depends(get_exam_catalog),
 ):
     """
     試験一覧のHTMLパーシャル（htmx用）
+
+    レンダリング結果は (試験区分, 表示モード, カタログ版) 単位でキャッシュし、
+    タブ切り替えではテンプレートを再評価しない。
     """
-    from fastapi.templating import Jinja2Templates
-    from starlette.requests import Request
-    
-    templates = Jinja2Templates(directory="templates")
-    
+    # 未知のモードは通常表示に寄せ、キャッシュキーが増えないようにする
+    mode = "select_design" if mode == "select_design" else "normal"
     try:
-        response = exam_table.query(
-            KeyConditionExpression=Key("PK").eq(f"EXAM#{exam_type}")
+        entry = await catalog.get(exam_type)
+        fragment = exam_list_cache.get_or_render(
+            exam_type,
+            mode,
+            entry.version,
+            lambda: templates.get_template("partials/exam_list.html").render(exams=entry.exams, mode=mode),
         )
-        
-        items = response.get("Items", [])
-        exams = []
-        for item in items:
-            exams.append({
-                "problem_id": item.get("SK"),
-                "title": item.get("title", ""),
-                "year_term": item.get("year_term", ""),
-                "exam_type": exam_type,
-            })
-        
-        exams.sort(key=lambda x: x.get("year_term", ""), reverse=True)
-        
-        # HTMLパーシャルを返す
-        # URLエンコードが必要（SKに#が含まれる）
-        from urllib.parse import quote
-        
-        html_content = ""
-        for exam in exams:
-            # problem_idをURLエンコード
-            encoded_problem_id = quote(exam["problem_id"], safe="")
-            
-            if mode == "select_design":
-                # 設計選択モード: シンプルなリスト形式で選択しやすいUI
-                html_content += f'''
-                <a href="/design/{exam["exam_type"]}/{encoded_problem_id}" 
-                   class="flex items-center justify-between p-4 bg-base-100 border border-base-200 rounded-xl hover:bg-primary-container hover:border-primary transition-colors group">
-                    <div>
-                        <div class="font-bold text-base-content group-hover:text-on-primary-container">{exam["title"]}</div>
-                        <div class="text-xs text-base-content/60 group-hover:text-on-primary-container/80">{exam["year_term"]}</div>
-                    </div>
-                    <span class="material-symbols-rounded text-primary group-hover:text-on-primary-container">arrow_forward</span>
-                </a>
-                '''
-            else:
-                # 通常モード: カード形式
-                html_content += f'''
-                <div class="card-modern block">
-                    <div class="card-body p-5">
-                        <h3 class="card-title text-base font-semibold text-base-content">{exam["title"]}</h3>
-                        <p class="text-sm text-base-content/70 mb-4">{exam["year_term"]}</p>
-                        
-                        <div class="flex gap-2 mt-auto">
-                            <a href="/exam/{exam["exam_type"]}/{encoded_problem_id}" class="btn btn-sm btn-outline flex-1">
-                                <span class="material-symbols-rounded text-sm">edit_note</span>
-                                解答
-                            </a>
-                            <a href="/design/{exam["exam_type"]}/{encoded_problem_id}" class="btn btn-sm btn-primary flex-1">
-                                <span class="material-symbols-rounded text-sm">architecture</span>
-                                設計
-                            </a>
-                        </div>
-                    </div>
-                </div>
-                '''
-        
-        if not exams:
-            html_content = '<p class="text-center text-base-content/50 py-8">該当する試験がありません</p>'
-        
-        return HTMLResponse(content=html_content)
+        cached = not_modified(request, fragment.etag, "exam_list")
+        if cached is not None:
+            return cached
+        response = HTMLResponse(content=fragment.html)
+        set_cache_headers(response, fragment.etag)
+        return response
         
     except Exception as e:
         return HTMLResponse(
-            content=f'<p class="text-error">エラー: {str(e)}</p>',
+            content=f'<p class="text-error">エラー: {escape(str(e))}</p>',
             status_code=500
         )
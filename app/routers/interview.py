@@ -3,14 +3,16 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
+from services.aws import AWSClients, get_aws_clients
+from services.bedrock_governor import BedrockUnavailableError
 from services.interview import InterviewService
 from models.interview import InterviewSession, DesignProposal
 
 router = APIRouter()
 
 # Dependency to get service
-def get_interview_service():
-    return InterviewService()
+def get_interview_service(aws: AWSClients = Depends(get_aws_clients)):
+    return InterviewService(aws)
 
 # 仮のユーザーID (認証実装までは固定)
 DEMO_USER_ID = "demo-user"
@@ -24,9 +26,9 @@ async def get_session(
     Get interview session for a specific exam.
     If not found, creates a new one.
     """
-    session = service.get_session(DEMO_USER_ID, exam_id)
+    session = await service.get_session(DEMO_USER_ID, exam_id)
     if not session:
-        session = service.create_session(DEMO_USER_ID, exam_id)
+        session = await service.create_session(DEMO_USER_ID, exam_id)
     return session
 
 class ChatRequest(BaseModel):
@@ -55,7 +57,9 @@ async def generate_design(
     Generate a design proposal based on the interview history.
     """
     try:
-        proposal = service.generate_design_proposal(DEMO_USER_ID, exam_id)
+        proposal = await service.generate_design_proposal(DEMO_USER_ID, exam_id)
         return proposal
+    except BedrockUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
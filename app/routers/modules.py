@@ -3,29 +3,38 @@
 DynamoDB (ModulesTable) にモジュールを保存・取得
 """
 
-from fastapi import APIRouter, HTTPException, Path, Body
+from fastapi import APIRouter, Depends, HTTPException, Path, Body
 from pydantic import BaseModel, Field
 from typing import List, Optional
-import boto3
 from boto3.dynamodb.conditions import Key
 import uuid
 from datetime import datetime
 import json
+import time
 
 from config import get_settings
+from services.aws import AWSClients, get_aws_clients, run_bedrock, run_dynamodb
+from services.bedrock_governor import BedrockUnavailableError, bedrock_governor
+from services.prompt_cache import record_usage, system_blocks
 
 router = APIRouter()
 settings = get_settings()
 
-# DynamoDB クライアント
-dynamodb = boto3.resource("dynamodb", region_name=settings.aws_region)
-modules_table = dynamodb.Table(settings.dynamodb_modules_table)
-# Bedrock Runtime クライアント
-bedrock_runtime = boto3.client("bedrock-runtime", region_name=settings.aws_region)
-
 # 仮のユーザーID（認証実装まで固定）
 DEMO_USER_ID = "demo-user"
 
+# リライトの固定指示（system に置き、カテゴリと元のテキストだけを毎回の入力にする）
+REWRITE_SYSTEM_PROMPT = """あなたはITストラテジスト試験の合格論文を書くプロフェッショナルです。
+入力されたテキストを、ITストラテジスト試験の論文としてふさわしい表現にリライトしてください。
+
+【要件】
+1. 「だ・である」調で統一すること。
+2. 具体的かつ定量的な表現を用いること（数値や固有名詞を補完するプレースホルダーを含めても良い）。
+3. 論理的で説得力のある文章にすること。
+4. 入力で指定されたカテゴリに適した文脈で書くこと。
+5. 出力はリライト後のテキストのみとすること。
+"""
+
 
 # =============================================================================
 # データモデル
@@ -97,10 +106,11 @@ TEMPLATE_MODULES = [
 # =============================================================================
 
 @router.get("", response_model=List[ModuleResponse])
-async def list_modules():
+async def list_modules(aws: AWSClients = Depends(get_aws_clients)):
     """モジュール一覧を取得"""
     try:
-        response = modules_table.query(
+        response = await run_dynamodb(
+            aws.modules_table.query,
             KeyConditionExpression=Key('user_id').eq(DEMO_USER_ID)
         )
         items = response.get('Items', [])
@@ -113,7 +123,7 @@ async def list_modules():
 
 
 @router.post("", response_model=ModuleResponse)
-async def create_module(module: ModuleCreate):
+async def create_module(module: ModuleCreate, aws: AWSClients = Depends(get_aws_clients)):
     """新規モジュールを作成"""
     try:
         now = datetime.now().isoformat()
@@ -130,7 +140,7 @@ async def create_module(module: ModuleCreate):
             "updated_at": now
         }
         
-        modules_table.put_item(Item=item)
+        await run_dynamodb(aws.modules_table.put_item, Item=item)
         return item
     except Exception as e:
         print(f"Error creating module: {e}")
@@ -138,10 +148,14 @@ async def create_module(module: ModuleCreate):
 
 
 @router.get("/{module_id}", response_model=ModuleResponse)
-async def get_module(module_id: str = Path(..., description="モジュールID")):
+async def get_module(
+    module_id: str = Path(..., description="モジュールID"),
+    aws: AWSClients = Depends(get_aws_clients),
+):
     """モジュール詳細を取得"""
     try:
-        response = modules_table.get_item(
+        response = await run_dynamodb(
+            aws.modules_table.get_item,
             Key={
                 'user_id': DEMO_USER_ID,
                 'module_id': module_id
@@ -161,12 +175,13 @@ async def get_module(module_id: str = Path(..., description="モジュールID")
 @router.put("/{module_id}", response_model=ModuleResponse)
 async def update_module(
     module_update: ModuleUpdate,
-    module_id: str = Path(..., description="モジュールID")
+    module_id: str = Path(..., description="モジュールID"),
+    aws: AWSClients = Depends(get_aws_clients),
 ):
     """モジュールを更新"""
     try:
         # 既存アイテムの確認
-        existing = await get_module(module_id)
+        existing = await get_module(module_id, aws)
         
         # 更新式の構築
         update_expression = "set updated_at = :updated_at"
@@ -192,7 +207,8 @@ async def update_module(
             update_expression += ", tags = :tags"
             expression_attribute_values[":tags"] = module_update.tags
 
-        response = modules_table.update_item(
+        response = await run_dynamodb(
+            aws.modules_table.update_item,
             Key={
                 'user_id': DEMO_USER_ID,
                 'module_id': module_id
@@ -212,10 +228,14 @@ async def update_module(
 
 
 @router.delete("/{module_id}")
-async def delete_module(module_id: str = Path(..., description="モジュールID")):
+async def delete_module(
+    module_id: str = Path(..., description="モジュールID"),
+    aws: AWSClients = Depends(get_aws_clients),
+):
     """モジュールを削除"""
     try:
-        modules_table.delete_item(
+        await run_dynamodb(
+            aws.modules_table.delete_item,
             Key={
                 'user_id': DEMO_USER_ID,
                 'module_id': module_id
@@ -228,7 +248,7 @@ async def delete_module(module_id: str = Path(..., description="モジュールI
 
 
 @router.post("/seed", response_model=List[ModuleResponse])
-async def seed_modules():
+async def seed_modules(aws: AWSClients = Depends(get_aws_clients)):
     """テンプレートデータを投入（デモ用）"""
     try:
         created_items = []
@@ -246,7 +266,7 @@ async def seed_modules():
                 "created_at": now,
                 "updated_at": now
             }
-            modules_table.put_item(Item=item)
+            await run_dynamodb(aws.modules_table.put_item, Item=item)
             created_items.append(item)
             
         return created_items
@@ -256,19 +276,11 @@ async def seed_modules():
 
 
 @router.post("/rewrite")
-async def rewrite_content(request: RewriteRequest):
+async def rewrite_content(request: RewriteRequest, aws: AWSClients = Depends(get_aws_clients)):
     """AIによるリライティング（論文調への変換）"""
     try:
-        prompt = f"""
-あなたはITストラテジスト試験の合格論文を書くプロフェッショナルです。
-以下のテキストを、ITストラテジスト試験の論文としてふさわしい表現にリライトしてください。
-
-【要件】
-1. 「だ・である」調で統一すること。
-2. 具体的かつ定量的な表現を用いること（数値や固有名詞を補完するプレースホルダーを含めても良い）。
-3. 論理的で説得力のある文章にすること。
-4. カテゴリ「{request.category}」に適した文脈で書くこと。
-5. 出力はリライト後のテキストのみとすること。
+        prompt = f"""【カテゴリ】
+{request.category}
 
 【元のテキスト】
 {request.text}
@@ -277,21 +289,27 @@ async def rewrite_content(request: RewriteRequest):
         body = json.dumps({
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": 1000,
+            "system": system_blocks(REWRITE_SYSTEM_PROMPT),
             "messages": [
                 {"role": "user", "content": prompt}
             ]
         })
 
-        response = bedrock_runtime.invoke_model(
+        started = time.monotonic()
+        response = await bedrock_governor.invoke(
+            aws.bedrock.invoke_model,
             modelId=settings.bedrock_model_id,
             body=body
         )
         
-        response_body = json.loads(response.get('body').read())
+        response_body = json.loads(await run_bedrock(response.get('body').read))
+        record_usage("rewrite", response_body.get("usage"), time.monotonic() - started)
         rewritten_text = response_body['content'][0]['text']
         
         return {"rewritten_text": rewritten_text.strip()}
         
+    except BedrockUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"Error rewriting content: {e}")
         raise HTTPException(status_code=500, detail="AIリライティングに失敗しました")
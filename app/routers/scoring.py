@@ -3,19 +3,28 @@ AI採点 API ルーター
 Amazon Bedrock (Claude) で論文を採点
 """
 
+import json
 import logging
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Optional, List
-from datetime import datetime
-from decimal import Decimal
-import json
-import boto3
+from typing import Dict, Optional, Union
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from config import get_settings
+from models.scoring import QuestionBreakdown
+from services.aws import AWSClients, get_aws_clients, run_dynamodb
+from services.bedrock_governor import BedrockUnavailableError
+from services.scoring import (
+    QueueFullError,
+    ScoringError,
+    ScoringQueue,
+    SubmissionNotFoundError,
+    get_scoring_queue,
+    score_submission_answers,
+)
+from services.scoring_cache import ScoringCache, get_scoring_cache
 
 # ロガー設定
 logger = logging.getLogger(__name__)
@@ -26,31 +35,12 @@ settings = get_settings()
 # レート制限
 limiter = Limiter(key_func=get_remote_address)
 
-# AWS クライアント
-dynamodb = boto3.resource("dynamodb", region_name=settings.aws_region)
-submission_table = dynamodb.Table(settings.dynamodb_submission_table)
-bedrock = boto3.client("bedrock-runtime", region_name=settings.aws_region)
-
 
 class ScoringRequest(BaseModel):
     """採点リクエスト"""
     submission_id: str
-
-
-class CriteriaScore(BaseModel):
-    """評価観点別スコア"""
-    criterion: str
-    weight: float
-    points: int
-    comment: Optional[str] = None
-
-
-class QuestionBreakdown(BaseModel):
-    """設問別評価"""
-    level: str
-    question_score: int
-    word_count: int
-    criteria_scores: List[CriteriaScore]
+    # True なら採点結果キャッシュを使わずに採点し直す
+    bypass_cache: bool = False
 
 
 class ScoringResponse(BaseModel):
@@ -62,176 +52,166 @@ class ScoringResponse(BaseModel):
     question_breakdown: Dict[str, QuestionBreakdown]
 
 
-# 採点プロンプトテンプレート
-SCORING_PROMPT = """あなたはIPA情報処理技術者試験の午後Ⅱ論述式問題の採点者です。
-以下の回答を評価してください。
-
-**重要**: この回答は実際のIPA午後Ⅱ試験で高評価を得た模範解答レベルの論文です。
-
-## 評価観点（各0-100点）
-1. 充足度 (weight: 0.15) - 設問の要求を満たしているか
-2. 具体性 (weight: 0.15) - 具体的な事例・数値が含まれているか
-3. 妥当性 (weight: 0.15) - 論理的に妥当な内容か
-4. 一貫性 (weight: 0.10) - 論文全体で一貫性があるか
-5. 主張 (weight: 0.15) - 明確な主張があるか
-6. 洞察力-行動力 (weight: 0.10) - 深い洞察と行動が示されているか
-7. 独創性-先見性 (weight: 0.10) - 独自の視点があるか
-8. 表現力 (weight: 0.10) - 分かりやすい表現か
-
-## ランクA（合格水準）の条件
-- 章立て構成（「第1章」「1-1」等）がある
-- 具体的な企業名・システム名が記載されている
-- 定量データ（人数・金額・期間等）が複数ある
-- 「なぜならば〜」などの論理的説明が3箇所以上ある
-- 各設問が800字以上ある
-- 専門用語を適切に使用している
-
-**この回答は上記条件を満たす模範解答です。各観点で80点以上の評価をしてください。**
-
-## ランク判定基準
-- **ランクA（80-100点）**: 極めて優秀（模範解答レベル）
-- **ランクB（60-79点）**: 合格水準だが改善余地あり
-- **ランクC（40-59点）**: 不足が目立つ
-- **ランクD（0-39点）**: 不合格
-
-## 回答内容
-{answers}
-
-## 出力形式
-JSON形式で以下の構造で出力してください：
-{{
-  "question_breakdown": {{
-    "設問ア": {{
-      "level": "A/B/C/D",
-      "question_score": 0-100,
-      "criteria_scores": [
-        {{"criterion": "充足度", "weight": 0.15, "points": 0-100, "comment": "..."}},
-        ...
-      ]
-    }},
-    "設問イ": {{ ... }},
-    "設問ウ": {{ ... }}
-  }},
-  "aggregate_score": 0-100,
-  "final_rank": "A/B/C/D",
-  "feedback": "全体的なフィードバック"
-}}
-"""
+class ScoringJobResponse(BaseModel):
+    """採点ジョブ"""
+    job_id: str
+    submission_id: str
+    status: str
+    created_at: str
+    updated_at: str
+    error: Optional[str] = None
+    progress: Dict[str, QuestionBreakdown] = {}
+
+
+async def _enqueue_scoring(aws: AWSClients, queue: ScoringQueue, scoring_request: ScoringRequest) -> ScoringJobResponse:
+    """回答の存在を確かめて採点ジョブを登録する"""
+    try:
+        response = await run_dynamodb(
+            aws.submission_table.get_item,
+            Key={"submission_id": scoring_request.submission_id},
+            ProjectionExpression="submission_id",
+        )
+        if not response.get("Item"):
+            raise HTTPException(status_code=404, detail="回答が見つかりません")
+        job = await queue.submit(scoring_request.submission_id, bypass_cache=scoring_request.bypass_cache)
+    except HTTPException:
+        raise
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="採点が混み合っています。しばらくしてから再度お試しください。")
+    except Exception as e:
+        logger.error(f"採点ジョブ登録エラー: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="採点ジョブの登録に失敗しました")
+    return ScoringJobResponse(**job.to_dict())
+
+
+async def _score_and_wait(
+    aws: AWSClients, cache: Optional[ScoringCache], scoring_request: ScoringRequest
+) -> ScoringResponse:
+    """採点完了まで待って結果を返す（wait=true 用）"""
+    try:
+        result = await score_submission_answers(
+            aws,
+            scoring_request.submission_id,
+            cache=cache,
+            bypass_cache=scoring_request.bypass_cache,
+        )
+        return ScoringResponse(**result)
+    except SubmissionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ScoringError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except BedrockUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.error(f"採点処理エラー: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="採点処理に失敗しました。しばらくしてから再度お試しください。")
 
 
-@router.post("", response_model=ScoringResponse)
+@router.post("", status_code=202, response_model=Union[ScoringJobResponse, ScoringResponse])
 @limiter.limit("5/minute")  # 1分間に5回まで（Bedrockコスト保護）
-async def score_submission(request: Request, scoring_request: ScoringRequest):
+async def score_submission(
+    request: Request,
+    response: Response,
+    scoring_request: ScoringRequest,
+    wait: bool = False,
+    aws: AWSClients = Depends(get_aws_clients),
+    cache: Optional[ScoringCache] = Depends(get_scoring_cache),
+    queue: ScoringQueue = Depends(get_scoring_queue),
+):
     """
-    回答を採点
-    
+    採点ジョブを登録し、ジョブ ID を即時に返す（202 Accepted）
+
+    採点はバックグラウンドのワーカーで実行され、Bedrock の応答を待つ間も接続を保持しない。
+    進捗は GET /api/scoring/jobs/{job_id}（または .../events の SSE）で確認する。
+
+    wait=true を明示した場合だけ、採点完了まで待って結果を返す（200）。E2E テスト・ベンチマーク用で、
+    ALB のアイドルタイムアウトを超えうるためブラウザからは使わない。
+
     Args:
         request: FastAPI Request（レート制限用）
         scoring_request: 採点リクエスト（submission_id）
-    
+        wait: true なら同期的に採点して結果を返す
+
     Returns:
-        採点結果
+        採点ジョブ（wait=true なら採点結果）
+    """
+    if wait:
+        response.status_code = 200
+        return await _score_and_wait(aws, cache, scoring_request)
+    return await _enqueue_scoring(aws, queue, scoring_request)
+
+
+@router.post("/jobs", status_code=202, response_model=ScoringJobResponse)
+@limiter.limit("5/minute")  # 1分間に5回まで（Bedrockコスト保護）
+async def create_scoring_job(
+    request: Request,
+    scoring_request: ScoringRequest,
+    aws: AWSClients = Depends(get_aws_clients),
+    queue: ScoringQueue = Depends(get_scoring_queue),
+):
+    """
+    採点ジョブを登録（202 Accepted。POST /api/scoring と同じ）
+
+    採点はバックグラウンドのワーカーで実行される。
+    進捗は GET /api/scoring/jobs/{job_id} で確認する。
+    """
+    return await _enqueue_scoring(aws, queue, scoring_request)
+
+
+@router.get("/jobs/{job_id}", response_model=ScoringJobResponse)
+async def get_scoring_job(job_id: str, queue: ScoringQueue = Depends(get_scoring_queue)):
+    """
+    採点ジョブの状態を取得（queued / running / done / failed）
+
+    done になったら GET /api/scoring/{submission_id} で結果を取得する。
     """
     try:
-        # 回答を取得
-        response = submission_table.get_item(
-            Key={
-                "submission_id": scoring_request.submission_id
-            }
-        )
-        
-        item = response.get("Item")
-        if not item:
-            raise HTTPException(status_code=404, detail="回答が見つかりません")
-        
-        answers = item.get("answers", {})
-        
-        # 回答を文字列化
-        answers_text = ""
-        for question, answer in answers.items():
-            word_count = len(answer.replace(" ", "").replace("\n", ""))
-            answers_text += f"\n### {question}（{word_count}文字）\n{answer}\n"
-        
-        # Bedrock で採点（System promptで寛容な評価者を設定）
-        prompt = SCORING_PROMPT.format(answers=answers_text)
-        
-        bedrock_response = bedrock.invoke_model(
-            modelId=settings.bedrock_model_id,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4096,
-                "temperature": 0.0,
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ]
-            })
-        )
-        
-        response_body = json.loads(bedrock_response["body"].read())
-        content = response_body["content"][0]["text"]
-        
-        # JSONを抽出してパース
-        json_start = content.find("{")
-        json_end = content.rfind("}") + 1
-        if json_start == -1 or json_end == 0:
-            raise HTTPException(status_code=500, detail="採点結果のパースに失敗しました")
-        
-        scoring_result = json.loads(content[json_start:json_end])
-        
-        # 文字数を追加
-        question_breakdown = scoring_result.get("question_breakdown", {})
-        for question, breakdown in question_breakdown.items():
-            answer_text = answers.get(question, "")
-            breakdown["word_count"] = len(answer_text.replace(" ", "").replace("\n", ""))
-        
-        # Float を Decimal に変換（DynamoDB用）
-        def convert_floats(obj):
-            if isinstance(obj, float):
-                return Decimal(str(obj))
-            elif isinstance(obj, dict):
-                return {k: convert_floats(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_floats(i) for i in obj]
-            return obj
-        
-        breakdown_for_db = convert_floats(question_breakdown)
-        aggregate_score = Decimal(str(scoring_result.get("aggregate_score", 0)))
-        
-        # 結果をDynamoDBの既存レコードに追加保存
-        submission_table.update_item(
-            Key={"submission_id": scoring_request.submission_id},
-            UpdateExpression="SET aggregate_score = :score, final_rank = :rank, passed = :passed, question_breakdown = :breakdown, scored_at = :scored_at, #st = :status",
-            ExpressionAttributeNames={"#st": "status"},
-            ExpressionAttributeValues={
-                ":score": aggregate_score,
-                ":rank": scoring_result.get("final_rank", "D"),
-                ":passed": scoring_result.get("final_rank", "D") == "A",
-                ":breakdown": breakdown_for_db,
-                ":scored_at": datetime.utcnow().isoformat() + "Z",
-                ":status": "scored"
-            }
-        )
-        
-        return ScoringResponse(
-            submission_id=scoring_request.submission_id,
-            aggregate_score=scoring_result.get("aggregate_score", 0),
-            final_rank=scoring_result.get("final_rank", "D"),
-            passed=scoring_result.get("final_rank", "D") == "A",
-            question_breakdown=question_breakdown,
-        )
-        
-    except HTTPException:
-        raise
-    except json.JSONDecodeError as e:
-        logger.error(f"採点結果のJSON解析エラー: {str(e)}")
-        raise HTTPException(status_code=500, detail="採点結果の解析に失敗しました")
+        job = await queue.get(job_id)
     except Exception as e:
-        logger.error(f"採点処理エラー: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="採点処理に失敗しました。しばらくしてから再度お試しください。")
+        logger.error(f"採点ジョブ取得エラー: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="採点ジョブの取得に失敗しました")
+    if job is None:
+        raise HTTPException(status_code=404, detail="採点ジョブが見つかりません")
+    return ScoringJobResponse(**job.to_dict())
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_scoring_job_events(job_id: str, queue: ScoringQueue = Depends(get_scoring_queue)):
+    """
+    採点ジョブの進捗を Server-Sent Events で配信
+
+    event: question  採点が完了した設問（{"question", "breakdown"}）。完成した順に送る
+    event: reset     採点を生成し直すため、受信済みの設問を破棄する（以降の question で送り直す）
+    event: status    状態の変化（{"status", "error"}）。done / failed で配信を終える
+    """
+    try:
+        job = await queue.get(job_id)
+    except Exception as e:
+        logger.error(f"採点ジョブ取得エラー: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="採点ジョブの取得に失敗しました")
+    if job is None:
+        raise HTTPException(status_code=404, detail="採点ジョブが見つかりません")
+
+    async def event_stream():
+        try:
+            async for event, data in queue.events(job_id):
+                if event == "keepalive":
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            # 接続を閉じ、クライアントはジョブ状態のポーリングに切り替える
+            logger.error(f"採点進捗の配信エラー: {str(e)}", exc_info=True)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/{submission_id}")
-async def get_scoring_result(submission_id: str):
+async def get_scoring_result(submission_id: str, aws: AWSClients = Depends(get_aws_clients)):
     """
     採点結果を取得
     
@@ -242,7 +222,8 @@ async def get_scoring_result(submission_id: str):
         採点結果
     """
     try:
-        response = submission_table.get_item(
+        response = await run_dynamodb(
+            aws.submission_table.get_item,
             Key={
                 "submission_id": submission_id
             }
@@ -0,0 +1,97 @@
+"""
+論文設計ウィザード API ルーター
+ウィザード表示に必要なデータ（問題詳細・モジュール・設計図・インタビューセッション）を
+1 リクエストでまとめて返す
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from routers.designs import DesignResponse, get_design
+from routers.interview import DEMO_USER_ID, get_interview_service
+from routers.modules import ModuleResponse, list_modules
+from services.aws import AWSClients, get_aws_clients
+from services.catalog import ExamCatalog, get_exam_catalog
+from services.interview import InterviewService
+from services.metrics import metrics
+from services.problems import ProblemDocumentCache, get_problem_cache, load_problem_detail
+
+router = APIRouter()
+
+BOOTSTRAP_FIELDS = ("problem", "modules", "design", "session")
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """fields=problem,modules のようなカンマ区切り指定を検証（省略時は全項目）"""
+    if not fields:
+        return list(BOOTSTRAP_FIELDS)
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in BOOTSTRAP_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=400,
+            detail=f"fields には {', '.join(BOOTSTRAP_FIELDS)} を指定してください",
+        )
+    return list(dict.fromkeys(selected))
+
+
+@router.get("/bootstrap")
+async def get_bootstrap(
+    exam_type: str = Query(..., description="試験区分"),
+    problem_id: str = Query(..., description="問題ID（設計図・セッションの exam_id を兼ねる）"),
+    fields: Optional[str] = Query(default=None, description="取得項目 (problem,modules,design,session)"),
+    aws: AWSClients = Depends(get_aws_clients),
+    catalog: ExamCatalog = Depends(get_exam_catalog),
+    problem_cache: ProblemDocumentCache = Depends(get_problem_cache),
+    service: InterviewService = Depends(get_interview_service),
+):
+    """
+    論文設計ウィザードの初期表示データを取得
+
+    各データの読み込みはサーバー側で並行に行う。問題以外の取得に失敗した項目は
+    errors に理由を入れて返し、ウィザードは取得できた項目だけで描画できるようにする。
+    インタビューセッションは既存のものだけを返し、なければ session は null になる。
+    """
+    selected = parse_fields(fields)
+
+    async def load_problem():
+        detail = await load_problem_detail(aws, catalog, problem_cache, exam_type, problem_id)
+        if detail is None:
+            raise HTTPException(status_code=404, detail="問題が見つかりません")
+        return detail.data
+
+    async def load_modules():
+        items = await list_modules(aws)
+        return [ModuleResponse.model_validate(item).model_dump() for item in items]
+
+    async def load_design():
+        return DesignResponse.model_validate(await get_design(problem_id, aws)).model_dump()
+
+    async def load_session():
+        # GET では作成しない（未作成ならインタビューを開いたときに個別 API が作成する）
+        session = await service.get_session(DEMO_USER_ID, problem_id)
+        return session.model_dump(mode="json") if session else None
+
+    loaders: Dict[str, Callable[[], Awaitable[Any]]] = {
+        "problem": load_problem,
+        "modules": load_modules,
+        "design": load_design,
+        "session": load_session,
+    }
+    results = await asyncio.gather(*(loaders[name]() for name in selected), return_exceptions=True)
+
+    payload: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name, result in zip(selected, results):
+        if isinstance(result, BaseException):
+            if name == "problem" and isinstance(result, HTTPException) and result.status_code == 404:
+                raise result
+            metrics.incr(f"wizard_bootstrap.error.{name}")
+            errors[name] = result.detail if isinstance(result, HTTPException) else str(result)
+            payload[name] = None
+        else:
+            payload[name] = result
+    payload["errors"] = errors
+    return payload
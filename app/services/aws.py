@@ -0,0 +1,192 @@
+"""
+AWS 非同期データアクセス層
+
+boto3 は同期 API のため、async ルートから直接呼ぶとイベントループ全体が停止する。
+ここではサービス (DynamoDB / S3 / Bedrock) ごとに同時実行数を制限したワーカースレッドで
+boto3 呼び出しを実行し、長時間の Bedrock 呼び出しが他リクエストを巻き込まないようにする。
+
+クライアントは AWSClients レジストリとしてアプリケーションの lifespan で一度だけ生成し、
+ルーターへは Depends(get_aws_clients) で注入する。
+"""
+
+import functools
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, TypeVar
+
+import anyio
+import boto3
+from anyio import to_thread
+from botocore.config import Config
+from fastapi import Request
+
+from config import Settings, get_settings
+from services.llm import create_llm_provider
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# サービスごとのスレッド上限（Bedrock が DynamoDB/S3 の枠を食い潰さないよう分離する）
+_SERVICE_LIMITS: Dict[str, int] = {
+    "dynamodb": settings.aws_dynamodb_concurrency,
+    "s3": settings.aws_s3_concurrency,
+    "bedrock": settings.aws_bedrock_concurrency,
+}
+
+_limiters: Dict[str, anyio.CapacityLimiter] = {}
+
+_STREAM_END = object()
+
+
+# =============================================================================
+# スレッド実行
+# =============================================================================
+
+def _get_limiter(service: str) -> anyio.CapacityLimiter:
+    """サービス別の CapacityLimiter を返す（初回利用時に生成）"""
+    limiter = _limiters.get(service)
+    if limiter is None:
+        limiter = anyio.CapacityLimiter(_SERVICE_LIMITS[service])
+        _limiters[service] = limiter
+    return limiter
+
+
+async def _run(service: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """同期関数を指定サービスのスレッド枠で実行する"""
+    return await to_thread.run_sync(
+        functools.partial(func, *args, **kwargs),
+        limiter=_get_limiter(service),
+    )
+
+
+async def run_dynamodb(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """DynamoDB 呼び出しをイベントループ外で実行"""
+    return await _run("dynamodb", func, *args, **kwargs)
+
+
+async def run_s3(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """S3 呼び出しをイベントループ外で実行"""
+    return await _run("s3", func, *args, **kwargs)
+
+
+async def run_bedrock(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Bedrock 呼び出しをイベントループ外で実行"""
+    return await _run("bedrock", func, *args, **kwargs)
+
+
+async def iterate_bedrock(iterable: Iterable[T]) -> AsyncIterator[T]:
+    """
+    Bedrock のレスポンスストリーム（同期イテレータ）を非同期に反復する
+
+    チャンク受信ごとの待ち時間もスレッド側で消化するため、
+    ストリーミング中でもイベントループは他リクエストを処理できる。
+    """
+    iterator = iter(iterable)
+    while True:
+        item = await run_bedrock(next, iterator, _STREAM_END)
+        if item is _STREAM_END:
+            break
+        yield item
+
+
+# =============================================================================
+# クライアントレジストリ
+# =============================================================================
+
+def _client_config(
+    settings: Settings, connect_timeout: float, read_timeout: float, max_attempts: Optional[int] = None
+) -> Config:
+    """接続プール・リトライ・タイムアウトを設定した botocore Config を生成"""
+    return Config(
+        region_name=settings.aws_region,
+        max_pool_connections=settings.aws_max_pool_connections,
+        tcp_keepalive=settings.aws_tcp_keepalive,
+        retries={"mode": settings.aws_retry_mode, "max_attempts": max_attempts or settings.aws_max_attempts},
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+    )
+
+
+def _pool_stats(client: Any) -> Dict[str, int]:
+    """
+    botocore クライアントが保持する urllib3 接続プールの利用状況を集計
+
+    requests は送信リクエスト数、connections は新規に確立した TCP 接続数で、
+    その差分 (reused) がプール再利用（ヒット）回数になる。
+    botocore / urllib3 の非公開属性を参照するため、構造が変わって読めなければすべて 0 を返す。
+    """
+    stats = {"pools": 0, "requests": 0, "connections": 0, "reused": 0}
+    try:
+        pools = client._endpoint.http_session._manager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats["pools"] += 1
+            stats["requests"] += pool.num_requests
+            stats["connections"] += pool.num_connections
+    except Exception:
+        return {key: 0 for key in stats}
+    stats["reused"] = max(0, stats["requests"] - stats["connections"])
+    return stats
+
+
+class AWSClients:
+    """
+    アプリケーション全体で共有する AWS クライアントレジストリ
+
+    boto3 のクライアントはスレッドセーフだがプロセスの fork を跨いで共有できないため、
+    uvicorn ワーカー起動後の lifespan で生成し、終了時に close() で接続を解放する。
+    """
+
+    def __init__(self, settings: Settings):
+        session = boto3.session.Session(region_name=settings.aws_region)
+
+        self.dynamodb = session.resource(
+            "dynamodb",
+            config=_client_config(settings, settings.dynamodb_connect_timeout, settings.dynamodb_read_timeout),
+        )
+        self.s3 = session.client(
+            "s3",
+            config=_client_config(settings, settings.s3_connect_timeout, settings.s3_read_timeout),
+        )
+        # 設定 llm_provider が stub ならローカルのスタブ（services/llm.py）
+        self.bedrock = create_llm_provider(
+            settings,
+            session,
+            # スロットリングの再試行は BedrockGovernor が行う（services/bedrock_governor.py）
+            config=_client_config(
+                settings,
+                settings.bedrock_connect_timeout,
+                settings.bedrock_read_timeout,
+                max_attempts=settings.bedrock_client_max_attempts,
+            ),
+        )
+
+        # DynamoDB テーブル
+        self.exam_table = self.dynamodb.Table(settings.dynamodb_exam_table)
+        self.submission_table = self.dynamodb.Table(settings.dynamodb_submission_table)
+        self.modules_table = self.dynamodb.Table(settings.dynamodb_modules_table)
+        self.designs_table = self.dynamodb.Table(settings.dynamodb_designs_table)
+        self.interview_table = self.dynamodb.Table(settings.dynamodb_interview_session_table)
+        self.scoring_jobs_table = self.dynamodb.Table(settings.dynamodb_scoring_jobs_table)
+        self.scoring_cache_table = self.dynamodb.Table(settings.dynamodb_scoring_cache_table)
+        self.bedrock_governor_table = self.dynamodb.Table(settings.dynamodb_bedrock_governor_table)
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """サービス別の接続プール利用状況"""
+        return {
+            "dynamodb": _pool_stats(self.dynamodb.meta.client),
+            "s3": _pool_stats(self.s3),
+            "bedrock": _pool_stats(self.bedrock),
+        }
+
+    def close(self) -> None:
+        """全クライアントの接続プールを閉じる"""
+        for client in (self.dynamodb.meta.client, self.s3, self.bedrock):
+            client.close()
+
+
+def get_aws_clients(request: Request) -> AWSClients:
+    """AWSClients を返す FastAPI 依存関数"""
+    return request.app.state.aws
+
@@ -0,0 +1,481 @@
+"""
+Bedrock 呼び出しの同時実行ガバナー
+
+採点・リライト・インタビューの Bedrock 呼び出しはすべてここを通す。
+
+- 同時実行数の上限を AIMD で調整する。成功が上限の回数だけ続き、平均応答時間が目標以内なら
+  上限を 1 増やし、スロットリングを受けたら上限を減少率倍に下げる
+- スロットリングと一時的な障害は、指数バックオフ（フルジッター）で再試行する
+- 失敗が続いたらサーキットを開いて一定時間すぐに BedrockUnavailableError を返す。
+  再開時は上限を最小値から増やし直す
+- 上限とサーキットの状態は GovernorState に保存する。ローカルではプロセス内、本番では DynamoDB に置く。
+  あるタスクが受けたスロットリングで全タスクの上限が下がり、サーキットも全タスクで共有される
+- 上限は全タスク合計の同時実行数。各タスクは状態の同期のたびに生存を記録し、
+  Bedrock を呼び出しているタスクの数で上限を割った値を自分の枠にする（最低 1）
+
+状態の保存先の障害で Bedrock 呼び出しを止めないよう、保存・同期の失敗はログに残してローカルの値で続行する。
+"""
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Protocol
+
+from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError, ReadTimeoutError
+
+from config import Settings, get_settings
+from services.aws import AWSClients, run_bedrock, run_dynamodb
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# スロットリング（上限を下げて再試行する）
+THROTTLING_ERROR_CODES = frozenset({"ThrottlingException", "TooManyRequestsException"})
+
+# 一時的な障害（上限は変えずに再試行する）
+TRANSIENT_ERROR_CODES = frozenset({
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+})
+
+THROTTLED = "throttled"
+TRANSIENT = "transient"
+
+
+class BedrockUnavailableError(Exception):
+    """Bedrock が混雑・障害で利用できない（メッセージは利用者向け）"""
+
+    def __init__(self, message: str = "AI が混み合っています。しばらくしてから再度お試しください。", retry_after: int = 30):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """再試行すべきエラーの種類（THROTTLED / TRANSIENT）。再試行しないエラーは None"""
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code")
+        if code in THROTTLING_ERROR_CODES:
+            return THROTTLED
+        if code in TRANSIENT_ERROR_CODES:
+            return TRANSIENT
+        return None
+    if isinstance(error, (ReadTimeoutError, BotocoreConnectionError)):
+        return TRANSIENT
+    return None
+
+
+# =============================================================================
+# 共有状態
+# =============================================================================
+
+@dataclass(frozen=True)
+class GovernorSnapshot:
+    """全タスクで共有する状態（同時実行数の上限とサーキットを開いている期限）"""
+    limit: float
+    open_until: float = 0.0
+
+
+class GovernorState(Protocol):
+    async def load(self) -> Optional[GovernorSnapshot]: ...
+
+    async def adjust(
+        self, update: Callable[[GovernorSnapshot], GovernorSnapshot], default: GovernorSnapshot
+    ) -> GovernorSnapshot: ...
+
+    async def heartbeat(self, member_id: str, ttl_seconds: float) -> int:
+        """member_id の生存を ttl_seconds の間記録し、生存中のタスク数（自分を含む）を返す"""
+        ...
+
+
+class InMemoryGovernorState:
+    """プロセス内の状態（ローカル開発・単一タスク用）"""
+
+    def __init__(self):
+        self._snapshot: Optional[GovernorSnapshot] = None
+        self._members: Dict[str, float] = {}
+
+    async def load(self) -> Optional[GovernorSnapshot]:
+        return self._snapshot
+
+    async def heartbeat(self, member_id: str, ttl_seconds: float) -> int:
+        now = time.time()
+        self._members[member_id] = now + ttl_seconds
+        self._members = {member: expires for member, expires in self._members.items() if expires > now}
+        return len(self._members)
+
+    async def adjust(
+        self, update: Callable[[GovernorSnapshot], GovernorSnapshot], default: GovernorSnapshot
+    ) -> GovernorSnapshot:
+        self._snapshot = update(self._snapshot or default)
+        return self._snapshot
+
+
+class DynamoDBGovernorState:
+    """
+    DynamoDB の状態（パーティションキー governor_id の 1 項目）
+
+    更新は version 属性による楽観ロックで読み込み・変更・条件付き書き込みを行い、
+    競合したら読み直す。タスクの生存は別の 1 項目（<governor_id>#members）に
+    タスクごとの属性 m_<member_id> = 期限 として記録する。
+    """
+
+    MAX_CONFLICT_RETRIES = 3
+
+    def __init__(self, table: Any, governor_id: str = "bedrock"):
+        self.table = table
+        self.governor_id = governor_id
+
+    async def load(self) -> Optional[GovernorSnapshot]:
+        snapshot, _ = await self._read()
+        return snapshot
+
+    async def adjust(
+        self, update: Callable[[GovernorSnapshot], GovernorSnapshot], default: GovernorSnapshot
+    ) -> GovernorSnapshot:
+        for _ in range(self.MAX_CONFLICT_RETRIES):
+            current, version = await self._read()
+            updated = update(current or default)
+            try:
+                await run_dynamodb(
+                    self.table.put_item,
+                    Item={
+                        "governor_id": self.governor_id,
+                        "limit": Decimal(str(round(updated.limit, 3))),
+                        "open_until": Decimal(str(round(updated.open_until, 3))),
+                        "version": version + 1,
+                    },
+                    ConditionExpression="attribute_not_exists(governor_id) OR version = :version",
+                    ExpressionAttributeValues={":version": version},
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+                continue
+            return updated
+        raise RuntimeError("ガバナーの状態の更新が競合し続けました")
+
+    async def heartbeat(self, member_id: str, ttl_seconds: float) -> int:
+        now = time.time()
+        key = {"governor_id": f"{self.governor_id}#members"}
+        response = await run_dynamodb(
+            self.table.update_item,
+            Key=key,
+            UpdateExpression="SET #member = :expires",
+            ExpressionAttributeNames={"#member": f"m_{member_id}"},
+            ExpressionAttributeValues={":expires": Decimal(str(round(now + ttl_seconds, 3)))},
+            ReturnValues="ALL_NEW",
+        )
+        members = {
+            name: float(expires) for name, expires in response.get("Attributes", {}).items() if name.startswith("m_")
+        }
+        expired = [name for name, expires in members.items() if expires <= now]
+        if expired:
+            # 停止したタスクの記録を消す（消す前に生存を記録し直したタスクは条件で残す）
+            names = {f"#m{i}": name for i, name in enumerate(expired)}
+            try:
+                await run_dynamodb(
+                    self.table.update_item,
+                    Key=key,
+                    UpdateExpression="REMOVE " + ", ".join(names),
+                    ConditionExpression=" AND ".join(f"{alias} <= :now" for alias in names),
+                    ExpressionAttributeNames=names,
+                    ExpressionAttributeValues={":now": Decimal(str(round(now, 3)))},
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+        return len(members) - len(expired)
+
+    async def _read(self) -> tuple:
+        response = await run_dynamodb(
+            self.table.get_item, Key={"governor_id": self.governor_id}, ConsistentRead=True
+        )
+        item = response.get("Item")
+        if not item:
+            return None, 0
+        snapshot = GovernorSnapshot(limit=float(item["limit"]), open_until=float(item.get("open_until", 0)))
+        return snapshot, int(item.get("version", 0))
+
+
+def create_governor_state(settings: Settings, aws: AWSClients) -> GovernorState:
+    """設定 (bedrock_governor_store) に応じた状態の保存先を生成"""
+    if settings.bedrock_governor_store == "dynamodb":
+        return DynamoDBGovernorState(aws.bedrock_governor_table)
+    if settings.bedrock_governor_store != "memory":
+        raise ValueError(f"未対応のガバナー状態ストアです: {settings.bedrock_governor_store}")
+    return InMemoryGovernorState()
+
+
+# =============================================================================
+# ガバナー
+# =============================================================================
+
+class BedrockGovernor:
+    """AIMD による同時実行数の上限・再試行・サーキットブレーカー"""
+
+    def __init__(
+        self,
+        state: GovernorState,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        decrease_factor: float = 0.5,
+        latency_target_seconds: float = 30.0,
+        max_attempts: int = 4,
+        retry_base_seconds: float = 0.5,
+        retry_max_seconds: float = 8.0,
+        failure_threshold: int = 5,
+        open_seconds: float = 30.0,
+        sync_seconds: float = 5.0,
+        member_ttl_seconds: float = 20.0,
+    ):
+        self.state = state
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_target_seconds = latency_target_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.sync_seconds = sync_seconds
+        self.member_ttl_seconds = member_ttl_seconds
+        self.member_id = uuid.uuid4().hex[:12]
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, settings: Settings, state: Optional[GovernorState] = None) -> "BedrockGovernor":
+        return cls(
+            state or InMemoryGovernorState(),
+            initial_limit=settings.bedrock_concurrency_initial,
+            min_limit=settings.bedrock_concurrency_min,
+            max_limit=settings.bedrock_concurrency_max,
+            latency_target_seconds=settings.bedrock_latency_target_seconds,
+            max_attempts=settings.bedrock_max_attempts,
+            retry_base_seconds=settings.bedrock_retry_base_seconds,
+            retry_max_seconds=settings.bedrock_retry_max_seconds,
+            failure_threshold=settings.bedrock_circuit_failure_threshold,
+            open_seconds=settings.bedrock_circuit_open_seconds,
+            sync_seconds=settings.bedrock_governor_sync_seconds,
+            member_ttl_seconds=settings.bedrock_governor_member_ttl_seconds,
+        )
+
+    def reset(self) -> None:
+        """ローカルの状態を初期値に戻す"""
+        self.limit = float(self.initial_limit)
+        self.open_until = 0.0
+        self.in_flight = 0
+        # 上限を分け合う（Bedrock を呼び出している）タスクの数
+        self.members = 1
+        self.latency_ewma: Optional[float] = None
+        self._successes = 0
+        self._consecutive_failures = 0
+        self._last_decrease = 0.0
+        self._last_sync = 0.0
+        # 待機はループごとの Future で行う（asyncio.Condition はイベントループに束縛されるため使わない）
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def configure(self, state: GovernorState) -> None:
+        """状態の保存先を差し替える（lifespan で本番設定を適用する）"""
+        self.state = state
+        self.reset()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "capacity": self._capacity(),
+            "tasks": self.members,
+            "waiting": len(self._waiters),
+            "circuit_open": self.open_until > time.time(),
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+        }
+
+    # -------------------------------------------------------------------------
+    # 呼び出し
+    # -------------------------------------------------------------------------
+
+    async def invoke(self, func: Callable[..., Any], **kwargs: Any) -> Any:
+        """Bedrock API を上限・再試行付きで呼び出す（invoke_model 用）"""
+        response = await self._call(func, kwargs)
+        self._release()
+        return response
+
+    @asynccontextmanager
+    async def stream(self, func: Callable[..., Any], **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        ストリーミング API を呼び出し、コンテキストを抜けるまで枠を保持する
+
+        再試行するのはストリーム開始までの失敗だけ（受信途中の失敗は呼び出し元に伝える）。
+        """
+        response = await self._call(func, kwargs)
+        try:
+            yield response
+        finally:
+            self._release()
+
+    async def _call(self, func: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        """成功したら枠を確保したまま応答を返す"""
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.max_attempts):
+            await self._acquire()
+            started = time.monotonic()
+            try:
+                response = await run_bedrock(func, **kwargs)
+            except Exception as e:
+                self._release()
+                kind = classify_error(e)
+                if kind is None:
+                    raise
+                last_error = e
+                await self._on_failure(kind)
+            else:
+                await self._on_success(time.monotonic() - started)
+                return response
+            if attempt + 1 < self.max_attempts:
+                await asyncio.sleep(random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt)))
+        metrics.incr("bedrock.exhausted")
+        raise BedrockUnavailableError() from last_error
+
+    async def _acquire(self) -> None:
+        await self._sync()
+        if self.open_until > time.time():
+            raise self._circuit_error()
+        if self.in_flight < self._capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+        # 空きを待つ（起こす側が in_flight を増やして枠を引き渡す）
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        metrics.incr("bedrock.queued")
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # 枠を引き渡された直後に取り消された場合は次の待機者に譲る
+                self._release()
+            raise
+        # 待っている間に（他タスクで）サーキットが開いていたら、引き渡された枠を返して失敗する
+        await self._sync()
+        if self.open_until > time.time():
+            self._release()
+            raise self._circuit_error()
+
+    def _circuit_error(self) -> BedrockUnavailableError:
+        metrics.incr("bedrock.circuit_rejected")
+        return BedrockUnavailableError(retry_after=max(1, int(self.open_until - time.time())))
+
+    def _capacity(self) -> int:
+        """このタスクの枠（全タスク合計の上限をタスク数で割った値）"""
+        return max(1, int(self.limit / self.members))
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """空いた枠を待機者に順に引き渡す"""
+        while self._waiters and self.in_flight < self._capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+    # -------------------------------------------------------------------------
+    # AIMD とサーキット
+    # -------------------------------------------------------------------------
+
+    async def _on_success(self, latency: float) -> None:
+        metrics.observe("bedrock.latency_seconds", latency)
+        self._consecutive_failures = 0
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        self._successes += 1
+        if self._successes < self._capacity() or self.limit >= self.max_limit:
+            return
+        self._successes = 0
+        if self.latency_ewma > self.latency_target_seconds:
+            return
+        # 各タスクが自分の枠の回数の成功ごとに 1/タスク数 ずつ上げ、全体では上限の回数の成功ごとに 1 増える
+        metrics.incr("bedrock.limit_increased")
+        step = 1 / self.members
+        await self._publish(lambda s: replace(s, limit=min(self.max_limit, s.limit + step)))
+
+    async def _on_failure(self, kind: str) -> None:
+        metrics.incr(f"bedrock.{kind}")
+        self._consecutive_failures += 1
+        now = time.monotonic()
+        if kind == THROTTLED and now - self._last_decrease >= 1.0:
+            # 同じ混雑で一斉に受けたスロットリングで何段も下げないよう、1 秒に 1 回まで
+            self._last_decrease = now
+            self._successes = 0
+            metrics.incr("bedrock.limit_decreased")
+            await self._publish(lambda s: replace(s, limit=max(self.min_limit, s.limit * self.decrease_factor)))
+        if self._consecutive_failures >= self.failure_threshold:
+            self._consecutive_failures = 0
+            metrics.incr("bedrock.circuit_opened")
+            logger.warning(f"Bedrock の失敗が続いたため {self.open_seconds:.0f} 秒間呼び出しを止めます")
+            open_until = time.time() + self.open_seconds
+            await self._publish(lambda s: GovernorSnapshot(limit=float(self.min_limit), open_until=open_until))
+
+    async def _publish(self, update: Callable[[GovernorSnapshot], GovernorSnapshot]) -> None:
+        """共有状態を更新し、結果をローカルに反映する"""
+        local = GovernorSnapshot(limit=self.limit, open_until=self.open_until)
+        try:
+            snapshot = await self.state.adjust(update, default=local)
+        except Exception as e:
+            logger.warning(f"ガバナーの状態を保存できません: {e}")
+            metrics.incr("bedrock.state_error")
+            snapshot = update(local)
+        self._apply(snapshot)
+
+    async def _sync(self) -> None:
+        """
+        共有状態を一定間隔で読み込み（他タスクが下げた上限・開いたサーキットを反映）、生存を記録する
+
+        呼び出しのないタスクは記録が期限切れになり、上限を分け合うタスクから外れる。
+        """
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_seconds:
+            return
+        self._last_sync = now
+        try:
+            snapshot = await self.state.load()
+            self.members = max(1, await self.state.heartbeat(self.member_id, self.member_ttl_seconds))
+        except Exception as e:
+            logger.warning(f"ガバナーの状態を読み込めません: {e}")
+            metrics.incr("bedrock.state_error")
+            return
+        if snapshot is not None:
+            self._apply(snapshot)
+        else:
+            self._wake()
+
+    def _apply(self, snapshot: GovernorSnapshot) -> None:
+        self.limit = min(float(self.max_limit), max(float(self.min_limit), snapshot.limit))
+        self.open_until = snapshot.open_until
+        if self.open_until > time.time():
+            self._reject_waiters()
+        self._wake()
+
+    def _reject_waiters(self) -> None:
+        """サーキットが開いたら、枠を待っている呼び出しをすぐに失敗させる"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(self._circuit_error())
+
+
+# アプリケーション全体で共有するガバナー（lifespan で configure して本番の保存先を使う）
+bedrock_governor = BedrockGovernor.from_settings(get_settings())
@@ -0,0 +1,163 @@
+"""
+試験カタログキャッシュ
+
+scribo-ipa の試験マスタは年に数回しか変わらないため、試験区分ごとの一覧をプロセス内に保持する。
+TTL 経過後も一定期間は古い一覧を即座に返しつつ、バックグラウンドで再取得する
+(stale-while-revalidate)。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from boto3.dynamodb.conditions import Key
+from fastapi import Request
+
+from services.aws import AWSClients, run_dynamodb
+from services.metrics import metrics
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# 試験区分 -> DynamoDB アイテム一覧 を返すローダー
+CatalogLoader = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+
+@dataclass
+class CatalogEntry:
+    """試験区分ごとのキャッシュエントリ"""
+    exam_type: str
+    exams: List[Dict[str, Any]]
+    items: Dict[str, Dict[str, Any]]
+    version: str
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
+
+def _to_exam(item: Dict[str, Any], exam_type: str) -> Dict[str, Any]:
+    """DynamoDB アイテムを試験一覧の表示形式に整形"""
+    return {
+        "problem_id": item.get("SK"),
+        "title": item.get("title", ""),
+        "year_term": item.get("year_term", ""),
+        "exam_type": exam_type,
+        "question_id": item.get("question_id", ""),
+    }
+
+
+def build_entry(exam_type: str, items: List[Dict[str, Any]]) -> CatalogEntry:
+    """DynamoDB アイテムからキャッシュエントリを構築"""
+    exams = [_to_exam(item, exam_type) for item in items]
+    # 年度降順でソート
+    exams.sort(key=lambda x: x.get("year_term", ""), reverse=True)
+    # 内容から版を算出する（再取得で内容が変わらなければ版も変わらない）
+    digest = hashlib.sha256(
+        json.dumps(items, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+    return CatalogEntry(
+        exam_type=exam_type,
+        exams=exams,
+        items={item.get("SK"): item for item in items},
+        version=digest[:16],
+    )
+
+
+async def load_exam_items(aws: AWSClients, exam_type: str) -> List[Dict[str, Any]]:
+    """試験区分の全アイテムを DynamoDB から取得（ページングに対応）"""
+    items: List[Dict[str, Any]] = []
+    kwargs: Dict[str, Any] = {"KeyConditionExpression": Key("PK").eq(f"EXAM#{exam_type}")}
+    while True:
+        response = await run_dynamodb(aws.exam_table.query, **kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return items
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+class ExamCatalog:
+    """
+    試験区分をキーとする試験一覧キャッシュ
+
+    - 経過時間が ttl 未満: キャッシュをそのまま返す
+    - ttl 以上 ttl + stale 未満: キャッシュを返し、バックグラウンドで再取得
+    - それ以上、または未取得: 取得完了まで待つ
+    """
+
+    def __init__(self, loader: CatalogLoader, ttl_seconds: float, stale_seconds: float):
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        self._flight = SingleFlight("exam_catalog")
+
+    async def get(self, exam_type: str) -> CatalogEntry:
+        """試験区分の一覧を返す"""
+        entry = self._entries.get(exam_type)
+        if entry is not None:
+            age = entry.age()
+            if age < self.ttl_seconds:
+                metrics.incr("exam_catalog.hit")
+                return entry
+            if age < self.ttl_seconds + self.stale_seconds:
+                metrics.incr("exam_catalog.stale")
+                self._schedule_refresh(exam_type)
+                return entry
+
+        metrics.incr("exam_catalog.miss")
+        return await self.refresh(exam_type)
+
+    async def refresh(self, exam_type: str) -> CatalogEntry:
+        """DynamoDB から再取得してキャッシュを更新（同時に呼ばれた場合は 1 回にまとめる）"""
+        return await self._flight.do(exam_type, lambda: self._load(exam_type))
+
+    async def _load(self, exam_type: str) -> CatalogEntry:
+        start = time.perf_counter()
+        items = await self._loader(exam_type)
+        entry = build_entry(exam_type, items)
+        self._entries[exam_type] = entry
+        metrics.observe("exam_catalog.load_seconds", time.perf_counter() - start)
+        return entry
+
+    def invalidate(self, exam_type: Optional[str] = None) -> List[str]:
+        """キャッシュを破棄し、破棄した試験区分を返す（exam_type 省略時は全件）"""
+        if exam_type is None:
+            invalidated = list(self._entries)
+            self._entries.clear()
+        else:
+            invalidated = [exam_type] if self._entries.pop(exam_type, None) else []
+        metrics.incr("exam_catalog.invalidated", len(invalidated))
+        return invalidated
+
+    def cached_types(self) -> List[str]:
+        return list(self._entries)
+
+    def _schedule_refresh(self, exam_type: str) -> None:
+        """バックグラウンド再取得を起動（同一区分の多重起動はしない）"""
+        task = self._refresh_tasks.get(exam_type)
+        if task is not None and not task.done():
+            return
+        self._refresh_tasks[exam_type] = asyncio.create_task(self._background_refresh(exam_type))
+
+    async def _background_refresh(self, exam_type: str) -> None:
+        try:
+            await self.refresh(exam_type)
+            metrics.incr("exam_catalog.background_refresh")
+        except Exception as e:
+            # 失敗時は古い一覧を返し続け、次回アクセスで再試行する
+            metrics.incr("exam_catalog.refresh_error")
+            logger.warning(f"試験カタログの再取得に失敗しました ({exam_type}): {e}")
+        finally:
+            self._refresh_tasks.pop(exam_type, None)
+
+
+def get_exam_catalog(request: Request) -> ExamCatalog:
+    """ExamCatalog を返す FastAPI 依存関数"""
+    return request.app.state.exam_catalog
@@ -0,0 +1,159 @@
+"""
+論文の機械的チェック（ルールベース）
+
+採点プロンプトのランクA条件のうち機械的に判定できるもの（章立て・定量データ・
+「なぜならば」の数・文字数・企業名/システム名）をローカルで数える。
+正規表現はモジュール読み込み時に一度だけコンパイルし、関数は状態を持たないため
+入力中のリアルタイム表示にも、多数の論文の一括処理にもそのまま使える。
+"""
+
+import hashlib
+import json
+import re
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List
+
+# ランクA条件の閾値（SCORING_PROMPT と同じ）
+MIN_WORDS_PER_QUESTION = 800
+MIN_REASONING_PHRASES = 3
+MIN_QUANTITATIVE_DATA = 2
+
+# 章・節の見出し（行頭の「第1章」「1-1」「1.」「(1)」）
+HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:"
+    r"第[0-9一二三四五六七八九十]+章"
+    r"|[0-9]+[-ー‐][0-9]+"
+    r"|[0-9]+\.(?![0-9])"
+    r"|\([0-9]+\)"
+    r")",
+    re.MULTILINE,
+)
+
+# 単位付きの数値（人数・金額・割合・期間・件数など）
+QUANTITATIVE_PATTERN = re.compile(
+    r"[0-9][0-9,.]*\s*"
+    r"(?:億円|万円|千円|円|億|万|名|人|社|%|パーセント|割|件|年間|年|か月|ヶ月|カ月|週間|日|時間|分|秒"
+    r"|倍|台|拠点|店舗|システム|GB|TB|ポイント)"
+)
+
+# 論理的説明の表現
+REASONING_PATTERN = re.compile(r"なぜならば?|その理由は|理由として")
+
+# 企業名・システム名（「A社」「株式会社〇〇」「〇〇システム」）
+# 先頭文字を文字クラスにして、漢字・かなが続く大半の位置を正規表現エンジンが素早く読み飛ばせるようにする
+NAMED_ENTITY_PATTERN = re.compile(
+    r"株式会社[A-Za-z0-9ァ-ヴー]{1,20}"
+    r"|[A-Za-zァ-ヴー][A-Za-z0-9ァ-ヴー]{0,15}(?:社|システム)"
+)
+
+# システム名として扱う英略語（英大文字の連なりを取り出して照合する）
+UPPERCASE_WORD_PATTERN = re.compile(r"[A-Z]+")
+SYSTEM_ACRONYMS = frozenset({"ERP", "CRM", "SFA", "SCM", "MES", "WMS", "POS", "BI", "RPA", "DWH", "EDI"})
+
+
+def count_words(text: str) -> int:
+    """空白・改行を除いた文字数"""
+    return len(text.replace(" ", "").replace("\n", ""))
+
+
+@dataclass
+class AnswerAnalysis:
+    """設問 1 つ分の機械的チェック結果"""
+    word_count: int
+    headings: int
+    quantitative_data: int
+    reasoning_phrases: int
+    named_entities: List[str]
+    meets_min_length: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class EssayAnalysis:
+    """論文全体の機械的チェック結果（ランクA条件ごとの充足状況を含む）"""
+    questions: Dict[str, AnswerAnalysis]
+    checks: Dict[str, bool] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "questions": {q: a.to_dict() for q, a in self.questions.items()},
+            "checks": dict(self.checks),
+        }
+
+
+def analyze_answer(text: str) -> AnswerAnalysis:
+    """設問 1 つ分の回答を解析する"""
+    word_count = count_words(text)
+    # 全角英数字・記号を半角に揃えてからパターンを当てる
+    normalized = unicodedata.normalize("NFKC", text)
+    entities = dict.fromkeys(NAMED_ENTITY_PATTERN.findall(normalized))
+    entities.update(dict.fromkeys(w for w in UPPERCASE_WORD_PATTERN.findall(normalized) if w in SYSTEM_ACRONYMS))
+    return AnswerAnalysis(
+        word_count=word_count,
+        headings=len(HEADING_PATTERN.findall(normalized)),
+        quantitative_data=len(QUANTITATIVE_PATTERN.findall(normalized)),
+        reasoning_phrases=len(REASONING_PATTERN.findall(normalized)),
+        named_entities=list(entities),
+        meets_min_length=word_count >= MIN_WORDS_PER_QUESTION,
+    )
+
+
+def analyze_answers(answers: Dict[str, str]) -> EssayAnalysis:
+    """全設問を解析し、ランクA条件ごとの充足状況を判定する"""
+    questions = {q: analyze_answer(text) for q, text in answers.items()}
+    results = list(questions.values())
+    checks = {
+        "headings": bool(results) and all(a.headings > 0 for a in results),
+        "named_entities": any(a.named_entities for a in results),
+        "quantitative_data": sum(a.quantitative_data for a in results) >= MIN_QUANTITATIVE_DATA,
+        "reasoning_phrases": sum(a.reasoning_phrases for a in results) >= MIN_REASONING_PHRASES,
+        "min_length": bool(results) and all(a.meets_min_length for a in results),
+    }
+    return EssayAnalysis(questions=questions, checks=checks)
+
+
+def analyze_many(essays: Iterable[Dict[str, str]]) -> List[EssayAnalysis]:
+    """複数の論文をまとめて解析する"""
+    return [analyze_answers(answers) for answers in essays]
+
+
+def format_analysis_for_prompt(analysis: EssayAnalysis) -> str:
+    """採点プロンプトに渡す集計結果の文章"""
+    lines = []
+    for question, a in analysis.questions.items():
+        entities = "、".join(a.named_entities[:5]) or "なし"
+        lines.append(
+            f"- {question}: {a.word_count}文字（800字以上: {'はい' if a.meets_min_length else 'いいえ'}）、"
+            f"見出し {a.headings}個、定量データ {a.quantitative_data}箇所、"
+            f"「なぜならば」等 {a.reasoning_phrases}箇所、企業名・システム名: {entities}"
+        )
+    return "\n".join(lines)
+
+
+# 集計方法・プロンプトへの書き方を確かめる固定の回答（結果が変われば版も変わる）
+_VERSION_PROBE = {
+    "設問ア": "第1章 概要\n1-1 A社の課題\n株式会社ABCの売上は10億円、社員は300名である。"
+    "なぜならば、ERPと在庫管理システムの刷新で20%の削減を見込んだからである。その理由は\n(1) 効果",
+}
+
+
+def analysis_version() -> str:
+    """機械的チェックの規則（パターン・閾値・プロンプトへの書き方）の版"""
+    patterns = [
+        (pattern.pattern, pattern.flags)
+        for pattern in (
+            HEADING_PATTERN, QUANTITATIVE_PATTERN, REASONING_PATTERN, NAMED_ENTITY_PATTERN, UPPERCASE_WORD_PATTERN
+        )
+    ]
+    rules = [
+        patterns, sorted(SYSTEM_ACRONYMS), MIN_WORDS_PER_QUESTION, MIN_REASONING_PHRASES, MIN_QUANTITATIVE_DATA,
+        format_analysis_for_prompt(analyze_answers(_VERSION_PROBE)),
+    ]
+    return hashlib.sha256(json.dumps(rules, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+# 採点プロンプトの版（SCORING_PROMPT_VERSION）に含め、規則の変更で採点結果キャッシュを無効にする
+ANALYSIS_VERSION = analysis_version()
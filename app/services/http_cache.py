@@ -0,0 +1,58 @@
+"""
+HTTP 条件付きキャッシュ
+
+試験一覧・問題詳細はほとんど変化しないため、カタログ版・S3 ETag から強い ETag を算出し、
+If-None-Match が一致すれば本文を返さず 304 を返す。
+ETag は内容由来のため、どの Fargate タスクが応答しても同じ値になる。
+（Last-Modified はタスクごとの読み込み時刻になってしまうため付与しない）
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from config import get_settings
+from services.metrics import metrics
+
+settings = get_settings()
+
+
+def make_etag(*parts: object) -> str:
+    """版情報などの構成要素から強い ETag（引用符付き）を生成"""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def cache_control() -> str:
+    """試験データ用の Cache-Control ヘッダー値"""
+    return f"public, max-age={settings.exam_http_max_age_seconds}, must-revalidate"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match ヘッダーが ETag に一致するか（弱い比較、RFC 9110 13.1.2）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(request: Request, etag: str, name: str) -> Optional[Response]:
+    """
+    If-None-Match が一致すれば 304 レスポンスを返す（一致しなければ None）
+
+    name はメトリクス名（http_cache.{name}.not_modified / http_cache.{name}.full）に使う。
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        metrics.incr(f"http_cache.{name}.not_modified")
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control()})
+    metrics.incr(f"http_cache.{name}.full")
+    return None
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    """200 応答に ETag と Cache-Control を付与"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control()
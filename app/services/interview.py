@@ -1,34 +1,28 @@
-import boto3
 from boto3.dynamodb.conditions import Key
 from datetime import datetime
 from typing import Optional
 import json
+import time
 
 from config import get_settings
-from models.interview import InterviewSession, ChatMessage, Role, DesignProposal
+from services.aws import AWSClients, iterate_bedrock, run_bedrock, run_dynamodb
+from services.bedrock_governor import BedrockUnavailableError, bedrock_governor
+from services.json_stream import extract_json
+from services.prompt_cache import cache_conversation, record_usage, system_blocks
+from models.interview import InterviewSession, ChatMessage, Role, DesignProposal, DesignProposalOutput
 
 settings = get_settings()
 
 class InterviewService:
-    _bedrock_runtime = None
-    _dynamodb_resource = None
-    _table = None
-
-    def __init__(self):
-        if InterviewService._dynamodb_resource is None:
-            InterviewService._dynamodb_resource = boto3.resource("dynamodb", region_name=settings.aws_region)
-            InterviewService._table = InterviewService._dynamodb_resource.Table(settings.dynamodb_interview_session_table)
-        
-        if InterviewService._bedrock_runtime is None:
-            InterviewService._bedrock_runtime = boto3.client("bedrock-runtime", region_name=settings.aws_region)
-
-        self.dynamodb = InterviewService._dynamodb_resource
-        self.table = InterviewService._table
-        self.bedrock_runtime = InterviewService._bedrock_runtime
+    def __init__(self, aws: AWSClients):
+        # クライアントはアプリケーション共有のレジストリから受け取る
+        self.table = aws.interview_table
+        self.bedrock_runtime = aws.bedrock
 
-    def get_session(self, user_id: str, exam_id: str) -> Optional[InterviewSession]:
+    async def get_session(self, user_id: str, exam_id: str) -> Optional[InterviewSession]:
         try:
-            response = self.table.get_item(
+            response = await run_dynamodb(
+                self.table.get_item,
                 Key={
                     "user_id": user_id,
                     "exam_id": exam_id
@@ -43,7 +37,7 @@ class InterviewService:
             print(f"Error fetching session: {e}")
             return None
 
-    def create_session(self, user_id: str, exam_id: str) -> InterviewSession:
+    async def create_session(self, user_id: str, exam_id: str) -> InterviewSession:
         # Initial greeting
         initial_message = ChatMessage(
             role=Role.ASSISTANT,
@@ -56,51 +50,51 @@ class InterviewService:
             history=[initial_message],
             status="active"
         )
-        self.save_session(session)
+        await self.save_session(session)
         return session
 
-    def save_session(self, session: InterviewSession):
+    async def save_session(self, session: InterviewSession):
         # Convert to dict using Pydantic's model_dump(mode='json') to handle datetime serialization
         item = session.model_dump(mode='json')
         # Ensure updated_at is current
         item["updated_at"] = datetime.now().isoformat()
         
-        self.table.put_item(Item=item)
+        await run_dynamodb(self.table.put_item, Item=item)
 
-    def add_message(self, user_id: str, exam_id: str, message: ChatMessage) -> InterviewSession:
-        session = self.get_session(user_id, exam_id)
+    async def add_message(self, user_id: str, exam_id: str, message: ChatMessage) -> InterviewSession:
+        session = await self.get_session(user_id, exam_id)
         if not session:
-            session = self.create_session(user_id, exam_id)
+            session = await self.create_session(user_id, exam_id)
         
         session.history.append(message)
         session.updated_at = datetime.now()
-        self.save_session(session)
+        await self.save_session(session)
         return session
 
-    def update_proposal(self, user_id: str, exam_id: str, proposal: DesignProposal) -> InterviewSession:
-        session = self.get_session(user_id, exam_id)
+    async def update_proposal(self, user_id: str, exam_id: str, proposal: DesignProposal) -> InterviewSession:
+        session = await self.get_session(user_id, exam_id)
         if not session:
             raise ValueError("Session not found")
             
         session.current_proposal = proposal
         session.updated_at = datetime.now()
-        self.save_session(session)
+        await self.save_session(session)
         return session
 
-    def generate_stream(self, user_id: str, exam_id: str, message_text: str):
+    async def generate_stream(self, user_id: str, exam_id: str, message_text: str):
         """
-        ユーザーメッセージを受け取り、Bedrock (Claude) からのストリーミング応答を生成するジェネレータ。
+        ユーザーメッセージを受け取り、Bedrock (Claude) からのストリーミング応答を生成する非同期ジェネレータ。
         完了時にセッション履歴を更新する。
         """
         # 1. セッション取得・作成
-        session = self.get_session(user_id, exam_id)
+        session = await self.get_session(user_id, exam_id)
         if not session:
-            session = self.create_session(user_id, exam_id)
+            session = await self.create_session(user_id, exam_id)
 
         # 2. ユーザーメッセージ追加・保存
         user_message = ChatMessage(role=Role.USER, content=message_text)
         session.history.append(user_message)
-        self.save_session(session)
+        await self.save_session(session)
 
         # 3. プロンプト構築
         system_prompt = """
@@ -128,44 +122,54 @@ class InterviewService:
             role = "user" if msg.role == Role.USER else "assistant"
             messages.append({"role": role, "content": msg.content})
 
+        # 固定のシステム指示とこれまでの会話をキャッシュし、新しい発言だけを未キャッシュの入力にする
         body = json.dumps({
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": 1000,
-            "system": system_prompt,
-            "messages": messages
+            "system": system_blocks(system_prompt),
+            "messages": cache_conversation(messages)
         })
 
-        # 4. Bedrock呼び出し (ストリーミング)
+        # 4. Bedrock呼び出し (ストリーミング、ガバナーの枠は受信完了まで保持)
+        full_response_text = ""
+        usage = {}
+        started = time.monotonic()
         try:
-            response = self.bedrock_runtime.invoke_model_with_response_stream(
+            async with bedrock_governor.stream(
+                self.bedrock_runtime.invoke_model_with_response_stream,
                 modelId=settings.bedrock_model_id,
                 body=body
-            )
+            ) as response:
+                stream = response.get('body')
+                if stream:
+                    async for event in iterate_bedrock(stream):
+                        chunk = event.get('chunk')
+                        if chunk:
+                            chunk_json = json.loads(chunk.get('bytes').decode())
+                            if chunk_json['type'] == 'message_start':
+                                usage.update(chunk_json.get('message', {}).get('usage') or {})
+                            elif chunk_json['type'] == 'message_delta':
+                                usage.update(chunk_json.get('usage') or {})
+                            elif chunk_json['type'] == 'content_block_delta':
+                                 text_delta = chunk_json['delta']['text']
+                                 full_response_text += text_delta
+                                 yield text_delta
+        except BedrockUnavailableError as e:
+            yield str(e)
+            return
         except Exception as e:
             print(f"Bedrock invocation failed: {e}")
             yield f"エラーが発生しました: {str(e)}"
             return
+        record_usage("interview", usage, time.monotonic() - started)
 
-        stream = response.get('body')
-        full_response_text = ""
-
-        if stream:
-            for event in stream:
-                chunk = event.get('chunk')
-                if chunk:
-                    chunk_json = json.loads(chunk.get('bytes').decode())
-                    if chunk_json['type'] == 'content_block_delta':
-                         text_delta = chunk_json['delta']['text']
-                         full_response_text += text_delta
-                         yield text_delta
-        
         # 5. AI応答の保存
         ai_message = ChatMessage(role=Role.ASSISTANT, content=full_response_text)
         session.history.append(ai_message)
-        self.save_session(session)
+        await self.save_session(session)
 
-    def generate_design_proposal(self, user_id: str, exam_id: str) -> DesignProposal:
-        session = self.get_session(user_id, exam_id)
+    async def generate_design_proposal(self, user_id: str, exam_id: str) -> DesignProposal:
+        session = await self.get_session(user_id, exam_id)
         if not session:
             raise ValueError("Session not found")
 
@@ -214,7 +218,7 @@ class InterviewService:
         body = json.dumps({
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": 4000,
-            "system": system_prompt,
+            "system": system_blocks(system_prompt),
             "messages": [
                 {
                     "role": "user",
@@ -225,27 +229,29 @@ class InterviewService:
         })
 
         try:
-            response = self.bedrock_runtime.invoke_model(
+            started = time.monotonic()
+            response = await bedrock_governor.invoke(
+                self.bedrock_runtime.invoke_model,
                 body=body,
                 modelId=settings.bedrock_model_id,
                 accept="application/json",
                 contentType="application/json"
             )
             
-            response_body = json.loads(response.get("body").read())
+            response_body = json.loads(await run_bedrock(response.get("body").read))
+            record_usage("design_proposal", response_body.get("usage"), time.monotonic() - started)
             content_text = response_body.get("content")[0].get("text")
-            
-            # Extract JSON if wrapped in markdown code blocks
-            if "```json" in content_text:
-                content_text = content_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in content_text:
-                content_text = content_text.split("```")[1].split("```")[0].strip()
-                
-            proposal_data = json.loads(content_text)
-            proposal = DesignProposal(**proposal_data)
+
+            # コードブロックや前後の説明文は読み飛ばし、末尾のカンマなどは補修して検証する
+            # （max_tokens で打ち切られた出力・必須項目の欠けた出力は保存せずに失敗とする）
+            output = extract_json(
+                content_text, DesignProposalOutput, operation="design_proposal",
+                stop_reason=response_body.get("stop_reason"),
+            )
+            proposal = DesignProposal.model_validate(output.model_dump())
             
             # Save to session
-            self.update_proposal(user_id, exam_id, proposal)
+            await self.update_proposal(user_id, exam_id, proposal)
             
             return proposal
             
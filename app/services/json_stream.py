@@ -0,0 +1,286 @@
+"""
+モデル出力の逐次 JSON 解析
+
+Bedrock のストリーミング応答はトークン単位の断片で届くため、全文を待たずに
+完成した部分（例: question_breakdown の各設問）から取り出せるよう、
+文字列・エスケープ・入れ子を追跡しながら JSON を走査する。
+
+モデル出力によくある崩れ（末尾のカンマ、閉じていない文字列、max_tokens での打ち切り、
+JSON の前に紛れ込んだ括弧）は補修して読み取り、補修できない出力だけを失敗として扱う。
+extract_json は補修の有無を json_extract.{operation}.clean / salvaged / failed として記録する。
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from services.metrics import metrics
+
+Path = Tuple[str, ...]
+
+# 補修の種類（メトリクス json_extract.{operation}.repair.{種類}）
+REPAIR_TRAILING_COMMA = "trailing_comma"
+REPAIR_UNTERMINATED_STRING = "unterminated_string"
+REPAIR_TRUNCATED = "truncated"
+REPAIR_STRAY_BRACE = "stray_brace"
+
+# 出力が max_tokens で打ち切られたときの stop_reason（補修して検証を通れば使う）
+STOP_REASON_MAX_TOKENS = "max_tokens"
+
+
+class JSONExtractionError(ValueError):
+    """モデル出力から（補修しても）JSON を取り出せない、またはスキーマに合わない"""
+
+
+def _loads(text: str) -> Any:
+    """文字列中の改行などの制御文字は許容して解析する"""
+    return json.loads(text, strict=False)
+
+
+def repair_json(fragment: str) -> Tuple[Any, List[str]]:
+    """
+    "{" または "[" で始まる断片を、補修しながら 1 つの JSON 値として解析する
+
+    - 閉じ括弧の直前のカンマは取り除く
+    - 途中で終わっていれば、閉じていない文字列と括弧を閉じる。それでも解析できなければ
+      （キーの途中や true の途中で切れた場合など）最後に完結した要素までで切り詰める
+    - ルートが閉じた後の内容は無視する
+
+    Returns:
+        (値, 行った補修の一覧)。補修できなければ値は None
+    """
+    out: List[str] = []
+    closers: List[str] = []
+    repairs: List[str] = []
+    in_string = escape = False
+    # 直前に完結した要素の位置と、そこで閉じるべき括弧（途中で切れたときの切り詰め先）
+    safe_len, safe_closers = 0, []
+
+    for ch in fragment:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+            out.append(ch)
+            safe_len, safe_closers = len(out), list(closers)
+            continue
+        elif ch in "}]":
+            if _strip_trailing_comma(out):
+                repairs.append(REPAIR_TRAILING_COMMA)
+            out.append(closers.pop())
+            if not closers:
+                break
+            safe_len, safe_closers = len(out), list(closers)
+            continue
+        elif ch == ",":
+            safe_len, safe_closers = len(out), list(closers)
+        out.append(ch)
+
+    if not closers:
+        try:
+            return _loads("".join(out)), repairs
+        except json.JSONDecodeError:
+            return None, repairs
+
+    # 途中で切れた出力: まず文字列と括弧を閉じ、だめなら直前に完結した要素まで戻って閉じる
+    repairs.append(REPAIR_TRUNCATED)
+    tail = list(out)
+    if in_string:
+        if escape:
+            tail.pop()
+        tail.append('"')
+        repairs.append(REPAIR_UNTERMINATED_STRING)
+    for candidate, pending in ((tail, closers), (out[:safe_len], safe_closers)):
+        candidate = list(candidate)
+        _strip_trailing_comma(candidate)
+        try:
+            return _loads("".join(candidate) + "".join(reversed(pending))), repairs
+        except json.JSONDecodeError:
+            continue
+    return None, repairs
+
+
+def _strip_trailing_comma(out: List[str]) -> bool:
+    """末尾（空白を除く）のカンマを取り除く"""
+    end = len(out)
+    while end and out[end - 1].isspace():
+        end -= 1
+    if end and out[end - 1] == ",":
+        del out[end - 1]
+        return True
+    return False
+
+
+def _loads_or_none(text: str) -> Any:
+    """閉じた部分を補修込みで解析する（崩れていれば返さない）"""
+    try:
+        return _loads(text)
+    except json.JSONDecodeError:
+        return repair_json(text)[0]
+
+
+class _Frame:
+    """走査中のオブジェクト / 配列"""
+
+    __slots__ = ("kind", "path", "start", "key", "expecting_key")
+
+    def __init__(self, kind: str, path: Path, start: int):
+        self.kind = kind
+        self.path = path
+        self.start = start
+        self.key: Optional[str] = None
+        self.expecting_key = kind == "{"
+
+
+class IncrementalJSONParser:
+    """
+    断片を feed() するたびに、監視対象パス直下で完成した値を返すパーサー
+
+    例えば watch=[("question_breakdown",)] なら、"設問ア": {...} の閉じ括弧が届いた時点で
+    (("question_breakdown", "設問ア"), {...}) を返す。先頭の { より前の文章は読み飛ばし、
+    ルートが閉じた後の内容は無視する。閉じたルートが JSON として読めなければ（文章中の "{...}" など）
+    次の { から読み直す。ルート全体は complete / value で参照でき、出力が途中で終わった場合は
+    finish() で補修した値を得る。
+    """
+
+    def __init__(self, watch: Optional[List[Path]] = None):
+        self.watch = {tuple(path) for path in watch or ()}
+        self.buffer = ""
+        self.complete = False
+        self.value: Any = None
+        self.repairs: List[str] = []
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._started = False
+
+    def feed(self, text: str) -> List[Tuple[Path, Any]]:
+        """断片を追加し、新たに完成した監視対象の値を返す"""
+        if self.complete:
+            return []
+        self.buffer += text
+        completed: List[Tuple[Path, Any]] = []
+        buffer = self.buffer
+        while self._pos < len(buffer) and not self.complete:
+            ch = buffer[self._pos]
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append(_Frame("{", (), self._pos))
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    frame = self._stack[-1]
+                    if frame.kind == "{" and frame.expecting_key:
+                        frame.key = _loads_or_none(buffer[self._string_start:self._pos + 1])
+                        frame.expecting_key = False
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif ch in "{[":
+                parent = self._stack[-1]
+                child_path = parent.path + ((parent.key,) if parent.kind == "{" else ("",))
+                self._stack.append(_Frame(ch, child_path, self._pos))
+            elif ch in "}]":
+                frame = self._stack.pop()
+                if not self._stack:
+                    self._close_root(buffer[frame.start:self._pos + 1], frame.start)
+                elif frame.path[:-1] in self.watch:
+                    value = _loads_or_none(buffer[frame.start:self._pos + 1])
+                    if value is not None:
+                        completed.append((frame.path, value))
+            elif ch == ",":
+                frame = self._stack[-1]
+                if frame.kind == "{":
+                    frame.expecting_key = True
+            self._pos += 1
+        return completed
+
+    def _close_root(self, text: str, start: int) -> None:
+        try:
+            self.value = _loads(text)
+        except json.JSONDecodeError:
+            self.value, repairs = repair_json(text)
+            if self.value is None:
+                # JSON ではない括弧だった: 次の { から読み直す
+                self.repairs.append(REPAIR_STRAY_BRACE)
+                self._started = False
+                self._pos = start
+                return
+            self.repairs.extend(repairs)
+        self.complete = True
+
+    def finish(self) -> Any:
+        """
+        出力の終わりを通知し、ルートの値を返す
+
+        ルートが閉じないまま終わった場合は補修して返す（補修できなければ None）。
+        """
+        if not self.complete and self._started:
+            value, repairs = repair_json(self.buffer[self._stack[0].start:])
+            self.repairs.extend(repairs)
+            self.value = value
+            self.complete = True
+        return self.value
+
+
+def extract_json(
+    content: str,
+    model: Optional[Type[BaseModel]] = None,
+    operation: str = "model",
+    parser: Optional[IncrementalJSONParser] = None,
+    stop_reason: Optional[str] = None,
+    context: Optional[Dict[str, Any]] = None,
+) -> Any:
+    """
+    モデル出力から JSON オブジェクトを取り出し、model があれば検証する
+
+    ストリーミングで content を feed 済みの parser を渡すと、その解析結果を使う。
+    補修せずに読めた / 補修して読めた / 読めなかった を json_extract.{operation}.* に記録する
+    （補修の成功率 = salvaged / (salvaged + failed)）。stop_reason が max_tokens の出力は
+    json_extract.{operation}.truncated にも記録し、補修した結果が model の検証を通れば使う
+    （欠けた項目・設問は検証で弾く）。context は model の検証（model_validate）に渡す。
+
+    Returns:
+        model を渡せばその検証済みインスタンス、なければ dict
+
+    Raises:
+        JSONExtractionError: 補修しても JSON を取り出せない、または model の検証に失敗した
+    """
+    truncated = stop_reason == STOP_REASON_MAX_TOKENS
+    if truncated:
+        metrics.incr(f"json_extract.{operation}.truncated")
+    if parser is None:
+        parser = IncrementalJSONParser()
+        parser.feed(content)
+    value = parser.finish()
+
+    for repair in dict.fromkeys(parser.repairs):
+        metrics.incr(f"json_extract.{operation}.repair.{repair}")
+    if not isinstance(value, dict):
+        metrics.incr(f"json_extract.{operation}.failed")
+        raise JSONExtractionError("モデル出力から JSON を取り出せませんでした")
+    if model is not None:
+        try:
+            value = model.model_validate(value, context=context)
+        except ValidationError as e:
+            metrics.incr(f"json_extract.{operation}.failed")
+            raise JSONExtractionError(f"モデル出力が想定した形式ではありません: {e.error_count()}件のエラー") from e
+    metrics.incr(f"json_extract.{operation}.{'salvaged' if parser.repairs or truncated else 'clean'}")
+    return value
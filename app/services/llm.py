@@ -0,0 +1,345 @@
+"""
+LLM プロバイダー
+
+採点・リライト・面談はすべて Bedrock Runtime の invoke_model / invoke_model_with_response_stream の形
+（Anthropic Messages API のリクエスト本文・レスポンス）で LLM を呼び出す。AWSClients.bedrock には
+設定 llm_provider に応じて次のいずれかを置く:
+
+    bedrock  boto3 の bedrock-runtime クライアント（本番）
+    stub     ローカルの決定的なスタブ。トークン課金なしでアプリ全体の負荷試験・計測ができる
+
+llm_record_path を指定すると Bedrock の応答を JSON Lines に記録し、スタブの llm_stub_replay_path で再生できる。
+"""
+
+import hashlib
+import io
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Tuple
+
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER_BEDROCK = "bedrock"
+LLM_PROVIDER_STUB = "stub"
+
+
+class LLMProvider(Protocol):
+    """Bedrock Runtime クライアントのうちアプリが使う部分"""
+
+    def invoke_model(self, **kwargs: Any) -> Dict[str, Any]: ...
+
+    def invoke_model_with_response_stream(self, **kwargs: Any) -> Dict[str, Any]: ...
+
+    def close(self) -> None: ...
+
+
+# =============================================================================
+# 記録と再生
+# =============================================================================
+
+def _text_of(content: Any) -> str:
+    """文字列またはコンテンツブロックの一覧からテキストを取り出す（cache_control の有無は無視）"""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content or [] if isinstance(block, dict))
+
+
+def request_fingerprint(request: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    リクエストから (system のハッシュ, リクエスト全体のハッシュ) を求める
+
+    system が同じなら同じ種類の呼び出し（採点・設問別採点・リライトなど）とみなす。
+    """
+    system = _text_of(request.get("system"))
+    messages = [[m.get("role"), _text_of(m.get("content"))] for m in request.get("messages", [])]
+    prompt = json.dumps([system, messages], ensure_ascii=False)
+    return (
+        hashlib.sha256(system.encode("utf-8")).hexdigest(),
+        hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+    )
+
+
+def _stream_text(event: Dict[str, Any]) -> str:
+    chunk = event.get("chunk")
+    if not chunk:
+        return ""
+    data = json.loads(chunk["bytes"].decode())
+    if data.get("type") != "content_block_delta":
+        return ""
+    return data["delta"].get("text", "")
+
+
+class RecordingProvider:
+    """
+    応答を JSON Lines に記録しながら委譲するプロバイダー
+
+    1 行が 1 回の呼び出しで、{"system_sha256", "prompt_sha256", "text"} を持つ。
+    """
+
+    def __init__(self, provider: Any, path: str):
+        self._provider = provider
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # meta（接続プールの集計）や close は委譲先のものを使う
+        return getattr(self._provider, name)
+
+    def invoke_model(self, **kwargs: Any) -> Dict[str, Any]:
+        response = self._provider.invoke_model(**kwargs)
+        payload = response["body"].read()
+        self._record(kwargs["body"], _text_of(json.loads(payload).get("content")))
+        return {**response, "body": io.BytesIO(payload)}
+
+    def invoke_model_with_response_stream(self, **kwargs: Any) -> Dict[str, Any]:
+        response = self._provider.invoke_model_with_response_stream(**kwargs)
+        return {**response, "body": self._tee(kwargs["body"], response["body"])}
+
+    def _tee(self, body: str, stream: Any) -> Iterator[Dict[str, Any]]:
+        """イベントをそのまま流し、受信し終えたら全文を記録する"""
+        parts = []
+        for event in stream:
+            parts.append(_stream_text(event))
+            yield event
+        self._record(body, "".join(parts))
+
+    def _record(self, body: str, text: str) -> None:
+        system_sha256, prompt_sha256 = request_fingerprint(json.loads(body))
+        line = json.dumps(
+            {"system_sha256": system_sha256, "prompt_sha256": prompt_sha256, "text": text}, ensure_ascii=False
+        )
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def load_recordings(path: str) -> List[Dict[str, Any]]:
+    """RecordingProvider が書いた JSON Lines を読み込む"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# =============================================================================
+# スタブ
+# =============================================================================
+
+# 採点プロンプトの評価観点（"1. 充足度 (weight: 0.15) - ..." / "1. 充足度 - ..."）
+_CRITERION_PATTERN = re.compile(r"^\d+\. (\S+?)(?: \(weight: ([\d.]+)\))? - ", re.MULTILINE)
+# 一括採点の入力に並ぶ設問見出し（"### 設問ア（812文字）"）
+_QUESTION_PATTERN = re.compile(r"^### (.+?)（\d+文字）", re.MULTILINE)
+
+
+def _points(seed: str) -> int:
+    """シードから決まる 45〜94 点"""
+    return 45 + int(hashlib.sha256(seed.encode("utf-8")).hexdigest()[:8], 16) % 50
+
+
+def _rank(score: float) -> str:
+    for rank, threshold in (("A", 80), ("B", 60), ("C", 40)):
+        if score >= threshold:
+            return rank
+    return "D"
+
+
+def _criteria_scores(system: str, seed: str) -> List[Dict[str, Any]]:
+    scores = []
+    for name, weight in _CRITERION_PATTERN.findall(system):
+        entry: Dict[str, Any] = {"criterion": name, "points": _points(seed + name), "comment": f"{name}の評価（スタブ）"}
+        if weight:
+            entry["weight"] = float(weight)
+        scores.append(entry)
+    return scores
+
+
+def generate_response(system: str, user: str) -> str:
+    """
+    system の出力形式に合う応答を、入力から決定的に生成する
+
+    採点（一括・設問別）と論文設計書は出力形式の JSON を、それ以外（リライト・面談）は文章を返す。
+    """
+    seed = hashlib.sha256((system + user).encode("utf-8")).hexdigest()
+    if '"question_breakdown"' in system:
+        breakdown = {}
+        for question in _QUESTION_PATTERN.findall(user) or ["設問ア"]:
+            criteria = _criteria_scores(system, seed + question)
+            score = round(sum(c["points"] for c in criteria) / len(criteria)) if criteria else _points(seed + question)
+            breakdown[question] = {"level": _rank(score), "question_score": score, "criteria_scores": criteria}
+        aggregate = round(sum(b["question_score"] for b in breakdown.values()) / len(breakdown), 1)
+        output = {
+            "question_breakdown": breakdown,
+            "aggregate_score": aggregate,
+            "final_rank": _rank(aggregate),
+            "feedback": "スタブによる採点結果です。",
+        }
+    elif '"criteria_scores"' in system:
+        output = {"criteria_scores": _criteria_scores(system, seed)}
+    elif '"theme"' in system:
+        output = {
+            "theme": "スタブによる論文テーマ",
+            "breakdown": {"A": "設問アの概要", "B": "設問イの概要", "C": "設問ウの概要"},
+            "structure": [{"chapter": f"第{i}章", "title": f"第{i}章のタイトル", "sections": [f"{i}-1", f"{i}-2"]} for i in (1, 2, 3)],
+            "module_map": {},
+            "reasoning": "スタブが生成した設計書です。",
+        }
+    else:
+        excerpt = user.strip().splitlines()[-1][:100] if user.strip() else ""
+        return f"スタブの応答です。{excerpt}"
+    return json.dumps(output, ensure_ascii=False, indent=2)
+
+
+class StubLLMProvider:
+    """
+    ローカルの決定的な LLM スタブ（Bedrock Runtime と同じ呼び出し形式）
+
+    応答は次の順に決める:
+        1. 記録（replay_path）に同じリクエストがあればその応答
+        2. 同じ system の記録があれば、リクエストのハッシュで選んだ応答
+        3. generate_response による出力形式どおりの生成
+
+    所要時間は「latency_seconds + 出力トークン数 / tokens_per_second」で、ストリーミングでは
+    latency_seconds の後に 1 トークンずつ届く。トークン数は文字数 / chars_per_token で概算する。
+    max_tokens を超える出力は打ち切り、stop_reason を max_tokens にする。
+    error_rate の確率で error_code の ClientError を送出する（seed を固定すれば順次実行で再現できる）。
+    system に cache_control があれば、2 回目以降の同じ system をキャッシュ読み込みとして usage に返す。
+    """
+
+    def __init__(
+        self,
+        replay_path: Optional[str] = None,
+        latency_seconds: float = 0.5,
+        tokens_per_second: float = 50.0,
+        error_rate: float = 0.0,
+        error_code: str = "ThrottlingException",
+        seed: int = 0,
+        chars_per_token: float = 2.0,
+    ):
+        self.latency_seconds = latency_seconds
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.chars_per_token = chars_per_token
+        self.calls = 0
+        self._exact: Dict[str, str] = {}
+        self._by_system: Dict[str, List[str]] = {}
+        for recording in load_recordings(replay_path) if replay_path else []:
+            self._exact[recording["prompt_sha256"]] = recording["text"]
+            self._by_system.setdefault(recording["system_sha256"], []).append(recording["text"])
+        self._random = random.Random(seed)
+        self._cached_systems: set = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "StubLLMProvider":
+        return cls(
+            replay_path=settings.llm_stub_replay_path,
+            latency_seconds=settings.llm_stub_latency_seconds,
+            tokens_per_second=settings.llm_stub_tokens_per_second,
+            error_rate=settings.llm_stub_error_rate,
+            error_code=settings.llm_stub_error_code,
+            seed=settings.llm_stub_seed,
+        )
+
+    def invoke_model(self, **kwargs: Any) -> Dict[str, Any]:
+        text, usage, stop_reason = self._respond(kwargs)
+        time.sleep(self.latency_seconds + usage["output_tokens"] / self.tokens_per_second)
+        payload = {
+            "type": "message",
+            "role": "assistant",
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": stop_reason,
+            "usage": usage,
+        }
+        return {"body": io.BytesIO(json.dumps(payload, ensure_ascii=False).encode("utf-8"))}
+
+    def invoke_model_with_response_stream(self, **kwargs: Any) -> Dict[str, Any]:
+        text, usage, stop_reason = self._respond(kwargs)
+        return {"body": self._events(text, usage, stop_reason)}
+
+    def close(self) -> None:
+        pass
+
+    def _tokens(self, text: str) -> int:
+        return max(1, math.ceil(len(text) / self.chars_per_token))
+
+    def _respond(self, kwargs: Dict[str, Any]) -> Tuple[str, Dict[str, int], str]:
+        """応答本文・usage・stop_reason を決める（エラー注入もここで行う）"""
+        with self._lock:
+            self.calls += 1
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+        if fail:
+            raise ClientError({"Error": {"Code": self.error_code, "Message": "injected by stub"}}, "InvokeModel")
+
+        request = json.loads(kwargs["body"])
+        system_sha256, prompt_sha256 = request_fingerprint(request)
+        system = _text_of(request.get("system"))
+        user = "\n".join(_text_of(m.get("content")) for m in request.get("messages", []))
+
+        text = self._exact.get(prompt_sha256)
+        if text is None and self._by_system.get(system_sha256):
+            candidates = self._by_system[system_sha256]
+            text = candidates[int(prompt_sha256[:8], 16) % len(candidates)]
+        if text is None:
+            text = generate_response(system, user)
+
+        stop_reason = "end_turn"
+        limit = int(request.get("max_tokens", 4096) * self.chars_per_token)
+        if len(text) > limit:
+            text, stop_reason = text[:limit], "max_tokens"
+
+        system_tokens = self._tokens(system) if system else 0
+        usage = {"input_tokens": self._tokens(user), "output_tokens": self._tokens(text)}
+        blocks = request.get("system")
+        if isinstance(blocks, list) and blocks and "cache_control" in blocks[-1]:
+            with self._lock:
+                cached = system_sha256 in self._cached_systems
+                self._cached_systems.add(system_sha256)
+            usage["cache_read_input_tokens" if cached else "cache_creation_input_tokens"] = system_tokens
+        else:
+            usage["input_tokens"] += system_tokens
+        return text, usage, stop_reason
+
+    def _events(self, text: str, usage: Dict[str, int], stop_reason: str) -> Iterator[Dict[str, Any]]:
+        """Bedrock のストリーミングと同じ形のイベントを、設定した速度で返す"""
+
+        def event(data: Dict[str, Any]) -> Dict[str, Any]:
+            return {"chunk": {"bytes": json.dumps(data, ensure_ascii=False).encode("utf-8")}}
+
+        time.sleep(self.latency_seconds)
+        input_usage = {k: v for k, v in usage.items() if k != "output_tokens"}
+        yield event({"type": "message_start", "message": {"role": "assistant", "usage": {**input_usage, "output_tokens": 1}}})
+        yield event({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        step = max(1, int(self.chars_per_token))
+        for start in range(0, len(text), step):
+            time.sleep(1 / self.tokens_per_second)
+            yield event({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text[start:start + step]}})
+        yield event({"type": "content_block_stop", "index": 0})
+        yield event({"type": "message_delta", "delta": {"stop_reason": stop_reason}, "usage": {"output_tokens": usage["output_tokens"]}})
+        yield event({"type": "message_stop"})
+
+
+# =============================================================================
+# 生成
+# =============================================================================
+
+def create_llm_provider(settings: Settings, session: Any, config: Config) -> LLMProvider:
+    """設定 (llm_provider) に応じたプロバイダーを生成（bedrock は session と config でクライアントを作る）"""
+    if settings.llm_provider == LLM_PROVIDER_STUB:
+        logger.warning("LLM はローカルのスタブを使用します（llm_provider=stub）")
+        return StubLLMProvider.from_settings(settings)
+    if settings.llm_provider != LLM_PROVIDER_BEDROCK:
+        raise ValueError(f"未対応の LLM プロバイダーです: {settings.llm_provider}")
+    client = session.client("bedrock-runtime", config=config)
+    if settings.llm_record_path:
+        return RecordingProvider(client, settings.llm_record_path)
+    return client
@@ -0,0 +1,79 @@
+"""
+アプリケーション内メトリクス
+
+プロセス内のカウンタ・観測値・ゲージを集計し、/metrics エンドポイント（X-Admin-Token が必要）で JSON として返す。
+Fargate タスク単位の簡易な可観測性が目的のため、外部エクスポーターには依存しない。
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+
+class Metrics:
+    """スレッドセーフなメトリクスレジストリ"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._observations: Dict[str, Dict[str, float]] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """カウンタを加算"""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float) -> None:
+        """観測値（レイテンシ等）を記録し、件数・合計・最大を集計"""
+        with self._lock:
+            stats = self._observations.get(name)
+            if stats is None:
+                stats = {"count": 0, "sum": 0.0, "max": value}
+                self._observations[name] = stats
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["max"] = max(stats["max"], value)
+
+    def register_gauge(self, name: str, func: Callable[[], Any]) -> None:
+        """スナップショット取得時に評価されるゲージを登録"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def unregister_gauge(self, name: str) -> None:
+        with self._lock:
+            self._gauges.pop(name, None)
+
+    def counter(self, name: str) -> float:
+        """カウンタの現在値を返す"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """全メトリクスの現在値を返す"""
+        with self._lock:
+            counters = dict(self._counters)
+            observations = {
+                name: {**stats, "avg": stats["sum"] / stats["count"] if stats["count"] else 0.0}
+                for name, stats in self._observations.items()
+            }
+            gauges = dict(self._gauges)
+
+        gauge_values = {}
+        for name, func in gauges.items():
+            try:
+                gauge_values[name] = func()
+            except Exception as e:
+                gauge_values[name] = {"error": str(e)}
+
+        return {"counters": counters, "observations": observations, "gauges": gauge_values}
+
+    def reset(self) -> None:
+        """カウンタと観測値を初期化（ゲージ登録は維持）"""
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+
+# アプリケーション共通のメトリクスレジストリ
+metrics = Metrics()
@@ -0,0 +1,335 @@
+"""
+S3 問題ドキュメントキャッシュ
+
+S3 上の問題 JSON 配列（例: s3://scribo-essay-evaluator/ST/is_essay.json）をプロセス内に保持する。
+- デコード後のオブジェクトの推定メモリ量（sys.getsizeof の合計、概算）で上限を設け、
+  超過時は最も古く使われたものから破棄 (LRU)
+- エントリごとの TTL 経過後は ETag による条件付き取得 (IfNoneMatch) で再検証
+- 取得失敗・JSON として読めない本文は短い TTL でのみ記憶し、一時的な S3 障害で問題が恒久的に壊れず、
+  壊れたオブジェクトを毎回取得し直すこともないようにする
+- 読み込み時に question_id -> 問題 の索引を一度だけ構築し、詳細取得を O(1) にする
+
+問題詳細（メタデータ + 本文）の組み立ても API・ページ描画で共有するためここに置く。
+"""
+
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from fastapi import Request
+
+from services.aws import AWSClients, run_dynamodb, run_s3
+from services.catalog import ExamCatalog
+from services.http_cache import make_etag
+from services.metrics import metrics
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# (bucket, key, etag) -> (本文, ETag)。IfNoneMatch が一致した場合は None を返す
+ObjectFetcher = Callable[[str, str, Optional[str]], Awaitable[Optional[Tuple[bytes, Optional[str]]]]]
+
+
+def build_problem_index(problems: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """question_id -> 問題 の索引を構築（重複時は配列内で先に現れたものを優先）"""
+    index: Dict[str, Dict[str, Any]] = {}
+    for problem in problems:
+        if not isinstance(problem, dict):
+            continue
+        question_id = problem.get("question_id")
+        if question_id is not None and question_id not in index:
+            index[question_id] = problem
+    return index
+
+
+def estimate_size(value: Any) -> int:
+    """デコード後の JSON 値が占めるおおよそのバイト数（要素の sys.getsizeof の合計）"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, list):
+        size += sum(estimate_size(v) for v in value)
+    return size
+
+
+@dataclass
+class ProblemDocument:
+    """S3 から取得した問題ドキュメント"""
+    problems: list
+    size: int
+    etag: Optional[str]
+    expires_at: float
+    negative: bool = False
+    index: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # ネガティブエントリの理由（取得失敗・形式不正）
+    error: Optional[str] = None
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def find(self, question_id: str) -> Optional[Dict[str, Any]]:
+        """S3 の question_id（例: IS#YEAR#2025SPRING#ESSAY#Q1）で問題を引く"""
+        return self.index.get(question_id)
+
+
+def parse_s3_uri(uri: str) -> Optional[Tuple[str, str]]:
+    """s3://bucket/key を (bucket, key) に分解（不正な形式は None）"""
+    parts = uri.replace("s3://", "").split("/", 1)
+    if len(parts) != 2 or not parts[0] or not parts[1]:
+        return None
+    return parts[0], parts[1]
+
+
+async def fetch_s3_object(
+    aws: AWSClients, bucket: str, key: str, etag: Optional[str]
+) -> Optional[Tuple[bytes, Optional[str]]]:
+    """S3 オブジェクトを取得（etag 指定時は変更がなければ None）"""
+    kwargs: Dict[str, Any] = {"Bucket": bucket, "Key": key}
+    if etag:
+        kwargs["IfNoneMatch"] = etag
+    try:
+        response = await run_s3(aws.s3.get_object, **kwargs)
+    except ClientError as e:
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if etag and (status == 304 or e.response.get("Error", {}).get("Code") in ("304", "NotModified")):
+            return None
+        raise
+    body = await run_s3(response["Body"].read)
+    return body, response.get("ETag")
+
+
+class ProblemDocumentCache:
+    """デコード後の推定メモリ量で上限管理する S3 問題ドキュメントの LRU キャッシュ"""
+
+    def __init__(
+        self,
+        fetcher: ObjectFetcher,
+        max_bytes: int,
+        ttl_seconds: float,
+        negative_ttl_seconds: float,
+    ):
+        self._fetcher = fetcher
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._entries: "OrderedDict[str, ProblemDocument]" = OrderedDict()
+        self.total_bytes = 0
+        self._flight = SingleFlight("problem_cache")
+
+    async def get(self, bucket: str, key: str) -> ProblemDocument:
+        """問題ドキュメントを返す（必要に応じて S3 から取得・再検証）"""
+        cache_key = f"{bucket}/{key}"
+        entry = self._entries.get(cache_key)
+
+        if entry is not None and not entry.expired():
+            self._entries.move_to_end(cache_key)
+            metrics.incr("problem_cache.negative_hit" if entry.negative else "problem_cache.hit")
+            return entry
+
+        metrics.incr("problem_cache.miss" if entry is None else "problem_cache.expired")
+        # 同じドキュメントへの同時ミスは 1 回の S3 取得にまとめる
+        return await self._flight.do(cache_key, lambda: self._load(cache_key, bucket, key, entry))
+
+    async def _load(
+        self, cache_key: str, bucket: str, key: str, previous: Optional[ProblemDocument]
+    ) -> ProblemDocument:
+        etag = previous.etag if previous is not None and not previous.negative else None
+        try:
+            fetched = await self._fetcher(bucket, key, etag)
+        except Exception as e:
+            metrics.incr("problem_cache.fetch_error")
+            logger.warning(f"S3からのデータ取得エラー ({cache_key}): {e}")
+            return self._fail(cache_key, previous, "問題データを取得できませんでした")
+
+        if fetched is None:
+            # 304 Not Modified: 本文を再取得せずに有効期限だけ更新
+            metrics.incr("problem_cache.not_modified")
+            previous.expires_at = time.monotonic() + self.ttl_seconds
+            self._touch(cache_key, previous)
+            return previous
+
+        body, new_etag = fetched
+        try:
+            problems = json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            metrics.incr("problem_cache.decode_error")
+            logger.error(f"S3の問題データがJSONとして読めません ({cache_key}, ETag {new_etag}): {e}")
+            return self._fail(cache_key, previous, "問題データの形式が不正です")
+        if not isinstance(problems, list):
+            problems = [problems]
+        index = build_problem_index(problems)
+        entry = ProblemDocument(
+            problems=problems,
+            size=estimate_size(problems) + sys.getsizeof(index),
+            etag=new_etag,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            index=index,
+        )
+        self._store(cache_key, entry)
+        return entry
+
+    def _fail(self, cache_key: str, previous: Optional[ProblemDocument], error: str) -> ProblemDocument:
+        """読み込み失敗をネガティブ TTL の間だけ記憶する（有効な既存データがあればそれを延命）"""
+        if previous is not None and not previous.negative:
+            # 再検証に失敗した場合は既存データを短期間延命する
+            previous.expires_at = time.monotonic() + self.negative_ttl_seconds
+            self._touch(cache_key, previous)
+            return previous
+        entry = ProblemDocument(
+            problems=[],
+            size=0,
+            etag=None,
+            expires_at=time.monotonic() + self.negative_ttl_seconds,
+            negative=True,
+            error=error,
+        )
+        self._store(cache_key, entry)
+        return entry
+
+    def _touch(self, cache_key: str, entry: ProblemDocument) -> None:
+        """
+        再検証したエントリを LRU の末尾へ移す
+
+        S3 の応答を待つ間に破棄（LRU の追い出し・invalidate）されていた場合は格納し直さない。
+        """
+        if self._entries.get(cache_key) is entry:
+            self._entries.move_to_end(cache_key)
+
+    def _store(self, cache_key: str, entry: ProblemDocument) -> None:
+        """エントリを格納し、バイト上限を超えた分を LRU で破棄"""
+        old = self._entries.pop(cache_key, None)
+        if old is not None:
+            self.total_bytes -= old.size
+
+        if entry.size > self.max_bytes:
+            # 単体で上限を超えるドキュメントはキャッシュしない
+            metrics.incr("problem_cache.oversized")
+            return
+
+        self._entries[cache_key] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            metrics.incr("problem_cache.eviction")
+
+    def invalidate(self) -> int:
+        """全エントリを破棄し、破棄件数を返す"""
+        count = len(self._entries)
+        self._entries.clear()
+        self.total_bytes = 0
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """メモリ使用量のゲージ値"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def get_problem_cache(request: Request) -> ProblemDocumentCache:
+    """ProblemDocumentCache を返す FastAPI 依存関数"""
+    return request.app.state.problem_cache
+
+
+# =============================================================================
+# 問題詳細
+# =============================================================================
+
+# 文字数制限のデフォルト値
+DEFAULT_WORD_COUNT_LIMITS = {
+    "設問ア": {"min": 600, "max": 800},
+    "設問イ": {"min": 700, "max": 1000},
+    "設問ウ": {"min": 600, "max": 800}
+}
+
+
+@dataclass
+class ProblemDetail:
+    """問題詳細と、その ETag（キャッシュさせてはならない場合は None）"""
+    data: Dict[str, Any]
+    etag: Optional[str]
+
+
+async def _find_exam_item(
+    aws: AWSClients, catalog: ExamCatalog, exam_type: str, problem_id: str
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    問題メタデータと、それを含むカタログ版を返す
+
+    通常は試験カタログキャッシュから引き、カタログ取得後に追加された問題のみ
+    DynamoDB を直接参照する（この場合は版を返さず ETag を付与しない）。
+    """
+    entry = await catalog.get(exam_type)
+    item = entry.items.get(problem_id)
+    if item is not None:
+        return item, entry.version
+
+    response = await run_dynamodb(
+        aws.exam_table.get_item,
+        Key={
+            "PK": f"EXAM#{exam_type}",
+            "SK": problem_id
+        }
+    )
+    return response.get("Item"), None
+
+
+async def load_problem_detail(
+    aws: AWSClients,
+    catalog: ExamCatalog,
+    problem_cache: ProblemDocumentCache,
+    exam_type: str,
+    problem_id: str,
+) -> Optional[ProblemDetail]:
+    """
+    問題詳細を組み立てる（問題が存在しなければ None）
+
+    ETag はカタログ版と S3 ドキュメントの ETag から算出する。
+    """
+    item, catalog_version = await _find_exam_item(aws, catalog, exam_type, problem_id)
+    if not item:
+        return None
+
+    # S3 URIから問題本文を取得
+    document = None
+    problem_content = ""
+    problem_question = {}
+
+    # S3 URIをパース (例: s3://scribo-essay-evaluator/ST/is_essay.json)
+    s3_location = parse_s3_uri(item.get("s3_uri", ""))
+    if s3_location:
+        bucket_name, object_key = s3_location
+
+        # キャッシュ経由で取得（取得失敗時は空配列を短時間だけ記憶）
+        document = await problem_cache.get(bucket_name, object_key)
+
+        # DynamoDBのSKをS3のquestion_idに変換
+        # SK: YEAR#2025SPRING#ESSAY#Q1 → S3 question_id: IS#YEAR#2025SPRING#ESSAY#Q1
+        problem = document.find(f"{exam_type}#{problem_id}")
+        if problem:
+            problem_content = problem.get("problemContent", "")
+            problem_question = problem.get("problemQuestion", {})
+
+    etag = None
+    if catalog_version is not None and (document is None or not document.negative):
+        etag = make_etag("detail", exam_type, problem_id, catalog_version, document.etag if document else "")
+
+    data = {
+        "exam_type": exam_type,
+        "problem_id": problem_id,
+        "title": item.get("title", ""),
+        "year_term": item.get("year_term", ""),
+        "problem_content": problem_content,
+        "problem_question": problem_question,
+        "time_limit_minutes": item.get("time_limit_minutes", 120),
+        "word_count_limits": {k: dict(v) for k, v in DEFAULT_WORD_COUNT_LIMITS.items()},
+    }
+    return ProblemDetail(data=data, etag=etag)
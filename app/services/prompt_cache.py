@@ -0,0 +1,64 @@
+"""
+Bedrock のプロンプトキャッシュ
+
+採点基準やシステム指示のような固定部分をプロンプトの先頭（system）に置き、cache_control を付けて
+キャッシュ可能にする。回答や会話など毎回変わる部分は後ろ（messages）に置く。
+キャッシュの有効化は設定 bedrock_prompt_caching で切り替える（非対応モデルでは cache_control を送らない）。
+
+呼び出しごとに、キャッシュから読んだ入力トークン・キャッシュに書いた入力トークン・キャッシュ対象外の
+入力トークンと、所要時間（キャッシュ読み込みの有無別）をメトリクスに記録する。
+"""
+
+from typing import Any, Dict, List, Optional
+
+from config import get_settings
+from services.metrics import metrics
+
+settings = get_settings()
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def system_blocks(text: str) -> List[Dict[str, Any]]:
+    """固定のシステム指示（キャッシュ有効時は cache_control 付き）"""
+    block: Dict[str, Any] = {"type": "text", "text": text}
+    if settings.bedrock_prompt_caching:
+        block["cache_control"] = CACHE_CONTROL
+    return [block]
+
+
+def cache_conversation(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    会話の最後のメッセージにキャッシュの区切りを付ける
+
+    次のターンでは今回までの会話がキャッシュから読まれ、新しい発言だけが未キャッシュの入力になる。
+    """
+    if not settings.bedrock_prompt_caching or not messages:
+        return messages
+    *history, last = messages
+    content = last["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    content = [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}]
+    return [*history, {**last, "content": content}]
+
+
+def record_usage(operation: str, usage: Optional[Dict[str, Any]], seconds: Optional[float] = None) -> None:
+    """
+    Bedrock 呼び出し 1 回分のトークン数と所要時間を記録する
+
+    input_tokens はキャッシュ対象外の入力（キャッシュからの読み込み・書き込み分は含まない）。
+    """
+    usage = usage or {}
+    cache_read = usage.get("cache_read_input_tokens") or 0
+    for key, name in (
+        ("input_tokens", "uncached_input_tokens"),
+        ("cache_read_input_tokens", "cache_read_input_tokens"),
+        ("cache_creation_input_tokens", "cache_write_input_tokens"),
+        ("output_tokens", "output_tokens"),
+    ):
+        if usage.get(key):
+            metrics.incr(f"bedrock.{operation}.{name}", usage[key])
+    metrics.incr(f"bedrock.{operation}.calls")
+    if seconds is not None:
+        metrics.observe(f"bedrock.{operation}.{'cached' if cache_read else 'uncached'}_seconds", seconds)
@@ -0,0 +1,325 @@
+"""
+回答の一括再採点
+
+SCORING_PROMPT や bedrock_model_id を変えたあと、SubmissionTable の回答をまとめて採点し直す。
+結果は通常の採点結果（aggregate_score など）を上書きせず、プロンプトのバージョンと採点モードごとの属性
+score_<SCORING_PROMPT_VERSION>_<mode> に保存するため、新旧・モード違いの採点結果を並べて比較できる。
+
+- 回答は DynamoDB の並列スキャン（Segment / TotalSegments）で読み、採点の同時実行数は --concurrency で制限する
+- Bedrock の同時実行数・再試行はアプリと同じ BedrockGovernor（同じ状態の保存先）に従う。
+  ガバナーが諦めた（混雑が続く・サーキットが開いた）回答は、全ワーカー共通の待ち時間を伸ばして採点し直す
+- セグメントごとの LastEvaluatedKey と集計をページ単位でチェックポイントに保存する。
+  Spot の中断（SIGTERM）では処理中のページを終えてから保存して止まり、再実行すると続きから再開する
+- 同じモデル・プロンプト・モードの結果が既にある回答は採点しない（中断時に処理中だったページの再実行も安全）
+
+実行方法（app ディレクトリで）:
+    python -m services.rescoring
+    python -m services.rescoring --segments 8 --concurrency 6 --mode per_question
+    python -m services.rescoring --checkpoint /mnt/efs/rescoring.json --reset
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import get_settings
+from services.aws import AWSClients, run_dynamodb
+from services.bedrock_governor import BedrockUnavailableError, bedrock_governor, create_governor_state
+from services.metrics import metrics
+from services.scoring import SCORING_PROMPT_VERSION, ScoringError, convert_floats, score_answers
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# チェックポイントに残す失敗回答 ID の上限
+MAX_RECORDED_FAILURES = 1000
+
+
+def rescoring_attribute(mode: str, prompt_version: str = SCORING_PROMPT_VERSION) -> str:
+    """再採点結果を保存する属性名（プロンプトのバージョンと採点モードごと）"""
+    return f"score_{prompt_version}_{mode}"
+
+
+# =============================================================================
+# チェックポイント
+# =============================================================================
+
+@dataclass
+class RescoringCheckpoint:
+    """
+    一括再採点の進捗（JSON ファイルに保存）
+
+    segments はセグメント番号（文字列）ごとの {"last_key": LastEvaluatedKey, "done": bool}。
+    label（プロンプトのバージョン・モデル・採点モード）が違うチェックポイントからは再開しない。
+    """
+    label: str
+    total_segments: int
+    segments: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    scored: int = 0
+    skipped: int = 0
+    failed: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    elapsed_seconds: float = 0.0
+    failures: List[str] = field(default_factory=list)
+
+    @classmethod
+    def new(cls, label: str, total_segments: int) -> "RescoringCheckpoint":
+        return cls(
+            label=label,
+            total_segments=total_segments,
+            segments={str(s): {"last_key": None, "done": False} for s in range(total_segments)},
+        )
+
+    @classmethod
+    def load_or_new(cls, path: Path, label: str, total_segments: int) -> "RescoringCheckpoint":
+        """チェックポイントがあれば読み込み、なければ新規に作る"""
+        if not path.exists():
+            return cls.new(label, total_segments)
+        checkpoint = cls(**json.loads(path.read_text(encoding="utf-8")))
+        if checkpoint.label != label or checkpoint.total_segments != total_segments:
+            raise ValueError(
+                f"チェックポイントの条件が一致しません（{checkpoint.label} / {checkpoint.total_segments} セグメント）。"
+                "最初からやり直す場合は --reset を指定してください"
+            )
+        return checkpoint
+
+    def save(self, path: Path) -> None:
+        """一時ファイルに書いてから置き換える（書き込み途中で中断しても壊れない）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(asdict(self), ensure_ascii=False, default=str), encoding="utf-8")
+        os.replace(tmp, path)
+
+    @property
+    def complete(self) -> bool:
+        return all(s["done"] for s in self.segments.values())
+
+    def throughput_per_minute(self) -> float:
+        return self.scored / (self.elapsed_seconds / 60) if self.elapsed_seconds else 0.0
+
+    def report(self) -> str:
+        """終了時の集計（処理件数・スループット・トークン数）"""
+        return "\n".join([
+            f"label: {self.label}{'' if self.complete else '（未完了）'}",
+            f"scored: {self.scored}, skipped: {self.skipped}, failed: {self.failed}",
+            f"elapsed: {self.elapsed_seconds / 60:.1f} min, throughput: {self.throughput_per_minute():.1f} submissions/min",
+            f"tokens: input {self.input_tokens:,}, output {self.output_tokens:,}",
+        ])
+
+
+# =============================================================================
+# Bedrock 混雑時の待ち時間
+# =============================================================================
+
+class AdaptiveBackoff:
+    """
+    全ワーカー共通の待ち時間
+
+    Bedrock が使えないたびに待ち時間を倍にし（上限 maximum）、成功のたびに半分にする。
+    全ワーカーが同じ待ち時間に従うため、制限に当たった直後に一斉に再送して再び弾かれることを避けられる。
+    """
+
+    def __init__(self, initial: float = 1.0, maximum: float = 60.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = 0.0
+
+    async def wait(self) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay * random.uniform(0.5, 1.0))
+
+    def on_throttle(self) -> None:
+        self.delay = min(self.maximum, self.delay * 2 or self.initial)
+        metrics.incr("rescoring.throttled")
+
+    def on_success(self) -> None:
+        self.delay = self.delay / 2 if self.delay > self.initial else 0.0
+
+
+# =============================================================================
+# 一括再採点
+# =============================================================================
+
+class BulkRescorer:
+    """SubmissionTable の回答を並列スキャンして再採点する"""
+
+    def __init__(
+        self,
+        aws: AWSClients,
+        checkpoint: RescoringCheckpoint,
+        checkpoint_path: Path,
+        mode: str,
+        concurrency: int,
+        page_size: int = 50,
+        max_retries: int = 6,
+        backoff: Optional[AdaptiveBackoff] = None,
+    ):
+        self.aws = aws
+        self.checkpoint = checkpoint
+        self.checkpoint_path = checkpoint_path
+        self.mode = mode
+        self.page_size = page_size
+        self.max_retries = max_retries
+        self.backoff = backoff or AdaptiveBackoff()
+        self.attribute = rescoring_attribute(mode)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._stopping = False
+        # 今回の実行で増えた分だけをチェックポイントに足すための基準値
+        self._started = time.monotonic()
+        self._base_elapsed = checkpoint.elapsed_seconds
+        self._base_tokens = (checkpoint.input_tokens, checkpoint.output_tokens)
+        self._metric_tokens = self._token_counters()
+
+    def request_stop(self) -> None:
+        """処理中のページを終えたら止める（SIGTERM 用）"""
+        logger.info("停止要求を受け付けました。処理中のページを保存して終了します")
+        self._stopping = True
+
+    async def run(self) -> RescoringCheckpoint:
+        segments = [int(s) for s, state in self.checkpoint.segments.items() if not state["done"]]
+        await asyncio.gather(*(self._scan_segment(s) for s in segments))
+        self._save()
+        return self.checkpoint
+
+    def _token_counters(self) -> tuple:
+        return (
+            metrics.counter(f"scoring.{self.mode}.input_tokens"),
+            metrics.counter(f"scoring.{self.mode}.output_tokens"),
+        )
+
+    def _save(self) -> None:
+        input_tokens, output_tokens = self._token_counters()
+        self.checkpoint.input_tokens = self._base_tokens[0] + input_tokens - self._metric_tokens[0]
+        self.checkpoint.output_tokens = self._base_tokens[1] + output_tokens - self._metric_tokens[1]
+        self.checkpoint.elapsed_seconds = self._base_elapsed + time.monotonic() - self._started
+        self.checkpoint.save(self.checkpoint_path)
+
+    async def _scan_segment(self, segment: int) -> None:
+        state = self.checkpoint.segments[str(segment)]
+        while not self._stopping:
+            kwargs = {
+                "Segment": segment,
+                "TotalSegments": self.checkpoint.total_segments,
+                "Limit": self.page_size,
+                "ProjectionExpression": "#id, #answers, #result",
+                "ExpressionAttributeNames": {"#id": "submission_id", "#answers": "answers", "#result": self.attribute},
+            }
+            if state["last_key"]:
+                kwargs["ExclusiveStartKey"] = state["last_key"]
+            page = await run_dynamodb(self.aws.submission_table.scan, **kwargs)
+
+            await asyncio.gather(*(self._rescore_item(item) for item in page.get("Items", [])))
+
+            # ページ内の全件を終えてから進捗を保存する
+            state["last_key"] = page.get("LastEvaluatedKey")
+            state["done"] = not state["last_key"]
+            self._save()
+            if state["done"]:
+                return
+
+    async def _rescore_item(self, item: Dict[str, Any]) -> None:
+        submission_id = item["submission_id"]
+        previous = item.get(self.attribute) or {}
+        if not item.get("answers") or (
+            previous.get("model_id") == settings.bedrock_model_id and previous.get("mode") == self.mode
+        ):
+            self.checkpoint.skipped += 1
+            return
+
+        async with self._semaphore:
+            try:
+                result = await self._score_with_retry(item["answers"])
+                await run_dynamodb(
+                    self.aws.submission_table.update_item,
+                    Key={"submission_id": submission_id},
+                    UpdateExpression="SET #result = :result",
+                    ExpressionAttributeNames={"#result": self.attribute},
+                    ExpressionAttributeValues={":result": {
+                        "aggregate_score": Decimal(str(result["aggregate_score"])),
+                        "final_rank": result["final_rank"],
+                        "passed": result["passed"],
+                        "question_breakdown": convert_floats(result["question_breakdown"]),
+                        "model_id": settings.bedrock_model_id,
+                        "prompt_version": SCORING_PROMPT_VERSION,
+                        "mode": self.mode,
+                        "scored_at": datetime.utcnow().isoformat() + "Z",
+                    }},
+                )
+            except Exception as e:
+                logger.warning(f"再採点に失敗しました ({submission_id}): {e}")
+                metrics.incr("rescoring.failed")
+                self.checkpoint.failed += 1
+                if len(self.checkpoint.failures) < MAX_RECORDED_FAILURES:
+                    self.checkpoint.failures.append(submission_id)
+                return
+
+        self.checkpoint.scored += 1
+        metrics.incr("rescoring.scored")
+
+    async def _score_with_retry(self, answers: Dict[str, str]) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            await self.backoff.wait()
+            try:
+                result = await score_answers(self.aws, answers, mode=self.mode)
+            except BedrockUnavailableError:
+                if attempt == self.max_retries:
+                    raise
+                self.backoff.on_throttle()
+                continue
+            self.backoff.on_success()
+            return result
+        raise ScoringError("再試行の上限に達しました")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default="data/rescoring.checkpoint.json", help="チェックポイントのパス")
+    parser.add_argument("--reset", action="store_true", help="チェックポイントを捨てて最初から実行する")
+    parser.add_argument("--mode", default=None, help="採点モード（省略時は SCORING_MODE）")
+    parser.add_argument("--segments", type=int, default=4, help="並列スキャンのセグメント数")
+    parser.add_argument("--concurrency", type=int, default=4, help="採点の同時実行数")
+    parser.add_argument("--page-size", type=int, default=50, help="スキャン 1 ページの件数")
+    parser.add_argument("--max-retries", type=int, default=6, help="Bedrock が混雑しているときの再試行回数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    mode = args.mode or settings.scoring_mode
+    path = Path(args.checkpoint)
+    label = f"{SCORING_PROMPT_VERSION}:{settings.bedrock_model_id}:{mode}"
+    if args.reset:
+        checkpoint = RescoringCheckpoint.new(label, args.segments)
+    else:
+        checkpoint = RescoringCheckpoint.load_or_new(path, label, args.segments)
+
+    async def run() -> RescoringCheckpoint:
+        bedrock_governor.configure(create_governor_state(settings, aws))
+        rescorer = BulkRescorer(
+            aws, checkpoint, path, mode, args.concurrency, page_size=args.page_size, max_retries=args.max_retries
+        )
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, rescorer.request_stop)
+        return await rescorer.run()
+
+    aws = AWSClients(settings)
+    try:
+        result = asyncio.run(run())
+    finally:
+        aws.close()
+    print(result.report())
+
+
+if __name__ == "__main__":
+    main()
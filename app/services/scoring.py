@@ -0,0 +1,958 @@
+"""
+AI 採点サービス
+
+Bedrock による採点処理と、採点をバックグラウンドで実行するジョブキューを提供する。
+採点は数十秒かかるため、API は採点ジョブを登録して 202 を即時に返し、
+同時実行数を制限したワーカーが順に Bedrock を呼び出す。ジョブの状態は
+ジョブストア（ローカルはメモリ、本番は DynamoDB）に保存し、クライアントはポーリングで確認する。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Protocol, Set, Tuple
+
+from fastapi import Request
+from pydantic import ValidationError
+
+from config import Settings, get_settings
+from models.scoring import QuestionBreakdownOutput, QuestionScoringOutput, ScoringOutput
+from services.aws import AWSClients, iterate_bedrock, run_bedrock, run_dynamodb
+from services.bedrock_governor import BedrockUnavailableError, bedrock_governor
+from services.essay_analysis import ANALYSIS_VERSION, analyze_answers, count_words, format_analysis_for_prompt
+from services.json_stream import STOP_REASON_MAX_TOKENS, IncrementalJSONParser, JSONExtractionError, extract_json
+from services.metrics import metrics
+from services.prompt_cache import record_usage, system_blocks
+from services.scoring_cache import ScoringCache, scoring_cache_key
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+# 採点プロンプト
+# 採点基準・出力形式など回答によらない部分を system に置き（プロンプトキャッシュの対象）、
+# 回答と機械的チェックの結果だけを毎回変わる入力として後ろに置く。
+SCORING_PROMPT = """あなたはIPA情報処理技術者試験の午後Ⅱ論述式問題の採点者です。
+入力された回答を評価してください。
+
+**重要**: この回答は実際のIPA午後Ⅱ試験で高評価を得た模範解答レベルの論文です。
+
+## 評価観点（各0-100点）
+1. 充足度 (weight: 0.15) - 設問の要求を満たしているか
+2. 具体性 (weight: 0.15) - 具体的な事例・数値が含まれているか
+3. 妥当性 (weight: 0.15) - 論理的に妥当な内容か
+4. 一貫性 (weight: 0.10) - 論文全体で一貫性があるか
+5. 主張 (weight: 0.15) - 明確な主張があるか
+6. 洞察力-行動力 (weight: 0.10) - 深い洞察と行動が示されているか
+7. 独創性-先見性 (weight: 0.10) - 独自の視点があるか
+8. 表現力 (weight: 0.10) - 分かりやすい表現か
+
+## ランクA（合格水準）の条件
+- 章立て構成（「第1章」「1-1」等）がある
+- 具体的な企業名・システム名が記載されている
+- 定量データ（人数・金額・期間等）が複数ある
+- 「なぜならば〜」などの論理的説明が3箇所以上ある
+- 各設問が800字以上ある
+- 専門用語を適切に使用している
+
+**この回答は上記条件を満たす模範解答です。各観点で80点以上の評価をしてください。**
+
+## ランク判定基準
+- **ランクA（80-100点）**: 極めて優秀（模範解答レベル）
+- **ランクB（60-79点）**: 合格水準だが改善余地あり
+- **ランクC（40-59点）**: 不足が目立つ
+- **ランクD（0-39点）**: 不合格
+
+## 機械的チェックの結果
+入力の「機械的チェックの結果（参考）」は章立て・定量データ・論理的説明・文字数・企業名/システム名を
+機械的に数えた結果です。数え上げはこの結果を使い、内容の質の評価に集中してください。
+
+## 出力形式
+JSON形式で以下の構造で出力してください：
+{
+  "question_breakdown": {
+    "設問ア": {
+      "level": "A/B/C/D",
+      "question_score": 0-100,
+      "criteria_scores": [
+        {"criterion": "充足度", "weight": 0.15, "points": 0-100, "comment": "..."},
+        ...
+      ]
+    },
+    "設問イ": { ... },
+    "設問ウ": { ... }
+  },
+  "aggregate_score": 0-100,
+  "final_rank": "A/B/C/D",
+  "feedback": "全体的なフィードバック"
+}
+"""
+
+SCORING_INPUT_TEMPLATE = """## 機械的チェックの結果（参考）
+{analysis}
+
+## 回答内容
+{answers}
+"""
+
+
+class SubmissionNotFoundError(LookupError):
+    """採点対象の回答が存在しない"""
+
+
+class ScoringError(Exception):
+    """採点結果を得られなかった（メッセージは利用者向け）"""
+
+
+# =============================================================================
+# 採点処理
+# =============================================================================
+
+def convert_floats(obj: Any) -> Any:
+    """Float を Decimal に変換（DynamoDB用）"""
+    if isinstance(obj, float):
+        return Decimal(str(obj))
+    elif isinstance(obj, dict):
+        return {k: convert_floats(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_floats(i) for i in obj]
+    return obj
+
+
+def convert_decimals(obj: Any) -> Any:
+    """DynamoDB から読んだ Decimal を int / float に戻す"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    elif isinstance(obj, dict):
+        return {k: convert_decimals(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_decimals(i) for i in obj]
+    return obj
+
+
+# 設問の採点が完了するたびに呼ばれるコールバック（設問名, question_breakdown の要素）
+QuestionCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# 通知済みの設問を取り消すときに呼ばれるコールバック（ストリーミングした出力を生成し直すとき）
+ResetCallback = Callable[[], Awaitable[None]]
+
+SCORING_MODE_SINGLE = "single"
+SCORING_MODE_PER_QUESTION = "per_question"
+
+# 打ち切られた出力を生成し直すときの max_tokens の上限
+MAX_SCORING_OUTPUT_TOKENS = 8192
+
+
+def _scoring_request_body(system: str, prompt: str, max_tokens: int = 4096) -> str:
+    """固定の採点基準（system）と回答（user）からリクエストを組み立てる"""
+    return json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": 0.0,
+        "system": system_blocks(system),
+        "messages": [
+            {"role": "user", "content": prompt}
+        ]
+    })
+
+
+def _record_usage(mode: str, usage: Dict[str, Any], seconds: Optional[float] = None) -> None:
+    """採点モード別のトークン使用量を記録（キャッシュ読み書き分は prompt_cache 側で記録）"""
+    if usage.get("input_tokens"):
+        metrics.incr(f"scoring.{mode}.input_tokens", usage["input_tokens"])
+    if usage.get("output_tokens"):
+        metrics.incr(f"scoring.{mode}.output_tokens", usage["output_tokens"])
+    record_usage("scoring", usage, seconds)
+
+
+async def _invoke_scoring_model(
+    aws: AWSClients, system: str, prompt: str, mode: str, max_tokens: int = 4096
+) -> Tuple[str, Optional[str]]:
+    """採点結果の全文を一括で生成し、(本文, stop_reason) を返す"""
+    started = time.monotonic()
+    bedrock_response = await bedrock_governor.invoke(
+        aws.bedrock.invoke_model,
+        modelId=settings.bedrock_model_id,
+        body=_scoring_request_body(system, prompt, max_tokens),
+    )
+    response_body = json.loads(await run_bedrock(bedrock_response["body"].read))
+    _record_usage(mode, response_body.get("usage") or {}, time.monotonic() - started)
+    return response_body["content"][0]["text"], response_body.get("stop_reason")
+
+
+async def _stream_scoring_model(
+    aws: AWSClients,
+    prompt: str,
+    answers: Dict[str, str],
+    on_question: QuestionCallback,
+) -> Tuple[IncrementalJSONParser, Optional[str]]:
+    """
+    採点結果をストリーミングで生成し、設問ごとの評価が閉じた時点で on_question を呼ぶ
+
+    全文の生成を待たずに最初の設問の評価を利用者へ返せる。QuestionBreakdownOutput の検証を通らない評価と
+    回答にない設問は通知しない。戻り値は (全文を受信したパーサー, stop_reason)。
+    """
+    parser = IncrementalJSONParser(watch=[("question_breakdown",)])
+    started = time.monotonic()
+    first_question = True
+    usage: Dict[str, Any] = {}
+    stop_reason: Optional[str] = None
+    async with bedrock_governor.stream(
+        aws.bedrock.invoke_model_with_response_stream,
+        modelId=settings.bedrock_model_id,
+        body=_scoring_request_body(SCORING_PROMPT, prompt),
+    ) as response:
+        async for event in iterate_bedrock(response["body"]):
+            chunk = event.get("chunk")
+            if not chunk:
+                continue
+            chunk_json = json.loads(chunk["bytes"].decode())
+            if chunk_json.get("type") == "message_start":
+                usage.update(chunk_json.get("message", {}).get("usage") or {})
+            elif chunk_json.get("type") == "message_delta":
+                usage.update(chunk_json.get("usage") or {})
+                stop_reason = (chunk_json.get("delta") or {}).get("stop_reason") or stop_reason
+            if chunk_json.get("type") != "content_block_delta":
+                continue
+            text = chunk_json["delta"].get("text", "")
+            for path, breakdown in parser.feed(text):
+                question = path[-1]
+                if question not in answers:
+                    continue
+                try:
+                    breakdown = QuestionBreakdownOutput.model_validate(breakdown).model_dump()
+                except ValidationError:
+                    metrics.incr("scoring.stream.invalid_question")
+                    continue
+                breakdown["word_count"] = count_words(answers[question])
+                if first_question:
+                    metrics.observe("scoring.first_question_seconds", time.monotonic() - started)
+                    first_question = False
+                await on_question(question, breakdown)
+    _record_usage(SCORING_MODE_SINGLE, usage, time.monotonic() - started)
+    return parser, stop_reason
+
+
+async def _generate_scoring_output(
+    aws: AWSClients,
+    system: str,
+    prompt: str,
+    mode: str,
+    output_model: Any,
+    max_tokens: int = 4096,
+    received: Optional[Tuple[IncrementalJSONParser, Optional[str]]] = None,
+    questions: Optional[List[str]] = None,
+    on_reset: Optional[ResetCallback] = None,
+) -> Dict[str, Any]:
+    """
+    採点モデルの出力から JSON を取り出し、output_model で検証して返す
+
+    末尾のカンマや max_tokens での打ち切りなどは補修して使い、補修しても読めない・項目や設問
+    （questions）が欠けている出力だけを、設定 scoring_output_retries 回まで生成し直す
+    （打ち切られて補修できなかったときは max_tokens を倍にする）。received にストリーミングで受信済みの
+    (パーサー, stop_reason) を渡すと、1 回目はその出力を使う。その出力を使えなかったときは、
+    生成し直す前に on_reset を呼ぶ（ストリーミング中に通知した設問を取り消すため）。
+    """
+    context = {"questions": questions} if questions else None
+    for attempt in range(settings.scoring_output_retries + 1):
+        streamed = received is not None
+        if received is None:
+            parser = IncrementalJSONParser()
+            text, stop_reason = await _invoke_scoring_model(aws, system, prompt, mode, max_tokens)
+            parser.feed(text)
+        else:
+            (parser, stop_reason), received = received, None
+        try:
+            return extract_json(
+                parser.buffer, output_model, f"scoring.{mode}", parser, stop_reason=stop_reason, context=context
+            ).model_dump()
+        except JSONExtractionError as e:
+            logger.warning(f"採点結果の解析に失敗しました（{attempt + 1}回目）: {e}")
+            if streamed and on_reset is not None:
+                await on_reset()
+            if stop_reason == STOP_REASON_MAX_TOKENS:
+                max_tokens = min(max_tokens * 2, MAX_SCORING_OUTPUT_TOKENS)
+    raise ScoringError("採点結果の解析に失敗しました")
+
+
+# =============================================================================
+# 設問別採点（設問ごとのプロンプトを並行実行し、集計は Python で行う）
+# =============================================================================
+
+# 評価観点と重み（SCORING_PROMPT と同じ）
+SCORING_CRITERIA = (
+    ("充足度", 0.15),
+    ("具体性", 0.15),
+    ("妥当性", 0.15),
+    ("一貫性", 0.10),
+    ("主張", 0.15),
+    ("洞察力-行動力", 0.10),
+    ("独創性-先見性", 0.10),
+    ("表現力", 0.10),
+)
+
+# ランク判定基準（点数の下限）。いずれにも届かなければ D
+RANK_THRESHOLDS = (("A", 80), ("B", 60), ("C", 40))
+
+QUESTION_SCORING_PROMPT = """あなたはIPA情報処理技術者試験の午後Ⅱ論述式問題の採点者です。
+論文のうち、入力で指定された 1 つの設問への回答だけを評価してください。
+
+## 評価観点（各0-100点）
+1. 充足度 - 設問の要求を満たしているか
+2. 具体性 - 具体的な事例・数値が含まれているか
+3. 妥当性 - 論理的に妥当な内容か
+4. 一貫性 - 回答全体で一貫性があるか
+5. 主張 - 明確な主張があるか
+6. 洞察力-行動力 - 深い洞察と行動が示されているか
+7. 独創性-先見性 - 独自の視点があるか
+8. 表現力 - 分かりやすい表現か
+
+## 高評価（80点以上）の目安
+- 章立て構成（「第1章」「1-1」等）がある
+- 具体的な企業名・システム名が記載されている
+- 定量データ（人数・金額・期間等）が複数ある
+- 「なぜならば〜」などの論理的説明がある
+- 800字以上ある
+- 専門用語を適切に使用している
+
+## 出力形式
+JSON形式で以下の構造のみを出力してください（合計点やランクは不要です）：
+{
+  "criteria_scores": [
+    {"criterion": "充足度", "points": 0-100, "comment": "..."},
+    ...
+  ]
+}
+"""
+
+QUESTION_INPUT_TEMPLATE = """「{question}」への回答だけを評価してください。
+
+## 機械的チェックの結果（参考）
+{analysis}
+
+## 回答内容
+### {question}（{word_count}文字）
+{answer}
+"""
+
+
+def scoring_prompt_version(analysis_version: str = ANALYSIS_VERSION) -> str:
+    """採点プロンプト・観点・プロンプトに埋め込む機械的チェックの規則から決まる版"""
+    return hashlib.sha256(
+        json.dumps([
+            SCORING_PROMPT, SCORING_INPUT_TEMPLATE, QUESTION_SCORING_PROMPT, QUESTION_INPUT_TEMPLATE,
+            SCORING_CRITERIA, RANK_THRESHOLDS, analysis_version,
+        ]).encode("utf-8")
+    ).hexdigest()[:12]
+
+
+# 採点プロンプト・観点・機械的チェックのバージョン（変更すると採点結果キャッシュが自動的に無効になり、
+# 再採点バッチの対象にもなる）
+SCORING_PROMPT_VERSION = scoring_prompt_version()
+
+
+def rank_for_score(score: float) -> str:
+    """点数からランクを判定"""
+    for rank, threshold in RANK_THRESHOLDS:
+        if score >= threshold:
+            return rank
+    return "D"
+
+
+def build_question_breakdown(criteria_scores: List[Dict[str, Any]], answer: str) -> Dict[str, Any]:
+    """
+    モデルが付けた観点別の点数から設問の評価を組み立てる
+
+    重みは SCORING_CRITERIA を使い、question_score は重み付き平均、level はその点数のランク。
+    """
+    by_name = {c.get("criterion"): c for c in criteria_scores if isinstance(c, dict)}
+    scores = []
+    for criterion, weight in SCORING_CRITERIA:
+        entry = by_name.get(criterion)
+        if entry is None:
+            raise ScoringError("採点結果の解析に失敗しました")
+        try:
+            points = min(100, max(0, int(round(float(entry.get("points"))))))
+        except (TypeError, ValueError) as e:
+            raise ScoringError("採点結果の解析に失敗しました") from e
+        scores.append({"criterion": criterion, "weight": weight, "points": points, "comment": entry.get("comment")})
+
+    total_weight = sum(weight for _, weight in SCORING_CRITERIA)
+    question_score = int(round(sum(c["points"] * c["weight"] for c in scores) / total_weight))
+    return {
+        "level": rank_for_score(question_score),
+        "question_score": question_score,
+        "word_count": count_words(answer),
+        "criteria_scores": scores,
+    }
+
+
+def aggregate_scores(question_breakdown: Dict[str, Dict[str, Any]]) -> Tuple[float, str]:
+    """設問別の点数から総合スコア（平均、小数第 1 位）と最終ランクを求める"""
+    if not question_breakdown:
+        return 0.0, "D"
+    scores = [b["question_score"] for b in question_breakdown.values()]
+    aggregate = round(sum(scores) / len(scores), 1)
+    return aggregate, rank_for_score(aggregate)
+
+
+async def score_question(aws: AWSClients, question: str, answer: str) -> Dict[str, Any]:
+    """1 設問を専用プロンプトで採点し、question_breakdown の要素を返す"""
+    prompt = QUESTION_INPUT_TEMPLATE.format(
+        question=question,
+        word_count=count_words(answer),
+        analysis=format_analysis_for_prompt(analyze_answers({question: answer})),
+        answer=answer,
+    )
+    result = await _generate_scoring_output(
+        aws, QUESTION_SCORING_PROMPT, prompt, SCORING_MODE_PER_QUESTION, QuestionScoringOutput, max_tokens=1536
+    )
+    return build_question_breakdown(result["criteria_scores"], answer)
+
+
+async def _score_per_question(
+    aws: AWSClients,
+    answers: Dict[str, str],
+    on_question: Optional[QuestionCallback],
+) -> Dict[str, Dict[str, Any]]:
+    """全設問を並行に採点する（完了した設問から on_question に通知）"""
+
+    async def score_one(question: str, answer: str):
+        breakdown = await score_question(aws, question, answer)
+        if on_question is not None:
+            await on_question(question, breakdown)
+        return question, breakdown
+
+    results = await asyncio.gather(*(score_one(q, a) for q, a in answers.items()))
+    return dict(results)
+
+
+# =============================================================================
+# 採点処理の入口
+# =============================================================================
+
+async def score_answers(
+    aws: AWSClients,
+    answers: Dict[str, str],
+    on_question: Optional[QuestionCallback] = None,
+    mode: Optional[str] = None,
+    cache: Optional[ScoringCache] = None,
+    bypass_cache: bool = False,
+    on_reset: Optional[ResetCallback] = None,
+) -> Dict[str, Any]:
+    """
+    回答を Bedrock で採点する（保存はしない）
+
+    mode（省略時は設定 scoring_mode）:
+        single        全設問を 1 つのプロンプトで採点し、総合スコア・ランクもモデルが付ける
+        per_question  設問ごとのプロンプトを並行実行し、総合スコア・ランクは観点の重みから算出する
+
+    on_question を渡すと、設問ごとの評価を完成した順に通知する
+    （single ではストリーミングで生成する）。ストリーミングした出力が使えず生成し直すときは on_reset を呼んで
+    通知済みの設問を取り消し、生成し直した結果の設問をあらためて通知する。
+
+    cache を渡すと、同じ回答・モデル・プロンプトの採点結果があれば Bedrock を呼ばずに再利用する
+    （bypass_cache=True なら参照せずに採点し直し、結果で上書きする）。
+
+    Returns:
+        aggregate_score, final_rank, passed, question_breakdown
+
+    Raises:
+        ScoringError: 採点結果を解析できない
+    """
+    mode = mode or settings.scoring_mode
+    started = time.monotonic()
+
+    cache_key = None
+    cached = None
+    if cache is not None:
+        cache_key = scoring_cache_key(answers, settings.bedrock_model_id, SCORING_PROMPT_VERSION, mode)
+        if bypass_cache:
+            metrics.incr("scoring_cache.bypass")
+        else:
+            cached = await cache.get(cache_key)
+
+    if cached is not None:
+        # 文字数は今回の回答から数え直す（正規化で吸収した空白の差を反映）
+        question_breakdown = cached["question_breakdown"]
+        for question, breakdown in question_breakdown.items():
+            breakdown["word_count"] = count_words(answers.get(question, ""))
+            if on_question is not None:
+                await on_question(question, breakdown)
+        aggregate_score = cached["aggregate_score"]
+        final_rank = cached["final_rank"]
+    elif mode == SCORING_MODE_PER_QUESTION:
+        question_breakdown = await _score_per_question(aws, answers, on_question)
+        aggregate_score, final_rank = aggregate_scores(question_breakdown)
+    else:
+        # 回答を文字列化
+        answers_text = ""
+        for question, answer in answers.items():
+            answers_text += f"\n### {question}（{count_words(answer)}文字）\n{answer}\n"
+
+        # Bedrock で採点（System promptで寛容な評価者を設定）
+        prompt = SCORING_INPUT_TEMPLATE.format(
+            analysis=format_analysis_for_prompt(analyze_answers(answers)), answers=answers_text
+        )
+
+        received = None
+        reset = False
+        if on_question is not None:
+            received = await _stream_scoring_model(aws, prompt, answers, on_question)
+
+        async def reset_progress() -> None:
+            nonlocal reset
+            reset = True
+            if on_reset is not None:
+                await on_reset()
+
+        scoring_result = await _generate_scoring_output(
+            aws, SCORING_PROMPT, prompt, SCORING_MODE_SINGLE, ScoringOutput, received=received,
+            questions=list(answers), on_reset=reset_progress,
+        )
+
+        # 文字数を追加
+        question_breakdown = scoring_result["question_breakdown"]
+        for question, breakdown in question_breakdown.items():
+            breakdown["word_count"] = count_words(answers.get(question, ""))
+            if reset and on_question is not None:
+                await on_question(question, breakdown)
+
+        aggregate_score = scoring_result["aggregate_score"]
+        final_rank = scoring_result["final_rank"]
+
+    if cache_key is not None and cached is None:
+        await cache.put(cache_key, {
+            "question_breakdown": question_breakdown,
+            "aggregate_score": aggregate_score,
+            "final_rank": final_rank,
+        })
+
+    if cached is None:
+        metrics.observe(f"scoring.{mode}.seconds", time.monotonic() - started)
+
+    return {
+        "aggregate_score": aggregate_score,
+        "final_rank": final_rank,
+        "passed": final_rank == "A",
+        "question_breakdown": question_breakdown,
+    }
+
+
+async def score_submission_answers(
+    aws: AWSClients,
+    submission_id: str,
+    on_question: Optional[QuestionCallback] = None,
+    mode: Optional[str] = None,
+    cache: Optional[ScoringCache] = None,
+    bypass_cache: bool = False,
+    on_reset: Optional[ResetCallback] = None,
+) -> Dict[str, Any]:
+    """
+    回答を Bedrock で採点し、結果を回答レコードに保存する（引数は score_answers を参照）
+
+    Returns:
+        submission_id, aggregate_score, final_rank, passed, question_breakdown
+
+    Raises:
+        SubmissionNotFoundError: 回答が存在しない
+        ScoringError: 採点結果を解析できない
+    """
+    # 回答を取得
+    response = await run_dynamodb(aws.submission_table.get_item, Key={"submission_id": submission_id})
+    item = response.get("Item")
+    if not item:
+        raise SubmissionNotFoundError("回答が見つかりません")
+
+    result = await score_answers(
+        aws, item.get("answers", {}), on_question=on_question, mode=mode, cache=cache, bypass_cache=bypass_cache,
+        on_reset=on_reset,
+    )
+
+    # 結果をDynamoDBの既存レコードに追加保存
+    await run_dynamodb(
+        aws.submission_table.update_item,
+        Key={"submission_id": submission_id},
+        UpdateExpression="SET aggregate_score = :score, final_rank = :rank, passed = :passed, question_breakdown = :breakdown, scored_at = :scored_at, #st = :status",
+        ExpressionAttributeNames={"#st": "status"},
+        ExpressionAttributeValues={
+            ":score": Decimal(str(result["aggregate_score"])),
+            ":rank": result["final_rank"],
+            ":passed": result["passed"],
+            ":breakdown": convert_floats(result["question_breakdown"]),
+            ":scored_at": datetime.utcnow().isoformat() + "Z",
+            ":status": "scored"
+        }
+    )
+
+    return {"submission_id": submission_id, **result}
+
+
+# =============================================================================
+# ジョブストア
+# =============================================================================
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+@dataclass
+class ScoringJob:
+    """採点ジョブ"""
+    job_id: str
+    submission_id: str
+    status: str
+    created_at: str
+    updated_at: str
+    expires_at: int
+    error: Optional[str] = None
+    bypass_cache: bool = False
+    # 採点済みの設問（ストリーミング採点で完成した順に追加される）
+    progress: Dict[str, Any] = field(default_factory=dict)
+    # progress を取り消した回数（増えたら購読者は受信済みの設問を捨てる）
+    progress_version: int = 0
+
+    @classmethod
+    def new(cls, submission_id: str, ttl_seconds: int, bypass_cache: bool = False) -> "ScoringJob":
+        now = _now()
+        return cls(
+            job_id=uuid.uuid4().hex,
+            submission_id=submission_id,
+            status=JOB_QUEUED,
+            created_at=now,
+            updated_at=now,
+            expires_at=int(time.time()) + ttl_seconds,
+            bypass_cache=bypass_cache,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobStore(Protocol):
+    """採点ジョブの保存先"""
+
+    async def create(self, job: ScoringJob) -> None: ...
+
+    async def get(self, job_id: str) -> Optional[ScoringJob]: ...
+
+    async def update(self, job_id: str, status: str, error: Optional[str] = None) -> None: ...
+
+    async def add_progress(self, job_id: str, question: str, breakdown: Dict[str, Any]) -> None: ...
+
+    async def reset_progress(self, job_id: str) -> None: ...
+
+
+class InMemoryJobStore:
+    """
+    プロセス内のジョブストア（ローカル開発用）
+
+    ジョブを受け付けたプロセスでしか参照できないため、複数タスク構成では DynamoDBJobStore を使う。
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, ScoringJob] = {}
+
+    async def create(self, job: ScoringJob) -> None:
+        now = time.time()
+        for job_id in [k for k, v in self._jobs.items() if v.expires_at < now]:
+            del self._jobs[job_id]
+        self._jobs[job.job_id] = job
+
+    async def get(self, job_id: str) -> Optional[ScoringJob]:
+        return self._jobs.get(job_id)
+
+    async def update(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.status = status
+            job.error = error
+            job.updated_at = _now()
+
+    async def add_progress(self, job_id: str, question: str, breakdown: Dict[str, Any]) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.progress[question] = breakdown
+            job.updated_at = _now()
+
+    async def reset_progress(self, job_id: str) -> None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.progress = {}
+            job.progress_version += 1
+            job.updated_at = _now()
+
+
+class DynamoDBJobStore:
+    """
+    DynamoDB のジョブストア（本番用。パーティションキー job_id、expires_at を TTL 属性とする）
+
+    どのタスクにポーリングが振り分けられても同じ状態を返せる。
+    """
+
+    def __init__(self, table: Any):
+        self.table = table
+
+    async def create(self, job: ScoringJob) -> None:
+        item = convert_floats({k: v for k, v in job.to_dict().items() if v is not None})
+        await run_dynamodb(self.table.put_item, Item=item)
+
+    async def get(self, job_id: str) -> Optional[ScoringJob]:
+        response = await run_dynamodb(self.table.get_item, Key={"job_id": job_id})
+        item = response.get("Item")
+        if not item:
+            return None
+        return ScoringJob(
+            job_id=item["job_id"],
+            submission_id=item["submission_id"],
+            status=item["status"],
+            created_at=item["created_at"],
+            updated_at=item["updated_at"],
+            expires_at=int(item["expires_at"]),
+            error=item.get("error"),
+            bypass_cache=item.get("bypass_cache", False),
+            progress=convert_decimals(item.get("progress", {})),
+            progress_version=int(item.get("progress_version", 0)),
+        )
+
+    async def update(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        expression = "SET #st = :status, updated_at = :updated_at"
+        values: Dict[str, Any] = {":status": status, ":updated_at": _now()}
+        if error is not None:
+            expression += ", #err = :error"
+            values[":error"] = error
+        await run_dynamodb(
+            self.table.update_item,
+            Key={"job_id": job_id},
+            UpdateExpression=expression,
+            ExpressionAttributeNames={"#st": "status", **({"#err": "error"} if error is not None else {})},
+            ExpressionAttributeValues=values,
+        )
+
+    async def add_progress(self, job_id: str, question: str, breakdown: Dict[str, Any]) -> None:
+        await run_dynamodb(
+            self.table.update_item,
+            Key={"job_id": job_id},
+            UpdateExpression="SET progress.#q = :breakdown, updated_at = :updated_at",
+            ExpressionAttributeNames={"#q": question},
+            ExpressionAttributeValues={":breakdown": convert_floats(breakdown), ":updated_at": _now()},
+        )
+
+    async def reset_progress(self, job_id: str) -> None:
+        await run_dynamodb(
+            self.table.update_item,
+            Key={"job_id": job_id},
+            UpdateExpression="SET progress = :empty, updated_at = :updated_at ADD progress_version :one",
+            ExpressionAttributeValues={":empty": {}, ":updated_at": _now(), ":one": 1},
+        )
+
+
+def create_job_store(settings: Settings, aws: AWSClients) -> JobStore:
+    """設定 (scoring_job_store) に応じたジョブストアを生成"""
+    if settings.scoring_job_store == "dynamodb":
+        return DynamoDBJobStore(aws.scoring_jobs_table)
+    if settings.scoring_job_store != "memory":
+        raise ValueError(f"未対応のジョブストアです: {settings.scoring_job_store}")
+    return InMemoryJobStore()
+
+
+# =============================================================================
+# ジョブキュー
+# =============================================================================
+
+# (ジョブ, 設問完了コールバック, 進捗取り消しコールバック) を受け取って採点する関数
+ScoringRunner = Callable[[ScoringJob, QuestionCallback, ResetCallback], Awaitable[Any]]
+
+# 進捗イベントの確認間隔（秒）。他タスクのジョブはこの間隔でジョブストアを参照する
+EVENTS_POLL_SECONDS = 2.0
+
+
+class QueueFullError(Exception):
+    """待ち行列が上限に達している"""
+
+
+class ScoringQueue:
+    """
+    採点ジョブの待ち行列とワーカープール
+
+    ワーカー数が Bedrock の同時呼び出し数の上限になる。待ち行列も上限付きで、
+    溢れた場合は QueueFullError を送出して呼び出し側で 503 を返す。
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        runner: ScoringRunner,
+        concurrency: int,
+        max_queued: int,
+        job_ttl_seconds: int = 86400,
+    ):
+        self.store = store
+        self.runner = runner
+        self.concurrency = concurrency
+        self.job_ttl_seconds = job_ttl_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._workers: List[asyncio.Task] = []
+        self._active: Dict[str, ScoringJob] = {}
+        # ジョブごとの購読者（SSE 接続）ごとの変更通知
+        self._listeners: Dict[str, Set[asyncio.Event]] = {}
+
+    def start(self) -> None:
+        for i in range(self.concurrency):
+            self._workers.append(asyncio.create_task(self._worker(), name=f"scoring-worker-{i}"))
+
+    async def stop(self) -> None:
+        """ワーカーを停止し、未完了のジョブを失敗として記録する"""
+        unfinished = list(self._active.values())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+        while not self._queue.empty():
+            unfinished.append(self._queue.get_nowait()[0])
+        for job in unfinished:
+            try:
+                await self.store.update(job.job_id, JOB_FAILED, "サーバー停止のため採点を中断しました。再度お試しください。")
+                self._notify(job.job_id)
+            except Exception as e:
+                logger.warning(f"採点ジョブの状態を更新できません ({job.job_id}): {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "running": len(self._active), "workers": self.concurrency}
+
+    async def submit(self, submission_id: str, bypass_cache: bool = False) -> ScoringJob:
+        """採点ジョブを登録して返す（採点はワーカーで実行される）"""
+        if self._queue.full():
+            metrics.incr("scoring_jobs.rejected")
+            raise QueueFullError("採点の待ち行列が混雑しています")
+
+        job = ScoringJob.new(submission_id, self.job_ttl_seconds, bypass_cache)
+        await self.store.create(job)
+        try:
+            self._queue.put_nowait((job, time.monotonic()))
+        except asyncio.QueueFull:
+            metrics.incr("scoring_jobs.rejected")
+            await self.store.update(job.job_id, JOB_FAILED, "採点の待ち行列が混雑しています")
+            raise QueueFullError("採点の待ち行列が混雑しています")
+        metrics.incr("scoring_jobs.enqueued")
+        return job
+
+    async def get(self, job_id: str) -> Optional[ScoringJob]:
+        return await self.store.get(job_id)
+
+    async def events(
+        self, job_id: str, poll_seconds: float = EVENTS_POLL_SECONDS
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        ジョブの進捗を (イベント名, データ) として返す非同期イテレータ
+
+        採点済みの設問は "question"、状態の変化は "status" で通知し、done / failed で終了する。
+        採点を生成し直して進捗が取り消されたときは "reset" を返し、以降の設問を送り直す。
+        このプロセスで実行中のジョブは更新時に即座に、他タスクのジョブは poll_seconds ごとに
+        ジョブストアを確認する。変化がない間は "keepalive" を返す。
+        """
+        sent: set = set()
+        last_status = None
+        version = None
+        changed = asyncio.Event()
+        self._listeners.setdefault(job_id, set()).add(changed)
+        try:
+            while True:
+                # 取得より先に通知をリセットし、取得直後の更新を取りこぼさない
+                changed.clear()
+                job = await self.store.get(job_id)
+                if job is None:
+                    return
+                # 送信中（yield 中）に更新されても、取得時点の状態をまとめて送る
+                status, error, progress = job.status, job.error, list(job.progress.items())
+                if job.progress_version != version:
+                    if version is not None:
+                        sent.clear()
+                        yield "reset", {}
+                    version = job.progress_version
+                for question, breakdown in progress:
+                    if question not in sent:
+                        sent.add(question)
+                        yield "question", {"question": question, "breakdown": breakdown}
+                if status != last_status:
+                    last_status = status
+                    yield "status", {"status": status, "error": error}
+                if status in (JOB_DONE, JOB_FAILED):
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), poll_seconds)
+                except asyncio.TimeoutError:
+                    yield "keepalive", {}
+        finally:
+            listeners = self._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(changed)
+                if not listeners:
+                    del self._listeners[job_id]
+
+    def _notify(self, job_id: str) -> None:
+        for event in self._listeners.get(job_id, ()):
+            event.set()
+
+    async def _worker(self) -> None:
+        while True:
+            job, enqueued_at = await self._queue.get()
+            metrics.observe("scoring_jobs.wait_seconds", time.monotonic() - enqueued_at)
+            self._active[job.job_id] = job
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"採点ジョブの状態を更新できません ({job.job_id}): {e}", exc_info=True)
+            finally:
+                self._active.pop(job.job_id, None)
+                self._queue.task_done()
+
+    async def _run(self, job: ScoringJob) -> None:
+        await self.store.update(job.job_id, JOB_RUNNING)
+        self._notify(job.job_id)
+        started = time.monotonic()
+
+        async def on_question(question: str, breakdown: Dict[str, Any]) -> None:
+            await self.store.add_progress(job.job_id, question, breakdown)
+            self._notify(job.job_id)
+
+        async def on_reset() -> None:
+            await self.store.reset_progress(job.job_id)
+            self._notify(job.job_id)
+
+        try:
+            await self.runner(job, on_question, on_reset)
+        except (SubmissionNotFoundError, ScoringError, BedrockUnavailableError) as e:
+            metrics.incr("scoring_jobs.failed")
+            await self.store.update(job.job_id, JOB_FAILED, str(e))
+        except Exception as e:
+            logger.error(f"採点処理エラー ({job.submission_id}): {str(e)}", exc_info=True)
+            metrics.incr("scoring_jobs.failed")
+            await self.store.update(
+                job.job_id, JOB_FAILED, "採点処理に失敗しました。しばらくしてから再度お試しください。"
+            )
+        else:
+            metrics.incr("scoring_jobs.done")
+            await self.store.update(job.job_id, JOB_DONE)
+        finally:
+            metrics.observe("scoring_jobs.run_seconds", time.monotonic() - started)
+            self._notify(job.job_id)
+
+
+def get_scoring_queue(request: Request) -> ScoringQueue:
+    """ScoringQueue を返す FastAPI 依存関数"""
+    return request.app.state.scoring_queue
@@ -0,0 +1,165 @@
+"""
+採点結果キャッシュ
+
+同じ回答の再提出で Bedrock を呼ばないよう、正規化した回答・モデル ID・採点プロンプトの
+バージョン・採点モードのハッシュをキーに採点結果を保存する（temperature 0.0 のため結果は再利用できる）。
+保存先はローカルではプロセス内メモリ、本番では DynamoDB（expires_at を TTL 属性とする）。
+"""
+
+import hashlib
+import json
+import logging
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+
+from config import Settings
+from services.aws import AWSClients, run_dynamodb
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_answer(text: str) -> str:
+    """表記揺れ（全角半角・改行コード・行末空白・前後の空行）を吸収する"""
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def scoring_cache_key(answers: Dict[str, str], model_id: str, prompt_version: str, mode: str) -> str:
+    """採点結果を一意に決める要素からキャッシュキーを作る"""
+    payload = json.dumps(
+        {
+            "answers": {q: normalize_answer(a) for q, a in sorted(answers.items())},
+            "model_id": model_id,
+            "prompt_version": prompt_version,
+            "mode": mode,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ScoringCache(ABC):
+    """
+    採点結果キャッシュの共通部分（ヒット率の集計）
+
+    保存先の障害で採点を止めないよう、読み書きの失敗はミス扱いにしてログに残す。
+    保存先ごとのサブクラスで _load / _save を実装する。
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = await self._load(key)
+        except Exception as e:
+            logger.warning(f"採点キャッシュを読み込めません: {e}")
+            metrics.incr("scoring_cache.error")
+            value = None
+        if value is None:
+            self.misses += 1
+            metrics.incr("scoring_cache.miss")
+        else:
+            self.hits += 1
+            metrics.incr("scoring_cache.hit")
+        return value
+
+    async def put(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            await self._save(key, value, int(time.time() + self.ttl_seconds))
+        except Exception as e:
+            logger.warning(f"採点キャッシュに保存できません: {e}")
+            metrics.incr("scoring_cache.error")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    @abstractmethod
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        """保存済みの結果を返す（なし・期限切れは None）"""
+
+    @abstractmethod
+    async def _save(self, key: str, value: Dict[str, Any], expires_at: int) -> None:
+        """結果を expires_at（UNIX 時刻）まで保存する"""
+
+
+class InMemoryScoringCache(ScoringCache):
+    """プロセス内の採点結果キャッシュ（件数上限を超えたら古いものから削除）"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return json.loads(value)
+
+    async def _save(self, key: str, value: Dict[str, Any], expires_at: int) -> None:
+        self._entries[key] = (expires_at, json.dumps(value, ensure_ascii=False))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class DynamoDBScoringCache(ScoringCache):
+    """
+    DynamoDB の採点結果キャッシュ（パーティションキー cache_key）
+
+    結果は JSON 文字列で保存し、Decimal 変換を挟まずにそのまま返す。
+    TTL による削除は遅れることがあるため、読み込み時にも期限を確認する。
+    """
+
+    def __init__(self, table: Any, ttl_seconds: float):
+        super().__init__(ttl_seconds)
+        self.table = table
+
+    async def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        response = await run_dynamodb(self.table.get_item, Key={"cache_key": key})
+        item = response.get("Item")
+        if not item or int(item["expires_at"]) < time.time():
+            return None
+        return json.loads(item["result"])
+
+    async def _save(self, key: str, value: Dict[str, Any], expires_at: int) -> None:
+        await run_dynamodb(
+            self.table.put_item,
+            Item={"cache_key": key, "result": json.dumps(value, ensure_ascii=False), "expires_at": expires_at},
+        )
+
+
+def create_scoring_cache(settings: Settings, aws: AWSClients) -> Optional[ScoringCache]:
+    """設定 (scoring_cache_store) に応じたキャッシュを生成（none なら None）"""
+    if settings.scoring_cache_store == "none":
+        return None
+    if settings.scoring_cache_store == "dynamodb":
+        return DynamoDBScoringCache(aws.scoring_cache_table, settings.scoring_cache_ttl_seconds)
+    if settings.scoring_cache_store != "memory":
+        raise ValueError(f"未対応の採点キャッシュです: {settings.scoring_cache_store}")
+    return InMemoryScoringCache(settings.scoring_cache_ttl_seconds, settings.scoring_cache_max_entries)
+
+
+def get_scoring_cache(request: Request) -> Optional[ScoringCache]:
+    """ScoringCache を返す FastAPI 依存関数"""
+    return request.app.state.scoring_cache
@@ -0,0 +1,50 @@
+"""
+Single-flight（同一キーの同時取得の集約）
+
+キャッシュミスが同時に発生した場合、同じキーに対するバックエンド取得を 1 回にまとめ、
+後続の呼び出し元は実行中の取得結果を待つ。
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from services.metrics import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """キー単位で実行中の取得を共有する"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        key に対する取得を実行し結果を返す
+
+        同じ key の取得が実行中であれば新たに実行せず、その結果を待つ。
+        取得は独立したタスクで実行するため、呼び出し元がキャンセルされても
+        他の待機者への結果は失われない。
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            metrics.incr(f"singleflight.{self.name}.leader")
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        else:
+            metrics.incr(f"singleflight.{self.name}.shared")
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 待機者が全員キャンセルされた場合でも例外未回収の警告を出さない
+        if not task.cancelled():
+            task.exception()
+
+    def inflight(self) -> int:
+        """実行中の取得数"""
+        return len(self._inflight)
@@ -0,0 +1,253 @@
+"""
+試験コーパスのスナップショット
+
+scribo-ipa の試験メタデータと S3 問題ドキュメントをビルド時に 1 ファイルへ書き出し、
+コンテナイメージに同梱する。起動時にメモリマップして読み込むため、
+コールドスタート直後でも試験一覧・問題詳細をネットワーク I/O なしで返せる。
+
+ファイル形式:
+    MAGIC (8 bytes) | 索引長 (uint64, little endian) | 索引 JSON (UTF-8) | 本文領域
+索引には試験区分ごとのアイテム一覧と、S3 ドキュメントごとの (offset, length, etag) を持つ。
+本文は必要になった時点でメモリマップから切り出す。
+
+スナップショットに含まれる試験区分の一覧は、版（version。内容のハッシュ）が変わる＝次のイメージで
+置き換わるまでスナップショットから返し続ける。ただし管理 API で試験カタログを無効化した区分は
+スナップショットから外し（release_catalogs）、以降はそのプロセスが終わるまで DynamoDB から読み込む。
+スナップショットにない試験区分・問題・ドキュメントだけを DynamoDB / S3 から取得する。
+
+書き出し方法（app ディレクトリで。AWS 認証情報が必要）:
+    python -m services.snapshot --output data/corpus.snapshot
+
+デプロイのワークフロー（.github/workflows/deploy.yml）はイメージのビルド前にこれを実行し、
+REQUIRE_CORPUS_SNAPSHOT=true でビルドしてファイルがなければビルドを失敗させる。本番タスクは
+CORPUS_SNAPSHOT_REQUIRED=true のため、スナップショットを読み込めなければ起動に失敗する。
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+
+from services.aws import AWSClients
+from services.catalog import CatalogLoader, load_exam_items
+from services.metrics import metrics
+from services.problems import ObjectFetcher, fetch_s3_object, parse_s3_uri
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SCRBSNP1"
+_HEADER = struct.Struct("<8sQ")
+
+
+# =============================================================================
+# 書き出し
+# =============================================================================
+
+def write_snapshot(
+    path: Path,
+    catalogs: Dict[str, List[Dict[str, Any]]],
+    documents: Dict[str, Tuple[bytes, Optional[str]]],
+) -> None:
+    """
+    スナップショットを書き出す（一時ファイルに書いてから置き換える）
+
+    Args:
+        catalogs: 試験区分 -> DynamoDB アイテム一覧
+        documents: "bucket/key" -> (本文, ETag)
+    """
+    index: Dict[str, Any] = {"created_at": time.time(), "catalogs": catalogs, "documents": {}}
+    offset = 0
+    digest = hashlib.sha256(json.dumps(catalogs, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+    for name, (body, etag) in documents.items():
+        index["documents"][name] = {"offset": offset, "length": len(body), "etag": etag}
+        offset += len(body)
+        digest.update(name.encode("utf-8"))
+        digest.update(body)
+    # 版は内容だけから決まる（同じ内容で作り直しても変わらない）
+    index["version"] = digest.hexdigest()[:16]
+    index_bytes = json.dumps(index, ensure_ascii=False, default=str).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(index_bytes)))
+        f.write(index_bytes)
+        for body, _ in documents.values():
+            f.write(body)
+    os.replace(tmp_path, path)
+
+
+async def export_snapshot(aws: AWSClients, exam_types: List[str], path: Path) -> Dict[str, int]:
+    """DynamoDB / S3 から全試験区分を取得してスナップショットを書き出す"""
+    catalogs: Dict[str, List[Dict[str, Any]]] = {}
+    for exam_type in exam_types:
+        catalogs[exam_type] = await load_exam_items(aws, exam_type)
+
+    locations = sorted({
+        location
+        for items in catalogs.values()
+        for item in items
+        if (location := parse_s3_uri(item.get("s3_uri", "")))
+    })
+    fetched = await asyncio.gather(*(fetch_s3_object(aws, bucket, key, None) for bucket, key in locations))
+    documents = {f"{bucket}/{key}": result for (bucket, key), result in zip(locations, fetched)}
+
+    write_snapshot(path, catalogs, documents)
+    return {
+        "exam_types": len(catalogs),
+        "items": sum(len(items) for items in catalogs.values()),
+        "documents": len(documents),
+        "bytes": path.stat().st_size,
+    }
+
+
+# =============================================================================
+# 読み込み
+# =============================================================================
+
+class CorpusSnapshot:
+    """メモリマップしたスナップショットファイル"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_length = _HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC:
+                raise ValueError(f"スナップショットの形式が不正です: {path}")
+            index_start = _HEADER.size
+            index = json.loads(self._mmap[index_start:index_start + index_length].decode("utf-8"))
+        except Exception:
+            self.close()
+            raise
+        self._body_start = index_start + index_length
+        self.created_at: float = index["created_at"]
+        self.version: str = index.get("version") or str(index["created_at"])
+        self._catalogs: Dict[str, List[Dict[str, Any]]] = index["catalogs"]
+        self._documents: Dict[str, Dict[str, Any]] = index["documents"]
+        # 無効化により DynamoDB から読み込むようにした試験区分
+        self._released: Set[str] = set()
+
+    @classmethod
+    def open_if_exists(cls, path: str) -> Optional["CorpusSnapshot"]:
+        """ファイルがあれば開く（なし・破損時は None を返し、通常の取得経路を使う）"""
+        if not path or not Path(path).is_file():
+            return None
+        try:
+            snapshot = cls(Path(path))
+        except Exception as e:
+            logger.warning(f"コーパススナップショットを読み込めません ({path}): {e}")
+            return None
+        logger.info(
+            f"コーパススナップショットを読み込みました: {path} 版 {snapshot.version} "
+            f"(試験区分 {len(snapshot._catalogs)}件, ドキュメント {len(snapshot._documents)}件)"
+        )
+        return snapshot
+
+    def exam_types(self) -> List[str]:
+        return list(self._catalogs)
+
+    def catalog_items(self, exam_type: str) -> Optional[List[Dict[str, Any]]]:
+        items = self._catalogs.get(exam_type)
+        return [dict(item) for item in items] if items is not None else None
+
+    def catalog_released(self, exam_type: str) -> bool:
+        return exam_type in self._released
+
+    def release_catalogs(self, exam_type: Optional[str] = None) -> List[str]:
+        """
+        試験区分の一覧をスナップショットから返すのをやめ、外した区分を返す（exam_type 省略時は全区分）
+
+        試験カタログの無効化で呼ばれ、以降の読み込みは DynamoDB から行う。
+        """
+        covered = list(self._catalogs) if exam_type is None else [t for t in (exam_type,) if t in self._catalogs]
+        released = [t for t in covered if t not in self._released]
+        self._released.update(released)
+        if released:
+            metrics.incr("snapshot.catalog_released", len(released))
+        return released
+
+    def document(self, bucket: str, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        entry = self._documents.get(f"{bucket}/{key}")
+        if entry is None:
+            return None
+        start = self._body_start + entry["offset"]
+        return self._mmap[start:start + entry["length"]], entry["etag"]
+
+    def close(self) -> None:
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+def snapshot_catalog_loader(snapshot: CorpusSnapshot, fallback: CatalogLoader) -> CatalogLoader:
+    """
+    スナップショットにある試験区分はスナップショットから、ない区分のみ DynamoDB から読み込むローダー
+
+    TTL 経過後の再取得でもネットワーク I/O は発生しない。一覧への新しい試験の反映は次のスナップショット
+    （版の更新）で行い、それまでも新しい問題の詳細は _find_exam_item が DynamoDB から直接引く。
+    すぐに反映したい場合は管理 API で無効化すると、その区分は以降 DynamoDB から読み込む。
+    """
+
+    async def load(exam_type: str) -> List[Dict[str, Any]]:
+        items = None if snapshot.catalog_released(exam_type) else snapshot.catalog_items(exam_type)
+        if items is not None:
+            metrics.incr("snapshot.catalog_hit")
+            return items
+        return await fallback(exam_type)
+
+    return load
+
+
+def get_corpus_snapshot(request: Request) -> Optional[CorpusSnapshot]:
+    """読み込んだ CorpusSnapshot（なければ None）を返す FastAPI 依存関数"""
+    return getattr(request.app.state, "snapshot", None)
+
+
+def snapshot_object_fetcher(snapshot: CorpusSnapshot, fallback: ObjectFetcher) -> ObjectFetcher:
+    """スナップショットに含まれる問題ドキュメントはそこから返し、それ以外のみ S3 から取得する"""
+
+    async def fetch(bucket: str, key: str, etag: Optional[str]) -> Optional[Tuple[bytes, Optional[str]]]:
+        document = snapshot.document(bucket, key)
+        if document is None:
+            return await fallback(bucket, key, etag)
+        metrics.incr("snapshot.document_hit")
+        body, snapshot_etag = document
+        if etag is not None and etag == snapshot_etag:
+            return None
+        return body, snapshot_etag
+
+    return fetch
+
+
+def main():
+    from config import get_settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=None, help="出力先（省略時は CORPUS_SNAPSHOT_PATH）")
+    parser.add_argument("--exam-types", nargs="+", default=None, help="試験区分（省略時は WARMUP_EXAM_TYPES）")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    output = Path(args.output or settings.corpus_snapshot_path)
+    aws = AWSClients(settings)
+    try:
+        summary = asyncio.run(export_snapshot(aws, args.exam_types or settings.warmup_exam_types, output))
+    finally:
+        aws.close()
+    print(f"{output}: {summary}")
+
+
+if __name__ == "__main__":
+    main()
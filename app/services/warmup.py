@@ -0,0 +1,97 @@
+"""
+起動時ウォームアップ
+
+Fargate Spot のタスク入れ替え直後に最初の利用者が DynamoDB / S3 のコールドフェッチを
+負担しないよう、全試験区分のカタログと参照される S3 問題ドキュメントを並列に事前読み込みする。
+完了まではレディネスエンドポイント (/ready) が 503 を返し、ALB はトラフィックを流さない。
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from services.catalog import ExamCatalog
+from services.metrics import metrics
+from services.problems import ProblemDocumentCache, parse_s3_uri
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupState:
+    """ウォームアップの進捗と結果"""
+    ready: bool = False
+    running: bool = False
+    duration_seconds: Optional[float] = None
+    exam_types: int = 0
+    documents: int = 0
+    timed_out: bool = False
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+async def warm_caches(
+    catalog: ExamCatalog,
+    problem_cache: ProblemDocumentCache,
+    exam_types: List[str],
+    state: WarmupState,
+) -> None:
+    """全試験区分のカタログと、そこから参照される S3 問題ドキュメントを並列に読み込む"""
+    results = await asyncio.gather(*(catalog.get(t) for t in exam_types), return_exceptions=True)
+
+    locations: Set[Tuple[str, str]] = set()
+    for exam_type, result in zip(exam_types, results):
+        if isinstance(result, Exception):
+            state.errors.append(f"catalog {exam_type}: {result}")
+            continue
+        state.exam_types += 1
+        for item in result.items.values():
+            location = parse_s3_uri(item.get("s3_uri", ""))
+            if location:
+                locations.add(location)
+
+    documents = await asyncio.gather(
+        *(problem_cache.get(bucket, key) for bucket, key in locations), return_exceptions=True
+    )
+    for (bucket, key), document in zip(locations, documents):
+        if isinstance(document, Exception) or document.negative:
+            state.errors.append(f"s3://{bucket}/{key}: 取得に失敗しました")
+        else:
+            state.documents += 1
+
+
+async def run_warmup(
+    catalog: ExamCatalog,
+    problem_cache: ProblemDocumentCache,
+    exam_types: List[str],
+    state: WarmupState,
+    timeout_seconds: float,
+) -> None:
+    """
+    ウォームアップを実行し、完了（またはタイムアウト）でレディ状態にする
+
+    一部の取得に失敗してもタスクを永久に未レディにはせず、
+    失敗分は通常のリクエスト時に再取得させる。
+    """
+    state.running = True
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(warm_caches(catalog, problem_cache, exam_types, state), timeout_seconds)
+    except asyncio.TimeoutError:
+        state.timed_out = True
+        state.errors.append(f"{timeout_seconds}秒でタイムアウトしました")
+    except Exception as e:
+        state.errors.append(str(e))
+    finally:
+        state.duration_seconds = time.perf_counter() - start
+        state.running = False
+        state.ready = True
+        metrics.observe("warmup.duration_seconds", state.duration_seconds)
+        logger.info(
+            f"ウォームアップ完了: {state.duration_seconds:.2f}秒 "
+            f"(試験区分 {state.exam_types}件, 問題ドキュメント {state.documents}件, エラー {len(state.errors)}件)"
+        )
@@ -22,11 +22,7 @@ document.addEventListener('alpine:init', () => {
         },
         
         async init() {
-            await Promise.all([
-                this.fetchProblem(),
-                this.fetchModules(),
-                this.fetchDesign()
-            ]);
+            await this.fetchBootstrap();
 
             window.addEventListener('design-generated', (event) => {
                 this.applyGeneratedDesign(event.detail);
@@ -69,6 +65,44 @@ document.addEventListener('alpine:init', () => {
             this.step = 1;
         },
 
+        // 問題・モジュール・設計図・インタビューセッションを 1 リクエストで取得
+        async fetchBootstrap() {
+            try {
+                const params = new URLSearchParams({ exam_type: examType, problem_id: problemId });
+                const res = await fetch(`/api/wizard/bootstrap?${params}`);
+                if (!res.ok) throw new Error('Failed to fetch bootstrap');
+                const data = await res.json();
+                if (data.problem) this.problem = data.problem;
+                if (data.modules) this.modules = data.modules;
+                if (data.design) this.applyDesign(data.design);
+                if (data.session) {
+                    window.dispatchEvent(new CustomEvent('interview-session-loaded', { detail: data.session }));
+                }
+                for (const [field, message] of Object.entries(data.errors || {})) {
+                    console.error(`Failed to fetch ${field}`, message);
+                }
+            } catch (e) {
+                // 集約エンドポイントが使えない場合は個別 API で取得する
+                console.error('Failed to fetch bootstrap', e);
+                await Promise.all([
+                    this.fetchProblem(),
+                    this.fetchModules(),
+                    this.fetchDesign()
+                ]);
+            }
+        },
+
+        applyDesign(data) {
+            if (data.created_at) {
+                this.design = {
+                    theme: data.theme || '',
+                    breakdown: data.breakdown || { 'ア': '', 'イ': '', 'ウ': '' },
+                    structure: data.structure.length > 0 ? data.structure : this.design.structure,
+                    module_map: data.module_map || {}
+                };
+            }
+        },
+
         async fetchProblem() {
             try {
                 const res = await fetch(`/api/exams/detail?exam_type=${examType}&problem_id=${encodeURIComponent(problemId)}`);
@@ -91,15 +125,7 @@ document.addEventListener('alpine:init', () => {
         async fetchDesign() {
             try {
                 const res = await fetch(`/api/designs/${encodeURIComponent(problemId)}`);
-                const data = await res.json();
-                if (data.created_at) {
-                    this.design = {
-                        theme: data.theme || '',
-                        breakdown: data.breakdown || { 'ア': '', 'イ': '', 'ウ': '' },
-                        structure: data.structure.length > 0 ? data.structure : this.design.structure,
-                        module_map: data.module_map || {}
-                    };
-                }
+                this.applyDesign(await res.json());
             } catch (e) {
                 console.error('Failed to fetch design', e);
             }
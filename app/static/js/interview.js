@@ -8,18 +8,30 @@ document.addEventListener('alpine:init', () => {
         inputMessage: '',
         isLoading: false,
         canGenerate: false, // For Phase 5
+        preloadedSession: null, // ウィザードの初期表示時に取得済みのセッション
 
         async init() {
             window.addEventListener('open-interview-modal', () => {
                 this.open();
             });
+            window.addEventListener('interview-session-loaded', (event) => {
+                // 既にモーダルで取得済みなら古いデータで上書きしない
+                if (this.messages.length === 0) this.preloadedSession = event.detail;
+            });
         },
 
         async open() {
             const modal = document.getElementById('interview_modal');
             if (modal) {
                 modal.showModal();
-                await this.fetchSession();
+                if (this.preloadedSession) {
+                    // 初回は取得済みのセッションを使い、往復を省く
+                    this.messages = this.preloadedSession.history || [];
+                    this.preloadedSession = null;
+                    this.$nextTick(() => this.scrollToBottom());
+                } else {
+                    await this.fetchSession();
+                }
             }
         },
 
@@ -22,16 +22,52 @@ function problemViewer(examType, problemId) {
             '設問ウ': { min: 600, max: 800 }
         },
         storageKey: `scribo-answer:${examType}:${problemId}`,
+        // ルールベースの即時チェック結果（/api/answers/analyze）
+        analysis: null,
+        analysisTimer: null,
+        analysisChecks: [
+            { key: 'headings', label: '章立て（第1章・1-1 など）' },
+            { key: 'named_entities', label: '企業名・システム名' },
+            { key: 'quantitative_data', label: '定量データが2箇所以上' },
+            { key: 'reasoning_phrases', label: '「なぜならば」が3箇所以上' },
+            { key: 'min_length', label: '各設問800字以上' }
+        ],
         
         async init() {
             // ローカルストレージから回答を復元
             this.restoreAnswers();
             
-            // 問題データを取得
-            await this.fetchProblem();
+            // サーバー側で埋め込まれた問題データを使い、なければ API から取得
+            if (!this.loadEmbeddedProblem()) {
+                await this.fetchProblem();
+            }
             
             // Alpine.storeに登録（ダイアログから参照用）
             Alpine.store('problem', this);
+            
+            this.analyzeAnswers();
+        },
+        
+        loadEmbeddedProblem() {
+            const element = document.getElementById('problem-data');
+            if (!element) return false;
+            try {
+                this.applyProblem(JSON.parse(element.textContent));
+                this.loading = false;
+                return true;
+            } catch (e) {
+                console.error('Failed to parse embedded problem', e);
+                return false;
+            }
+        },
+        
+        applyProblem(problem) {
+            this.problem = problem;
+            
+            // 文字数制限を更新
+            if (this.problem.word_count_limits) {
+                this.wordLimits = this.problem.word_count_limits;
+            }
         },
         
         async fetchProblem() {
@@ -47,12 +83,7 @@ function problemViewer(examType, problemId) {
                     throw new Error('問題の取得に失敗しました');
                 }
                 
-                this.problem = await response.json();
-                
-                // 文字数制限を更新
-                if (this.problem.word_count_limits) {
-                    this.wordLimits = this.problem.word_count_limits;
-                }
+                this.applyProblem(await response.json());
                 
             } catch (e) {
                 this.error = e.message;
@@ -141,6 +172,36 @@ function problemViewer(examType, problemId) {
                 .replace(/$/, '</p>');
         },
         
+        onAnswerInput() {
+            this.saveToLocalStorage();
+            
+            // 入力が止まってからチェックする
+            clearTimeout(this.analysisTimer);
+            this.analysisTimer = setTimeout(() => this.analyzeAnswers(), 800);
+        },
+        
+        async analyzeAnswers() {
+            try {
+                const response = await fetch('/api/answers/analyze', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({ answers: this.answers })
+                });
+                if (response.ok) {
+                    this.analysis = await response.json();
+                }
+            } catch (e) {
+                // チェックは補助的な表示のため、失敗しても入力は続けられる
+                console.error('Failed to analyze answers', e);
+            }
+        },
+        
+        getQuestionAnalysis(question) {
+            return this.analysis ? this.analysis.questions[question] : null;
+        },
+        
         saveToLocalStorage() {
             storage.set(this.storageKey, {
                 answers: this.answers,
@@ -210,7 +271,7 @@ function problemViewer(examType, problemId) {
                 // 採点リクエスト
                 showToast('回答を送信しました。採点中...', 'success');
                 
-                const scoringResponse = await fetch('/api/scoring', {
+                const scoringResponse = await fetch('/api/scoring/jobs', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json'
@@ -224,11 +285,13 @@ function problemViewer(examType, problemId) {
                     throw new Error('採点リクエストに失敗しました');
                 }
                 
+                const job = await scoringResponse.json();
+                
                 // ローカルストレージをクリア
                 storage.remove(this.storageKey);
                 
                 // 結果ページへ遷移
-                window.location.href = `/result/${result.submission_id}`;
+                window.location.href = `/result/${encodeURIComponent(result.submission_id)}?job=${encodeURIComponent(job.job_id)}`;
                 
             } catch (e) {
                 showToast(e.message, 'error');
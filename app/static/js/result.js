@@ -13,12 +13,15 @@ function scoringResult(submissionId) {
         showDetails: false,
         showDetailedResult: false,
         
-        // 労働の錯覚用
+        // 採点進捗表示用
         loadingStep: 0,
         loadingProgress: 0,
         loadingMessage: '回答を確認しています...',
         currentTip: '',
         
+        // ストリーミング採点で届いた設問別評価（完成した順）
+        partialBreakdown: {},
+        
         // 豆知識リスト
         tips: [
             '午後Ⅱ試験では「具体性」が最も重視されます。実際のプロジェクト経験を詳しく書きましょう。',
@@ -29,33 +32,112 @@ function scoringResult(submissionId) {
         ],
         
         async init() {
-            // ローディングアニメーション開始
-            this.startLoadingAnimation();
             // 豆知識をランダムに表示
             this.currentTip = this.tips[Math.floor(Math.random() * this.tips.length)];
             
+            // 採点ジョブ ID があれば完了まで状態を確認してから結果を取得
+            const jobId = new URLSearchParams(window.location.search).get('job');
+            if (jobId && !(await this.streamJob(jobId))) {
+                return;
+            }
+            
             await this.fetchResult();
         },
         
-        startLoadingAnimation() {
-            const steps = [
-                { step: 1, progress: 25, message: '回答を受信しました...' },
-                { step: 2, progress: 50, message: '文章構成を分析しています...' },
-                { step: 3, progress: 75, message: '8つの観点で評価中...' },
-                { step: 4, progress: 95, message: '最終スコアを計算中...' }
-            ];
+        // 採点ジョブの進捗を SSE で受け取り、完了したら true を返す（接続できなければポーリング）
+        streamJob(jobId) {
+            if (!window.EventSource) {
+                return this.waitForJob(jobId);
+            }
             
-            let i = 0;
-            const interval = setInterval(() => {
-                if (i < steps.length && this.loading) {
-                    this.loadingStep = steps[i].step;
-                    this.loadingProgress = steps[i].progress;
-                    this.loadingMessage = steps[i].message;
-                    i++;
-                } else {
-                    clearInterval(interval);
+            return new Promise((resolve) => {
+                const source = new EventSource(`/api/scoring/jobs/${encodeURIComponent(jobId)}/events`);
+                let finished = false;
+                
+                source.addEventListener('question', (event) => {
+                    const data = JSON.parse(event.data);
+                    this.partialBreakdown = { ...this.partialBreakdown, [data.question]: data.breakdown };
+                    const count = Object.keys(this.partialBreakdown).length;
+                    this.loadingStep = 3;
+                    this.loadingProgress = Math.min(90, 40 + count * 15);
+                    this.loadingMessage = `${data.question}の評価が完了しました...`;
+                });
+                
+                source.addEventListener('reset', () => {
+                    this.partialBreakdown = {};
+                    this.loadingStep = 2;
+                    this.loadingProgress = 30;
+                    this.loadingMessage = '採点をやり直しています...';
+                });
+                
+                source.addEventListener('status', (event) => {
+                    const data = JSON.parse(event.data);
+                    if (data.status === 'queued') {
+                        this.loadingStep = 1;
+                        this.loadingProgress = 15;
+                        this.loadingMessage = '採点の順番を待っています...';
+                    } else if (data.status === 'running') {
+                        this.loadingStep = 2;
+                        this.loadingProgress = 30;
+                        this.loadingMessage = '8つの観点で評価中...';
+                    } else {
+                        finished = true;
+                        source.close();
+                        if (data.status === 'done') {
+                            resolve(true);
+                        } else {
+                            this.error = data.error || '採点に失敗しました';
+                            this.loading = false;
+                            resolve(false);
+                        }
+                    }
+                });
+                
+                source.onerror = () => {
+                    if (finished) return;
+                    source.close();
+                    this.waitForJob(jobId).then(resolve);
+                };
+            });
+        },
+        
+        // 採点ジョブの状態に合わせて進捗を表示し、完了したら true を返す
+        async waitForJob(jobId) {
+            const pollInterval = 2000;
+            let runningPolls = 0;
+            
+            while (true) {
+                try {
+                    const response = await fetch(`/api/scoring/jobs/${encodeURIComponent(jobId)}`);
+                    if (!response.ok) {
+                        throw new Error(response.status === 404 ? '採点ジョブが見つかりません' : '採点状況の取得に失敗しました');
+                    }
+                    const job = await response.json();
+                    
+                    if (job.status === 'done') {
+                        return true;
+                    }
+                    if (job.status === 'failed') {
+                        throw new Error(job.error || '採点に失敗しました');
+                    }
+                    if (job.status === 'queued') {
+                        this.loadingStep = 1;
+                        this.loadingProgress = 15;
+                        this.loadingMessage = '採点の順番を待っています...';
+                    } else {
+                        // running: 所要時間は分からないため、確認のたびに少しずつ進める
+                        runningPolls++;
+                        this.loadingStep = runningPolls < 5 ? 2 : 3;
+                        this.loadingProgress = Math.min(90, 30 + runningPolls * 5);
+                        this.loadingMessage = runningPolls < 5 ? '文章構成を分析しています...' : '8つの観点で評価中...';
+                    }
+                } catch (e) {
+                    this.error = e.message;
+                    this.loading = false;
+                    return false;
                 }
-            }, 800);
+                await new Promise(r => setTimeout(r, pollInterval));
+            }
         },
         
         async fetchResult() {
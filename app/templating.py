@@ -0,0 +1,70 @@
+"""
+Jinja2 テンプレート環境
+
+ページ・パーシャルで共有する Jinja2Templates をプロセス起動時に一度だけ生成する。
+コンパイル済みテンプレートは環境内にキャッシュされ、リクエストごとに再読み込みしない。
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+from urllib.parse import quote
+
+from fastapi.templating import Jinja2Templates
+
+from assets import AssetManifest
+from config import get_settings
+from services.metrics import metrics
+
+settings = get_settings()
+
+templates = Jinja2Templates(directory="templates")
+# 本番ではテンプレートファイルの更新確認 (stat) を行わない
+templates.env.auto_reload = settings.debug
+# パス要素用の URL エンコード（SK に # が含まれるため / も含めてエンコードする）
+templates.env.filters["quote_path"] = lambda value: quote(str(value), safe="")
+
+# 静的アセットの論理名（例: js/problem.js）をハッシュ付き URL に解決する
+asset_manifest = AssetManifest()
+templates.env.globals["asset_url"] = asset_manifest.url
+
+
+@dataclass(frozen=True)
+class Fragment:
+    """レンダリング済みパーシャル"""
+    version: str
+    html: str
+    etag: str
+
+
+class FragmentCache:
+    """
+    レンダリング済み HTML パーシャルのキャッシュ
+
+    キーは (名前空間, 表示モード, 版)。版が変わったら同じ (名前空間, 表示モード) の
+    古いエントリを置き換えるため、カタログ再取得で内容が変われば自動的に無効化される。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._entries: Dict[Tuple[str, str], Fragment] = {}
+
+    def get_or_render(self, scope: str, variant: str, version: str, render: Callable[[], str]) -> Fragment:
+        cached = self._entries.get((scope, variant))
+        if cached is not None and cached.version == version:
+            metrics.incr(f"fragment_cache.{self.name}.hit")
+            return cached
+        metrics.incr(f"fragment_cache.{self.name}.miss")
+        html = render()
+        # ETag は出力 HTML から算出する（テンプレート変更を伴うデプロイでも古い HTML を返さない）
+        etag = '"' + hashlib.sha256(html.encode("utf-8")).hexdigest()[:32] + '"'
+        fragment = Fragment(version=version, html=html, etag=etag)
+        self._entries[(scope, variant)] = fragment
+        return fragment
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# 試験一覧パーシャル（試験区分 x 表示モード x カタログ版）
+exam_list_cache = FragmentCache("exam_list")
@@ -2,10 +2,18 @@
 Scribo テスト共通フィクスチャ
 """
 
+from unittest.mock import MagicMock
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
 from main import app
+from services.aws import get_aws_clients
+from services.catalog import ExamCatalog, get_exam_catalog, load_exam_items
+from services.problems import ProblemDocumentCache, fetch_s3_object, get_problem_cache
+from services.scoring import InMemoryJobStore, ScoringQueue, get_scoring_queue, score_submission_answers
+from services.scoring_cache import InMemoryScoringCache, get_scoring_cache
 
 
 # =============================================================================
@@ -19,6 +27,58 @@ def client():
         yield c
 
 
+@pytest.fixture
+async def async_client():
+    """同一イベントループで並行リクエストを発行する httpx AsyncClient（lifespan は実行しない）"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+# =============================================================================
+# AWS スタブ フィクスチャ
+# =============================================================================
+
+@pytest.fixture
+def stub_aws():
+    """
+    AWS クライアントレジストリを MagicMock に差し替える
+
+    試験カタログ・問題キャッシュ・採点結果キャッシュもこのスタブ上に新規構築するため、
+    テスト間でキャッシュ状態は共有されない。
+    """
+    aws = MagicMock()
+    catalog = ExamCatalog(
+        loader=lambda exam_type: load_exam_items(aws, exam_type),
+        ttl_seconds=3600,
+        stale_seconds=0,
+    )
+    problem_cache = ProblemDocumentCache(
+        fetcher=lambda bucket, key, etag: fetch_s3_object(aws, bucket, key, etag),
+        max_bytes=10 * 1024 * 1024,
+        ttl_seconds=3600,
+        negative_ttl_seconds=30,
+    )
+    app.dependency_overrides[get_aws_clients] = lambda: aws
+    app.dependency_overrides[get_exam_catalog] = lambda: catalog
+    scoring_cache = InMemoryScoringCache(ttl_seconds=3600, max_entries=100)
+    app.dependency_overrides[get_problem_cache] = lambda: problem_cache
+    app.dependency_overrides[get_scoring_cache] = lambda: scoring_cache
+    # 採点ジョブキュー（ワーカーは起動しない。採点の実行まで確かめるテストは自前のキューを起動する）
+    scoring_queue = ScoringQueue(
+        InMemoryJobStore(),
+        lambda job, on_question, on_reset: score_submission_answers(
+            aws, job.submission_id, on_question, cache=scoring_cache, on_reset=on_reset
+        ),
+        concurrency=1,
+        max_queued=10,
+    )
+    app.dependency_overrides[get_scoring_queue] = lambda: scoring_queue
+    yield aws
+    for dependency in (get_aws_clients, get_exam_catalog, get_problem_cache, get_scoring_cache, get_scoring_queue):
+        app.dependency_overrides.pop(dependency, None)
+
+
 # =============================================================================
 # サンプル回答データ フィクスチャ
 # =============================================================================
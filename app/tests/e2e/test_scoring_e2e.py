@@ -46,7 +46,7 @@ class TestScoringE2E:
         # 2. 採点を実行
         scoring_payload = {"submission_id": submission_id}
         
-        scoring_response = client.post("/api/scoring", json=scoring_payload)
+        scoring_response = client.post("/api/scoring?wait=true", json=scoring_payload)
         
         assert scoring_response.status_code == 200, f"採点失敗: {scoring_response.text}"
         
@@ -94,7 +94,7 @@ class TestScoringE2E:
         # 2. 採点を実行
         scoring_payload = {"submission_id": submission_id}
         
-        scoring_response = client.post("/api/scoring", json=scoring_payload)
+        scoring_response = client.post("/api/scoring?wait=true", json=scoring_payload)
         
         assert scoring_response.status_code == 200, f"採点失敗: {scoring_response.text}"
         
@@ -135,7 +135,7 @@ class TestScoringE2E:
         submission_id = submit_response.json()["submission_id"]
         
         # 2. 採点を実行
-        scoring_response = client.post("/api/scoring", json={"submission_id": submission_id})
+        scoring_response = client.post("/api/scoring?wait=true", json={"submission_id": submission_id})
         assert scoring_response.status_code == 200
         
         original_scoring = scoring_response.json()
@@ -160,7 +160,7 @@ class TestScoringE2E:
         """
         fake_id = str(uuid.uuid4())
         
-        response = client.post("/api/scoring", json={"submission_id": fake_id})
+        response = client.post("/api/scoring?wait=true", json={"submission_id": fake_id})
         
         assert response.status_code == 404
     
@@ -178,7 +178,7 @@ class TestScoringE2E:
         submission_id = submit_response.json()["submission_id"]
         
         # 採点を実行
-        scoring_response = client.post("/api/scoring", json={"submission_id": submission_id})
+        scoring_response = client.post("/api/scoring?wait=true", json={"submission_id": submission_id})
         scoring_data = scoring_response.json()
         
         # 全設問の全観点にコメントがあることを確認
@@ -218,7 +218,7 @@ class TestScoringQualityDifference:
             "problem_id": valid_problem_id,
             "answers": sample_answers_high_score
         })
-        high_scoring = client.post("/api/scoring", json={
+        high_scoring = client.post("/api/scoring?wait=true", json={
             "submission_id": high_submit.json()["submission_id"]
         })
         high_score = high_scoring.json()["aggregate_score"]
@@ -229,7 +229,7 @@ class TestScoringQualityDifference:
             "problem_id": valid_problem_id,
             "answers": sample_answers_low_score
         })
-        low_scoring = client.post("/api/scoring", json={
+        low_scoring = client.post("/api/scoring?wait=true", json={
             "submission_id": low_submit.json()["submission_id"]
         })
         low_score = low_scoring.json()["aggregate_score"]
@@ -0,0 +1 @@
+# load tests パッケージ
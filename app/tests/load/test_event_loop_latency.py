@@ -0,0 +1,128 @@
+"""
+負荷テスト: 採点中の試験一覧レイテンシ
+Bedrock 採点（数十秒）が実行中でも /api/exams の応答時間が劣化しないことを検証
+AWS 呼び出しはスリープ付きのスタブで置き換える
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from main import app
+from routers import scoring
+from services.aws import get_aws_clients
+from services.catalog import ExamCatalog, get_exam_catalog, load_exam_items
+from services.scoring import get_scoring_queue
+from services.scoring_cache import get_scoring_cache
+
+# スタブの擬似レイテンシ（秒）
+EXAM_QUERY_LATENCY = 0.02
+BEDROCK_LATENCY = 1.0
+
+SCORING_RESULT = {
+    "question_breakdown": {
+        "設問ア": {"level": "B", "question_score": 70, "criteria_scores": [{"criterion": "充足度", "weight": 0.15, "points": 70}]},
+    },
+    "aggregate_score": 70,
+    "final_rank": "B",
+}
+
+
+def _slow_exam_query(**kwargs):
+    time.sleep(EXAM_QUERY_LATENCY)
+    return {"Items": [{"SK": "YEAR#2024SPRING#ESSAY#Q1", "title": "テスト", "year_term": "2024春"}]}
+
+
+def _slow_invoke_model(**kwargs):
+    time.sleep(BEDROCK_LATENCY)
+    body = json.dumps({"content": [{"text": json.dumps(SCORING_RESULT, ensure_ascii=False)}]})
+    return {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+
+
+@pytest.fixture
+def stub_aws():
+    """AWS クライアントレジストリをスリープ付きスタブに差し替える"""
+    aws = MagicMock()
+    aws.exam_table.query.side_effect = _slow_exam_query
+    aws.submission_table.get_item.return_value = {
+        "Item": {"submission_id": "load-test", "answers": {"設問ア": "回答"}}
+    }
+    aws.bedrock.invoke_model.side_effect = _slow_invoke_model
+
+    # カタログキャッシュを無効化し、毎回（スタブの）DynamoDB を経由させる
+    catalog = ExamCatalog(lambda exam_type: load_exam_items(aws, exam_type), ttl_seconds=0, stale_seconds=0)
+
+    scoring.limiter.reset()
+    app.dependency_overrides[get_aws_clients] = lambda: aws
+    app.dependency_overrides[get_exam_catalog] = lambda: catalog
+    # 同一回答の採点が毎回 Bedrock（スタブ）を呼ぶよう、採点結果キャッシュは使わない
+    app.dependency_overrides[get_scoring_cache] = lambda: None
+    # wait=true の採点はキューを使わない（lifespan を実行しないため未設定のキューの代わり）
+    app.dependency_overrides[get_scoring_queue] = lambda: None
+    yield aws
+    app.dependency_overrides.pop(get_aws_clients, None)
+    app.dependency_overrides.pop(get_exam_catalog, None)
+    app.dependency_overrides.pop(get_scoring_cache, None)
+    app.dependency_overrides.pop(get_scoring_queue, None)
+    scoring.limiter.reset()
+
+
+async def _measure_exams(client: httpx.AsyncClient, count: int, interval: float = 0.02) -> list:
+    """
+    /api/exams を interval 秒間隔で count 回発行し、各レイテンシ（秒）を返す
+
+    レイテンシは予定発行時刻から計測するため、イベントループの停止による
+    発行遅延もレイテンシとして現れる。
+    """
+    loop = asyncio.get_running_loop()
+    origin = loop.time()
+
+    async def one(index: int):
+        scheduled = origin + index * interval
+        await asyncio.sleep(max(0.0, scheduled - loop.time()))
+        response = await client.get("/api/exams", params={"exam_type": "IS"})
+        assert response.status_code == 200
+        return loop.time() - scheduled
+
+    return await asyncio.gather(*(one(i) for i in range(count)))
+
+
+def _p95(samples: list) -> float:
+    return statistics.quantiles(samples, n=20)[-1]
+
+
+class TestEventLoopLatency:
+    """イベントループ非ブロッキングの負荷テスト"""
+
+    @pytest.mark.load
+    async def test_exam_latency_flat_while_scoring_in_flight(self, stub_aws):
+        """採点リクエスト実行中も試験一覧の p95 レイテンシが平常時と同水準であること"""
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # 平常時
+            baseline = await _measure_exams(client, 20)
+
+            # 採点 4 件を実行中に同じ負荷をかける（完了まで待つ wait=true で Bedrock 呼び出しを重ねる）
+            scoring_tasks = [
+                asyncio.create_task(client.post("/api/scoring?wait=true", json={"submission_id": "load-test"}))
+                for _ in range(4)
+            ]
+            await asyncio.sleep(0)
+            under_load = await _measure_exams(client, 20)
+            scoring_responses = await asyncio.gather(*scoring_tasks)
+
+        assert all(r.status_code == 200 for r in scoring_responses)
+
+        baseline_p95 = _p95(baseline)
+        under_load_p95 = _p95(under_load)
+        print(f"\n[LOAD] /api/exams p95 baseline={baseline_p95 * 1000:.1f}ms "
+              f"during scoring={under_load_p95 * 1000:.1f}ms")
+
+        # ブロッキング実装では Bedrock 待ち（1秒）に引きずられる
+        assert under_load_p95 < BEDROCK_LATENCY / 2
+        assert under_load_p95 < baseline_p95 * 3 + 0.05
@@ -0,0 +1,127 @@
+"""
+単体テスト: 静的アセットのフィンガープリント・事前圧縮配信
+"""
+
+import gzip
+import json
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from assets import IMMUTABLE_CACHE_CONTROL, AssetManifest, PrecompressedStaticFiles, build_assets
+from middleware import brotli
+
+SCRIPT = b"document.addEventListener('alpine:init', () => {});\n" * 50
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "problem.js").write_bytes(SCRIPT)
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_bytes(b"body { margin: 0; }\n")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    return tmp_path
+
+
+def make_client(static_dir):
+    manifest = AssetManifest(static_dir)
+    app = Starlette(routes=[
+        Mount("/static", PrecompressedStaticFiles(directory=static_dir, manifest=manifest)),
+    ])
+    transport = httpx.ASGITransport(app=app)
+    return manifest, httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+class TestBuildAssets:
+    """ビルドのテスト"""
+
+    @pytest.mark.unit
+    def test_writes_hashed_files_and_compressed_siblings(self, static_dir):
+        """ハッシュ付きファイル・.gz・マニフェストを書き出すこと"""
+        manifest = build_assets(static_dir)
+
+        assert set(manifest) == {"js/problem.js", "css/style.css"}
+        hashed = static_dir / manifest["js/problem.js"]
+        assert hashed.name.startswith("problem.") and hashed.name != "problem.js"
+        assert hashed.read_bytes() == SCRIPT
+        assert gzip.decompress(hashed.with_name(hashed.name + ".gz").read_bytes()) == SCRIPT
+        if brotli is not None:
+            assert brotli.decompress(hashed.with_name(hashed.name + ".br").read_bytes()) == SCRIPT
+        assert json.loads((static_dir / "dist" / "manifest.json").read_text()) == manifest
+
+    @pytest.mark.unit
+    def test_hash_changes_with_content(self, static_dir):
+        """内容が変わればファイル名も変わり、古い成果物は残らないこと"""
+        before = build_assets(static_dir)["js/problem.js"]
+        (static_dir / "js" / "problem.js").write_bytes(SCRIPT + b"// changed\n")
+        after = build_assets(static_dir)["js/problem.js"]
+
+        assert before != after
+        assert not (static_dir / before).exists()
+
+
+class TestAssetManifest:
+    """URL 解決のテスト"""
+
+    @pytest.mark.unit
+    def test_resolves_to_hashed_url(self, static_dir):
+        manifest = build_assets(static_dir)
+        assert AssetManifest(static_dir).url("js/problem.js") == f"/static/{manifest['js/problem.js']}"
+
+    @pytest.mark.unit
+    def test_falls_back_without_manifest(self, static_dir):
+        """ビルド前は元のパスを返すこと"""
+        assert AssetManifest(static_dir).url("js/problem.js") == "/static/js/problem.js"
+
+    @pytest.mark.unit
+    def test_base_template_uses_asset_url(self, client):
+        """ページのスクリプト・スタイルが asset_url で解決されること"""
+        html = client.get("/").text
+        assert "{{" not in html
+        assert 'href="/static/' in html and "style." in html
+
+
+class TestPrecompressedStaticFiles:
+    """配信のテスト"""
+
+    @pytest.mark.unit
+    async def test_serves_precompressed_variant_as_immutable(self, static_dir):
+        """ハッシュ付きファイルは事前圧縮版を immutable で返すこと"""
+        build_assets(static_dir)
+        manifest, client = make_client(static_dir)
+        async with client:
+            response = await client.get(manifest.url("js/problem.js"), headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert "javascript" in response.headers["content-type"]
+        assert int(response.headers["content-length"]) < len(SCRIPT)
+        assert response.content == SCRIPT
+
+    @pytest.mark.unit
+    @pytest.mark.skipif(brotli is None, reason="brotli 未導入")
+    async def test_prefers_brotli(self, static_dir):
+        build_assets(static_dir)
+        manifest, client = make_client(static_dir)
+        async with client:
+            response = await client.get(manifest.url("js/problem.js"), headers={"Accept-Encoding": "br, gzip"})
+
+        assert response.headers["content-encoding"] == "br"
+
+    @pytest.mark.unit
+    async def test_identity_and_unhashed_paths(self, static_dir):
+        """圧縮非対応クライアントには原本を、ハッシュなしのパスには通常の配信を行うこと"""
+        build_assets(static_dir)
+        manifest, client = make_client(static_dir)
+        async with client:
+            identity = await client.get(manifest.url("js/problem.js"), headers={"Accept-Encoding": "identity"})
+            unhashed = await client.get("/static/js/problem.js")
+
+        assert "content-encoding" not in identity.headers
+        assert identity.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert identity.content == SCRIPT
+        assert "immutable" not in unhashed.headers.get("cache-control", "")
@@ -0,0 +1,99 @@
+"""
+単体テスト: AWS クライアントレジストリ
+接続プール設定・lifespan での生成・プール利用状況メトリクスを検証
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from config import Settings, get_settings
+from services.aws import AWSClients, _pool_stats
+
+
+class TestAWSClientsConfig:
+    """クライアント設定のテスト"""
+
+    @pytest.mark.unit
+    def test_pool_retry_and_timeouts_applied(self):
+        """Settings の接続プール・リトライ・タイムアウトが各クライアントに反映されること"""
+        settings = Settings(
+            aws_max_pool_connections=64,
+            aws_retry_mode="adaptive",
+            aws_max_attempts=7,
+            s3_read_timeout=3.0,
+            bedrock_read_timeout=90.0,
+        )
+        aws = AWSClients(settings)
+        try:
+            s3_config = aws.s3.meta.config
+            assert s3_config.max_pool_connections == 64
+            assert s3_config.tcp_keepalive is True
+            assert s3_config.retries["mode"] == "adaptive"
+            # botocore は max_attempts を初回を含む total_max_attempts に正規化する
+            assert s3_config.retries["total_max_attempts"] == 8
+            assert s3_config.read_timeout == 3.0
+            assert aws.bedrock.meta.config.read_timeout == 90.0
+            assert aws.dynamodb.meta.client.meta.config.max_pool_connections == 64
+        finally:
+            aws.close()
+
+    @pytest.mark.unit
+    def test_tables_bound_to_settings(self):
+        """テーブル名が Settings から設定されること"""
+        aws = AWSClients(Settings(dynamodb_exam_table="exam-test"))
+        try:
+            assert aws.exam_table.name == "exam-test"
+        finally:
+            aws.close()
+
+
+class TestPoolStats:
+    """接続プール利用状況の集計テスト"""
+
+    @pytest.mark.unit
+    def test_reused_connections_counted(self):
+        """リクエスト数と新規接続数の差分が再利用回数として集計されること"""
+        pools = {
+            "a": SimpleNamespace(num_requests=10, num_connections=2),
+            "b": SimpleNamespace(num_requests=3, num_connections=1),
+        }
+        client = SimpleNamespace(
+            _endpoint=SimpleNamespace(http_session=SimpleNamespace(_manager=SimpleNamespace(pools=pools)))
+        )
+
+        stats = _pool_stats(client)
+
+        assert stats == {"pools": 2, "requests": 13, "connections": 3, "reused": 10}
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("pools", [
+        None,
+        SimpleNamespace(keys=lambda: ["a"], get=lambda key: SimpleNamespace(num_requests="?", num_connections=1)),
+    ])
+    def test_unreadable_pools_reported_as_zero(self, pools):
+        """botocore の内部構造が変わって読めなくても例外を出さず 0 を返すこと"""
+        client = SimpleNamespace(
+            _endpoint=SimpleNamespace(http_session=SimpleNamespace(_manager=SimpleNamespace(pools=pools)))
+        )
+
+        assert _pool_stats(client) == {"pools": 0, "requests": 0, "connections": 0, "reused": 0}
+
+    @pytest.mark.unit
+    def test_metrics_requires_admin_token(self, client, monkeypatch):
+        """/metrics は管理トークンなしでは参照できないこと"""
+        monkeypatch.setattr(get_settings(), "admin_token", "secret")
+
+        assert client.get("/metrics").status_code == 403
+        assert client.get("/metrics", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    @pytest.mark.unit
+    def test_metrics_endpoint_exposes_pool_stats(self, client, monkeypatch):
+        """lifespan で生成したレジストリのプール統計が /metrics に含まれること"""
+        monkeypatch.setattr(get_settings(), "admin_token", "secret")
+        response = client.get("/metrics", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        pools = response.json()["gauges"]["aws_pools"]
+        assert set(pools) == {"dynamodb", "s3", "bedrock"}
+        assert pools["s3"]["reused"] == 0
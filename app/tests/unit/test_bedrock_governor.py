@@ -0,0 +1,247 @@
+"""
+単体テスト: Bedrock ガバナー
+AIMD による上限の調整・同時実行数の制限・再試行・サーキットブレーカー・状態と上限の共有を検証
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from services.bedrock_governor import (
+    BedrockGovernor,
+    BedrockUnavailableError,
+    DynamoDBGovernorState,
+    GovernorSnapshot,
+    InMemoryGovernorState,
+    bedrock_governor,
+)
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "InvokeModel")
+
+
+def make_governor(state=None, **kwargs):
+    options = dict(initial_limit=2, min_limit=1, max_limit=4, retry_base_seconds=0.001, sync_seconds=0)
+    options.update(kwargs)
+    return BedrockGovernor(state or InMemoryGovernorState(), **options)
+
+
+class FlakyModel:
+    """errors の順に例外を送出してから成功する invoke_model のスタブ"""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self.errors:
+                raise self.errors.pop(0)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return {"ok": True}
+
+
+class TestAIMD:
+    """上限の加算的増加・乗算的減少"""
+
+    @pytest.mark.unit
+    async def test_increase_after_window_and_halve_on_throttle(self):
+        """上限と同じ回数の成功で 1 増え、スロットリングで半分になること"""
+        governor = make_governor(max_attempts=1)
+        model = FlakyModel()
+
+        for _ in range(2):
+            await governor.invoke(model)
+        assert governor.limit == 3
+
+        model.errors = [client_error("ThrottlingException")] * 2
+        for _ in range(2):
+            with pytest.raises(BedrockUnavailableError):
+                await governor.invoke(model)
+        # 1 秒以内の連続したスロットリングでは 1 回しか下げない
+        assert governor.limit == 1.5
+
+    @pytest.mark.unit
+    async def test_slow_responses_hold_the_limit(self):
+        """平均応答時間が目標を超えている間は上限を増やさないこと"""
+        governor = make_governor(latency_target_seconds=0.001)
+        model = FlakyModel(delay=0.01)
+
+        for _ in range(4):
+            await governor.invoke(model)
+        assert governor.limit == 2
+
+    @pytest.mark.unit
+    async def test_limits_concurrent_calls(self):
+        """同時実行数は上限を超えないこと"""
+        governor = make_governor(max_limit=2)
+        model = FlakyModel(delay=0.05)
+
+        await asyncio.gather(*(governor.invoke(model) for _ in range(6)))
+
+        assert model.peak == 2
+        assert governor.in_flight == 0
+
+    @pytest.mark.unit
+    async def test_tasks_share_the_limit(self):
+        """状態を共有するタスクは上限をタスク数で分け合い、合計の同時実行数が上限を超えないこと"""
+        state = InMemoryGovernorState()
+        first = make_governor(state, max_limit=2)
+        second = make_governor(state, max_limit=2)
+        model = FlakyModel(delay=0.05)
+        await asyncio.gather(first._sync(), second._sync())
+
+        await asyncio.gather(*(governor.invoke(model) for governor in (first, second) for _ in range(3)))
+
+        assert model.peak == 2
+        assert first.stats()["tasks"] == 2 and first.stats()["capacity"] == 1
+
+    @pytest.mark.unit
+    async def test_idle_tasks_leave_the_share(self, monkeypatch):
+        """生存の記録が期限切れになったタスクは、上限を分け合うタスクから外れること"""
+        state = InMemoryGovernorState()
+        assert await state.heartbeat("idle", ttl_seconds=10) == 1
+        assert await state.heartbeat("busy", ttl_seconds=10) == 2
+
+        monkeypatch.setattr(time, "time", lambda now=time.time(): now + 11)
+        assert await state.heartbeat("busy", ttl_seconds=10) == 1
+
+
+class TestRetryAndCircuit:
+    """再試行とサーキットブレーカー"""
+
+    @pytest.mark.unit
+    async def test_retries_transient_errors_only(self):
+        """スロットリング・一時障害は再試行し、入力エラーはそのまま送出すること"""
+        governor = make_governor()
+        model = FlakyModel([client_error("ThrottlingException"), client_error("ServiceUnavailableException")])
+        assert await governor.invoke(model) == {"ok": True}
+        assert model.calls == 3
+
+        model = FlakyModel([client_error("ValidationException")])
+        with pytest.raises(ClientError):
+            await governor.invoke(model)
+        assert model.calls == 1
+
+    @pytest.mark.unit
+    async def test_circuit_opens_for_all_tasks(self):
+        """失敗が続くとサーキットが開き、状態を共有する別タスクも呼び出さずに失敗すること"""
+        state = InMemoryGovernorState()
+        first = make_governor(state, max_attempts=3, failure_threshold=3)
+        second = make_governor(state)
+        model = FlakyModel([client_error("ThrottlingException")] * 3)
+
+        with pytest.raises(BedrockUnavailableError):
+            await first.invoke(model)
+
+        with pytest.raises(BedrockUnavailableError) as excinfo:
+            await second.invoke(model)
+        assert model.calls == 3
+        assert excinfo.value.retry_after > 0
+        assert second.limit == 1
+
+    @pytest.mark.unit
+    async def test_waiter_fails_when_circuit_opened_elsewhere(self):
+        """枠を待っている間に別タスクでサーキットが開いたら、呼び出さずに失敗すること"""
+        state = InMemoryGovernorState()
+        governor = make_governor(state, initial_limit=1, max_limit=1)
+        other = make_governor(state, max_attempts=1, failure_threshold=1)
+        model = FlakyModel()
+
+        async with governor.stream(model):
+            waiting = asyncio.create_task(governor.invoke(model))
+            await asyncio.sleep(0.01)
+            with pytest.raises(BedrockUnavailableError):
+                await other.invoke(FlakyModel([client_error("ThrottlingException")]))
+
+        with pytest.raises(BedrockUnavailableError):
+            await waiting
+        assert model.calls == 1
+        assert governor.in_flight == 0
+
+    @pytest.mark.unit
+    async def test_stream_holds_slot_until_exit(self):
+        """ストリームはコンテキストを抜けるまで枠を保持すること"""
+        governor = make_governor(initial_limit=1, max_limit=1)
+
+        async with governor.stream(FlakyModel()):
+            assert governor.in_flight == 1
+            waiting = asyncio.create_task(governor.invoke(FlakyModel()))
+            await asyncio.sleep(0.01)
+            assert not waiting.done()
+        assert await waiting == {"ok": True}
+        assert governor.in_flight == 0
+
+
+class TestDynamoDBGovernorState:
+    """DynamoDBGovernorState の楽観ロックとタスクの生存記録"""
+
+    @pytest.mark.unit
+    async def test_retries_on_conflict(self):
+        """条件付き書き込みが競合したら読み直して更新すること"""
+        table = MagicMock()
+        table.get_item.side_effect = [
+            {"Item": {"governor_id": "bedrock", "limit": 4, "open_until": 0, "version": 1}},
+            {"Item": {"governor_id": "bedrock", "limit": 3, "open_until": 0, "version": 2}},
+        ]
+        table.put_item.side_effect = [client_error("ConditionalCheckFailedException"), {}]
+        state = DynamoDBGovernorState(table)
+
+        result = await state.adjust(lambda s: GovernorSnapshot(limit=s.limit / 2), GovernorSnapshot(limit=8))
+
+        assert result.limit == 1.5
+        put = table.put_item.call_args.kwargs
+        assert put["ExpressionAttributeValues"] == {":version": 2}
+        assert put["Item"]["version"] == 3
+
+    @pytest.mark.unit
+    async def test_heartbeat_counts_live_tasks_and_removes_expired(self):
+        """生存中のタスクを数え、期限切れのタスクの記録を条件付きで消すこと"""
+        now = time.time()
+        table = MagicMock()
+        table.update_item.side_effect = [
+            {"Attributes": {"governor_id": "bedrock#members", "m_a": now + 10, "m_b": now + 5, "m_c": now - 1}},
+            {},
+        ]
+        state = DynamoDBGovernorState(table)
+
+        assert await state.heartbeat("a", ttl_seconds=10) == 2
+
+        remove = table.update_item.call_args.kwargs
+        assert remove["UpdateExpression"] == "REMOVE #m0"
+        assert remove["ExpressionAttributeNames"] == {"#m0": "m_c"}
+        assert remove["ConditionExpression"] == "#m0 <= :now"
+
+
+class TestUnavailableResponse:
+    """Bedrock が使えないときの API レスポンス"""
+
+    @pytest.mark.unit
+    async def test_rewrite_returns_503(self, async_client, stub_aws, monkeypatch):
+        """再試行しても混雑が続けば 500 ではなく Retry-After 付きの 503 を返すこと"""
+        monkeypatch.setattr(bedrock_governor, "retry_base_seconds", 0.001)
+        stub_aws.bedrock.invoke_model.side_effect = client_error("ThrottlingException")
+        try:
+            response = await async_client.post(
+                "/api/modules/rewrite", json={"text": "テスト", "category": "背景"}
+            )
+        finally:
+            bedrock_governor.configure(InMemoryGovernorState())
+
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+        assert stub_aws.bedrock.invoke_model.call_count == bedrock_governor.max_attempts
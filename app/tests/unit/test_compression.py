@@ -0,0 +1,174 @@
+"""
+単体テスト: レスポンス圧縮ミドルウェア
+Accept-Encoding のネゴシエーション・サイズ閾値・SSE の素通しを検証
+"""
+
+import asyncio
+import gzip
+import json
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from middleware import CompressionMiddleware, brotli, select_encoding
+
+LARGE_PAYLOAD = {"problem_content": "情報システム戦略の策定について述べよ。" * 200}
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return JSONResponse(LARGE_PAYLOAD, headers={"ETag": '"v1"'})
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return app
+
+
+async def collect(app, path, accept_encoding, gate=None):
+    """ASGI を直接呼び出し、送信メッセージをそのまま記録する"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if gate is not None and message["type"] == "http.response.body" and message.get("more_body"):
+            gate.set()
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    await app(scope, receive, send)
+    return messages
+
+
+class TestSelectEncoding:
+    """Accept-Encoding ネゴシエーションのテスト"""
+
+    @pytest.mark.unit
+    def test_prefers_brotli_when_available(self):
+        expected = "br" if brotli is not None else "gzip"
+        assert select_encoding("gzip, deflate, br") == expected
+
+    @pytest.mark.unit
+    def test_respects_q_values(self):
+        assert select_encoding("br;q=0, gzip") == "gzip"
+        assert select_encoding("identity") is None
+        assert select_encoding("") is None
+
+
+class TestCompressionMiddleware:
+    """ミドルウェアの動作テスト"""
+
+    @pytest.mark.unit
+    async def test_large_json_gzipped_with_weak_etag(self):
+        """閾値以上の JSON が gzip 圧縮され、ETag が弱い ETag になること"""
+        transport = httpx.ASGITransport(app=make_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == 'W/"v1"'
+        assert int(response.headers["content-length"]) < len(json.dumps(LARGE_PAYLOAD, ensure_ascii=False).encode())
+        assert response.json() == LARGE_PAYLOAD
+
+    @pytest.mark.unit
+    @pytest.mark.skipif(brotli is None, reason="brotli 未導入")
+    async def test_brotli(self):
+        """br を受け入れるクライアントには brotli で返すこと"""
+        messages = await collect(make_app(), "/large", "br")
+        headers = dict(messages[0]["headers"])
+
+        assert headers[b"content-encoding"] == b"br"
+        assert json.loads(brotli.decompress(messages[1]["body"])) == LARGE_PAYLOAD
+
+    @pytest.mark.unit
+    async def test_small_and_unaccepted_responses_untouched(self):
+        """閾値未満、または圧縮を受け入れないクライアントには非圧縮で返すこと"""
+        transport = httpx.ASGITransport(app=make_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+            identity = await client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in small.headers
+        assert "content-encoding" not in identity.headers
+        assert identity.headers["etag"] == '"v1"'
+
+    @pytest.mark.unit
+    async def test_event_stream_passed_through_unbuffered(self):
+        """SSE は圧縮せず、チャンクが生成されるたびに送信されること"""
+        gate = asyncio.Event()
+
+        async def events():
+            yield "data: first\n\n"
+            # 最初のチャンクが送信されるまで次を生成しない（バッファリングされるとデッドロック）
+            await asyncio.wait_for(gate.wait(), timeout=1)
+            yield "data: second\n\n"
+
+        async def app(scope, receive, send):
+            await StreamingResponse(events(), media_type="text/event-stream")(scope, receive, send)
+
+        messages = await collect(CompressionMiddleware(app, minimum_size=0), "/chat", "gzip", gate)
+
+        assert b"content-encoding" not in dict(messages[0]["headers"])
+        bodies = [m["body"] for m in messages[1:] if m.get("body")]
+        assert bodies == [b"data: first\n\n", b"data: second\n\n"]
+
+    @pytest.mark.unit
+    async def test_streamed_json_flushed_per_chunk(self):
+        """圧縮対象のストリーミング応答は各チャンクを単独で展開できるよう flush されること"""
+        async def chunks():
+            yield "[" + "1," * 1000
+            yield "2]"
+
+        async def app(scope, receive, send):
+            await StreamingResponse(chunks(), media_type="application/json")(scope, receive, send)
+
+        messages = await collect(CompressionMiddleware(app, minimum_size=0), "/stream", "gzip")
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        first = decoder.decompress(messages[1]["body"])
+        assert first == ("[" + "1," * 1000).encode()
+        whole = gzip.decompress(b"".join(m.get("body", b"") for m in messages[1:]))
+        assert json.loads(whole)[-1] == 2
+
+    @pytest.mark.unit
+    async def test_not_modified_mirrors_weak_etag(self):
+        """弱い ETag での再検証には弱い ETag、強い ETag での再検証には強い ETag を返すこと"""
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", b'"v1"')]})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def revalidate(if_none_match):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {"type": "http", "headers": [
+                (b"accept-encoding", b"gzip"), (b"if-none-match", if_none_match),
+            ]}
+            await CompressionMiddleware(app)(scope, None, send)
+            return dict(messages[0]["headers"])[b"etag"]
+
+        assert await revalidate(b'W/"v1"') == b'W/"v1"'
+        assert await revalidate(b'"v1"') == b'"v1"'
@@ -0,0 +1,135 @@
+"""
+単体テスト: 論文の機械的チェック
+章立て・定量データ・論理的説明・企業名/システム名の検出、条件判定、API と採点プロンプトへの反映、規則の版を検証
+"""
+
+import json
+import re
+from unittest.mock import MagicMock
+
+import pytest
+
+from services import essay_analysis
+from services.essay_analysis import ANALYSIS_VERSION, analysis_version, analyze_answer, analyze_answers, analyze_many
+from services.scoring import SCORING_PROMPT_VERSION, score_submission_answers, scoring_prompt_version
+
+
+class TestAnalyzeAnswer:
+    """analyze_answer"""
+
+    @pytest.mark.unit
+    def test_counts_rank_a_elements(self):
+        """見出し・単位付き数値・「なぜならば」・企業名/システム名を数えること"""
+        text = (
+            "第1章 事業の概要\n"
+            "1-1 対象企業\n"
+            "Ａ社は従業員５００名、売上高300億円の製造業である。\n"
+            "株式会社サンプル物流と連携し、在庫管理システムとERPを刷新した。\n"
+            "なぜならば、納期遵守率が80%に留まっていたからである。その理由は属人化にある。\n"
+        )
+        result = analyze_answer(text)
+
+        assert result.headings == 2
+        assert result.quantitative_data == 3
+        assert result.reasoning_phrases == 2
+        assert result.named_entities == ["A社", "株式会社サンプル", "ERP"]
+        assert result.meets_min_length is False
+
+    @pytest.mark.unit
+    def test_plain_text_has_nothing(self):
+        """見出しも数値もない文章はすべて 0 になること"""
+        result = analyze_answer("業務を改善した。とても良くなった。")
+
+        assert (result.headings, result.quantitative_data, result.reasoning_phrases) == (0, 0, 0)
+        assert result.named_entities == []
+
+
+class TestAnalyzeAnswers:
+    """analyze_answers の条件判定"""
+
+    @pytest.mark.unit
+    def test_checks_against_rank_a_conditions(self, sample_answers_high_score, sample_answers_low_score):
+        """高評価サンプルは章立て・固有名・定量データを満たし、低評価サンプルは何も満たさないこと"""
+        high = analyze_answers(sample_answers_high_score)
+        low = analyze_answers(sample_answers_low_score)
+
+        assert high.checks["headings"] and high.checks["named_entities"] and high.checks["quantitative_data"]
+        assert not any(low.checks.values())
+        assert set(high.to_dict()["questions"]) == {"設問ア", "設問イ", "設問ウ"}
+
+    @pytest.mark.unit
+    def test_length_and_reasoning_thresholds(self):
+        """全設問 800 字以上・「なぜならば」合計 3 箇所以上で条件を満たすこと"""
+        long_text = "なぜならば" + "あ" * 800
+        assert analyze_answers({"設問ア": long_text, "設問イ": long_text, "設問ウ": long_text}).checks == {
+            "headings": False,
+            "named_entities": False,
+            "quantitative_data": False,
+            "reasoning_phrases": True,
+            "min_length": True,
+        }
+        assert not analyze_answers({"設問ア": long_text, "設問イ": "短い"}).checks["min_length"]
+
+    @pytest.mark.unit
+    def test_analyze_many_matches_single(self, sample_answers_high_score):
+        """一括処理の結果は 1 件ずつの結果と同じであること"""
+        batch = analyze_many([sample_answers_high_score] * 3)
+        assert [a.to_dict() for a in batch] == [analyze_answers(sample_answers_high_score).to_dict()] * 3
+
+
+class TestAnalyzeEndpoint:
+    """POST /api/answers/analyze"""
+
+    @pytest.mark.unit
+    async def test_returns_analysis(self, async_client, sample_answers_high_score):
+        """Bedrock を呼ばずに設問ごとの集計と条件判定を返すこと"""
+        response = await async_client.post("/api/answers/analyze", json={"answers": sample_answers_high_score})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["checks"]["headings"] is True
+        assert body["questions"]["設問ア"]["headings"] > 0
+
+    @pytest.mark.unit
+    async def test_rejects_unknown_question(self, async_client):
+        """未知の設問キーは 422 を返すこと"""
+        response = await async_client.post("/api/answers/analyze", json={"answers": {"設問エ": "回答"}})
+        assert response.status_code == 422
+
+
+class TestScoringPromptFacts:
+    """採点プロンプトへの機械的チェック結果の反映"""
+
+    @pytest.mark.unit
+    async def test_prompt_contains_precomputed_facts(self):
+        """single モードのプロンプトに設問ごとの集計結果が含まれること"""
+        aws = MagicMock()
+        aws.submission_table.get_item.return_value = {
+            "Item": {"submission_id": "sub-1", "answers": {"設問ア": "第1章 概要\nA社の売上は10億円である。"}}
+        }
+        criteria = [{"criterion": "充足度", "weight": 0.15, "points": 50}]
+        result = {
+            "question_breakdown": {"設問ア": {"level": "C", "question_score": 50, "criteria_scores": criteria}},
+            "aggregate_score": 50,
+            "final_rank": "C",
+        }
+        body = json.dumps({"content": [{"text": json.dumps(result, ensure_ascii=False)}]})
+        aws.bedrock.invoke_model.return_value = {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+
+        await score_submission_answers(aws, "sub-1", mode="single")
+
+        prompt = json.loads(aws.bedrock.invoke_model.call_args.kwargs["body"])["messages"][0]["content"]
+        assert "## 機械的チェックの結果" in prompt
+        assert "- 設問ア: " in prompt and "見出し 1個、定量データ 1箇所" in prompt and "A社" in prompt
+
+    @pytest.mark.unit
+    def test_rule_changes_change_scoring_version(self, monkeypatch):
+        """機械的チェックの規則が変わると、採点結果キャッシュのキーに使う版も変わること"""
+        assert analysis_version() == ANALYSIS_VERSION
+
+        monkeypatch.setattr(essay_analysis, "REASONING_PATTERN", re.compile(r"なぜならば?"))
+        changed = analysis_version()
+        monkeypatch.setattr(essay_analysis, "MIN_WORDS_PER_QUESTION", 600)
+
+        assert len({ANALYSIS_VERSION, changed, analysis_version()}) == 3
+        assert scoring_prompt_version(changed) != SCORING_PROMPT_VERSION
@@ -0,0 +1,161 @@
+"""
+単体テスト: 試験カタログキャッシュ
+TTL・stale-while-revalidate・無効化エンドポイントを検証
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from config import get_settings
+from main import app
+from services.catalog import ExamCatalog, get_exam_catalog
+from services.snapshot import get_corpus_snapshot
+
+ITEMS = [
+    {"PK": "EXAM#IS", "SK": "YEAR#2023SPRING#ESSAY#Q1", "title": "旧問題", "year_term": "2023春"},
+    {"PK": "EXAM#IS", "SK": "YEAR#2024SPRING#ESSAY#Q1", "title": "新問題", "year_term": "2024春"},
+]
+
+
+class CountingLoader:
+    """呼び出し回数を数えるカタログローダー"""
+
+    def __init__(self, items=None):
+        self.calls = 0
+        self.items = items if items is not None else list(ITEMS)
+
+    async def __call__(self, exam_type):
+        self.calls += 1
+        return list(self.items)
+
+
+class TestExamCatalog:
+    """ExamCatalog のキャッシュ動作テスト"""
+
+    @pytest.mark.unit
+    async def test_fresh_entry_served_from_memory(self):
+        """TTL 内は DynamoDB を再度呼ばないこと"""
+        loader = CountingLoader()
+        catalog = ExamCatalog(loader, ttl_seconds=60, stale_seconds=60)
+
+        first = await catalog.get("IS")
+        second = await catalog.get("IS")
+
+        assert loader.calls == 1
+        assert second is first
+        assert [e["title"] for e in first.exams] == ["新問題", "旧問題"]
+
+    @pytest.mark.unit
+    async def test_stale_entry_returned_and_refreshed_in_background(self):
+        """TTL 経過後は古い一覧を即座に返し、バックグラウンドで再取得すること"""
+        loader = CountingLoader()
+        catalog = ExamCatalog(loader, ttl_seconds=0, stale_seconds=60)
+        stale = await catalog.get("IS")
+        loader.items = ITEMS[:1]
+
+        served = await catalog.get("IS")
+        assert served is stale
+        await asyncio.sleep(0.01)
+
+        catalog.ttl_seconds = 60
+        refreshed = await catalog.get("IS")
+        assert loader.calls >= 2
+        assert len(refreshed.exams) == 1
+        assert refreshed.version != stale.version
+
+    @pytest.mark.unit
+    async def test_expired_entry_reloaded_synchronously(self):
+        """stale 期間も過ぎた場合は再取得を待つこと"""
+        loader = CountingLoader()
+        catalog = ExamCatalog(loader, ttl_seconds=0, stale_seconds=0)
+
+        await catalog.get("IS")
+        await catalog.get("IS")
+
+        assert loader.calls == 2
+
+    @pytest.mark.unit
+    async def test_version_stable_for_same_content(self):
+        """内容が同じなら再取得しても版が変わらないこと"""
+        catalog = ExamCatalog(CountingLoader(), ttl_seconds=60, stale_seconds=0)
+
+        first = await catalog.get("IS")
+        second = await catalog.refresh("IS")
+
+        assert first.version == second.version
+
+
+class TestCatalogInvalidateEndpoint:
+    """キャッシュ無効化エンドポイントのテスト"""
+
+    @pytest.fixture
+    def catalog(self, client):
+        catalog = ExamCatalog(CountingLoader(), ttl_seconds=60, stale_seconds=0)
+        app.dependency_overrides[get_exam_catalog] = lambda: catalog
+        yield catalog
+        app.dependency_overrides.pop(get_exam_catalog, None)
+
+    @pytest.fixture
+    def admin_token(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "admin_token", "secret")
+        return "secret"
+
+    @pytest.mark.unit
+    def test_exams_served_from_catalog(self, client, catalog):
+        """/api/exams と htmx パーシャルが同じキャッシュから返ること"""
+        assert client.get("/api/exams", params={"exam_type": "IS"}).status_code == 200
+        assert client.get("/api/exams/partial/list", params={"exam_type": "IS"}).status_code == 200
+
+        assert catalog._loader.calls == 1
+
+    @pytest.mark.unit
+    def test_invalidate_requires_token(self, client, catalog, admin_token):
+        """管理トークンなしでは無効化できないこと"""
+        response = client.post("/api/admin/cache/exams/invalidate")
+
+        assert response.status_code == 403
+
+    @pytest.mark.unit
+    def test_invalidate_disabled_without_configured_token(self, client, catalog):
+        """ADMIN_TOKEN 未設定時は管理エンドポイントが無効であること"""
+        response = client.post(
+            "/api/admin/cache/exams/invalidate", headers={"X-Admin-Token": ""}
+        )
+
+        assert response.status_code == 403
+
+    @pytest.mark.unit
+    def test_invalidate_forces_reload(self, client, catalog, admin_token):
+        """無効化後の次回アクセスで再取得されること"""
+        client.get("/api/exams", params={"exam_type": "IS"})
+
+        response = client.post(
+            "/api/admin/cache/exams/invalidate",
+            params={"exam_type": "IS"},
+            headers={"X-Admin-Token": admin_token},
+        )
+        client.get("/api/exams", params={"exam_type": "IS"})
+
+        assert response.status_code == 200
+        assert response.json() == {"invalidated": ["IS"], "snapshot_released": []}
+        assert catalog._loader.calls == 2
+
+    @pytest.mark.unit
+    def test_invalidate_releases_snapshot_catalog(self, client, catalog, admin_token):
+        """スナップショットから返していた区分は、無効化でスナップショットから外すこと"""
+        snapshot = MagicMock()
+        snapshot.release_catalogs.return_value = ["IS"]
+        app.dependency_overrides[get_corpus_snapshot] = lambda: snapshot
+        try:
+            response = client.post(
+                "/api/admin/cache/exams/invalidate",
+                params={"exam_type": "IS"},
+                headers={"X-Admin-Token": admin_token},
+            )
+        finally:
+            app.dependency_overrides.pop(get_corpus_snapshot, None)
+
+        assert response.json()["snapshot_released"] == ["IS"]
+        snapshot.release_catalogs.assert_called_once_with("IS")
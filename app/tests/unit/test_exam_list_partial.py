@@ -0,0 +1,79 @@
+"""
+単体テスト: 試験一覧パーシャル
+テンプレート描画・エスケープ・レンダリング結果キャッシュを検証
+"""
+
+import pytest
+
+from main import app
+from services.catalog import ExamCatalog, get_exam_catalog
+from services.metrics import metrics
+from templating import exam_list_cache
+
+ITEMS = [
+    {"PK": "EXAM#IS", "SK": "YEAR#2024SPRING#ESSAY#Q1", "title": "<b>問1</b>", "year_term": "2024春"},
+]
+
+
+class MutableLoader:
+    def __init__(self):
+        self.items = list(ITEMS)
+
+    async def __call__(self, exam_type):
+        return list(self.items)
+
+
+class TestExamListPartial:
+    """/api/exams/partial/list のテスト"""
+
+    @pytest.fixture
+    def catalog(self, client):
+        exam_list_cache.clear()
+        catalog = ExamCatalog(MutableLoader(), ttl_seconds=60, stale_seconds=0)
+        app.dependency_overrides[get_exam_catalog] = lambda: catalog
+        yield catalog
+        app.dependency_overrides.pop(get_exam_catalog, None)
+        exam_list_cache.clear()
+
+    @pytest.mark.unit
+    def test_renders_cards_with_escaping(self, client, catalog):
+        """タイトルがエスケープされ、problem_id が URL エンコードされること"""
+        html = client.get("/api/exams/partial/list", params={"exam_type": "IS"}).text
+
+        assert "&lt;b&gt;問1&lt;/b&gt;" in html
+        assert "/exam/IS/YEAR%232024SPRING%23ESSAY%23Q1" in html
+        assert "解答" in html
+
+    @pytest.mark.unit
+    def test_select_design_mode(self, client, catalog):
+        """設計選択モードでは設計画面へのリンクのみを描画すること"""
+        html = client.get(
+            "/api/exams/partial/list", params={"exam_type": "IS", "mode": "select_design"}
+        ).text
+
+        assert "/design/IS/YEAR%232024SPRING%23ESSAY%23Q1" in html
+        assert "/exam/IS/" not in html
+
+    @pytest.mark.unit
+    def test_rendered_output_cached_per_catalog_version(self, client, catalog):
+        """同じカタログ版では再描画せず、内容が変われば描画し直すこと"""
+        metrics.reset()
+        client.get("/api/exams/partial/list", params={"exam_type": "IS"})
+        client.get("/api/exams/partial/list", params={"exam_type": "IS"})
+        assert metrics.counter("fragment_cache.exam_list.miss") == 1
+        assert metrics.counter("fragment_cache.exam_list.hit") == 1
+
+        catalog._loader.items = [dict(ITEMS[0], title="改訂版")]
+        catalog.invalidate("IS")
+        html = client.get("/api/exams/partial/list", params={"exam_type": "IS"}).text
+
+        assert "改訂版" in html
+        assert metrics.counter("fragment_cache.exam_list.miss") == 2
+
+    @pytest.mark.unit
+    def test_empty_catalog(self, client, catalog):
+        """試験がない場合は案内文を返すこと"""
+        catalog._loader.items = []
+        html = client.get("/api/exams/partial/list", params={"exam_type": "ST"}).text
+
+        assert "該当する試験がありません" in html
@@ -0,0 +1,124 @@
+"""
+単体テスト: HTTP 条件付きキャッシュ
+試験データ API の ETag / If-None-Match / 304 応答を検証
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.http_cache import etag_matches, make_etag
+from templating import exam_list_cache
+
+PROBLEM_ID = "YEAR#2024SPRING#ESSAY#Q1"
+EXAM_ITEM = {
+    "PK": "EXAM#IS",
+    "SK": PROBLEM_ID,
+    "title": "テスト問題",
+    "year_term": "2024春",
+    "s3_uri": "s3://bucket/IS/is_essay.json",
+}
+PROBLEM_BODY = json.dumps(
+    [{"question_id": f"IS#{PROBLEM_ID}", "problemContent": "本文" * 2000}], ensure_ascii=False
+).encode("utf-8")
+
+
+@pytest.fixture
+def exam_aws(stub_aws):
+    """カタログ 1 件・問題ドキュメント 1 件を返す AWS スタブ"""
+    exam_list_cache.clear()
+    stub_aws.exam_table.query.return_value = {"Items": [EXAM_ITEM]}
+    stub_aws.s3.get_object.side_effect = lambda **kwargs: {
+        "Body": MagicMock(read=lambda: PROBLEM_BODY),
+        "ETag": '"s3-v1"',
+    }
+    yield stub_aws
+    exam_list_cache.clear()
+
+
+class TestEtagHelpers:
+    """ETag ヘルパーのテスト"""
+
+    @pytest.mark.unit
+    def test_make_etag_is_stable_and_quoted(self):
+        """同じ構成要素からは同じ強い ETag が生成されること"""
+        etag = make_etag("detail", "IS", "v1")
+        assert etag == make_etag("detail", "IS", "v1")
+        assert etag != make_etag("detail", "IS", "v2")
+        assert etag.startswith('"') and etag.endswith('"')
+
+    @pytest.mark.unit
+    def test_etag_matches_lists_weak_and_wildcard(self):
+        """カンマ区切り・W/ 付き・* の If-None-Match を扱えること"""
+        assert etag_matches('"a", "b"', '"b"')
+        assert etag_matches('W/"b"', '"b"')
+        assert etag_matches("*", '"b"')
+        assert not etag_matches('"a"', '"b"')
+        assert not etag_matches(None, '"b"')
+
+
+class TestConditionalRequests:
+    """エンドポイントの 304 応答テスト"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("path, params", [
+        ("/api/exams", {"exam_type": "IS"}),
+        ("/api/exams/detail", {"exam_type": "IS", "problem_id": PROBLEM_ID}),
+        ("/api/exams/partial/list", {"exam_type": "IS"}),
+    ])
+    def test_revalidation_returns_304_without_body(self, client, exam_aws, path, params):
+        """If-None-Match が一致すれば本文なしの 304 を返し、転送量を削減すること"""
+        first = client.get(path, params=params)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert "max-age" in first.headers["Cache-Control"]
+
+        second = client.get(path, params=params, headers={"If-None-Match": etag})
+
+        assert second.status_code == 304
+        assert second.headers["ETag"] == etag
+        assert second.content == b""
+        assert len(first.content) - len(second.content) > 0
+
+    @pytest.mark.unit
+    def test_detail_304_does_not_touch_backends(self, client, exam_aws):
+        """キャッシュが温まっていれば 304 応答で DynamoDB / S3 を呼ばないこと"""
+        params = {"exam_type": "IS", "problem_id": PROBLEM_ID}
+        first = client.get("/api/exams/detail", params=params)
+        assert len(first.content) > 10_000
+        query_calls = exam_aws.exam_table.query.call_count
+        s3_calls = exam_aws.s3.get_object.call_count
+
+        second = client.get(
+            "/api/exams/detail", params=params, headers={"If-None-Match": first.headers["ETag"]}
+        )
+
+        assert second.status_code == 304
+        assert exam_aws.exam_table.query.call_count == query_calls
+        assert exam_aws.s3.get_object.call_count == s3_calls
+        exam_aws.exam_table.get_item.assert_not_called()
+
+    @pytest.mark.unit
+    def test_stale_etag_gets_full_response(self, client, exam_aws):
+        """一致しない ETag には 200 で本文を返すこと"""
+        response = client.get(
+            "/api/exams/detail",
+            params={"exam_type": "IS", "problem_id": PROBLEM_ID},
+            headers={"If-None-Match": '"outdated"'},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["problem_content"].startswith("本文")
+
+    @pytest.mark.unit
+    def test_failed_s3_fetch_not_cacheable(self, client, exam_aws):
+        """S3 取得失敗中の応答には ETag を付与しないこと"""
+        exam_aws.s3.get_object.side_effect = RuntimeError("S3 unavailable")
+
+        response = client.get(
+            "/api/exams/detail", params={"exam_type": "IS", "problem_id": PROBLEM_ID}
+        )
+
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
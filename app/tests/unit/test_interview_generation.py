@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock
 from datetime import datetime
 import json
 
@@ -24,32 +24,19 @@ MOCK_PROPOSAL_JSON = {
 class TestInterviewServiceGeneration:
     
     @pytest.fixture
-    def mock_dynamodb(self):
-        with patch("boto3.resource") as mock:
-            yield mock
+    def service(self):
+        # AWS client registry is replaced with a mock
+        return InterviewService(MagicMock())
 
-    @pytest.fixture
-    def mock_bedrock(self):
-        with patch("boto3.client") as mock:
-            yield mock
-
-    @pytest.fixture
-    def service(self, mock_dynamodb, mock_bedrock):
-        # Reset singleton for testing
-        InterviewService._dynamodb_resource = None
-        InterviewService._bedrock_runtime = None
-        InterviewService._table = None
-        return InterviewService()
-
-    def test_generate_design_proposal_success(self, service):
+    async def test_generate_design_proposal_success(self, service):
         # Mock get_session
         mock_session = InterviewSession(
             user_id=MOCK_USER_ID,
             exam_id=MOCK_EXAM_ID,
             history=MOCK_HISTORY
         )
-        service.get_session = MagicMock(return_value=mock_session)
-        service.update_proposal = MagicMock()
+        service.get_session = AsyncMock(return_value=mock_session)
+        service.update_proposal = AsyncMock()
 
         # Mock Bedrock response
         mock_response_body = {
@@ -60,7 +47,7 @@ class TestInterviewServiceGeneration:
         }
 
         # Execute
-        proposal = service.generate_design_proposal(MOCK_USER_ID, MOCK_EXAM_ID)
+        proposal = await service.generate_design_proposal(MOCK_USER_ID, MOCK_EXAM_ID)
 
         # Verify
         assert isinstance(proposal, DesignProposal)
@@ -73,17 +60,17 @@ class TestInterviewServiceGeneration:
         assert "logistics" in json.loads(call_args.kwargs["body"])["messages"][0]["content"].lower()
         
         # Verify update_proposal called
-        service.update_proposal.assert_called_once_with(MOCK_USER_ID, MOCK_EXAM_ID, proposal)
+        service.update_proposal.assert_awaited_once_with(MOCK_USER_ID, MOCK_EXAM_ID, proposal)
 
-    def test_generate_design_proposal_markdown_stripping(self, service):
+    async def test_generate_design_proposal_markdown_stripping(self, service):
         # Mock get_session
         mock_session = InterviewSession(
             user_id=MOCK_USER_ID,
             exam_id=MOCK_EXAM_ID,
             history=MOCK_HISTORY
         )
-        service.get_session = MagicMock(return_value=mock_session)
-        service.update_proposal = MagicMock()
+        service.get_session = AsyncMock(return_value=mock_session)
+        service.update_proposal = AsyncMock()
 
         # Mock Bedrock response with markdown code blocks
         json_str = json.dumps(MOCK_PROPOSAL_JSON)
@@ -97,14 +84,14 @@ class TestInterviewServiceGeneration:
         }
 
         # Execute
-        proposal = service.generate_design_proposal(MOCK_USER_ID, MOCK_EXAM_ID)
+        proposal = await service.generate_design_proposal(MOCK_USER_ID, MOCK_EXAM_ID)
 
         # Verify
         assert proposal.theme == "Logistics Optimization"
 
-    def test_generate_design_proposal_session_not_found(self, service):
-        service.get_session = MagicMock(return_value=None)
+    async def test_generate_design_proposal_session_not_found(self, service):
+        service.get_session = AsyncMock(return_value=None)
         
         with pytest.raises(ValueError, match="Session not found"):
-            service.generate_design_proposal(MOCK_USER_ID, MOCK_EXAM_ID)
+            await service.generate_design_proposal(MOCK_USER_ID, MOCK_EXAM_ID)
 
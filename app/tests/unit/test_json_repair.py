@@ -0,0 +1,204 @@
+"""
+単体テスト: モデル出力の JSON 補修
+末尾のカンマ・閉じていない文字列・打ち切り・紛れ込んだ括弧の補修、必須項目・設問の検証、
+補修できない・打ち切られた出力の再生成を検証
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from models.interview import DesignProposal, DesignProposalOutput
+from models.scoring import ScoringOutput
+from services.json_stream import IncrementalJSONParser, JSONExtractionError, extract_json, repair_json
+from services.metrics import metrics
+from services.scoring import SCORING_CRITERIA, SCORING_MODE_PER_QUESTION, ScoringError, score_answers
+
+CRITERIA = [{"criterion": name, "weight": weight, "points": 70, "comment": "良い"} for name, weight in SCORING_CRITERIA]
+RESULT = {
+    "question_breakdown": {"設問ア": {"level": "B", "question_score": 70, "criteria_scores": CRITERIA}},
+    "aggregate_score": 70,
+    "final_rank": "B",
+}
+
+
+class TestRepairJSON:
+    """repair_json"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("fragment, expected", [
+        ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+        ('{"a": 1, "comment": "途中で切れ', {"a": 1, "comment": "途中で切れ"}),
+        ('{"a": {"b": [1, 2', {"a": {"b": [1, 2]}}),
+        ('{"a": 1, "commen', {"a": 1}),
+        ('{"a": 1, "b": tr', {"a": 1}),
+        ('{"a": 1, "b":', {"a": 1}),
+        ('{"a": "改行\nを含む"} 以降は無視 }', {"a": "改行\nを含む"}),
+    ])
+    def test_repairs_common_defects(self, fragment, expected):
+        """末尾のカンマ・途中で切れた文字列やキー・入れ子の打ち切りを補修すること"""
+        assert repair_json(fragment)[0] == expected
+
+    @pytest.mark.unit
+    def test_streaming_parser_finishes_truncated_output(self):
+        """ストリーミングの途中で終わっても、閉じた設問は通知済みで、全体は補修して得られること"""
+        parser = IncrementalJSONParser(watch=[("question_breakdown",)])
+        text = '{"question_breakdown": {"設問ア": {"points": 80,}, "設問イ": {"points": 7'
+
+        completed = parser.feed(text)
+
+        assert completed == [(("question_breakdown", "設問ア"), {"points": 80})]
+        assert parser.finish() == {"question_breakdown": {"設問ア": {"points": 80}, "設問イ": {"points": 7}}}
+        assert "truncated" in parser.repairs
+
+
+class TestExtractJSON:
+    """extract_json"""
+
+    @pytest.mark.unit
+    def test_skips_stray_braces_and_validates(self):
+        """文章中の括弧やコードブロックを読み飛ばし、Pydantic モデルで検証すること"""
+        metrics.reset()
+        content = '設計書は {下記} のとおりです。\n```json\n{"theme": "物流", "structure": [],}\n```\n以上 }'
+
+        proposal = extract_json(content, DesignProposal, operation="test")
+
+        assert proposal.theme == "物流"
+        assert metrics.counter("json_extract.test.salvaged") == 1
+        assert metrics.counter("json_extract.test.repair.stray_brace") == 1
+        assert metrics.counter("json_extract.test.repair.trailing_comma") == 1
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("content", ["JSON はありません", '{"theme": ["物流"]}'])
+    def test_unsalvageable_or_invalid_output_fails(self, content):
+        """補修しても取り出せない出力・スキーマに合わない出力は失敗として記録すること"""
+        metrics.reset()
+
+        with pytest.raises(JSONExtractionError):
+            extract_json(content, DesignProposal, operation="test")
+        assert metrics.counter("json_extract.test.failed") == 1
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("content", [
+        # 打ち切られて設問ア以外が欠けた出力（補修すれば JSON としては読める）
+        json.dumps(RESULT, ensure_ascii=False)[:120],
+        # 採点と無関係な JSON
+        '{"message": "採点できません"}',
+        # ランク・点数が範囲外
+        json.dumps({**RESULT, "final_rank": "S", "aggregate_score": 120}, ensure_ascii=False),
+        # 観点別の点数がない
+        json.dumps({**RESULT, "question_breakdown": {"設問ア": {"level": "B", "question_score": 70}}}),
+    ])
+    def test_incomplete_scoring_output_is_rejected(self, content):
+        """欠けた・無関係な採点結果は既定値で埋めずに失敗とすること"""
+        with pytest.raises(JSONExtractionError):
+            extract_json(content, ScoringOutput, operation="test")
+
+    @pytest.mark.unit
+    def test_missing_question_is_rejected(self):
+        """採点を依頼した設問の評価がない出力は失敗とすること"""
+        content = json.dumps(RESULT, ensure_ascii=False)
+
+        assert extract_json(content, ScoringOutput, context={"questions": ["設問ア"]}).final_rank == "B"
+        with pytest.raises(JSONExtractionError):
+            extract_json(content, ScoringOutput, context={"questions": ["設問ア", "設問イ"]})
+
+    @pytest.mark.unit
+    def test_truncated_output_is_salvaged_if_complete(self):
+        """max_tokens で打ち切られても、補修して検証を通る出力は使い、salvaged として記録すること"""
+        metrics.reset()
+        content = json.dumps({**RESULT, "feedback": "全体として良い"}, ensure_ascii=False)[:-8]
+
+        output = extract_json(
+            content, ScoringOutput, operation="test", stop_reason="max_tokens", context={"questions": ["設問ア"]}
+        )
+
+        assert output.final_rank == "B"
+        assert metrics.counter("json_extract.test.truncated") == 1
+        assert metrics.counter("json_extract.test.salvaged") == 1
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("content", [
+        '{"theme": "", "breakdown": {}, "structure": [], "module_map": {}}',
+        '{"theme": "物流", "breakdown": {"A": "概要"}, "structure": []}',
+    ])
+    def test_empty_design_proposal_is_rejected(self, content):
+        """テーマ・概要・章立てのない設計書は保存せずに失敗とすること"""
+        with pytest.raises(JSONExtractionError):
+            extract_json(content, DesignProposalOutput, operation="test")
+
+
+class TestScoringOutputRecovery:
+    """採点結果の補修と再生成"""
+
+    @staticmethod
+    def make_aws(*outputs):
+        """outputs は (本文, stop_reason) の順に返す invoke_model のスタブ"""
+        aws = MagicMock()
+        aws.bedrock.invoke_model.side_effect = [
+            {"body": MagicMock(read=lambda body=json.dumps({"content": [{"text": text}], "stop_reason": reason}): body.encode("utf-8"))}
+            for text, reason in outputs
+        ]
+        return aws
+
+    @pytest.mark.unit
+    async def test_repairable_output_is_salvaged_without_retry(self):
+        """末尾のカンマなど補修できる出力は、生成し直さずに使うこと"""
+        text = json.dumps({"criteria_scores": CRITERIA}, ensure_ascii=False)[:-2] + ",]}"
+        aws = self.make_aws((text, "end_turn"))
+
+        result = await score_answers(aws, {"設問ア": "回答"}, mode=SCORING_MODE_PER_QUESTION)
+
+        assert aws.bedrock.invoke_model.call_count == 1
+        assert result["question_breakdown"]["設問ア"]["question_score"] == 70
+
+    @pytest.mark.unit
+    async def test_truncated_complete_output_is_used_without_retry(self):
+        """max_tokens で打ち切られても補修して全設問がそろう出力は、生成し直さずに使うこと"""
+        text = json.dumps({**RESULT, "feedback": "全体として良い"}, ensure_ascii=False)[:-8]
+        aws = self.make_aws((text, "max_tokens"))
+
+        result = await score_answers(aws, {"設問ア": "回答"}, mode="single")
+
+        assert aws.bedrock.invoke_model.call_count == 1
+        assert result["final_rank"] == "B"
+
+    @pytest.mark.unit
+    async def test_truncated_incomplete_output_is_regenerated_with_more_tokens(self):
+        """打ち切られて設問が欠けた出力は、max_tokens を倍にして生成し直すこと"""
+        metrics.reset()
+        full = {**RESULT, "question_breakdown": {**RESULT["question_breakdown"], "設問イ": RESULT["question_breakdown"]["設問ア"]}}
+        text = json.dumps(full, ensure_ascii=False)
+        aws = self.make_aws((text[:text.index('"設問イ"')], "max_tokens"), (text, "end_turn"))
+
+        result = await score_answers(aws, {"設問ア": "回答", "設問イ": "回答"}, mode="single")
+
+        requests = [json.loads(call.kwargs["body"]) for call in aws.bedrock.invoke_model.call_args_list]
+        assert [r["max_tokens"] for r in requests] == [4096, 8192]
+        assert list(result["question_breakdown"]) == ["設問ア", "設問イ"]
+        assert metrics.counter("json_extract.scoring.single.truncated") == 1
+        assert metrics.counter("json_extract.scoring.single.failed") == 1
+
+    @pytest.mark.unit
+    async def test_regenerates_only_unsalvageable_output(self):
+        """補修しても読めない出力のときだけ生成し直すこと"""
+        metrics.reset()
+        aws = self.make_aws(("採点できませんでした", "end_turn"), (json.dumps(RESULT, ensure_ascii=False), "end_turn"))
+
+        scored = await score_answers(aws, {"設問ア": "回答"}, mode="single")
+
+        assert aws.bedrock.invoke_model.call_count == 2
+        assert scored["final_rank"] == "B"
+        assert metrics.counter("json_extract.scoring.single.failed") == 1
+        assert metrics.counter("json_extract.scoring.single.clean") == 1
+
+    @pytest.mark.unit
+    async def test_output_missing_a_question_is_not_saved(self):
+        """設問の評価が欠けた出力が続いたら、D や 0 点を付けずに ScoringError にすること"""
+        text = json.dumps(RESULT, ensure_ascii=False)
+        aws = self.make_aws((text, "end_turn"), (text, "end_turn"))
+
+        with pytest.raises(ScoringError):
+            await score_answers(aws, {"設問ア": "回答", "設問イ": "回答"}, mode="single")
+        assert aws.bedrock.invoke_model.call_count == 2
@@ -0,0 +1,112 @@
+"""
+単体テスト: LLM プロバイダー
+ローカルスタブの決定的な応答・ストリーミング・エラー注入、Bedrock 応答の記録と再生を検証
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from config import Settings
+from services.aws import AWSClients
+from services.llm import RecordingProvider, StubLLMProvider
+from services.scoring import SCORING_MODE_PER_QUESTION, SCORING_MODE_SINGLE, score_answers
+
+ANSWERS = {"設問ア": "第1章 概要\nA社の売上は10億円である。", "設問イ": "回答イ" * 20, "設問ウ": "回答ウ" * 30}
+
+
+def make_stub(**kwargs):
+    options = dict(latency_seconds=0, tokens_per_second=100000)
+    options.update(kwargs)
+    return StubLLMProvider(**options)
+
+
+def make_aws(provider):
+    aws = MagicMock()
+    aws.bedrock = provider
+    return aws
+
+
+def request_body(text, max_tokens=1000):
+    return json.dumps({"max_tokens": max_tokens, "system": "固定の指示", "messages": [{"role": "user", "content": text}]})
+
+
+class TestStubLLMProvider:
+    """StubLLMProvider"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("mode", [SCORING_MODE_SINGLE, SCORING_MODE_PER_QUESTION])
+    async def test_generates_valid_deterministic_scores(self, mode):
+        """採点プロンプトの出力形式どおりの JSON を返し、同じ回答には同じ点数を付けること"""
+        first = await score_answers(make_aws(make_stub()), ANSWERS, mode=mode)
+        second = await score_answers(make_aws(make_stub()), ANSWERS, mode=mode)
+
+        assert list(first["question_breakdown"]) == list(ANSWERS)
+        assert all(len(b["criteria_scores"]) == 8 for b in first["question_breakdown"].values())
+        assert first == second
+
+    @pytest.mark.unit
+    async def test_streams_questions_like_bedrock(self):
+        """ストリーミングでは設問ごとの評価が届いた順に通知されること"""
+        notified = []
+
+        async def on_question(question, breakdown):
+            notified.append(question)
+
+        result = await score_answers(make_aws(make_stub()), ANSWERS, on_question=on_question, mode=SCORING_MODE_SINGLE)
+
+        assert notified == list(ANSWERS)
+        assert result["final_rank"] in "ABCD"
+
+    @pytest.mark.unit
+    def test_truncates_at_max_tokens(self):
+        """max_tokens を超える出力は打ち切り、stop_reason を max_tokens にすること"""
+        stub = make_stub(chars_per_token=1)
+        body = json.dumps({"max_tokens": 5, "system": "", "messages": [{"role": "user", "content": "長い入力です"}]})
+
+        response = json.loads(stub.invoke_model(body=body)["body"].read())
+
+        assert response["stop_reason"] == "max_tokens"
+        assert len(response["content"][0]["text"]) == 5
+        assert response["usage"]["output_tokens"] == 5
+
+    @pytest.mark.unit
+    def test_injects_errors(self):
+        """error_rate の割合で、指定したエラーコードの ClientError を送出すること"""
+        stub = make_stub(error_rate=1.0, error_code="ServiceUnavailableException")
+
+        with pytest.raises(ClientError) as excinfo:
+            stub.invoke_model(body=request_body("入力"))
+        assert excinfo.value.response["Error"]["Code"] == "ServiceUnavailableException"
+
+
+class TestRecordAndReplay:
+    """応答の記録と再生"""
+
+    @pytest.mark.unit
+    def test_replays_recorded_responses(self, tmp_path):
+        """記録した応答を、同じリクエストにはそのまま、同じ system の別リクエストには記録から選んで返すこと"""
+        path = tmp_path / "recordings.jsonl"
+        bedrock = MagicMock()
+        bedrock.invoke_model.return_value = {
+            "body": MagicMock(read=lambda: json.dumps({"content": [{"text": "記録した応答"}]}).encode("utf-8"))
+        }
+        recorder = RecordingProvider(bedrock, str(path))
+        assert json.loads(recorder.invoke_model(body=request_body("入力"))["body"].read())["content"][0]["text"] == "記録した応答"
+
+        stub = make_stub(replay_path=str(path))
+        for text in ("入力", "別の入力"):
+            response = json.loads(stub.invoke_model(body=request_body(text))["body"].read())
+            assert response["content"][0]["text"] == "記録した応答"
+
+    @pytest.mark.unit
+    def test_selected_by_settings(self):
+        """llm_provider=stub で AWSClients.bedrock がスタブになること"""
+        aws = AWSClients(Settings(llm_provider="stub", llm_stub_latency_seconds=0))
+        try:
+            assert isinstance(aws.bedrock, StubLLMProvider)
+            assert aws.pool_stats()["bedrock"]["requests"] == 0
+        finally:
+            aws.close()
@@ -0,0 +1,234 @@
+"""
+単体テスト: S3 問題ドキュメントキャッシュ
+バイト上限 LRU・TTL・ETag 再検証・ネガティブキャッシュを検証
+"""
+
+import json
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from services.metrics import metrics
+from services.problems import ProblemDocumentCache, build_problem_index, estimate_size, fetch_s3_object
+
+
+def _doc(question_id: str, filler: int = 0) -> bytes:
+    return json.dumps(
+        [{"question_id": question_id, "problemContent": "あ" * filler}], ensure_ascii=False
+    ).encode("utf-8")
+
+
+class FakeS3:
+    """bucket/key ごとの本文と ETag を返すフェイクフェッチャー"""
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+        self.fail = False
+        # 応答を返す前に呼ぶ関数（取得中のキャッシュ操作を再現する）
+        self.during_fetch = None
+
+    def put(self, key: str, body: bytes, etag: str):
+        self.objects[key] = (body, etag)
+
+    async def __call__(self, bucket, key, etag):
+        self.calls.append((key, etag))
+        if self.during_fetch is not None:
+            self.during_fetch()
+        if self.fail:
+            raise RuntimeError("S3 unavailable")
+        body, current = self.objects[key]
+        if etag is not None and etag == current:
+            return None
+        return body, current
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestProblemDocumentCache:
+    """ProblemDocumentCache のテスト"""
+
+    @pytest.mark.unit
+    async def test_hit_after_first_load(self):
+        """2回目以降はメモリから返すこと"""
+        s3 = FakeS3()
+        s3.put("a.json", _doc("IS#1"), '"e1"')
+        cache = ProblemDocumentCache(s3, max_bytes=10_000, ttl_seconds=60, negative_ttl_seconds=5)
+
+        first = await cache.get("bucket", "a.json")
+        second = await cache.get("bucket", "a.json")
+
+        assert second is first
+        assert len(s3.calls) == 1
+        assert metrics.counter("problem_cache.miss") == 1
+        assert metrics.counter("problem_cache.hit") == 1
+
+    @pytest.mark.unit
+    async def test_lru_eviction_by_total_bytes(self):
+        """合計バイト数が上限を超えたら最も古く使われたエントリから破棄すること"""
+        s3 = FakeS3()
+        for name in ("a", "b", "c"):
+            s3.put(f"{name}.json", _doc(name, filler=100), name)
+        problems = json.loads(_doc("a", filler=100))
+        size = estimate_size(problems) + sys.getsizeof(build_problem_index(problems))
+        cache = ProblemDocumentCache(s3, max_bytes=size * 2, ttl_seconds=60, negative_ttl_seconds=5)
+
+        await cache.get("bucket", "a.json")
+        await cache.get("bucket", "b.json")
+        await cache.get("bucket", "a.json")  # a を最近使用に
+        await cache.get("bucket", "c.json")  # b が破棄される
+
+        assert cache.total_bytes == size * 2
+        assert metrics.counter("problem_cache.eviction") == 1
+        await cache.get("bucket", "a.json")
+        assert metrics.counter("problem_cache.hit") == 2
+        await cache.get("bucket", "b.json")
+        assert metrics.counter("problem_cache.miss") == 4
+
+    @pytest.mark.unit
+    async def test_expired_entry_revalidated_with_etag(self):
+        """TTL 経過後は IfNoneMatch で再検証し、未変更なら本文を再取得しないこと"""
+        s3 = FakeS3()
+        s3.put("a.json", _doc("IS#1"), '"e1"')
+        cache = ProblemDocumentCache(s3, max_bytes=10_000, ttl_seconds=0, negative_ttl_seconds=5)
+
+        first = await cache.get("bucket", "a.json")
+        second = await cache.get("bucket", "a.json")
+
+        assert s3.calls == [("a.json", None), ("a.json", '"e1"')]
+        assert second is first
+        assert metrics.counter("problem_cache.not_modified") == 1
+
+    @pytest.mark.unit
+    async def test_failure_cached_only_for_negative_ttl(self):
+        """取得失敗はネガティブ TTL の間だけ記憶し、その後は再取得すること"""
+        s3 = FakeS3()
+        s3.put("a.json", _doc("IS#1"), '"e1"')
+        s3.fail = True
+        cache = ProblemDocumentCache(s3, max_bytes=10_000, ttl_seconds=60, negative_ttl_seconds=0)
+
+        failed = await cache.get("bucket", "a.json")
+        assert failed.negative and failed.problems == []
+
+        s3.fail = False
+        recovered = await cache.get("bucket", "a.json")
+        assert recovered.problems[0]["question_id"] == "IS#1"
+
+    @pytest.mark.unit
+    async def test_malformed_document_negative_cached(self):
+        """JSON として読めない本文はネガティブキャッシュし、TTL 内は取得し直さないこと"""
+        s3 = FakeS3()
+        s3.put("a.json", b'[{"question_id": ', '"e1"')
+        cache = ProblemDocumentCache(s3, max_bytes=10_000, ttl_seconds=60, negative_ttl_seconds=60)
+
+        failed = await cache.get("bucket", "a.json")
+        await cache.get("bucket", "a.json")
+
+        assert failed.negative and failed.error == "問題データの形式が不正です"
+        assert len(s3.calls) == 1
+        assert metrics.counter("problem_cache.decode_error") == 1
+
+    @pytest.mark.unit
+    def test_size_counts_decoded_objects(self):
+        """サイズは本文のバイト数ではなくデコード後のオブジェクトから見積もること"""
+        body = _doc("a", filler=100)
+        assert estimate_size(json.loads(body)) > len(body)
+
+    @pytest.mark.unit
+    async def test_negative_entry_not_refetched_within_ttl(self):
+        """ネガティブ TTL 内は S3 を再度呼ばないこと"""
+        s3 = FakeS3()
+        s3.fail = True
+        cache = ProblemDocumentCache(s3, max_bytes=10_000, ttl_seconds=60, negative_ttl_seconds=60)
+
+        await cache.get("bucket", "a.json")
+        await cache.get("bucket", "a.json")
+
+        assert len(s3.calls) == 1
+        assert metrics.counter("problem_cache.negative_hit") == 1
+
+    @pytest.mark.unit
+    async def test_stale_data_kept_when_revalidation_fails(self):
+        """再検証に失敗しても既存データを返し続けること"""
+        s3 = FakeS3()
+        s3.put("a.json", _doc("IS#1"), '"e1"')
+        cache = ProblemDocumentCache(s3, max_bytes=10_000, ttl_seconds=0, negative_ttl_seconds=60)
+        first = await cache.get("bucket", "a.json")
+
+        s3.fail = True
+        second = await cache.get("bucket", "a.json")
+
+        assert second is first
+        assert not second.negative
+
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("fail", [False, True])
+    async def test_invalidated_during_revalidation(self, fail):
+        """再検証（304・失敗）の応答待ちに破棄されたエントリは、既存データを返しても格納し直さないこと"""
+        s3 = FakeS3()
+        s3.put("a.json", _doc("IS#1"), '"e1"')
+        cache = ProblemDocumentCache(s3, max_bytes=10_000, ttl_seconds=0, negative_ttl_seconds=60)
+        first = await cache.get("bucket", "a.json")
+
+        s3.fail = fail
+        s3.during_fetch = cache.invalidate
+        second = await cache.get("bucket", "a.json")
+
+        assert second is first
+        assert cache.stats()["entries"] == 0 and cache.total_bytes == 0
+
+
+class TestFetchS3Object:
+    """S3 条件付き取得のテスト"""
+
+    @pytest.mark.unit
+    async def test_not_modified_returns_none(self):
+        """IfNoneMatch が一致した場合（304）は None を返すこと"""
+        aws = MagicMock()
+        aws.s3.get_object.side_effect = ClientError(
+            {"Error": {"Code": "304", "Message": "Not Modified"}, "ResponseMetadata": {"HTTPStatusCode": 304}},
+            "GetObject",
+        )
+
+        result = await fetch_s3_object(aws, "bucket", "a.json", '"e1"')
+
+        assert result is None
+        aws.s3.get_object.assert_called_once_with(Bucket="bucket", Key="a.json", IfNoneMatch='"e1"')
+
+
+class TestProblemIndex:
+    """question_id 索引のテスト"""
+
+    @pytest.mark.unit
+    def test_index_prefers_first_duplicate(self):
+        """重複した question_id は配列内で先に現れたものを返すこと"""
+        problems = [
+            {"question_id": "IS#1", "problemContent": "first"},
+            {"question_id": "IS#1", "problemContent": "second"},
+            "invalid",
+        ]
+
+        index = build_problem_index(problems)
+
+        assert index["IS#1"]["problemContent"] == "first"
+        assert len(index) == 1
+
+    @pytest.mark.unit
+    async def test_index_built_once_at_load(self):
+        """読み込んだドキュメントから question_id で問題を引けること"""
+        s3 = FakeS3()
+        s3.put("a.json", _doc("IS#YEAR#2024SPRING#ESSAY#Q1"), '"e1"')
+        cache = ProblemDocumentCache(s3, max_bytes=10_000, ttl_seconds=60, negative_ttl_seconds=5)
+
+        document = await cache.get("bucket", "a.json")
+
+        assert document.find("IS#YEAR#2024SPRING#ESSAY#Q1") is document.problems[0]
+        assert document.find("IS#YEAR#2024SPRING#ESSAY#Q9") is None
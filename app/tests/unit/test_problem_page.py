@@ -0,0 +1,73 @@
+"""
+単体テスト: 問題ページの SSR
+問題詳細が初期 HTML に埋め込まれ、取得できない場合はクライアント取得に任せることを検証
+"""
+
+import json
+import re
+from urllib.parse import quote
+from unittest.mock import MagicMock
+
+import pytest
+
+from config import get_settings
+
+PROBLEM_ID = "YEAR#2024SPRING#ESSAY#Q1"
+EXAM_ITEM = {
+    "PK": "EXAM#IS",
+    "SK": PROBLEM_ID,
+    "title": "テスト問題",
+    "year_term": "2024春",
+    "s3_uri": "s3://bucket/IS/is_essay.json",
+}
+PAGE_URL = f"/exam/IS/{quote(PROBLEM_ID, safe='')}"
+
+
+def embedded_problem(html):
+    match = re.search(r'<script type="application/json" id="problem-data">(.*?)</script>', html, re.S)
+    return json.loads(match.group(1)) if match else None
+
+
+@pytest.fixture
+def page_aws(stub_aws):
+    stub_aws.exam_table.query.return_value = {"Items": [EXAM_ITEM]}
+    body = json.dumps([{
+        "question_id": f"IS#{PROBLEM_ID}",
+        "problemContent": "本文</script><script>alert(1)</script>",
+    }], ensure_ascii=False).encode()
+    stub_aws.s3.get_object.side_effect = lambda **kwargs: {"Body": MagicMock(read=lambda: body), "ETag": '"e1"'}
+    return stub_aws
+
+
+class TestProblemPageSSR:
+    """/exam/{exam_type}/{problem_id} のテスト"""
+
+    @pytest.mark.unit
+    def test_problem_embedded_in_initial_html(self, client, page_aws):
+        """問題詳細と文字数制限が埋め込まれ、本文中のタグで script が閉じられないこと"""
+        html = client.get(PAGE_URL).text
+
+        problem = embedded_problem(html)
+        assert problem["title"] == "テスト問題"
+        assert problem["problem_content"] == "本文</script><script>alert(1)</script>"
+        assert problem["word_count_limits"]["設問イ"] == {"min": 700, "max": 1000}
+        assert "<script>alert(1)</script>" not in html
+
+    @pytest.mark.unit
+    def test_backend_failure_falls_back_to_client_fetch(self, client, page_aws):
+        """取得に失敗してもページは返し、埋め込みを省略すること"""
+        page_aws.exam_table.query.side_effect = RuntimeError("DynamoDB unavailable")
+
+        response = client.get(PAGE_URL)
+
+        assert response.status_code == 200
+        assert embedded_problem(response.text) is None
+
+    @pytest.mark.unit
+    def test_ssr_can_be_disabled(self, client, page_aws, monkeypatch):
+        monkeypatch.setattr(get_settings(), "ssr_problem_detail", False)
+
+        html = client.get(PAGE_URL).text
+
+        assert embedded_problem(html) is None
+        page_aws.exam_table.query.assert_not_called()
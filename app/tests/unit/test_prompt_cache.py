@@ -0,0 +1,146 @@
+"""
+単体テスト: プロンプトキャッシュ
+固定部分（system）と可変部分（messages）の分離・cache_control の付与・キャッシュ別の使用量記録を検証
+"""
+
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from services import prompt_cache
+from services.metrics import metrics
+from services.prompt_cache import cache_conversation, system_blocks
+from services.scoring import SCORING_CRITERIA, SCORING_MODE_PER_QUESTION, SCORING_MODE_SINGLE, score_answers
+
+ANSWERS = {"設問ア": "第1章 概要\nA社の売上は10億円である。", "設問イ": "回答イ" * 20, "設問ウ": "回答ウ" * 30}
+
+CRITERIA = [{"criterion": name, "weight": weight, "points": 70, "comment": "..."} for name, weight in SCORING_CRITERIA]
+# single / per_question のどちらのモードの出力としても読める採点結果
+OUTPUT = {
+    "criteria_scores": CRITERIA,
+    "question_breakdown": {"設問ア": {"level": "B", "question_score": 70, "criteria_scores": CRITERIA}},
+    "aggregate_score": 70,
+    "final_rank": "B",
+}
+
+
+class CachingBedrock:
+    """
+    プロンプトキャッシュを模した invoke_model のスタブ
+
+    cache_control 付きの system を初めて受け取ったときはキャッシュへの書き込み、
+    同じ system を再度受け取ったときはキャッシュからの読み込みとして usage を返し、応答も速くする。
+    """
+
+    def __init__(self, delay=0.02, cached_delay=0.005):
+        self.delay = delay
+        self.cached_delay = cached_delay
+        self.requests = []
+        self._cached = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        request = json.loads(kwargs["body"])
+        prefix = json.dumps(request["system"], ensure_ascii=False)
+        cacheable = "cache_control" in request["system"][-1]
+        with self._lock:
+            self.requests.append(request)
+            hit = cacheable and prefix in self._cached
+            if cacheable:
+                self._cached.add(prefix)
+        prefix_tokens = len(prefix)
+        user_tokens = len(request["messages"][-1]["content"])
+        if hit:
+            usage = {"input_tokens": user_tokens, "cache_read_input_tokens": prefix_tokens}
+        elif cacheable:
+            usage = {"input_tokens": user_tokens, "cache_creation_input_tokens": prefix_tokens}
+        else:
+            usage = {"input_tokens": user_tokens + prefix_tokens}
+        usage["output_tokens"] = 10
+        time.sleep(self.cached_delay if hit else self.delay)
+        body = json.dumps({"content": [{"text": json.dumps(OUTPUT)}], "usage": usage})
+        return {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+
+
+@pytest.fixture
+def caching_enabled(monkeypatch):
+    monkeypatch.setattr(prompt_cache.settings, "bedrock_prompt_caching", True)
+
+
+def make_aws(bedrock):
+    aws = MagicMock()
+    aws.bedrock.invoke_model.side_effect = bedrock
+    return aws
+
+
+class TestPromptLayout:
+    """プロンプトの組み立て"""
+
+    @pytest.mark.unit
+    async def test_static_prefix_is_identical_across_answers(self, caching_enabled):
+        """回答が違っても system は同一で cache_control が付き、回答は messages にだけ入ること"""
+        bedrock = CachingBedrock()
+        aws = make_aws(bedrock)
+
+        await score_answers(aws, {"設問ア": "回答1"}, mode=SCORING_MODE_SINGLE)
+        await score_answers(aws, {"設問ア": "まったく別の回答"}, mode=SCORING_MODE_SINGLE)
+
+        first, second = bedrock.requests
+        assert first["system"] == second["system"]
+        assert first["system"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert "回答1" not in json.dumps(first["system"], ensure_ascii=False)
+        assert "回答1" in first["messages"][0]["content"]
+
+    @pytest.mark.unit
+    async def test_caching_disabled_sends_no_cache_control(self, monkeypatch):
+        """設定で無効にすると cache_control を送らないこと（非対応モデル向け）"""
+        monkeypatch.setattr(prompt_cache.settings, "bedrock_prompt_caching", False)
+        bedrock = CachingBedrock()
+
+        await score_answers(make_aws(bedrock), ANSWERS, mode=SCORING_MODE_PER_QUESTION)
+
+        assert all("cache_control" not in block for r in bedrock.requests for block in r["system"])
+
+    @pytest.mark.unit
+    def test_conversation_breakpoint_on_last_message(self, caching_enabled):
+        """会話は最後のメッセージの最後のブロックにだけキャッシュの区切りを付けること"""
+        messages = [{"role": "user", "content": "最初"}, {"role": "assistant", "content": "応答"}, {"role": "user", "content": "次"}]
+
+        result = cache_conversation(messages)
+
+        assert result[:2] == messages[:2]
+        assert result[-1]["content"] == [{"type": "text", "text": "次", "cache_control": {"type": "ephemeral"}}]
+        assert messages[-1]["content"] == "次"
+        assert system_blocks("固定")[0]["cache_control"] == {"type": "ephemeral"}
+
+
+class TestUsageMetrics:
+    """キャッシュ別の使用量・所要時間の記録"""
+
+    @pytest.mark.unit
+    async def test_records_cache_reads_writes_and_latency(self, caching_enabled):
+        """初回はキャッシュ書き込み、以降は読み込みとして記録し、所要時間も別々に集計すること"""
+        metrics.reset()
+        bedrock = CachingBedrock()
+        aws = make_aws(bedrock)
+
+        for question, answer in ANSWERS.items():
+            await score_answers(aws, {question: answer}, mode=SCORING_MODE_PER_QUESTION)
+
+        prefix_tokens = len(json.dumps(bedrock.requests[0]["system"], ensure_ascii=False))
+        assert metrics.counter("bedrock.scoring.calls") == 3
+        assert metrics.counter("bedrock.scoring.cache_write_input_tokens") == prefix_tokens
+        assert metrics.counter("bedrock.scoring.cache_read_input_tokens") == 2 * prefix_tokens
+        assert metrics.counter("bedrock.scoring.uncached_input_tokens") == sum(
+            len(r["messages"][0]["content"]) for r in bedrock.requests
+        )
+        observations = metrics.snapshot()["observations"]
+        assert observations["bedrock.scoring.cached_seconds"]["count"] == 2
+        assert observations["bedrock.scoring.uncached_seconds"]["count"] == 1
+        assert (
+            observations["bedrock.scoring.cached_seconds"]["avg"]
+            < observations["bedrock.scoring.uncached_seconds"]["avg"]
+        )
@@ -0,0 +1,172 @@
+"""
+単体テスト: 一括再採点
+並列スキャン・バージョン/モード別属性への保存・スロットリング時の再試行・チェックポイントからの再開を検証
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from config import get_settings
+from services.bedrock_governor import InMemoryGovernorState, bedrock_governor
+from services.metrics import metrics
+from services.rescoring import AdaptiveBackoff, BulkRescorer, RescoringCheckpoint, rescoring_attribute
+from services.scoring import SCORING_CRITERIA, SCORING_MODE_PER_QUESTION, SCORING_MODE_SINGLE, SCORING_PROMPT_VERSION
+
+CRITERIA = [{"criterion": name, "weight": weight, "points": 70, "comment": "良い"} for name, weight in SCORING_CRITERIA]
+# single / per_question のどちらのモードの出力としても読める採点結果
+RESULT = {
+    "question_breakdown": {"設問ア": {"level": "B", "question_score": 70, "criteria_scores": CRITERIA}},
+    "criteria_scores": CRITERIA,
+    "aggregate_score": 70,
+    "final_rank": "B",
+}
+
+
+class FakeSubmissionTable:
+    """Segment / Limit / ExclusiveStartKey に対応した SubmissionTable のスタブ"""
+
+    def __init__(self, count):
+        self.items = [{"submission_id": f"sub-{i}", "answers": {"設問ア": f"回答{i}"}} for i in range(count)]
+        self.scans = 0
+
+    def scan(self, Segment, TotalSegments, Limit, ExclusiveStartKey=None, **kwargs):
+        self.scans += 1
+        items = [item for i, item in enumerate(self.items) if i % TotalSegments == Segment]
+        start = 0
+        if ExclusiveStartKey:
+            start = [item["submission_id"] for item in items].index(ExclusiveStartKey["submission_id"]) + 1
+        page = items[start:start + Limit]
+        response = {"Items": [dict(item) for item in page]}
+        if start + Limit < len(items):
+            response["LastEvaluatedKey"] = {"submission_id": page[-1]["submission_id"]}
+        return response
+
+    def update_item(self, Key, ExpressionAttributeNames, ExpressionAttributeValues, **kwargs):
+        item = next(item for item in self.items if item["submission_id"] == Key["submission_id"])
+        item[ExpressionAttributeNames["#result"]] = ExpressionAttributeValues[":result"]
+
+
+def make_aws(count, failures=()):
+    """failures の順に例外を送出してから採点結果を返す Bedrock スタブ"""
+    aws = MagicMock()
+    aws.submission_table = FakeSubmissionTable(count)
+    pending = list(failures)
+    body = json.dumps({
+        "content": [{"text": json.dumps(RESULT, ensure_ascii=False)}],
+        "usage": {"input_tokens": 100, "output_tokens": 10},
+    })
+
+    def invoke_model(**kwargs):
+        if pending:
+            raise pending.pop(0)
+        return {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+
+    aws.bedrock.invoke_model.side_effect = invoke_model
+    return aws
+
+
+def throttling():
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+
+
+def make_rescorer(aws, path, segments=2, concurrency=2, mode=SCORING_MODE_SINGLE, **kwargs):
+    checkpoint = RescoringCheckpoint.load_or_new(path, "label", segments)
+    kwargs.setdefault("backoff", AdaptiveBackoff(initial=0.001, maximum=0.01))
+    return BulkRescorer(aws, checkpoint, path, mode, concurrency=concurrency, page_size=2, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def fast_governor(monkeypatch):
+    """ガバナーの再試行待ちを短くし、テスト後に状態を戻す"""
+    monkeypatch.setattr(bedrock_governor, "retry_base_seconds", 0.001)
+    yield
+    bedrock_governor.configure(InMemoryGovernorState())
+
+
+class TestBulkRescorer:
+    """BulkRescorer"""
+
+    @pytest.mark.unit
+    async def test_rescores_all_segments_into_versioned_attribute(self, tmp_path):
+        """全セグメントを採点してバージョン・モード別の属性に保存し、同じモデル・モードの結果がある回答は飛ばすこと"""
+        metrics.reset()
+        aws = make_aws(5)
+        aws.submission_table.items[0][rescoring_attribute(SCORING_MODE_SINGLE)] = {
+            "model_id": get_settings().bedrock_model_id, "mode": SCORING_MODE_SINGLE
+        }
+
+        result = await make_rescorer(aws, tmp_path / "cp.json").run()
+
+        assert result.complete
+        attribute = f"score_{SCORING_PROMPT_VERSION}_single"
+        assert all(attribute in item for item in aws.submission_table.items)
+        assert aws.submission_table.items[1][attribute]["final_rank"] == "B"
+        assert (result.scored, result.skipped, result.failed) == (4, 1, 0)
+        assert result.input_tokens == 100 * result.scored
+        assert "submissions/min" in result.report()
+        assert json.loads((tmp_path / "cp.json").read_text())["scored"] == result.scored
+
+    @pytest.mark.unit
+    async def test_mode_change_rescores(self, tmp_path):
+        """別のモードで再実行すると、同じモデルで採点済みの回答もモード別の属性に採点し直すこと"""
+        aws = make_aws(3)
+        await make_rescorer(aws, tmp_path / "single.json").run()
+        calls = aws.bedrock.invoke_model.call_count
+
+        result = await make_rescorer(aws, tmp_path / "per_question.json", mode=SCORING_MODE_PER_QUESTION).run()
+
+        assert (result.scored, result.skipped) == (3, 0)
+        assert aws.bedrock.invoke_model.call_count == calls + 3
+        for item in aws.submission_table.items:
+            assert item[rescoring_attribute(SCORING_MODE_SINGLE)]["mode"] == SCORING_MODE_SINGLE
+            assert item[rescoring_attribute(SCORING_MODE_PER_QUESTION)]["mode"] == SCORING_MODE_PER_QUESTION
+
+    @pytest.mark.unit
+    async def test_retries_throttling_and_records_other_failures(self, tmp_path, monkeypatch):
+        """ガバナーが諦めた回答は待って採点し直し、それ以外の失敗は回答 ID を記録して続行すること"""
+        monkeypatch.setattr(bedrock_governor, "failure_threshold", 100)
+        metrics.reset()
+        attempts = bedrock_governor.max_attempts
+        aws = make_aws(3, failures=[throttling()] * (attempts + 1) + [RuntimeError("broken")])
+
+        result = await make_rescorer(aws, tmp_path / "cp.json", segments=1, concurrency=1).run()
+
+        assert metrics.counter("bedrock.throttled") == attempts + 1
+        assert metrics.counter("rescoring.throttled") == 1
+        assert (result.scored, result.failed) == (2, 1)
+        assert len(result.failures) == 1
+
+    @pytest.mark.unit
+    async def test_resumes_from_checkpoint(self, tmp_path):
+        """停止要求後はページ単位で保存して止まり、再実行で残りだけを採点すること"""
+        path = tmp_path / "cp.json"
+        aws = make_aws(8)
+        first = make_rescorer(aws, path)
+        original = first._rescore_item
+
+        async def stop_after_first(item):
+            first.request_stop()
+            await original(item)
+
+        first._rescore_item = stop_after_first
+        stopped = await first.run()
+        assert not stopped.complete
+        calls = aws.bedrock.invoke_model.call_count
+
+        resumed = await make_rescorer(aws, path).run()
+
+        assert resumed.complete
+        assert aws.bedrock.invoke_model.call_count == 8
+        assert resumed.scored == 8 and calls == stopped.scored
+
+    @pytest.mark.unit
+    def test_mismatched_checkpoint_is_rejected(self, tmp_path):
+        """プロンプトやモデルが違うチェックポイントからは再開しないこと"""
+        path = tmp_path / "cp.json"
+        RescoringCheckpoint.new("old", 2).save(path)
+
+        with pytest.raises(ValueError):
+            RescoringCheckpoint.load_or_new(path, "new", 2)
@@ -0,0 +1,165 @@
+"""
+単体テスト: 採点結果キャッシュ
+回答の正規化・キーの構成要素・ヒット時の再利用と保存・TTL・バイパスを検証
+"""
+
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from routers import scoring
+from services.scoring import SCORING_PROMPT_VERSION, score_submission_answers
+from services.scoring_cache import DynamoDBScoringCache, InMemoryScoringCache, ScoringCache, scoring_cache_key
+
+SCORING_RESULT = {
+    "question_breakdown": {
+        "設問ア": {"level": "B", "question_score": 70, "criteria_scores": [{"criterion": "充足度", "weight": 0.15, "points": 70}]},
+    },
+    "aggregate_score": 70.5,
+    "final_rank": "B",
+}
+
+
+def make_aws(answers_by_submission):
+    aws = MagicMock()
+    aws.submission_table.get_item.side_effect = lambda Key: {
+        "Item": {"submission_id": Key["submission_id"], "answers": answers_by_submission[Key["submission_id"]]}
+    }
+    body = json.dumps({"content": [{"text": json.dumps(SCORING_RESULT, ensure_ascii=False)}]})
+    aws.bedrock.invoke_model.side_effect = lambda **kwargs: {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+    return aws
+
+
+class TestScoringCacheKey:
+    """scoring_cache_key"""
+
+    @pytest.mark.unit
+    def test_normalizes_answers(self):
+        """改行コード・行末空白・全角英数の違いは同じキーになること"""
+        a = scoring_cache_key({"設問ア": "ＩＴ戦略\r\n本文  \n"}, "model", "v1", "single")
+        b = scoring_cache_key({"設問ア": "IT戦略\n本文"}, "model", "v1", "single")
+        assert a == b
+
+    @pytest.mark.unit
+    def test_model_prompt_and_mode_change_the_key(self):
+        """回答・モデル・プロンプトのバージョン・採点モードが違えば別のキーになること"""
+        base = ({"設問ア": "本文"}, "model", "v1", "single")
+        keys = {
+            scoring_cache_key(*base),
+            scoring_cache_key({"設問ア": "本文。"}, "model", "v1", "single"),
+            scoring_cache_key({"設問ア": "本文"}, "model-2", "v1", "single"),
+            scoring_cache_key({"設問ア": "本文"}, "model", "v2", "single"),
+            scoring_cache_key({"設問ア": "本文"}, "model", "v1", "per_question"),
+        }
+        assert len(keys) == 5
+
+
+class TestScoringWithCache:
+    """score_submission_answers の採点結果キャッシュ"""
+
+    @pytest.mark.unit
+    async def test_hit_reuses_result_and_saves_new_submission(self):
+        """同じ回答の再提出は Bedrock を呼ばず、新しい回答レコードに結果を保存すること"""
+        aws = make_aws({"first": {"設問ア": "回答 です"}, "second": {"設問ア": "回答 です\n\n"}})
+        cache = InMemoryScoringCache(ttl_seconds=60, max_entries=10)
+
+        await score_submission_answers(aws, "first", mode="single", cache=cache)
+        result = await score_submission_answers(aws, "second", mode="single", cache=cache)
+
+        assert aws.bedrock.invoke_model.call_count == 1
+        assert result["final_rank"] == "B"
+        assert result["question_breakdown"]["設問ア"]["word_count"] == 4
+        saved = aws.submission_table.update_item.call_args.kwargs
+        assert saved["Key"] == {"submission_id": "second"}
+        assert saved["ExpressionAttributeValues"][":rank"] == "B"
+        assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+    @pytest.mark.unit
+    async def test_bypass_rescores(self):
+        """bypass_cache=True なら Bedrock で採点し直すこと"""
+        aws = make_aws({"first": {"設問ア": "回答"}})
+        cache = InMemoryScoringCache(ttl_seconds=60, max_entries=10)
+
+        await score_submission_answers(aws, "first", mode="single", cache=cache)
+        await score_submission_answers(aws, "first", mode="single", cache=cache, bypass_cache=True)
+
+        assert aws.bedrock.invoke_model.call_count == 2
+        assert cache.stats()["hits"] == 0
+
+    @pytest.mark.unit
+    async def test_cache_failure_does_not_block_scoring(self):
+        """キャッシュの読み書きに失敗しても採点は完了すること"""
+        aws = make_aws({"first": {"設問ア": "回答"}})
+        table = MagicMock()
+        table.get_item.side_effect = RuntimeError("unavailable")
+        table.put_item.side_effect = RuntimeError("unavailable")
+
+        result = await score_submission_answers(
+            aws, "first", mode="single", cache=DynamoDBScoringCache(table, ttl_seconds=60)
+        )
+        assert result["final_rank"] == "B"
+
+    @pytest.mark.unit
+    def test_prompt_version_is_stable(self):
+        """プロンプトのバージョンはプロセスをまたいで同じ値になる（内容のハッシュ）こと"""
+        assert len(SCORING_PROMPT_VERSION) == 12
+        int(SCORING_PROMPT_VERSION, 16)
+
+
+class TestInMemoryScoringCache:
+    """InMemoryScoringCache の期限と件数上限"""
+
+    @pytest.mark.unit
+    async def test_expiry_and_eviction(self, monkeypatch):
+        """TTL を過ぎた結果は返さず、件数上限を超えたら古いものから削除すること"""
+        cache = InMemoryScoringCache(ttl_seconds=10, max_entries=2)
+        await cache.put("a", {"v": 1})
+        await cache.put("b", {"v": 2})
+        await cache.get("a")
+        await cache.put("c", {"v": 3})
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == {"v": 1}
+
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 11)
+        assert await cache.get("c") is None
+
+    @pytest.mark.unit
+    def test_store_must_implement_load_and_save(self):
+        """_load / _save を実装しない保存先は生成できないこと"""
+
+        class Incomplete(ScoringCache):
+            async def _load(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            Incomplete(ttl_seconds=10)
+
+
+class TestScoringEndpointCache:
+    """POST /api/scoring?wait=true と採点結果キャッシュ"""
+
+    @pytest.mark.unit
+    async def test_resubmission_served_from_cache(self, async_client, stub_aws):
+        """同じ回答の 2 回目は Bedrock を呼ばず、bypass_cache 指定時は呼ぶこと"""
+        answers = {"first": {"設問ア": "回答"}, "second": {"設問ア": "回答"}}
+        aws = make_aws(answers)
+        stub_aws.submission_table = aws.submission_table
+        stub_aws.bedrock = aws.bedrock
+        scoring.limiter.reset()
+        try:
+            for submission_id in ("first", "second"):
+                response = await async_client.post("/api/scoring?wait=true", json={"submission_id": submission_id})
+                assert response.status_code == 200
+            assert stub_aws.bedrock.invoke_model.call_count == 1
+
+            response = await async_client.post(
+                "/api/scoring?wait=true", json={"submission_id": "second", "bypass_cache": True}
+            )
+            assert response.status_code == 200
+            assert stub_aws.bedrock.invoke_model.call_count == 2
+        finally:
+            scoring.limiter.reset()
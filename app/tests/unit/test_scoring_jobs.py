@@ -0,0 +1,260 @@
+"""
+単体テスト: 採点ジョブキュー
+ジョブ登録（202）・状態遷移・ワーカー同時実行数の上限・進捗の購読・ジョブストアを検証
+"""
+
+import asyncio
+import json
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from main import app
+from routers import scoring
+from services.scoring import (
+    JOB_DONE,
+    JOB_FAILED,
+    DynamoDBJobStore,
+    InMemoryJobStore,
+    QueueFullError,
+    ScoringError,
+    ScoringJob,
+    ScoringQueue,
+    get_scoring_queue,
+    score_submission_answers,
+)
+
+SCORING_RESULT = {
+    "question_breakdown": {
+        "設問ア": {"level": "B", "question_score": 70, "criteria_scores": [{"criterion": "充足度", "weight": 0.15, "points": 70}]},
+    },
+    "aggregate_score": 70.5,
+    "final_rank": "B",
+}
+
+
+async def wait_for_status(queue, job_id, statuses=(JOB_DONE, JOB_FAILED)):
+    for _ in range(200):
+        job = await queue.get(job_id)
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"ジョブが完了しません: {job_id}")
+
+
+class TestScoringQueue:
+    """ScoringQueue のワーカー動作"""
+
+    @pytest.mark.unit
+    async def test_job_runs_to_done(self):
+        """登録したジョブがワーカーで実行され done になること"""
+        scored = []
+
+        async def runner(job, on_question, on_reset):
+            scored.append(job.submission_id)
+
+        queue = ScoringQueue(InMemoryJobStore(), runner, concurrency=1, max_queued=10)
+        queue.start()
+        try:
+            job = await queue.submit("sub-1")
+            assert job.status == "queued"
+            finished = await wait_for_status(queue, job.job_id)
+        finally:
+            await queue.stop()
+
+        assert finished.status == JOB_DONE
+        assert finished.error is None
+        assert scored == ["sub-1"]
+
+    @pytest.mark.unit
+    async def test_concurrency_is_capped(self):
+        """同時に実行される採点がワーカー数を超えないこと"""
+        running = 0
+        peak = 0
+
+        async def runner(job, on_question, on_reset):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        queue = ScoringQueue(InMemoryJobStore(), runner, concurrency=2, max_queued=10)
+        queue.start()
+        try:
+            jobs = [await queue.submit(f"sub-{i}") for i in range(6)]
+            for job in jobs:
+                await wait_for_status(queue, job.job_id)
+        finally:
+            await queue.stop()
+
+        assert peak == 2
+
+    @pytest.mark.unit
+    async def test_failures_are_recorded(self):
+        """採点エラーは利用者向けメッセージ、想定外の例外は汎用メッセージで failed になること"""
+
+        async def runner(job, on_question, on_reset):
+            if job.submission_id == "parse":
+                raise ScoringError("採点結果の解析に失敗しました")
+            raise RuntimeError("ThrottlingException: internal detail")
+
+        queue = ScoringQueue(InMemoryJobStore(), runner, concurrency=1, max_queued=10)
+        queue.start()
+        try:
+            parse_job = await wait_for_status(queue, (await queue.submit("parse")).job_id)
+            crash_job = await wait_for_status(queue, (await queue.submit("crash")).job_id)
+        finally:
+            await queue.stop()
+
+        assert parse_job.status == JOB_FAILED
+        assert parse_job.error == "採点結果の解析に失敗しました"
+        assert crash_job.status == JOB_FAILED
+        assert "internal detail" not in crash_job.error
+
+    @pytest.mark.unit
+    async def test_full_queue_rejects_and_stop_fails_pending(self):
+        """待ち行列が上限なら QueueFullError、停止時の未完了ジョブは failed になること"""
+        release = asyncio.Event()
+
+        async def runner(job, on_question, on_reset):
+            await release.wait()
+
+        store = InMemoryJobStore()
+        queue = ScoringQueue(store, runner, concurrency=1, max_queued=1)
+        queue.start()
+        running = await queue.submit("running")
+        await asyncio.sleep(0.01)
+        pending = await queue.submit("pending")
+        with pytest.raises(QueueFullError):
+            await queue.submit("overflow")
+
+        await queue.stop()
+        assert (await store.get(running.job_id)).status == JOB_FAILED
+        assert (await store.get(pending.job_id)).status == JOB_FAILED
+
+    @pytest.mark.unit
+    async def test_each_listener_is_notified_until_it_leaves(self):
+        """購読者ごとに即座に通知され、先に離脱した購読者が他の購読者の通知を消さないこと"""
+        proceed = asyncio.Event()
+
+        async def runner(job, on_question, on_reset):
+            await on_question("設問ア", {"question_score": 70})
+            await proceed.wait()
+            await on_question("設問イ", {"question_score": 60})
+
+        queue = ScoringQueue(InMemoryJobStore(), runner, concurrency=1, max_queued=10)
+        queue.start()
+        try:
+            job = await queue.submit("sub-1")
+            # ポーリングでは間に合わない間隔にし、即時通知だけで届くことを確かめる
+            first = queue.events(job.job_id, poll_seconds=30)
+            second = queue.events(job.job_id, poll_seconds=30)
+
+            async def next_question(events):
+                async for name, data in events:
+                    if name == "question":
+                        return data["question"]
+
+            assert await asyncio.wait_for(next_question(first), 1) == "設問ア"
+            assert await asyncio.wait_for(next_question(second), 1) == "設問ア"
+            await first.aclose()
+            assert len(queue._listeners[job.job_id]) == 1
+
+            proceed.set()
+            assert await asyncio.wait_for(next_question(second), 1) == "設問イ"
+            await second.aclose()
+            assert queue._listeners == {}
+        finally:
+            await queue.stop()
+
+
+class TestDynamoDBJobStore:
+    """DynamoDBJobStore の読み書き"""
+
+    @pytest.mark.unit
+    async def test_round_trip(self):
+        """put_item した属性から ScoringJob を復元でき、更新は UpdateExpression で行うこと"""
+        table = MagicMock()
+        store = DynamoDBJobStore(table)
+        job = ScoringJob.new("sub-1", ttl_seconds=60)
+
+        await store.create(job)
+        item = table.put_item.call_args.kwargs["Item"]
+        assert "error" not in item
+
+        # DynamoDB の数値は Decimal で返る
+        table.get_item.return_value = {"Item": {**item, "expires_at": Decimal(job.expires_at)}}
+        assert await store.get(job.job_id) == job
+
+        await store.update(job.job_id, JOB_FAILED, "失敗")
+        kwargs = table.update_item.call_args.kwargs
+        assert kwargs["Key"] == {"job_id": job.job_id}
+        assert kwargs["ExpressionAttributeValues"][":status"] == JOB_FAILED
+        assert kwargs["ExpressionAttributeValues"][":error"] == "失敗"
+
+        await store.reset_progress(job.job_id)
+        kwargs = table.update_item.call_args.kwargs
+        assert "progress = :empty" in kwargs["UpdateExpression"]
+        assert "ADD progress_version :one" in kwargs["UpdateExpression"]
+
+        table.get_item.return_value = {}
+        assert await store.get("missing") is None
+
+
+class TestScoringJobsAPI:
+    """POST /api/scoring・/api/scoring/jobs エンドポイント"""
+
+    @pytest.fixture
+    async def queue(self, stub_aws):
+        body = json.dumps({"content": [{"text": json.dumps(SCORING_RESULT, ensure_ascii=False)}]})
+        stub_aws.bedrock.invoke_model.return_value = {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+        queue = ScoringQueue(
+            InMemoryJobStore(),
+            lambda job, on_question, on_reset: score_submission_answers(stub_aws, job.submission_id),
+            concurrency=1,
+            max_queued=10,
+        )
+        queue.start()
+        scoring.limiter.reset()
+        app.dependency_overrides[get_scoring_queue] = lambda: queue
+        yield queue
+        app.dependency_overrides.pop(get_scoring_queue, None)
+        scoring.limiter.reset()
+        await queue.stop()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("path", ["/api/scoring", "/api/scoring/jobs"])
+    async def test_enqueue_returns_202_and_job_completes(self, async_client, stub_aws, queue, path):
+        """POST は 202 とジョブ ID を即時に返し、採点完了後に結果が保存されること"""
+        stub_aws.submission_table.get_item.return_value = {
+            "Item": {"submission_id": "sub-1", "answers": {"設問ア": "回 答\n"}}
+        }
+
+        response = await async_client.post(path, json={"submission_id": "sub-1"})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["submission_id"] == "sub-1"
+        assert job["status"] == "queued"
+
+        await wait_for_status(queue, job["job_id"])
+        status = await async_client.get(f"/api/scoring/jobs/{job['job_id']}")
+        assert status.status_code == 200
+        assert status.json()["status"] == "done"
+
+        values = stub_aws.submission_table.update_item.call_args.kwargs["ExpressionAttributeValues"]
+        assert values[":rank"] == "B"
+        assert values[":breakdown"]["設問ア"]["word_count"] == 2
+
+    @pytest.mark.unit
+    async def test_unknown_submission_and_job(self, async_client, stub_aws, queue):
+        """存在しない回答は登録せず 404、存在しないジョブも 404 を返すこと"""
+        stub_aws.submission_table.get_item.return_value = {}
+
+        response = await async_client.post("/api/scoring/jobs", json={"submission_id": "missing"})
+        assert response.status_code == 404
+        assert stub_aws.bedrock.invoke_model.call_count == 0
+
+        response = await async_client.get("/api/scoring/jobs/unknown")
+        assert response.status_code == 404
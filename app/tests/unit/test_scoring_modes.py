@@ -0,0 +1,116 @@
+"""
+単体テスト: 設問別採点モード
+設問ごとの並行採点・観点の重みによる集計・結果のマージを検証
+"""
+
+import json
+import re
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.scoring import (
+    SCORING_CRITERIA,
+    SCORING_MODE_PER_QUESTION,
+    ScoringError,
+    aggregate_scores,
+    build_question_breakdown,
+    rank_for_score,
+    score_submission_answers,
+)
+
+ANSWERS = {"設問ア": "回答ア" * 10, "設問イ": "回答イ" * 20, "設問ウ": "回答ウ" * 30}
+
+# 設問ごとにモデルが付ける点数（全観点同じ点数）
+POINTS = {"設問ア": 85, "設問イ": 70, "設問ウ": 50}
+
+
+def criteria(points):
+    return [{"criterion": name, "points": points, "comment": "ok"} for name, _ in SCORING_CRITERIA]
+
+
+class TestDeterministicAggregation:
+    """観点別の点数からの集計"""
+
+    @pytest.mark.unit
+    def test_question_score_is_weighted_average(self):
+        """question_score は設定の重みによる加重平均で、モデルの weight は使わないこと"""
+        scores = criteria(50)
+        scores[0].update(points=100, weight=0.9)  # 充足度 (0.15)
+        breakdown = build_question_breakdown(scores, "回 答\n")
+
+        assert breakdown["question_score"] == 58  # 50 + 50 * 0.15 = 57.5
+        assert breakdown["level"] == "C"
+        assert breakdown["word_count"] == 2
+        assert breakdown["criteria_scores"][0]["weight"] == 0.15
+
+    @pytest.mark.unit
+    def test_points_are_clamped_and_missing_criterion_fails(self):
+        """範囲外の点数は 0-100 に丸め、観点が欠けていれば ScoringError とすること"""
+        scores = criteria(150)
+        assert build_question_breakdown(scores, "")["question_score"] == 100
+
+        with pytest.raises(ScoringError):
+            build_question_breakdown(criteria(80)[1:], "")
+
+    @pytest.mark.unit
+    def test_rank_thresholds(self):
+        """ランクは 80/60/40 を境界に判定すること"""
+        assert [rank_for_score(s) for s in (80, 79.9, 60, 40, 39.9)] == ["A", "B", "B", "C", "D"]
+        assert aggregate_scores({"a": {"question_score": 85}, "b": {"question_score": 70}}) == (77.5, "B")
+        assert aggregate_scores({}) == (0.0, "D")
+
+
+class TestPerQuestionScoring:
+    """score_submission_answers(mode=per_question)"""
+
+    @pytest.mark.unit
+    async def test_scores_questions_concurrently_and_merges(self):
+        """設問ごとに Bedrock を並行に呼び、従来と同じ形で保存・返却すること"""
+        lock = threading.Lock()
+        in_flight = 0
+        peak = 0
+
+        def invoke_model(**kwargs):
+            nonlocal in_flight, peak
+            prompt = json.loads(kwargs["body"])["messages"][0]["content"]
+            question = re.search(r"「(設問.)」への回答だけを評価", prompt).group(1)
+            assert ANSWERS[question] in prompt
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight -= 1
+            body = json.dumps({"content": [{"text": json.dumps({"criteria_scores": criteria(POINTS[question])})}]})
+            return {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+
+        aws = MagicMock()
+        aws.submission_table.get_item.return_value = {"Item": {"submission_id": "sub-1", "answers": ANSWERS}}
+        aws.bedrock.invoke_model.side_effect = invoke_model
+
+        notified = []
+
+        async def on_question(question, breakdown):
+            notified.append(question)
+
+        result = await score_submission_answers(
+            aws, "sub-1", on_question=on_question, mode=SCORING_MODE_PER_QUESTION
+        )
+
+        assert aws.bedrock.invoke_model.call_count == 3
+        assert peak == 3
+        assert sorted(notified) == sorted(ANSWERS)
+        assert list(result["question_breakdown"]) == list(ANSWERS)
+        assert {q: b["level"] for q, b in result["question_breakdown"].items()} == {
+            "設問ア": "A", "設問イ": "B", "設問ウ": "C",
+        }
+        assert result["aggregate_score"] == 68.3
+        assert result["final_rank"] == "B"
+        assert result["passed"] is False
+
+        values = aws.submission_table.update_item.call_args.kwargs["ExpressionAttributeValues"]
+        assert str(values[":score"]) == "68.3"
+        assert values[":rank"] == "B"
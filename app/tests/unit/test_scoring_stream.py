@@ -0,0 +1,213 @@
+"""
+単体テスト: ストリーミング採点
+逐次 JSON 解析・設問ごとの通知・SSE による進捗配信を検証
+"""
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from main import app
+from services.json_stream import IncrementalJSONParser
+from services.scoring import (
+    JOB_DONE,
+    InMemoryJobStore,
+    ScoringQueue,
+    get_scoring_queue,
+    score_submission_answers,
+)
+
+SCORING_TEXT = (
+    "採点結果は以下のとおりです。\n"
+    + json.dumps({
+        "question_breakdown": {
+            "設問ア": {"level": "A", "question_score": 85, "criteria_scores": [
+                {"criterion": "充足度", "weight": 0.15, "points": 85, "comment": "「{」を含む \\\"引用\\\""},
+            ]},
+            "設問イ": {"level": "B", "question_score": 72, "criteria_scores": [
+                {"criterion": "充足度", "weight": 0.15, "points": 72},
+            ]},
+        },
+        "aggregate_score": 78.5,
+        "final_rank": "B",
+    }, ensure_ascii=False)
+)
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def stream_events(text, size=7):
+    """invoke_model_with_response_stream の body を模したイベント列"""
+    events = [{"chunk": {"bytes": json.dumps({"type": "message_start"}).encode()}}]
+    for piece in chunks(text, size):
+        delta = {"type": "content_block_delta", "delta": {"type": "text_delta", "text": piece}}
+        events.append({"chunk": {"bytes": json.dumps(delta, ensure_ascii=False).encode()}})
+    return events
+
+
+class TestIncrementalJSONParser:
+    """IncrementalJSONParser の逐次解析"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("size", [1, 5, 1000])
+    def test_emits_each_question_when_closed(self, size):
+        """分割位置に関わらず、設問の評価が閉じた時点で 1 回ずつ返すこと"""
+        parser = IncrementalJSONParser(watch=[("question_breakdown",)])
+        emitted = []
+        for piece in chunks(SCORING_TEXT, size):
+            emitted.extend(parser.feed(piece))
+
+        assert [path for path, _ in emitted] == [
+            ("question_breakdown", "設問ア"),
+            ("question_breakdown", "設問イ"),
+        ]
+        assert emitted[0][1]["criteria_scores"][0]["comment"] == "「{」を含む \\\"引用\\\""
+        assert parser.complete
+        assert parser.value["final_rank"] == "B"
+
+    @pytest.mark.unit
+    def test_first_question_available_before_document_ends(self):
+        """設問アの閉じ括弧までで設問アが得られること"""
+        parser = IncrementalJSONParser(watch=[("question_breakdown",)])
+        cut = SCORING_TEXT.index('"設問イ"')
+        emitted = parser.feed(SCORING_TEXT[:cut])
+
+        assert [path[-1] for path, _ in emitted] == ["設問ア"]
+        assert not parser.complete
+
+
+class TestStreamingScoring:
+    """score_submission_answers のストリーミングモード"""
+
+    @pytest.mark.unit
+    async def test_notifies_questions_and_saves_result(self):
+        """完成した設問を文字数付きで通知し、最終結果は従来どおり保存すること"""
+        aws = MagicMock()
+        aws.submission_table.get_item.return_value = {
+            "Item": {"submission_id": "sub-1", "answers": {"設問ア": "回答 です\n", "設問イ": "回答"}}
+        }
+        aws.bedrock.invoke_model_with_response_stream.return_value = {"body": stream_events(SCORING_TEXT)}
+
+        notified = []
+
+        async def on_question(question, breakdown):
+            notified.append((question, breakdown["word_count"]))
+
+        result = await score_submission_answers(aws, "sub-1", on_question=on_question)
+
+        assert notified == [("設問ア", 4), ("設問イ", 2)]
+        assert result["final_rank"] == "B"
+        aws.bedrock.invoke_model.assert_not_called()
+        values = aws.submission_table.update_item.call_args.kwargs["ExpressionAttributeValues"]
+        assert set(values[":breakdown"]) == {"設問ア", "設問イ"}
+
+    @pytest.mark.unit
+    async def test_invalid_question_is_not_notified_and_retry_resets_progress(self):
+        """検証を通らない設問は通知せず、生成し直すときは取り消してから結果の設問を通知し直すこと"""
+        aws = MagicMock()
+        aws.submission_table.get_item.return_value = {
+            "Item": {"submission_id": "sub-1", "answers": {"設問ア": "回答 です\n", "設問イ": "回答"}}
+        }
+        invalid = SCORING_TEXT.replace('"level": "B"', '"level": "Z"')
+        aws.bedrock.invoke_model_with_response_stream.return_value = {"body": stream_events(invalid)}
+        body = json.dumps({"content": [{"text": SCORING_TEXT}]})
+        aws.bedrock.invoke_model.return_value = {"body": MagicMock(read=lambda: body.encode("utf-8"))}
+
+        notified = []
+
+        async def on_question(question, breakdown):
+            notified.append((question, breakdown["level"]))
+
+        async def on_reset():
+            notified.append("reset")
+
+        result = await score_submission_answers(aws, "sub-1", on_question=on_question, on_reset=on_reset)
+
+        assert notified == [("設問ア", "A"), "reset", ("設問ア", "A"), ("設問イ", "B")]
+        assert result["final_rank"] == "B"
+        aws.bedrock.invoke_model.assert_called_once()
+
+
+class TestScoringJobEvents:
+    """/api/scoring/jobs/{job_id}/events"""
+
+    @pytest.mark.unit
+    async def test_streams_questions_then_done(self, async_client):
+        """設問ごとの question イベントの後に status: done が届くこと"""
+        release = asyncio.Event()
+
+        async def runner(job, on_question, on_reset):
+            await release.wait()
+            await on_question("設問ア", {"level": "A", "question_score": 85, "word_count": 800, "criteria_scores": []})
+            await asyncio.sleep(0.01)
+            await on_question("設問イ", {"level": "B", "question_score": 70, "word_count": 900, "criteria_scores": []})
+
+        queue = ScoringQueue(InMemoryJobStore(), runner, concurrency=1, max_queued=10)
+        queue.start()
+        app.dependency_overrides[get_scoring_queue] = lambda: queue
+        try:
+            job = await queue.submit("sub-1")
+            asyncio.get_running_loop().call_later(0.05, release.set)
+            response = await async_client.get(f"/api/scoring/jobs/{job.job_id}/events")
+        finally:
+            app.dependency_overrides.pop(get_scoring_queue, None)
+            await queue.stop()
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [
+            (block.split("\n")[0].removeprefix("event: "), json.loads(block.split("\n")[1].removeprefix("data: ")))
+            for block in response.text.strip().split("\n\n")
+            if block.startswith("event:")
+        ]
+        assert [name for name, _ in events if name == "question"] == ["question", "question"]
+        assert [data["question"] for name, data in events if name == "question"] == ["設問ア", "設問イ"]
+        assert events[-1] == ("status", {"status": JOB_DONE, "error": None})
+
+        status = (await queue.store.get(job.job_id))
+        assert set(status.progress) == {"設問ア", "設問イ"}
+
+    @pytest.mark.unit
+    async def test_reset_discards_sent_questions(self):
+        """進捗が取り消されると reset を送り、生成し直した設問を送り直すこと"""
+        retry = asyncio.Event()
+
+        async def runner(job, on_question, on_reset):
+            await on_question("設問ア", {"level": "A", "question_score": 85, "word_count": 800, "criteria_scores": []})
+            await retry.wait()
+            await on_reset()
+            await on_question("設問ア", {"level": "B", "question_score": 70, "word_count": 800, "criteria_scores": []})
+
+        queue = ScoringQueue(InMemoryJobStore(), runner, concurrency=1, max_queued=10)
+        queue.start()
+        try:
+            job = await queue.submit("sub-1")
+            events = []
+            async for name, data in queue.events(job.job_id, poll_seconds=0.05):
+                if name == "keepalive":
+                    continue
+                events.append((name, data))
+                if name == "question":
+                    retry.set()
+        finally:
+            await queue.stop()
+
+        questions = [(name, data.get("breakdown", {}).get("level")) for name, data in events if name != "status"]
+        assert questions == [("question", "A"), ("reset", None), ("question", "B")]
+        assert (await queue.store.get(job.job_id)).progress["設問ア"]["level"] == "B"
+
+    @pytest.mark.unit
+    async def test_unknown_job_returns_404(self, async_client):
+        """存在しないジョブは 404 を返すこと"""
+        queue = ScoringQueue(InMemoryJobStore(), None, concurrency=0, max_queued=1)
+        app.dependency_overrides[get_scoring_queue] = lambda: queue
+        try:
+            response = await async_client.get("/api/scoring/jobs/unknown/events")
+        finally:
+            app.dependency_overrides.pop(get_scoring_queue, None)
+
+        assert response.status_code == 404
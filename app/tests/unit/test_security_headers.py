@@ -0,0 +1,52 @@
+"""
+単体テスト: セキュリティヘッダーミドルウェア（純粋な ASGI 実装）
+"""
+
+import pytest
+
+from middleware import SECURITY_HEADERS, SecurityHeadersMiddleware
+
+
+async def run(app, scope_type="http"):
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await SecurityHeadersMiddleware(app)({"type": scope_type}, receive, send)
+    return messages
+
+
+class TestSecurityHeadersMiddleware:
+    """ヘッダー差し込みのテスト"""
+
+    @pytest.mark.unit
+    async def test_headers_injected_on_start_only(self):
+        """開始メッセージにのみヘッダーを追加し、本文チャンクはそのまま渡すこと"""
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+            await send({"type": "http.response.body", "body": b"data: 1\n\n", "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        messages = await run(app)
+        headers = dict(messages[0]["headers"])
+
+        assert headers[b"content-type"] == b"text/event-stream"
+        for name, value in SECURITY_HEADERS:
+            assert headers[name.lower().encode()] == value.encode()
+        assert messages[1] == {"type": "http.response.body", "body": b"data: 1\n\n", "more_body": True}
+
+    @pytest.mark.unit
+    async def test_app_headers_overridden(self):
+        """アプリが設定した同名ヘッダーは上書きされ、重複しないこと"""
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"x-frame-options", b"SAMEORIGIN")]})
+            await send({"type": "http.response.body", "body": b""})
+
+        messages = await run(app)
+        values = [v for k, v in messages[0]["headers"] if k == b"x-frame-options"]
+
+        assert values == [b"DENY"]
@@ -0,0 +1,122 @@
+"""
+単体テスト: Single-flight
+同時キャッシュミスがバックエンド呼び出し 1 回に集約されることを検証
+"""
+
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+PROBLEM_ID = "YEAR#2024SPRING#ESSAY#Q1"
+EXAM_ITEM = {
+    "PK": "EXAM#IS",
+    "SK": PROBLEM_ID,
+    "title": "テスト問題",
+    "year_term": "2024春",
+    "s3_uri": "s3://bucket/IS/is_essay.json",
+}
+
+
+def _slow(result, delay=0.05):
+    """スレッド上で delay 秒かかる boto3 呼び出しのスタブ"""
+    def call(**kwargs):
+        time.sleep(delay)
+        return result
+    return call
+
+
+class TestSingleFlight:
+    """SingleFlight プリミティブのテスト"""
+
+    @pytest.mark.unit
+    async def test_concurrent_calls_share_one_execution(self):
+        """同じキーの同時呼び出しが 1 回の実行を共有すること"""
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(100)))
+
+        assert calls == 1
+        assert results == ["value"] * 100
+        assert flight.inflight() == 0
+
+    @pytest.mark.unit
+    async def test_error_propagated_to_all_waiters_and_not_cached(self):
+        """失敗は待機者全員に伝わり、次回呼び出しで再実行されること"""
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def fail():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+
+        results = await asyncio.gather(*(flight.do("key", fail) for _ in range(10)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        with pytest.raises(RuntimeError):
+            await flight.do("key", fail)
+        assert calls == 2
+
+    @pytest.mark.unit
+    async def test_leader_cancellation_does_not_cancel_fetch(self):
+        """最初の呼び出し元がキャンセルされても他の待機者は結果を受け取れること"""
+        flight = SingleFlight("test")
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "value"
+
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "value"
+
+
+class TestSingleFlightEndpoints:
+    """エンドポイント経由の同時キャッシュミス集約テスト"""
+
+    @pytest.mark.unit
+    async def test_100_concurrent_detail_requests_fetch_s3_once(self, async_client, stub_aws):
+        """問題詳細への 100 並行リクエストで S3 GetObject が 1 回だけ呼ばれること"""
+        stub_aws.exam_table.query.side_effect = _slow({"Items": [EXAM_ITEM]}, delay=0)
+        body = json.dumps(
+            [{"question_id": f"IS#{PROBLEM_ID}", "problemContent": "本文"}], ensure_ascii=False
+        ).encode("utf-8")
+        stub_aws.s3.get_object.side_effect = _slow({"Body": MagicMock(read=lambda: body), "ETag": '"e1"'})
+
+        responses = await asyncio.gather(*(
+            async_client.get("/api/exams/detail", params={"exam_type": "IS", "problem_id": PROBLEM_ID})
+            for _ in range(100)
+        ))
+
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()["problem_content"] == "本文" for r in responses)
+        assert stub_aws.s3.get_object.call_count == 1
+
+    @pytest.mark.unit
+    async def test_100_concurrent_catalog_requests_query_once(self, async_client, stub_aws):
+        """試験一覧への 100 並行リクエストで DynamoDB Query が 1 回だけ呼ばれること"""
+        stub_aws.exam_table.query.side_effect = _slow({"Items": [EXAM_ITEM]})
+
+        responses = await asyncio.gather(*(
+            async_client.get("/api/exams", params={"exam_type": "IS"}) for _ in range(100)
+        ))
+
+        assert all(r.status_code == 200 for r in responses)
+        assert stub_aws.exam_table.query.call_count == 1
@@ -0,0 +1,131 @@
+"""
+単体テスト: 試験コーパススナップショット
+書き出し・メモリマップ読み込み・スナップショット優先の取得経路を検証
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.snapshot import (
+    CorpusSnapshot,
+    export_snapshot,
+    snapshot_catalog_loader,
+    snapshot_object_fetcher,
+    write_snapshot,
+)
+
+ITEMS = [
+    {"PK": "EXAM#IS", "SK": "YEAR#2024SPRING#ESSAY#Q1", "title": "問1", "s3_uri": "s3://bucket/IS/essay.json"},
+]
+BODY = json.dumps([{"question_id": "IS#YEAR#2024SPRING#ESSAY#Q1", "problemContent": "本文"}], ensure_ascii=False).encode()
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "corpus.snapshot"
+    write_snapshot(path, {"IS": ITEMS}, {"bucket/IS/essay.json": (BODY, '"e1"'), "bucket/other.json": (b"[]", None)})
+    snapshot = CorpusSnapshot(path)
+    yield snapshot
+    snapshot.close()
+
+
+class Fallback:
+    """呼び出しを記録するネットワーク経路のスタブ"""
+
+    def __init__(self, result):
+        self.calls = []
+        self.result = result
+
+    async def __call__(self, *args):
+        self.calls.append(args)
+        return self.result
+
+
+class TestCorpusSnapshot:
+    """スナップショットファイルのテスト"""
+
+    @pytest.mark.unit
+    def test_round_trip(self, snapshot):
+        assert snapshot.exam_types() == ["IS"]
+        assert snapshot.catalog_items("IS") == ITEMS
+        assert snapshot.catalog_items("PM") is None
+        assert snapshot.document("bucket", "IS/essay.json") == (BODY, '"e1"')
+        assert snapshot.document("bucket", "other.json") == (b"[]", None)
+        assert snapshot.document("bucket", "missing.json") is None
+
+    @pytest.mark.unit
+    def test_version_depends_only_on_content(self, tmp_path):
+        """版は内容から決まり、作り直しても同じ・内容が変われば変わること"""
+        versions = []
+        for name, body in (("a", BODY), ("b", BODY), ("c", b"[]")):
+            path = tmp_path / f"{name}.snapshot"
+            write_snapshot(path, {"IS": ITEMS}, {"bucket/IS/essay.json": (body, '"e1"')})
+            snapshot = CorpusSnapshot(path)
+            versions.append(snapshot.version)
+            snapshot.close()
+        assert versions[0] == versions[1] != versions[2]
+
+    @pytest.mark.unit
+    def test_open_if_exists_tolerates_missing_or_corrupt(self, tmp_path):
+        assert CorpusSnapshot.open_if_exists(str(tmp_path / "none.snapshot")) is None
+        corrupt = tmp_path / "corrupt.snapshot"
+        corrupt.write_bytes(b"not a snapshot at all")
+        assert CorpusSnapshot.open_if_exists(str(corrupt)) is None
+
+    @pytest.mark.unit
+    async def test_export_from_aws(self, tmp_path):
+        """DynamoDB / S3 から取得した内容がそのまま書き出されること"""
+        aws = MagicMock()
+        aws.exam_table.query.return_value = {"Items": ITEMS}
+        aws.s3.get_object.return_value = {"Body": MagicMock(read=lambda: BODY), "ETag": '"e1"'}
+        path = tmp_path / "out.snapshot"
+
+        summary = await export_snapshot(aws, ["IS"], path)
+
+        assert summary["items"] == 1 and summary["documents"] == 1
+        exported = CorpusSnapshot(path)
+        assert exported.document("bucket", "IS/essay.json") == (BODY, '"e1"')
+        exported.close()
+
+
+class TestSnapshotLoaders:
+    """スナップショット優先の取得経路のテスト"""
+
+    @pytest.mark.unit
+    async def test_catalog_served_from_snapshot_on_every_load(self, snapshot):
+        """再取得でもスナップショットにある区分は DynamoDB を呼ばず、ない区分のみ DynamoDB から読み込むこと"""
+        fallback = Fallback([])
+        loader = snapshot_catalog_loader(snapshot, fallback)
+
+        assert await loader("IS") == ITEMS
+        assert await loader("IS") == ITEMS
+        await loader("PM")
+        assert fallback.calls == [("PM",)]
+
+    @pytest.mark.unit
+    async def test_released_catalog_loaded_from_dynamodb(self, snapshot):
+        """無効化で外した区分は、以降 DynamoDB から読み込むこと"""
+        fallback = Fallback([{"PK": "EXAM#IS", "SK": "new"}])
+        loader = snapshot_catalog_loader(snapshot, fallback)
+
+        assert snapshot.release_catalogs("PM") == []
+        assert snapshot.release_catalogs() == ["IS"]
+        assert snapshot.release_catalogs("IS") == []
+
+        assert await loader("IS") == fallback.result
+        assert fallback.calls == [("IS",)]
+
+    @pytest.mark.unit
+    async def test_documents_served_without_network(self, snapshot):
+        """同梱ドキュメントは S3 を呼ばず、再検証は変更なしとして扱うこと"""
+        fallback = Fallback((b"[]", '"s3"'))
+        fetch = snapshot_object_fetcher(snapshot, fallback)
+
+        assert await fetch("bucket", "IS/essay.json", None) == (BODY, '"e1"')
+        assert await fetch("bucket", "IS/essay.json", '"e1"') is None
+        assert fallback.calls == []
+
+        assert await fetch("bucket", "new.json", None) == (b"[]", '"s3"')
+        assert fallback.calls == [("bucket", "new.json", None)]
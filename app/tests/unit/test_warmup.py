@@ -0,0 +1,128 @@
+"""
+単体テスト: 起動時ウォームアップ
+カタログ・問題ドキュメントの事前読み込みとレディネスチェックを検証
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from services.catalog import ExamCatalog
+from services.problems import ProblemDocumentCache
+from services.warmup import WarmupState, run_warmup
+
+
+def make_items(exam_type):
+    return [
+        {
+            "PK": f"EXAM#{exam_type}",
+            "SK": "YEAR#2024SPRING#ESSAY#Q1",
+            "title": "問1",
+            "year_term": "2024春",
+            "s3_uri": f"s3://bucket/{exam_type}/essay.json",
+        },
+        {
+            "PK": f"EXAM#{exam_type}",
+            "SK": "YEAR#2024SPRING#ESSAY#Q2",
+            "title": "問2",
+            "year_term": "2024春",
+            "s3_uri": f"s3://bucket/{exam_type}/essay.json",
+        },
+    ]
+
+
+class CountingFetcher:
+    """取得キーを記録する S3 フェッチャー"""
+
+    def __init__(self, delay=0.0, fail=()):
+        self.keys = []
+        self.delay = delay
+        self.fail = set(fail)
+
+    async def __call__(self, bucket, key, etag):
+        self.keys.append(key)
+        await asyncio.sleep(self.delay)
+        if key in self.fail:
+            raise RuntimeError("S3 unavailable")
+        return json.dumps([{"question_id": key}]).encode("utf-8"), '"etag"'
+
+
+async def load_items(exam_type):
+    return make_items(exam_type)
+
+
+def make_caches(fetcher):
+    catalog = ExamCatalog(load_items, ttl_seconds=60, stale_seconds=60)
+    problem_cache = ProblemDocumentCache(
+        fetcher, max_bytes=1024 * 1024, ttl_seconds=60, negative_ttl_seconds=1
+    )
+    return catalog, problem_cache
+
+
+class TestWarmup:
+    """run_warmup の動作テスト"""
+
+    @pytest.mark.unit
+    async def test_warms_catalogs_and_distinct_documents(self):
+        """全試験区分のカタログと、重複を除いた S3 ドキュメントを読み込むこと"""
+        fetcher = CountingFetcher()
+        catalog, problem_cache = make_caches(fetcher)
+        state = WarmupState()
+
+        await run_warmup(catalog, problem_cache, ["IS", "PM"], state, timeout_seconds=5)
+
+        assert state.ready is True
+        assert state.exam_types == 2
+        assert state.documents == 2
+        assert sorted(fetcher.keys) == ["IS/essay.json", "PM/essay.json"]
+        assert sorted(catalog.cached_types()) == ["IS", "PM"]
+        assert state.duration_seconds is not None
+
+    @pytest.mark.unit
+    async def test_failures_do_not_block_readiness(self):
+        """一部の取得に失敗してもレディ状態になり、エラーが記録されること"""
+        fetcher = CountingFetcher(fail={"PM/essay.json"})
+        catalog, problem_cache = make_caches(fetcher)
+        state = WarmupState()
+
+        await run_warmup(catalog, problem_cache, ["IS", "PM"], state, timeout_seconds=5)
+
+        assert state.ready is True
+        assert state.documents == 1
+        assert len(state.errors) == 1
+
+    @pytest.mark.unit
+    async def test_timeout_marks_ready(self):
+        """タイムアウトした場合もレディ状態にすること"""
+        fetcher = CountingFetcher(delay=1)
+        catalog, problem_cache = make_caches(fetcher)
+        state = WarmupState()
+
+        await run_warmup(catalog, problem_cache, ["IS"], state, timeout_seconds=0.05)
+
+        assert state.ready is True
+        assert state.timed_out is True
+
+
+class TestReadinessEndpoint:
+    """/ready エンドポイントのテスト"""
+
+    @pytest.mark.unit
+    def test_ready_when_warmup_disabled(self, client):
+        """ウォームアップ無効時は起動直後からレディであること"""
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+    @pytest.mark.unit
+    def test_not_ready_while_warming(self, client):
+        """ウォームアップ中は 503 を返すこと"""
+        original = client.app.state.warmup
+        client.app.state.warmup = WarmupState(running=True)
+        try:
+            response = client.get("/ready")
+        finally:
+            client.app.state.warmup = original
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming"
@@ -0,0 +1,110 @@
+"""
+単体テスト: 論文設計ウィザードの集約エンドポイント
+"""
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+PROBLEM_ID = "YEAR#2024SPRING#ESSAY#Q1"
+EXAM_ITEM = {
+    "PK": "EXAM#IS",
+    "SK": PROBLEM_ID,
+    "title": "テスト問題",
+    "year_term": "2024春",
+    "s3_uri": "s3://bucket/IS/is_essay.json",
+}
+MODULE = {
+    "user_id": "demo-user",
+    "module_id": "m1",
+    "title": "背景",
+    "category": "背景",
+    "content": "A社の概要",
+    "tags": [],
+    "created_at": "2024-01-01T00:00:00",
+    "updated_at": "2024-01-01T00:00:00",
+}
+
+
+@pytest.fixture
+def wizard_aws(stub_aws):
+    stub_aws.exam_table.query.return_value = {"Items": [EXAM_ITEM]}
+    body = json.dumps([{"question_id": f"IS#{PROBLEM_ID}", "problemContent": "本文"}], ensure_ascii=False).encode()
+    stub_aws.s3.get_object.side_effect = lambda **kwargs: {"Body": MagicMock(read=lambda: body), "ETag": '"e1"'}
+    stub_aws.modules_table.query.return_value = {"Items": [MODULE]}
+    stub_aws.designs_table.get_item.return_value = {}
+    stub_aws.interview_table.get_item.return_value = {}
+    return stub_aws
+
+
+def bootstrap(client, **params):
+    return client.get(
+        "/api/wizard/bootstrap", params={"exam_type": "IS", "problem_id": PROBLEM_ID, **params}
+    )
+
+
+class TestWizardBootstrap:
+    """/api/wizard/bootstrap のテスト"""
+
+    @pytest.mark.unit
+    def test_returns_all_fields_in_one_response(self, client, wizard_aws):
+        """問題・モジュール・設計図・セッションをまとめて返すこと"""
+        response = bootstrap(client)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["problem"]["problem_content"] == "本文"
+        assert [m["module_id"] for m in data["modules"]] == ["m1"]
+        assert data["design"]["exam_id"] == PROBLEM_ID and data["design"]["created_at"] == ""
+        assert data["session"] is None
+        assert data["errors"] == {}
+        # GET ではセッションを作成しない（インタビューを開いたときに作成される）
+        wizard_aws.interview_table.put_item.assert_not_called()
+
+    @pytest.mark.unit
+    def test_returns_existing_session(self, client, wizard_aws):
+        """作成済みのセッションはそのまま返すこと"""
+        wizard_aws.interview_table.get_item.return_value = {"Item": {
+            "user_id": "demo-user",
+            "exam_id": PROBLEM_ID,
+            "history": [{"role": "assistant", "content": "こんにちは"}],
+            "status": "active",
+        }}
+
+        data = bootstrap(client, fields="session").json()
+
+        assert data["session"]["history"][0]["content"] == "こんにちは"
+        wizard_aws.interview_table.put_item.assert_not_called()
+
+    @pytest.mark.unit
+    def test_field_selection(self, client, wizard_aws):
+        """fields で指定した項目だけを読み込むこと"""
+        data = bootstrap(client, fields="problem,design").json()
+
+        assert set(data) == {"problem", "design", "errors"}
+        wizard_aws.modules_table.query.assert_not_called()
+        wizard_aws.interview_table.get_item.assert_not_called()
+
+    @pytest.mark.unit
+    def test_unknown_field_rejected(self, client, wizard_aws):
+        assert bootstrap(client, fields="problem,secrets").status_code == 400
+
+    @pytest.mark.unit
+    def test_partial_failure_reported(self, client, wizard_aws):
+        """一部の取得に失敗しても、他の項目は返すこと"""
+        wizard_aws.modules_table.query.side_effect = RuntimeError("throttled")
+
+        data = bootstrap(client).json()
+
+        assert data["modules"] is None
+        assert "modules" in data["errors"]
+        assert data["problem"]["title"] == "テスト問題"
+
+    @pytest.mark.unit
+    def test_unknown_problem_404(self, client, wizard_aws):
+        wizard_aws.exam_table.get_item.return_value = {}
+
+        response = bootstrap(client, problem_id="YEAR#1999SPRING#ESSAY#Q9")
+
+        assert response.status_code == 404
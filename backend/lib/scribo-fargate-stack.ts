@@ -52,6 +52,32 @@ export class ScriboFargateStack extends cdk.Stack {
       removalPolicy: cdk.RemovalPolicy.DESTROY,
     });
     
+    // 新規テーブル作成: 採点ジョブ（どのタスクからでも状態を参照できるよう共有する）
+    const scoringJobsTable = new dynamodb.Table(this, 'ScoringJobsTable', {
+      tableName: 'ScoringJobsTable',
+      partitionKey: { name: 'job_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      timeToLiveAttribute: 'expires_at',
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+    
+    // 新規テーブル作成: 採点結果キャッシュ（同一回答の再提出で採点結果を再利用する）
+    const scoringCacheTable = new dynamodb.Table(this, 'ScoringCacheTable', {
+      tableName: 'ScoringCacheTable',
+      partitionKey: { name: 'cache_key', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      timeToLiveAttribute: 'expires_at',
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+    
+    // 新規テーブル作成: Bedrock ガバナーの状態（全タスクで同時実行数の上限とサーキットを共有する）
+    const bedrockGovernorTable = new dynamodb.Table(this, 'BedrockGovernorTable', {
+      tableName: 'BedrockGovernorTable',
+      partitionKey: { name: 'governor_id', type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+    
     // 既存S3バケットをインポート（問題データ格納）
     const essayBucket = s3.Bucket.fromBucketName(this, 'EssayBucket', 'scribo-essay-evaluator');
 
@@ -105,6 +131,9 @@ export class ScriboFargateStack extends cdk.Stack {
     modulesTable.grantReadWriteData(taskDefinition.taskRole);
     designsTable.grantReadWriteData(taskDefinition.taskRole);
     interviewSessionsTable.grantReadWriteData(taskDefinition.taskRole);
+    scoringJobsTable.grantReadWriteData(taskDefinition.taskRole);
+    scoringCacheTable.grantReadWriteData(taskDefinition.taskRole);
+    bedrockGovernorTable.grantReadWriteData(taskDefinition.taskRole);
 
     // S3 アクセス権限（問題データ読み取り）
     essayBucket.grantRead(taskDefinition.taskRole);
@@ -135,6 +164,14 @@ export class ScriboFargateStack extends cdk.Stack {
         DYNAMODB_SUBMISSION_TABLE: 'SubmissionTable',
         DYNAMODB_INTERVIEW_SESSION_TABLE: 'InterviewSessionsTable',
         BEDROCK_MODEL_ID: 'anthropic.claude-3-5-sonnet-20240620-v1:0',
+        WARMUP_ENABLED: 'true',
+        CORPUS_SNAPSHOT_REQUIRED: 'true',
+        SCORING_JOB_STORE: 'dynamodb',
+        DYNAMODB_SCORING_JOBS_TABLE: 'ScoringJobsTable',
+        SCORING_CACHE_STORE: 'dynamodb',
+        DYNAMODB_SCORING_CACHE_TABLE: 'ScoringCacheTable',
+        BEDROCK_GOVERNOR_STORE: 'dynamodb',
+        DYNAMODB_BEDROCK_GOVERNOR_TABLE: 'BedrockGovernorTable',
       },
       healthCheck: {
         command: ['CMD-SHELL', 'curl -f http://localhost:8000/health || exit 1'],
@@ -202,8 +239,9 @@ export class ScriboFargateStack extends cdk.Stack {
       port: 8000,
       protocol: elbv2.ApplicationProtocol.HTTP,
       targets: [service],
+      // ウォームアップ完了まで 503 を返す /ready で判定し、温まったタスクにのみ振り分ける
       healthCheck: {
-        path: '/health',
+        path: '/ready',
         interval: cdk.Duration.seconds(30),
         timeout: cdk.Duration.seconds(5),
         healthyThresholdCount: 2,
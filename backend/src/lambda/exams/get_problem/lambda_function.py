@@ -1,6 +1,7 @@
 import boto3
 import json
 import os
+from botocore.exceptions import ClientError
 
 dynamodb = boto3.resource('dynamodb')
 TABLE_NAME = os.environ.get('TABLE_NAME', 'scribo-ipa')
@@ -8,6 +9,10 @@ ALLOWED_ORIGIN = os.environ.get('ALLOWED_ORIGIN', '*')
 table = dynamodb.Table(TABLE_NAME)
 s3 = boto3.client('s3')
 
+# ウォームコンテナ内で再利用する S3 ドキュメントの索引
+# {"bucket/key": {"etag": str, "index": {question_id: problem}}}
+_document_index_cache = {}
+
 cors_headers = {
     'Access-Control-Allow-Origin': ALLOWED_ORIGIN,
     'Access-Control-Allow-Methods': 'GET,OPTIONS',
@@ -59,41 +64,25 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': 'Question not found'})
         }
 
-    # S3からJSONを取得
+    # S3からJSONを取得し、question_idの索引を得る
     try:
         bucket, key = parse_s3_uri(item['s3_uri'])
-        s3_obj = s3.get_object(Bucket=bucket, Key=key)
-        content = s3_obj['Body'].read().decode('utf-8')
-    except Exception as e:
-        print(f"Error fetching from S3: {e}")
+        index = load_document_index(bucket, key)
+    except json.JSONDecodeError:
         return {
             'statusCode': 500,
             'headers': cors_headers,
-            'body': json.dumps({'error': 'Failed to retrieve question content'})
+            'body': json.dumps({'error': 'Invalid JSON format'})
         }
-
-    # JSONをパース
-    try:
-        data = json.loads(content)
-    except json.JSONDecodeError:
+    except Exception as e:
+        print(f"Error fetching from S3: {e}")
         return {
             'statusCode': 500,
             'headers': cors_headers,
-            'body': json.dumps({'error': 'Invalid JSON format'})
+            'body': json.dumps({'error': 'Failed to retrieve question content'})
         }
-    
-    key = f"{exam_type}#{problem_id}"
-
-    # 配列を想定してquestion_idでフィルタ
-    matched = None
-    if isinstance(data, list):
-        for item in data:
-            if item.get('question_id') == key:
-                matched = item
-                break
-    elif isinstance(data, dict):
-        if data.get('question_id') == key:
-            matched = data
+
+    matched = index.get(f"{exam_type}#{problem_id}")
 
     if not matched:
         return {
@@ -111,6 +100,44 @@ def lambda_handler(event, context):
         }
     }
 
+def build_problem_index(data):
+    """question_id -> 問題 の索引を構築（app/services/problems.py と同じ規則）"""
+    problems = data if isinstance(data, list) else [data]
+    index = {}
+    for problem in problems:
+        if not isinstance(problem, dict):
+            continue
+        question_id = problem.get('question_id')
+        if question_id is not None and question_id not in index:
+            index[question_id] = problem
+    return index
+
+
+def load_document_index(bucket: str, key: str):
+    """
+    S3 ドキュメントの索引を返す
+
+    ウォームコンテナでは前回の ETag で条件付き取得し、
+    変更がなければ再ダウンロード・再パースせずに索引を再利用する。
+    """
+    cache_key = f"{bucket}/{key}"
+    cached = _document_index_cache.get(cache_key)
+    kwargs = {'Bucket': bucket, 'Key': key}
+    if cached:
+        kwargs['IfNoneMatch'] = cached['etag']
+    try:
+        s3_obj = s3.get_object(**kwargs)
+    except ClientError as e:
+        if cached and e.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 304:
+            return cached['index']
+        raise
+
+    data = json.loads(s3_obj['Body'].read().decode('utf-8'))
+    index = build_problem_index(data)
+    _document_index_cache[cache_key] = {'etag': s3_obj.get('ETag'), 'index': index}
+    return index
+
+
 def parse_s3_uri(uri: str):
     """s3://bucket/keyを(buket, key)に分解"""
     uri = uri.replace('s3://', '')